@@ -688,7 +688,7 @@ app.get('/api/version', (_req, res) => {
 // Health and readiness endpoints
 app.get('/api/healthz', (_req, res) => {
   try {
-    res.json({ ok: true, port: PORT, now: Date.now() });
+    res.json({ ok: true, port: PORT, pid: process.pid, now: Date.now() });
   } catch (e: any) {
     res.status(500).json({ ok: false, error: e?.message || String(e) });
   }
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - compact closed audit days into seekable archives and look entries up
+
+`compact` turns every closed day file (audit-<day>.jsonl, before today UTC
+and idle for --min-idle minutes) into <AUDIT_DIR>/archive/audit-<day>.jsonl.frames:
+the same bytes, cut into ~128 KiB frames compressed one by one (see
+auditlib/archive.py). While it does, it records which frames mention which
+roundId, matchId, lobbyId, wallet (playerId, winnerId, players), tx
+signature and event type in archive/index.sqlite. A lookup then reads only
+the frames that index points at, so it costs about the same however many
+days are archived. Days not archived yet (today's file among them) are
+scanned as well, so a lookup always covers the whole history.
+
+  python3 scripts/audit-archive.py compact                      # archive, keep the originals
+  python3 scripts/audit-archive.py compact --delete-originals   # ...and remove them once checked
+  python3 scripts/audit-archive.py find --round 5f0c2a1e-...
+  python3 scripts/audit-archive.py find --wallet 9xQe... --type payout_sent --since 2026-09-01
+  python3 scripts/audit-archive.py stats
+  python3 scripts/audit-archive.py reindex                      # rebuild index.sqlite from the archives
+
+Originals are only deleted after the archive has been read back and matched
+against the file's sha256. A day archived by an earlier run is re-archived
+first if its file no longer has the archived size and sha256. audit-verify.py reads archived days too, so the
+hash chain stays verifiable after the originals are gone.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from auditlib import DAY_FILE_RE, DEFAULT_AUDIT_DIR, day_file_name
+from auditlib.archive import ARCHIVE_SUFFIX, FRAME_BYTES, ArchiveReader, archive_name, entry_keys, write_archive
+
+KINDS = ("round", "match", "lobby", "wallet", "tx", "type")
+DEFAULT_MIN_IDLE_MIN = 15.0     # the server can still append to yesterday's file just after midnight
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+  id INTEGER PRIMARY KEY, day TEXT UNIQUE NOT NULL, file TEXT NOT NULL, entries INTEGER NOT NULL,
+  raw_bytes INTEGER NOT NULL, packed_bytes INTEGER NOT NULL, sha256 TEXT NOT NULL, created REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS keys (
+  kind TEXT NOT NULL, key TEXT NOT NULL, archive_id INTEGER NOT NULL, frame INTEGER NOT NULL,
+  PRIMARY KEY (kind, key, archive_id, frame)) WITHOUT ROWID;
+"""
+
+
+def human(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def open_index(archive_dir: Path) -> sqlite3.Connection:
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(archive_dir / "index.sqlite")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def index_archive(conn: sqlite3.Connection, path: Path, footer: dict, frame_keys: dict[int, set]) -> None:
+    """Replace the index rows of one day, in one transaction."""
+    with conn:
+        row = conn.execute("SELECT id FROM archives WHERE day = ?", (footer["day"],)).fetchone()
+        if row:
+            conn.execute("DELETE FROM keys WHERE archive_id = ?", (row[0],))
+            conn.execute("DELETE FROM archives WHERE id = ?", (row[0],))
+        cur = conn.execute(
+            "INSERT INTO archives (day, file, entries, raw_bytes, packed_bytes, sha256, created) VALUES (?,?,?,?,?,?,?)",
+            (footer["day"], path.name, footer["entries"], footer["raw_bytes"], path.stat().st_size, footer["sha256"],
+             time.time()))
+        archive_id = cur.lastrowid
+        conn.executemany("INSERT OR IGNORE INTO keys VALUES (?,?,?,?)",
+                         ((kind, key, archive_id, frame) for frame, keys in frame_keys.items() for kind, key in keys))
+
+
+def closed_days(audit_dir: Path, min_idle_s: float) -> list[str]:
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    out = []
+    for p in sorted(audit_dir.iterdir()):
+        m = DAY_FILE_RE.match(p.name)
+        if m and m.group(1) < today and time.time() - p.stat().st_mtime >= min_idle_s:
+            out.append(m.group(1))
+    return out
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cmd_compact(args) -> int:
+    archive_dir = args.dir / "archive"
+    conn = open_index(archive_dir)
+    done = {day for (day,) in conn.execute("SELECT day FROM archives")}
+    days = closed_days(args.dir, args.min_idle * 60)
+    todo = [d for d in days if d not in done or not (archive_dir / archive_name(d)).exists()]
+    raw_total = packed_total = 0
+
+    def archive(day: str) -> bool:
+        nonlocal raw_total, packed_total
+        src = args.dir / day_file_name(day)
+        dest = archive_dir / archive_name(day)
+        frame_keys: dict[int, set] = {}
+        t0 = time.monotonic()
+
+        def on_frame(i: int, lines: list[bytes]) -> None:
+            keys = set()
+            for line in lines:
+                keys |= entry_keys(line)
+            frame_keys[i] = keys
+
+        footer = write_archive(src, dest, day, codec=args.codec, frame_bytes=args.frame_kib * 1024, on_frame=on_frame)
+        with ArchiveReader(dest) as reader:
+            if hashlib.sha256(reader.read_all()).hexdigest() != footer["sha256"]:
+                dest.unlink()
+                print(f"❌ ERROR: {dest.name} does not read back as {src.name}; original kept")
+                return False
+        index_archive(conn, dest, footer, frame_keys)
+        packed = dest.stat().st_size
+        raw_total += footer["raw_bytes"]
+        packed_total += packed
+        print(f"[archive] {src.name}: {footer['entries']:,} entries, {human(footer['raw_bytes'])} -> {human(packed)} "
+              f"in {len(footer['frames'])} frames ({time.monotonic() - t0:.1f}s)")
+        return True
+
+    for day in todo:
+        if not archive(day):
+            return 1
+    if args.delete_originals:
+        for day in days:
+            src = args.dir / day_file_name(day)
+            if not src.exists() or not (archive_dir / archive_name(day)).exists():
+                continue
+            # The archive may be from an earlier run; only delete the file it was made from.
+            row = conn.execute("SELECT raw_bytes, sha256 FROM archives WHERE day = ?", (day,)).fetchone()
+            if row is None:
+                continue
+            if (src.stat().st_size, file_sha256(src)) != tuple(row):
+                print(f"[archive] {src.name} changed since it was archived; archiving it again")
+                todo.append(day)
+                if not archive(day):
+                    return 1
+                row = conn.execute("SELECT raw_bytes, sha256 FROM archives WHERE day = ?", (day,)).fetchone()
+                if (src.stat().st_size, file_sha256(src)) != tuple(row):
+                    print(f"⚠️  {src.name} is still changing; original kept")
+                    continue
+            src.unlink()
+            print(f"[archive] removed {src.name}")
+    conn.close()
+    if todo:
+        print(f"[archive] {len(todo)} days, {human(raw_total)} -> {human(packed_total)}"
+              + (f" ({raw_total / packed_total:.1f}x)" if packed_total else ""))
+    else:
+        print("[archive] nothing to compact")
+    return 0
+
+
+def matches(keys: set[tuple[str, str]], criteria: dict[str, str]) -> bool:
+    return all(item in keys for item in criteria.items())
+
+
+def scan_frame(lines: list[bytes], criteria: dict[str, str]) -> list[bytes]:
+    needles = [f'"{v}"'.encode() for v in criteria.values()]
+    out = []
+    for line in lines:
+        if all(n in line for n in needles) and matches(entry_keys(line), criteria):
+            out.append(line)
+    return out
+
+
+def cmd_find(args) -> int:
+    criteria = {kind: getattr(args, kind) for kind in KINDS if getattr(args, kind)}
+    if not criteria:
+        print("❌ ERROR: give at least one of --round, --match, --lobby, --wallet, --tx, --type")
+        return 1
+    archive_dir = args.dir / "archive"
+    t0 = time.monotonic()
+    hits: list[tuple[str, int, bytes]] = []      # (day, line order, line)
+    frames_read = 0
+    archived: set[str] = set()
+    if (archive_dir / "index.sqlite").exists():
+        conn = open_index(archive_dir)
+        archived = {day for (day,) in conn.execute("SELECT day FROM archives")}
+        clauses = " INTERSECT ".join("SELECT archive_id, frame FROM keys WHERE kind = ? AND key = ?" for _ in criteria)
+        params = [v for item in criteria.items() for v in item]
+        rows = conn.execute(
+            f"SELECT a.day, a.file, k.frame FROM ({clauses}) k JOIN archives a ON a.id = k.archive_id "
+            f"WHERE a.day >= ? AND a.day <= ? ORDER BY a.day, k.frame",
+            params + [args.since or "", args.until or "9999"]).fetchall()
+        conn.close()
+        by_file: dict[tuple[str, str], list[int]] = {}
+        for day, file, frame in rows:
+            by_file.setdefault((day, file), []).append(frame)
+
+        def read(item) -> list[tuple[str, int, bytes]]:
+            (day, file), frames = item
+            out = []
+            with ArchiveReader(archive_dir / file) as reader:
+                for i in frames:
+                    lines = reader.frame(i).splitlines()
+                    found = set(scan_frame(lines, criteria))
+                    first = reader.frames[i].first_line
+                    out.extend((day, first + n, line) for n, line in enumerate(lines) if line in found)
+            return out
+
+        frames_read = len(rows)
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:       # lzma/zlib release the GIL
+            for found in pool.map(read, by_file.items()):
+                hits.extend(found)
+    # Days not archived yet, today's included: scan them.
+    scanned = 0
+    for p in sorted(args.dir.iterdir()):
+        m = DAY_FILE_RE.match(p.name)
+        if not m or m.group(1) in archived:
+            continue
+        day = m.group(1)
+        if (args.since and day < args.since) or (args.until and day > args.until):
+            continue
+        lines = p.read_bytes().splitlines()
+        scanned += 1
+        found = set(scan_frame(lines, criteria))
+        hits.extend((day, n + 1, line) for n, line in enumerate(lines) if line in found)
+    hits.sort(key=lambda h: (h[0], h[1]))
+    if args.limit:
+        hits = hits[:args.limit]
+    for day, line_no, line in hits:
+        if args.pretty:
+            entry = json.loads(line)
+            ts = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(entry.get("ts", 0) / 1000))
+            payload = json.dumps(entry.get("payload"), separators=(",", ":"))
+            print(f"{ts}  {entry.get('type', ''):24} {payload[:160]}")
+        else:
+            sys.stdout.write(line.decode(errors="replace") + "\n")
+    print(f"[find] {len(hits)} entries; {frames_read} archived frames read, {scanned} unarchived day files scanned, "
+          f"{(time.monotonic() - t0) * 1000:.0f} ms", file=sys.stderr)
+    return 0 if hits else 1
+
+
+def cmd_stats(args) -> int:
+    archive_dir = args.dir / "archive"
+    plain = [p for p in args.dir.iterdir() if DAY_FILE_RE.match(p.name)]
+    print(f"Unarchived day files: {len(plain)} ({human(sum(p.stat().st_size for p in plain))})")
+    if not (archive_dir / "index.sqlite").exists():
+        print("No archives yet")
+        return 0
+    conn = open_index(archive_dir)
+    n, entries, raw, packed, first, last = conn.execute(
+        "SELECT COUNT(*), SUM(entries), SUM(raw_bytes), SUM(packed_bytes), MIN(day), MAX(day) FROM archives").fetchone()
+    keys = conn.execute("SELECT kind, COUNT(DISTINCT key) FROM keys GROUP BY kind ORDER BY kind").fetchall()
+    conn.close()
+    if not n:
+        print("No archives yet")
+        return 0
+    print(f"Archived days: {n} ({first} .. {last}), {entries:,} entries, {human(raw)} -> {human(packed)} "
+          f"({raw / packed:.1f}x)")
+    print(f"Index: {human((archive_dir / 'index.sqlite').stat().st_size)}, "
+          + ", ".join(f"{count:,} {kind}" for kind, count in keys))
+    return 0
+
+
+def cmd_reindex(args) -> int:
+    archive_dir = args.dir / "archive"
+    (archive_dir / "index.sqlite").unlink(missing_ok=True)
+    conn = open_index(archive_dir)
+    paths = sorted(archive_dir.glob(f"audit-*{ARCHIVE_SUFFIX}"))
+    for path in paths:
+        with ArchiveReader(path) as reader:
+            frame_keys = {}
+            for i in range(len(reader.frames)):
+                keys = set()
+                for line in reader.frame(i).splitlines():
+                    keys |= entry_keys(line)
+                frame_keys[i] = keys
+            index_archive(conn, path, reader.footer, frame_keys)
+        print(f"[archive] indexed {path.name}")
+    conn.close()
+    print(f"[archive] index rebuilt from {len(paths)} archives")
+    return 0
+
+
+def main() -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dir", type=Path, default=DEFAULT_AUDIT_DIR, help=f"Audit directory (default: {DEFAULT_AUDIT_DIR}).")
+    parser = argparse.ArgumentParser(description="Compact closed audit days into seekable archives and look entries up.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("compact", parents=[common], help="Archive closed day files.")
+    p.add_argument("--delete-originals", action="store_true", help="Remove day files once their archive checks out.")
+    p.add_argument("--min-idle", type=float, default=DEFAULT_MIN_IDLE_MIN,
+                   help=f"Only days whose file has not changed for this many minutes (default: {DEFAULT_MIN_IDLE_MIN:g}).")
+    p.add_argument("--codec", choices=("x", "z"), default="x", help="x = LZMA2 (default), z = zlib (faster, larger).")
+    p.add_argument("--frame-kib", type=int, default=FRAME_BYTES // 1024,
+                   help=f"Uncompressed bytes per frame, in KiB (default: {FRAME_BYTES // 1024}).")
+    p = sub.add_parser("find", parents=[common], help="Print the entries matching every key given.")
+    for kind, help_text in (("round", "roundId"), ("match", "matchId"), ("lobby", "lobbyId"),
+                            ("wallet", "playerId / winnerId / one of players"), ("tx", "transaction signature"),
+                            ("type", "event type, e.g. payout_sent")):
+        p.add_argument(f"--{kind}", help=help_text)
+    p.add_argument("--since", help="First day, YYYY-MM-DD.")
+    p.add_argument("--until", help="Last day, YYYY-MM-DD.")
+    p.add_argument("--limit", type=int, default=0, help="At most this many entries.")
+    p.add_argument("--pretty", action="store_true", help="One readable line per entry instead of the raw JSON.")
+    p.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="Threads reading archives.")
+    sub.add_parser("stats", parents=[common], help="Archive and index sizes.")
+    sub.add_parser("reindex", parents=[common], help="Rebuild index.sqlite from the archives.")
+    args = parser.parse_args()
+
+    if not args.dir.is_dir():
+        print(f"❌ ERROR: audit directory not found: {args.dir}")
+        return 1
+    return {"compact": cmd_compact, "find": cmd_find, "stats": cmd_stats, "reindex": cmd_reindex}[args.command](args)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Archive cancelled by user")
+        sys.exit(1)
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - verify the hash chain of the server audit log
+
+AuditLogger.ts appends one JSON line per event to <AUDIT_DIR>/audit-<day>.jsonl
+(AUDIT_DIR defaults to packages/server/data/audit). Each line is the JSON body
+{ts, type, payload, server, prevHash} with ,"hash":"<sha256 of that body>"
+spliced in before the closing brace, and prevHash is the hash of the line the
+same process wrote before. A process starts its chain from 64 zeros, so every
+server restart begins a new chain.
+
+The body is recovered from the raw bytes (the line minus its 75-byte hash
+suffix, plus "}"), so no JSON is parsed except for the entries reported. Day
+files are memory-mapped and checked in parallel, one process per file, each
+file on its own. The chain is then stitched across files in day order: every
+prevHash must be the hash of an earlier entry that nothing else has
+continued, or zeros. Chains from several processes can be interleaved.
+
+What gets reported, by file, line and byte offset:
+  - an entry whose hash does not match its body (edited after writing)
+  - an entry whose prevHash matches no earlier entry (entries deleted,
+    reordered or inserted before it, or the end of an earlier day removed)
+  - a second entry continuing an already continued entry (a fork)
+  - a line cut off mid-entry (truncation; only a warning on the newest file,
+    which the server may be writing to right now)
+  - a file that shrank, changed, or disappeared since it was last verified
+
+Days compacted by audit-archive.py (archive/audit-<day>.jsonl.frames) are
+read from their archive once the original is gone; an archive is verified
+in full again only when it changes.
+
+A checkpoint index in .cache/audit-verify/ remembers what has been verified.
+Files that have not changed since then (same size and mtime) are not read
+again, and one whose mtime moved without growing is read again in full. A
+file that only grew is verified from where the last run stopped, after
+checking that the last verified entry and the checkpoints before it are
+still where they were. Run with --full now and then to re-read everything.
+
+  python3 scripts/audit-verify.py
+  python3 scripts/audit-verify.py --dir /opt/spermrace/packages/server/data/audit --full
+  python3 scripts/audit-verify.py --json report.json
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from auditlib import DAY_FILE_RE, DEFAULT_AUDIT_DIR, REPO_ROOT, day_file_name
+from auditlib.archive import ARCHIVE_SUFFIX, ArchiveReader
+
+INDEX_DIR = REPO_ROOT / ".cache" / "audit-verify"
+INDEX_VERSION = 1
+
+ARCHIVE_RE = re.compile(r"^audit-(\d{4}-\d{2}-\d{2})" + re.escape(ARCHIVE_SUFFIX) + "$")
+GENESIS = b"0" * 64
+HASH_SUFFIX = b',"hash":"'                 # line = body[:-1] + ',"hash":"<64 hex>"}'
+SUFFIX_LEN = len(HASH_SUFFIX) + 64 + 2     # 75
+PREV_MARKER = b'"prevHash":"'
+CHECKPOINT_EVERY = 4096                    # entries between the spot checks kept in the index
+MAX_ISSUES_PER_FILE = 50
+_HEX = re.compile(rb"^[0-9a-f]{64}$")
+
+
+@dataclass
+class Issue:
+    kind: str          # hash_mismatch | chain_break | fork | malformed | truncated | changed | missing
+    file: str
+    line: int          # 1-based; 0 when it is about the whole file
+    offset: int
+    detail: str
+    warning: bool = False
+
+
+@dataclass
+class FileState:
+    """What has been verified of one day file; saved in the checkpoint index."""
+    name: str
+    size: int = 0                  # bytes verified (always at a line boundary)
+    mtime_ns: int = 0
+    archive_size: int = 0          # set when verified from an archive (whose size is not `size`)
+    entries: int = 0
+    last_hash: str = ""
+    last_offset: int = 0           # where the last verified line starts
+    heads: list[str] = field(default_factory=list)                  # hashes nothing in this file continues
+    refs: list[list] = field(default_factory=list)                  # [line, offset, prevHash] continuing no entry of this file
+    restarts: list[list] = field(default_factory=list)              # [line, offset] of entries with a zero prevHash
+    checkpoints: list[list] = field(default_factory=list)           # [line, offset, hash] every CHECKPOINT_EVERY entries
+    issues: list[dict] = field(default_factory=list)
+
+
+def verify_file(path: str, state: dict | None, is_newest: bool) -> dict:
+    """
+    Check every entry of `path` after what `state` already covers, against
+    itself and the entries before it in the same file. Runs in a worker
+    process; takes and returns plain dicts.
+    """
+    st = FileState(**state) if state else FileState(Path(path).name.replace(ARCHIVE_SUFFIX, ".jsonl"))
+    name = st.name
+    issues: list[Issue] = []
+    heads = set(st.heads)
+
+    def issue(kind: str, line: int, offset: int, detail: str, warning: bool = False) -> None:
+        if len(issues) < MAX_ISSUES_PER_FILE:
+            issues.append(Issue(kind, name, line, offset, detail, warning))
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        issue("missing", 0, 0, "file disappeared while verifying")
+        return {"state": asdict(st), "issues": [asdict(i) for i in issues]}
+    try:
+        stat = os.fstat(fd)
+        if path.endswith(ARCHIVE_SUFFIX):
+            try:
+                with ArchiveReader(Path(path)) as reader:
+                    data = reader.read_all()
+            except (OSError, ValueError) as e:
+                issue("malformed", 0, 0, f"archive unreadable: {e}")
+                return {"state": asdict(st), "issues": [asdict(i) for i in issues]}
+            st.archive_size = stat.st_size
+            mapped = None
+        elif stat.st_size == 0:
+            st.mtime_ns = stat.st_mtime_ns
+            return {"state": asdict(st), "issues": []}
+        else:
+            mapped = data = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        size = len(data)
+        try:
+            pos = st.size
+            line_no = st.entries
+            sha256 = hashlib.sha256
+            while pos < size:
+                end = data.find(b"\n", pos)
+                if end < 0:
+                    issue("truncated", line_no + 1, pos,
+                          f"last line is cut off after {size - pos} bytes"
+                          + (" (the server may still be writing it)" if is_newest else ""), warning=is_newest)
+                    break
+                line = data[pos:end]
+                line_no += 1
+                if (len(line) <= SUFFIX_LEN or line[-SUFFIX_LEN:-SUFFIX_LEN + len(HASH_SUFFIX)] != HASH_SUFFIX
+                        or line[-2:] != b'"}' or not _HEX.match(line[-66:-2])):
+                    issue("malformed", line_no, pos, "not an AuditLogger entry (no hash field at the end)")
+                    pos = end + 1
+                    continue
+                claimed = line[-66:-2]
+                body = line[:-SUFFIX_LEN] + b"}"
+                actual = sha256(body).hexdigest().encode()
+                if actual != claimed:
+                    issue("hash_mismatch", line_no, pos,
+                          f"hash {claimed[:12].decode()}… does not match its body ({actual[:12].decode()}…): entry edited")
+                prev = body[-(64 + 2):-2]
+                if body[-(64 + 2 + len(PREV_MARKER)):-(64 + 2)] != PREV_MARKER or not _HEX.match(prev):
+                    issue("malformed", line_no, pos, "no prevHash before the hash field")
+                elif prev == GENESIS:
+                    st.restarts.append([line_no, pos])
+                else:
+                    p = prev.decode()
+                    if p in heads:
+                        heads.discard(p)
+                    else:
+                        st.refs.append([line_no, pos, p])
+                h = claimed.decode()
+                heads.add(h)
+                if line_no % CHECKPOINT_EVERY == 0:
+                    st.checkpoints.append([line_no, pos, h])
+                st.last_hash, st.last_offset = h, pos
+                pos = end + 1
+            st.size = pos
+            st.entries = line_no
+            st.mtime_ns = stat.st_mtime_ns
+        finally:
+            if mapped is not None:
+                mapped.close()
+    finally:
+        os.close(fd)
+    st.heads = sorted(heads)
+    return {"state": asdict(st), "issues": [asdict(i) for i in issues]}
+
+
+def still_matches(path: Path, state: FileState) -> str | None:
+    """Why the verified part of `path` can no longer be trusted, or None."""
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return "file is gone"
+    if size < state.size:
+        return f"file shrank from {state.size} to {size} bytes since it was verified ({state.entries} entries)"
+    if not state.entries:
+        return None
+    with open(path, "rb") as f:
+        for line_no, offset, digest in state.checkpoints + [[state.entries, state.last_offset, state.last_hash]]:
+            f.seek(offset)
+            line = f.readline().rstrip(b"\n")
+            if line[-66:-2].decode(errors="replace") != digest:
+                return f"entry {line_no} (byte {offset}) is not the one verified before: rewritten since the last run"
+    return None
+
+
+def describe(path: Path, offset: int) -> str:
+    """' (ts ..., type ...)' for the entry at `offset`, for reports."""
+    try:
+        if path.name.endswith(ARCHIVE_SUFFIX):
+            with ArchiveReader(path) as reader:
+                entry = json.loads(reader.line_at(offset))
+        else:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                entry = json.loads(f.readline())
+        ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry.get("ts", 0) / 1000))
+        pid = (entry.get("server") or {}).get("pid")
+        return f" (ts {ts}, type {entry.get('type')}, pid {pid})"
+    except (OSError, ValueError, AttributeError):
+        return ""
+
+
+def index_path(directory: Path) -> Path:
+    key = hashlib.sha1(str(directory.resolve()).encode()).hexdigest()[:12]
+    return INDEX_DIR / f"{key}.json"
+
+
+def load_index(directory: Path) -> dict[str, FileState]:
+    try:
+        data = json.loads(index_path(directory).read_text())
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != INDEX_VERSION:
+        return {}
+    return {name: FileState(**s) for name, s in data.get("files", {}).items()}
+
+
+def save_index(directory: Path, states: dict[str, FileState]) -> None:
+    path = index_path(directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"version": INDEX_VERSION, "dir": str(directory.resolve()), "saved": time.time(),
+                               "files": {n: asdict(s) for n, s in states.items()}}, separators=(",", ":")))
+    os.replace(tmp, path)
+
+
+def stitch(sources: dict[str, Path], names: list[str], states: dict[str, FileState]) -> list[Issue]:
+    """Link every file's dangling prevHashes to the open chain ends of the files before it."""
+    issues: list[Issue] = []
+    open_heads: dict[str, tuple[str, int]] = {}     # hash -> (file, line) of the entry nobody has continued yet
+    consumed: dict[str, tuple[str, int]] = {}       # hash -> (file, line) of the entry that continued it
+    for i, name in enumerate(names):
+        st = states[name]
+        # Every later entry of a file continues a head of the same file, so the
+        # first entry is the earliest one that didn't.
+        first = min((r[0] for r in st.refs + st.restarts), default=0)
+        for line, offset, prev in st.refs:
+            if prev in open_heads:
+                consumed[prev] = (name, line)
+                del open_heads[prev]
+            elif i == 0 and line == first:
+                continue    # the oldest file continues logs that are no longer here
+            elif prev in consumed:
+                other = consumed[prev]
+                issues.append(Issue("fork", name, line, offset,
+                                    f"continues the same entry as {other[0]}:{other[1]}"
+                                    + describe(sources[name], offset)))
+            else:
+                if line == first:
+                    where = f"the previous file, {names[i - 1]}, ends at entry {states[names[i - 1]].entries}"
+                else:
+                    where = f"it does not continue {name}:{line - 1}, the entry before it in the same file"
+                issues.append(Issue("chain_break", name, line, offset,
+                                    f"prevHash {prev[:12]}… is not the hash of any earlier entry: entries before it "
+                                    f"were deleted or reordered ({where})" + describe(sources[name], offset)))
+        for h in st.heads:
+            open_heads[h] = (name, 0)
+    return issues
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verify the hash chain of the server audit log.")
+    parser.add_argument("--dir", type=Path, default=DEFAULT_AUDIT_DIR,
+                        help=f"Audit log directory (default: {DEFAULT_AUDIT_DIR}).")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint index and re-read every file.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per CPU).")
+    parser.add_argument("--json", type=Path, help="Also write the report as JSON to this path.")
+    args = parser.parse_args()
+
+    if not args.dir.is_dir():
+        print(f"❌ ERROR: audit directory not found: {args.dir}")
+        return 1
+    # Day file name -> where its bytes are: the day file itself, or its archive once that is gone.
+    sources = {p.name: p for p in args.dir.iterdir() if DAY_FILE_RE.match(p.name)}
+    archive_dir = args.dir / "archive"
+    if archive_dir.is_dir():
+        for p in archive_dir.iterdir():
+            m = ARCHIVE_RE.match(p.name)
+            if m:
+                sources.setdefault(day_file_name(m.group(1)), p)
+    names = sorted(sources)
+    if not names:
+        print(f"No audit-*.jsonl files in {args.dir}")
+        return 0
+    previous = {} if args.full else load_index(args.dir)
+    issues: list[Issue] = []
+    for name in sorted(set(previous) - set(names)):
+        if previous[name].entries:
+            issues.append(Issue("missing", name, 0, 0, f"verified before with {previous[name].entries} entries, now gone"))
+
+    states: dict[str, FileState] = {}
+    jobs: dict[str, dict | None] = {}
+    for name in names:
+        path = sources[name]
+        old = previous.get(name)
+        stat = path.stat()
+        archived = path.name.endswith(ARCHIVE_SUFFIX)
+        on_disk = old.archive_size if old is not None and archived else old.size if old is not None else -1
+        if old is not None and on_disk == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+            states[name] = old      # untouched since it was verified
+            continue
+        if old is not None and (archived or old.archive_size):
+            old = None              # archived since the last run (or the archive changed): read it all once
+        elif old is not None and old.size == stat.st_size:
+            old = None              # rewritten in place, nothing appended: read it all again
+        elif old is not None:
+            problem = still_matches(path, old)
+            if problem:
+                issues.append(Issue("changed", name, 0, 0, problem))
+                old = None          # verify it again from the start
+        jobs[name] = asdict(old) if old else None
+
+    t0 = time.monotonic()
+    read_bytes = sum(max(0, sources[n].stat().st_size - (s or {}).get("size", 0)) for n, s in jobs.items())
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(jobs)))) as pool:
+            futures = {name: pool.submit(verify_file, str(sources[name]), state, name == names[-1])
+                       for name, state in jobs.items()}
+            for name, fut in futures.items():
+                out = fut.result()
+                states[name] = FileState(**out["state"])
+                issues.extend(Issue(**i) for i in out["issues"])
+    # Issues found by earlier runs stay until the file is verified again from scratch.
+    for name in names:
+        if name not in jobs or jobs[name] is not None:
+            issues.extend(Issue(**i) for i in states[name].issues if not i.get("warning"))
+    for name in jobs:
+        states[name].issues = [asdict(i) for i in issues if i.file == name and i.kind not in ("changed", "missing")]
+    issues.extend(stitch(sources, names, states))
+    elapsed = time.monotonic() - t0
+
+    # Same issue reported by this run and kept from the last one: show it once.
+    seen = set()
+    unique = []
+    for i in issues:
+        key = (i.kind, i.file, i.line, i.offset)
+        if key not in seen:
+            seen.add(key)
+            unique.append(i)
+    issues = sorted(unique, key=lambda i: (i.file, i.line))
+
+    entries = sum(s.entries for s in states.values())
+    restarts = sum(len(s.restarts) for s in states.values())
+    print(f"[audit] {len(names)} files, {entries:,} entries, {restarts} chain starts (server restarts); "
+          f"read {len(jobs)} files ({read_bytes / 2**20:.1f} MiB) in {elapsed:.2f}s")
+    errors = [i for i in issues if not i.warning]
+    for i in issues:
+        where = f"{i.file}:{i.line} (byte {i.offset})" if i.line else i.file
+        extra = describe(sources.get(i.file, args.dir / i.file), i.offset) if i.kind == "hash_mismatch" else ""
+        print(f"{'⚠️ ' if i.warning else '❌'} {i.kind}: {where}: {i.detail}{extra}")
+    save_index(args.dir, states)
+    if args.json:
+        args.json.write_text(json.dumps({"dir": str(args.dir), "files": len(names), "entries": entries,
+                                         "restarts": restarts, "issues": [asdict(i) for i in issues]}, indent=2))
+    if not errors:
+        print("✅ Audit chain intact")
+        return 0
+    print(f"❌ {len(errors)} problems found")
+    return 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Verification cancelled by user")
+        sys.exit(1)
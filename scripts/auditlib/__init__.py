@@ -0,0 +1,18 @@
+"""
+SpermRace.io - shared helpers for the audit log tools (audit-verify.py, audit-archive.py)
+
+AuditLogger.ts writes one JSONL file per UTC day to AUDIT_DIR; closed days
+can be compacted into frame archives (see archive.py) next to them.
+"""
+import os
+import re
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+DEFAULT_AUDIT_DIR = Path(os.environ.get("AUDIT_DIR") or REPO_ROOT / "packages" / "server" / "data" / "audit")
+DAY_FILE_RE = re.compile(r"^audit-(\d{4}-\d{2}-\d{2})\.jsonl$")
+
+
+def day_file_name(day: str) -> str:
+    return f"audit-{day}.jsonl"
@@ -0,0 +1,192 @@
+"""
+Seekable frame archives of closed audit days.
+
+An archive holds the day file's bytes unchanged, cut at line boundaries into
+frames of about FRAME_BYTES that are each compressed on their own, so one
+entry can be read by decompressing one frame:
+
+    b"SRAF" + version byte + codec byte      header
+    frame, frame, ...                         raw LZMA2 (codec "x") or zlib (codec "z")
+    footer                                    JSON: day, codec, entries, raw_bytes, sha256, frames
+    u64 footer length (little endian) + b"SRAF"
+
+Each frame in the footer is [offset, length, raw_offset, raw_length,
+first_line, lines, first_ts, last_ts]. The footer makes an archive
+self-describing, so the lookup index can always be rebuilt from the archives.
+Because the bytes are unchanged, the hash chain still verifies after
+decompression.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import lzma
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+MAGIC = b"SRAF"
+VERSION = 1
+ARCHIVE_SUFFIX = ".jsonl.frames"
+FRAME_BYTES = 128 * 1024
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]
+_TRAILER = struct.Struct("<Q4s")
+
+
+def archive_name(day: str) -> str:
+    return f"audit-{day}{ARCHIVE_SUFFIX}"
+
+
+def compress(codec: str, data: bytes) -> bytes:
+    if codec == "x":
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+    return zlib.compress(data, 9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "x":
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+    return zlib.decompress(data)
+
+
+def entry_keys(line: bytes) -> set[tuple[str, str]]:
+    """(kind, key) pairs an entry is found by: type, round, match, lobby, wallet, tx."""
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return set()
+    if not isinstance(entry, dict):
+        return set()
+    keys = set()
+    if isinstance(entry.get("type"), str):
+        keys.add(("type", entry["type"]))
+    payload = entry.get("payload")
+    if not isinstance(payload, dict):
+        return keys
+    for kind, fields in (("round", ("roundId",)), ("match", ("matchId",)), ("lobby", ("lobbyId",)),
+                         ("wallet", ("playerId", "winnerId")), ("tx", ("txSig", "txSignature", "signature"))):
+        for name in fields:
+            value = payload.get(name)
+            if isinstance(value, str) and value:
+                keys.add((kind, value))
+    players = payload.get("players")
+    if isinstance(players, list):
+        keys.update(("wallet", p) for p in players if isinstance(p, str) and p)
+    return keys
+
+
+@dataclass
+class Frame:
+    offset: int
+    length: int
+    raw_offset: int
+    raw_length: int
+    first_line: int
+    lines: int
+    first_ts: int
+    last_ts: int
+
+
+def _ts(line: bytes) -> int:
+    # "ts" is always the first field AuditLogger writes: {"ts":1700000000000,...
+    head = line[:32]
+    if head.startswith(b'{"ts":'):
+        end = head.find(b",")
+        try:
+            return int(head[6:end])
+        except ValueError:
+            pass
+    return 0
+
+
+def write_archive(src: Path, dest: Path, day: str, codec: str = "x", frame_bytes: int = FRAME_BYTES,
+                  on_frame=None) -> dict:
+    """
+    Compact `src` into `dest` (written to a temp name, fsynced, renamed) and
+    return the footer. `on_frame(index, lines)` gets each frame's lines, for
+    indexing while the data is in memory.
+    """
+    data = src.read_bytes()
+    frames: list[Frame] = []
+    tmp = dest.with_name(dest.name + ".tmp")
+    pos = 0
+    line_no = 1
+    with open(tmp, "wb") as out:
+        out.write(MAGIC + bytes([VERSION]) + codec.encode())
+        while pos < len(data):
+            end = data.find(b"\n", min(len(data), pos + frame_bytes) - 1)
+            end = len(data) if end < 0 else end + 1
+            raw = data[pos:end]
+            lines = raw.splitlines()
+            packed = compress(codec, raw)
+            frames.append(Frame(out.tell(), len(packed), pos, len(raw), line_no, len(lines),
+                                _ts(lines[0]) if lines else 0, _ts(lines[-1]) if lines else 0))
+            out.write(packed)
+            if on_frame is not None:
+                on_frame(len(frames) - 1, lines)
+            line_no += len(lines)
+            pos = end
+        footer = {"version": VERSION, "day": day, "codec": codec, "entries": line_no - 1, "raw_bytes": len(data),
+                  "sha256": hashlib.sha256(data).hexdigest(),
+                  "frames": [[f.offset, f.length, f.raw_offset, f.raw_length, f.first_line, f.lines,
+                              f.first_ts, f.last_ts] for f in frames]}
+        blob = json.dumps(footer, separators=(",", ":")).encode()
+        out.write(blob)
+        out.write(_TRAILER.pack(len(blob), MAGIC))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, dest)
+    return footer
+
+
+class ArchiveReader:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._f = open(self.path, "rb")
+        try:
+            head = self._f.read(6)
+            if head[:4] != MAGIC or head[4] != VERSION:
+                raise ValueError(f"{self.path.name}: not an audit frame archive")
+            self._f.seek(-_TRAILER.size, os.SEEK_END)
+            length, magic = _TRAILER.unpack(self._f.read(_TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path.name}: archive trailer missing (incomplete write?)")
+            self._f.seek(-_TRAILER.size - length, os.SEEK_END)
+            self.footer = json.loads(self._f.read(length))
+        except BaseException:
+            self._f.close()
+            raise
+        self.codec = self.footer["codec"]
+        self.frames = [Frame(*f) for f in self.footer["frames"]]
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def frame(self, i: int) -> bytes:
+        f = self.frames[i]
+        self._f.seek(f.offset)
+        raw = decompress(self.codec, self._f.read(f.length))
+        if len(raw) != f.raw_length:
+            raise ValueError(f"{self.path.name}: frame {i} decompressed to {len(raw)} bytes, expected {f.raw_length}")
+        return raw
+
+    def read_all(self) -> bytes:
+        return b"".join(self.frame(i) for i in range(len(self.frames)))
+
+    def line_at(self, raw_offset: int) -> bytes:
+        """The line starting at `raw_offset` of the original day file."""
+        for i, f in enumerate(self.frames):
+            if f.raw_offset <= raw_offset < f.raw_offset + f.raw_length:
+                raw = self.frame(i)
+                start = raw_offset - f.raw_offset
+                end = raw.find(b"\n", start)
+                return raw[start:] if end < 0 else raw[start:end]
+        return b""
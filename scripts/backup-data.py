@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - incremental, deduplicated backups of packages/server/data
+
+Every snapshot is a small manifest listing, for each file, the sha256 of
+its fixed-size chunks; the chunks themselves live once in a content-
+addressed store shared by all snapshots. A run only writes the chunks that
+changed since any earlier snapshot, so it is cheap enough to run every few
+minutes from cron.
+
+How each file is read so the snapshot is consistent:
+  - SQLite databases (found by their header, not their name) are copied
+    with the online backup API (sqlite3.Connection.backup), a few hundred
+    pages at a time with a short sleep between steps, so writers are never
+    blocked for long. Chunks are page-aligned, so a run stores the changed
+    pages and little else. -wal/-shm/-journal files are covered by that copy
+    and skipped.
+  - JSON state files (payment-state.json is rewritten in place every 10 s)
+    are re-read until they parse, so a half-written file is never stored.
+  - Append-only logs (*.log, *.jsonl: payment and audit logs) are cut at
+    their last complete line. If the file only grew, the chunks before the
+    previous end are taken from the last snapshot after re-hashing just the
+    last one of them, instead of reading the whole file again.
+Everything else is read as is. Reads are rate-limited (--max-read-mbps).
+
+  python3 scripts/backup-data.py                       # snapshot (same as `snapshot`)
+  python3 scripts/backup-data.py snapshot --keep 288   # ...then keep the last 288 (a day at 5 min)
+  python3 scripts/backup-data.py list
+  python3 scripts/backup-data.py verify --all
+  python3 scripts/backup-data.py restore --to /tmp/data-restore [--snapshot 20260101T120000Z]
+  python3 scripts/backup-data.py prune --keep 288
+
+The store defaults to $BACKUP_DIR/store (BACKUP_DIR defaults to backups/).
+"""
+from __future__ import annotations
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SOURCE = REPO_ROOT / "packages" / "server" / "data"
+DEFAULT_STORE = Path(os.environ.get("BACKUP_DIR") or REPO_ROOT / "backups") / "store"
+
+MANIFEST_VERSION = 1
+CHUNK_SIZE = 64 * 1024          # a multiple of every SQLite page size, so chunks stay page-aligned
+SQLITE_HEADER = b"SQLite format 3\x00"
+SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+SQLITE_STEP_PAGES = 256
+SQLITE_STEP_SLEEP_S = 0.005
+SQLITE_IN_MEMORY_MAX = 256 * 1024 * 1024   # larger databases are copied through a temp file in the store
+APPEND_ONLY_SUFFIXES = (".log", ".jsonl")
+JSON_RETRIES = 5
+DEFAULT_WORKERS = min(16, (os.cpu_count() or 2) * 2)
+DEFAULT_MAX_READ_MBPS = 64.0
+
+
+def human(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+@dataclass
+class FileEntry:
+    path: str                   # relative to the source directory
+    kind: str                   # sqlite | json | append | file
+    size: int
+    mode: int
+    mtime_ns: int
+    inode: int = 0
+    chunks: list[str] = field(default_factory=list)
+    wal_size: int = 0           # sqlite: the -wal sidecar, where WAL-mode commits land
+    wal_mtime_ns: int = 0
+
+
+@dataclass
+class Manifest:
+    name: str
+    created: float
+    source: str
+    files: list[FileEntry]
+    version: int = MANIFEST_VERSION
+
+    @property
+    def size(self) -> int:
+        return sum(f.size for f in self.files)
+
+    def to_json(self) -> dict:
+        return {"version": self.version, "name": self.name, "created": self.created, "source": self.source,
+                "chunk_size": CHUNK_SIZE, "files": [asdict(f) for f in self.files]}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Manifest":
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"unsupported manifest version {data.get('version')}")
+        return cls(name=data["name"], created=data["created"], source=data["source"],
+                   files=[FileEntry(**f) for f in data["files"]])
+
+
+class Throttle:
+    """Token bucket over bytes read, shared by all threads (0 = unlimited)."""
+
+    def __init__(self, mbps: float):
+        self.rate = mbps * 1024 * 1024
+        self.lock = threading.Lock()
+        self.next_free = time.monotonic()
+
+    def take(self, n: int) -> None:
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.next_free = max(self.next_free, now) + n / self.rate
+            wait = self.next_free - now - 0.25      # allow a quarter second of burst
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Store:
+    """
+    chunks/ab/<sha256>  one chunk: b"Z" + zlib data, or b"R" + raw data when it does not compress
+    snapshots/<name>.json
+    tmp/                SQLite copies too large to hold in memory
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.chunks = root / "chunks"
+        self.snapshots = root / "snapshots"
+        self.tmp = root / "tmp"
+        self._known: set[str] = set()
+        self.written = 0
+        self.written_bytes = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def init(self) -> None:
+        for d in (self.chunks, self.snapshots, self.tmp):
+            d.mkdir(parents=True, exist_ok=True)
+
+    def remember(self, digests) -> None:
+        """Chunks known to be stored already (listed by a snapshot), so put() skips the exists() check."""
+        with self._lock:
+            self._known.update(digests)
+
+    def chunk_path(self, digest: str) -> Path:
+        return self.chunks / digest[:2] / digest
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._known:
+                self.reused += 1
+                return digest
+        path = self.chunk_path(digest)
+        if path.exists():
+            with self._lock:
+                self._known.add(digest)
+                self.reused += 1
+            return digest
+        packed = zlib.compress(data, 1)
+        blob = b"Z" + packed if len(packed) < len(data) else b"R" + data
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._known.add(digest)
+            self.written += 1
+            self.written_bytes += len(blob)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """The chunk's data; raises ValueError if it does not hash to its name."""
+        blob = self.chunk_path(digest).read_bytes()
+        if blob[:1] == b"Z":
+            unpack = zlib.decompressobj()
+            data = unpack.decompress(blob[1:])
+            if not unpack.eof or unpack.unused_data:
+                raise ValueError(f"chunk {digest[:12]} is truncated or has trailing data")
+        else:
+            data = blob[1:]
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"chunk {digest[:12]} is corrupt")
+        return data
+
+    def manifests(self) -> list[Manifest]:
+        out = []
+        for path in sorted(self.snapshots.glob("*.json")):
+            try:
+                out.append(Manifest.from_json(json.loads(path.read_text())))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠️  skipping unreadable snapshot {path.name}: {e}")
+        return out
+
+    def save_manifest(self, manifest: Manifest) -> Path:
+        path = self.snapshots / f"{manifest.name}.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest.to_json(), f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return path
+
+    def lock(self, blocking: bool):
+        """An exclusive flock on store/.lock, or None if another run holds it."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        f = open(self.root / ".lock", "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            f.close()
+            return None
+        return f
+
+
+# Snapshot ----------------------------------------------------------------------------
+
+
+def classify(path: Path) -> str:
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(SQLITE_HEADER)) == SQLITE_HEADER:
+                return "sqlite"
+    except OSError:
+        pass
+    if path.suffix == ".json":
+        return "json"
+    if path.suffix in APPEND_ONLY_SUFFIXES:
+        return "append"
+    return "file"
+
+
+def chunk_bytes(store: Store, data: bytes | memoryview, throttle: Throttle) -> list[str]:
+    view = memoryview(data)
+    out = []
+    for off in range(0, len(view), CHUNK_SIZE):
+        piece = bytes(view[off:off + CHUNK_SIZE])
+        throttle.take(len(piece))
+        out.append(store.put(piece))
+    return out
+
+
+def chunk_file(store: Store, path: Path, throttle: Throttle, start: int = 0, limit: int | None = None) -> list[str]:
+    out = []
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = limit - start if limit is not None else None
+        while remaining is None or remaining > 0:
+            piece = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not piece:
+                break
+            throttle.take(len(piece))
+            out.append(store.put(piece))
+            if remaining is not None:
+                remaining -= len(piece)
+    return out
+
+
+def snapshot_sqlite(store: Store, path: Path, throttle: Throttle) -> tuple[int, list[str]]:
+    src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        size = path.stat().st_size
+        if size <= SQLITE_IN_MEMORY_MAX:
+            dst = sqlite3.connect(":memory:")
+            try:
+                src.backup(dst, pages=SQLITE_STEP_PAGES, sleep=SQLITE_STEP_SLEEP_S)
+                image = dst.serialize()
+            finally:
+                dst.close()
+            return len(image), chunk_bytes(store, image, throttle)
+        fd, tmp = tempfile.mkstemp(dir=store.tmp, suffix=".sqlite")
+        os.close(fd)
+        try:
+            dst = sqlite3.connect(tmp)
+            try:
+                src.backup(dst, pages=SQLITE_STEP_PAGES, sleep=SQLITE_STEP_SLEEP_S)
+            finally:
+                dst.close()
+            return os.path.getsize(tmp), chunk_file(store, Path(tmp), throttle)
+        finally:
+            os.unlink(tmp)
+    finally:
+        src.close()
+
+
+def snapshot_json(store: Store, path: Path, throttle: Throttle) -> tuple[int, list[str]]:
+    data = path.read_bytes()
+    for _ in range(JSON_RETRIES):
+        try:
+            json.loads(data)
+            break
+        except ValueError:
+            time.sleep(0.2)     # caught mid-write; the server rewrites it in one go
+            data = path.read_bytes()
+    else:
+        print(f"⚠️  {path.name} still does not parse after {JSON_RETRIES} reads; storing it as is")
+    return len(data), chunk_bytes(store, data, throttle)
+
+
+def snapshot_append(store: Store, path: Path, st: os.stat_result, prev: FileEntry | None,
+                    throttle: Throttle, full_read: bool) -> tuple[int, list[str]]:
+    # Stop at the last newline, so a line being written is left for the next run.
+    end = st.st_size
+    with open(path, "rb") as f:
+        while end > 0:
+            back = min(end, CHUNK_SIZE)
+            f.seek(end - back)
+            tail = f.read(back)
+            nl = tail.rfind(b"\n")
+            if nl >= 0:
+                end = end - back + nl + 1
+                break
+            end -= back
+    kept: list[str] = []
+    if (not full_read and prev is not None and prev.kind == "append" and prev.inode == st.st_ino
+            and prev.size <= end and prev.chunks):
+        # Only whole chunks of the previous end can be reused; its tail chunk may have grown since.
+        whole = prev.size // CHUNK_SIZE
+        if whole:
+            with open(path, "rb") as f:
+                f.seek((whole - 1) * CHUNK_SIZE)
+                last = f.read(CHUNK_SIZE)
+            throttle.take(len(last))
+            if hashlib.sha256(last).hexdigest() == prev.chunks[whole - 1]:
+                kept = prev.chunks[:whole]
+                store.reused += whole
+    return end, kept + chunk_file(store, path, throttle, start=len(kept) * CHUNK_SIZE, limit=end)
+
+
+def scan_source(source: Path) -> list[Path]:
+    files = [p for p in sorted(source.rglob("*")) if p.is_file() and not p.is_symlink()]
+    sqlite_paths = {str(p) for p in files if classify(p) == "sqlite"}
+    return [p for p in files
+            if not any(str(p).endswith(s) and str(p)[: -len(s)] in sqlite_paths for s in SQLITE_SIDECARS)]
+
+
+def take_snapshot(store: Store, source: Path, throttle: Throttle, workers: int, full_read: bool) -> Manifest:
+    previous = store.manifests()
+    prev_files = {f.path: f for f in previous[-1].files} if previous else {}
+    for f in prev_files.values():
+        store.remember(f.chunks)
+
+    def one(path: Path) -> FileEntry | None:
+        rel = str(path.relative_to(source))
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        kind = classify(path)
+        prev = prev_files.get(rel)
+        entry = FileEntry(rel, kind, st.st_size, st.st_mode & 0o7777, st.st_mtime_ns, st.st_ino)
+        if kind == "sqlite":
+            # In WAL mode a commit only touches -wal until the next checkpoint.
+            try:
+                wal = os.stat(f"{path}-wal")
+                entry.wal_size, entry.wal_mtime_ns = wal.st_size, wal.st_mtime_ns
+            except FileNotFoundError:
+                pass
+        if (not full_read and prev is not None and prev.kind == kind and prev.mtime_ns == st.st_mtime_ns
+                and prev.inode == st.st_ino and (kind == "sqlite" or prev.size == st.st_size)
+                and (prev.wal_size, prev.wal_mtime_ns) == (entry.wal_size, entry.wal_mtime_ns)):
+            entry.size, entry.chunks = prev.size, list(prev.chunks)
+            store.reused += len(prev.chunks)
+            return entry
+        try:
+            if kind == "sqlite":
+                entry.size, entry.chunks = snapshot_sqlite(store, path, throttle)
+            elif kind == "json":
+                entry.size, entry.chunks = snapshot_json(store, path, throttle)
+            elif kind == "append":
+                entry.size, entry.chunks = snapshot_append(store, path, st, prev, throttle, full_read)
+            else:
+                entry.size, entry.chunks = st.st_size, chunk_file(store, path, throttle, limit=st.st_size)
+        except FileNotFoundError:
+            return None
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        entries = [e for e in pool.map(one, scan_source(source)) if e is not None]
+    name = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    if any(m.name == name for m in previous):
+        name += f"-{int(time.time() * 1000) % 1000:03d}"
+    return Manifest(name=name, created=time.time(), source=str(source), files=entries)
+
+
+# Verify / restore / prune ----------------------------------------------------------------
+
+
+def find_snapshot(store: Store, name: str | None) -> Manifest:
+    manifests = store.manifests()
+    if not manifests:
+        raise SystemExit(f"❌ ERROR: no snapshots in {store.root}")
+    if name is None:
+        return manifests[-1]
+    for m in manifests:
+        if m.name == name:
+            return m
+    raise SystemExit(f"❌ ERROR: no snapshot named {name!r} (see `list`)")
+
+
+def verify(store: Store, manifests: list[Manifest], workers: int) -> dict[str, str]:
+    """Re-hash every chunk the manifests use, once each; {digest: problem} for the bad ones."""
+    digests = sorted({d for m in manifests for f in m.files for d in f.chunks})
+    bad: dict[str, str] = {}
+
+    def check(digest: str) -> None:
+        try:
+            store.get(digest)
+        except FileNotFoundError:
+            bad[digest] = "missing"
+        except (OSError, ValueError, zlib.error) as e:
+            bad[digest] = str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(check, digests))
+    return bad
+
+
+def restore(store: Store, manifest: Manifest, target: Path, workers: int) -> int:
+    """Write every file of the snapshot under `target`, chunks in parallel; returns bytes written."""
+    jobs = []
+    for f in manifest.files:
+        out = target / f.path
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "wb") as fh:
+            fh.truncate(f.size)
+        for i, digest in enumerate(f.chunks):
+            jobs.append((out, i * CHUNK_SIZE, digest))
+    fds: dict[Path, int] = {}
+    lock = threading.Lock()
+
+    def fd_for(path: Path) -> int:
+        with lock:
+            if path not in fds:
+                fds[path] = os.open(path, os.O_WRONLY)
+            return fds[path]
+
+    def write(job) -> int:
+        path, offset, digest = job
+        data = store.get(digest)
+        os.pwrite(fd_for(path), data, offset)
+        return len(data)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            total = sum(pool.map(write, jobs))
+        for fd in fds.values():
+            os.fsync(fd)
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+    for f in manifest.files:
+        out = target / f.path
+        if out.stat().st_size != f.size:
+            raise ValueError(f"{f.path}: restored {out.stat().st_size} bytes, expected {f.size}")
+        os.chmod(out, f.mode)
+        os.utime(out, ns=(f.mtime_ns, f.mtime_ns))
+    return total
+
+
+def prune(store: Store, keep: int) -> tuple[int, int, int]:
+    """Drop all but the newest `keep` snapshots and every chunk only they used."""
+    manifests = store.manifests()
+    drop = manifests[:-keep] if keep > 0 else manifests
+    for m in drop:
+        (store.snapshots / f"{m.name}.json").unlink(missing_ok=True)
+    live = {d for m in manifests[len(drop):] for f in m.files for d in f.chunks}
+    removed = freed = 0
+    for path in store.chunks.glob("*/*"):
+        if path.name not in live:
+            try:
+                freed += path.stat().st_size
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return len(drop), removed, freed
+
+
+# CLI -------------------------------------------------------------------------------------
+
+
+def cmd_snapshot(args) -> int:
+    store = Store(args.store)
+    store.init()
+    lock = store.lock(blocking=False)
+    if lock is None:
+        print("[backup] another backup is running on this store; skipping")
+        return 0
+    with lock:
+        if not args.source.is_dir():
+            print(f"❌ ERROR: source directory not found: {args.source}")
+            return 1
+        t0 = time.monotonic()
+        manifest = take_snapshot(store, args.source, Throttle(args.max_read_mbps), args.workers, args.full_read)
+        path = store.save_manifest(manifest)
+        elapsed = time.monotonic() - t0
+        print(f"[backup] {manifest.name}: {len(manifest.files)} files, {human(manifest.size)}; "
+              f"{store.written} new chunks ({human(store.written_bytes)} written), {store.reused} reused, "
+              f"{elapsed:.1f}s")
+        print(f"Backup written: {path}")
+        if args.keep:
+            dropped, removed, freed = prune(store, args.keep)
+            if dropped or removed:
+                print(f"[backup] pruned {dropped} snapshots, {removed} chunks ({human(freed)})")
+    return 0
+
+
+def cmd_list(args) -> int:
+    store = Store(args.store)
+    if not store.snapshots.is_dir():
+        print(f"No snapshots in {store.root}")
+        return 0
+    for m in store.manifests():
+        chunks = sum(len(f.chunks) for f in m.files)
+        print(f"{m.name}  {len(m.files):4} files  {human(m.size):>10}  {chunks:7} chunks")
+    return 0
+
+
+def cmd_verify(args) -> int:
+    store = Store(args.store)
+    manifests = store.manifests() if args.all else [find_snapshot(store, args.snapshot)]
+    if not manifests:
+        print(f"❌ ERROR: no snapshots in {store.root}")
+        return 1
+    t0 = time.monotonic()
+    bad = verify(store, manifests, args.workers)
+    unique = len({d for m in manifests for f in m.files for d in f.chunks})
+    print(f"[verify] {len(manifests)} snapshots, {unique} chunks checked in {time.monotonic() - t0:.1f}s")
+    if not bad:
+        print("✅ All chunks present and intact")
+        return 0
+    for m in manifests:
+        for f in m.files:
+            problems = [bad[d] for d in f.chunks if d in bad]
+            if problems:
+                print(f"❌ {m.name} {f.path}: {len(problems)} bad chunks ({problems[0]})")
+    return 1
+
+
+def cmd_restore(args) -> int:
+    store = Store(args.store)
+    manifest = find_snapshot(store, args.snapshot)
+    target = args.to.resolve()
+    if target == args.source.resolve() and not args.force:
+        print("❌ ERROR: refusing to restore over the live data directory without --force (stop the server first)")
+        return 1
+    if target.exists() and any(target.iterdir()) and not args.force:
+        print(f"❌ ERROR: {target} is not empty (use --force to overwrite)")
+        return 1
+    t0 = time.monotonic()
+    try:
+        total = restore(store, manifest, target, args.workers)
+    except (FileNotFoundError, ValueError, zlib.error) as e:
+        print(f"❌ ERROR: restore failed: {e}")
+        return 1
+    elapsed = time.monotonic() - t0
+    print(f"[restore] {manifest.name} -> {target}: {len(manifest.files)} files, {human(total)} "
+          f"in {elapsed:.1f}s ({human(total / elapsed if elapsed else 0)}/s)")
+    failed = 0
+    for f in manifest.files:
+        if f.kind == "sqlite":
+            conn = sqlite3.connect(target / f.path)
+            try:
+                result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            finally:
+                conn.close()
+            if result != "ok":
+                failed += 1
+                print(f"❌ {f.path}: integrity_check: {result}")
+    return 1 if failed else 0
+
+
+def cmd_prune(args) -> int:
+    store = Store(args.store)
+    with store.lock(blocking=True):
+        dropped, removed, freed = prune(store, args.keep)
+    print(f"[prune] removed {dropped} snapshots, {removed} chunks ({human(freed)})")
+    return 0
+
+
+def main() -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--store", type=Path, default=DEFAULT_STORE, help=f"Chunk store (default: {DEFAULT_STORE}).")
+    common.add_argument("--source", type=Path, default=DEFAULT_SOURCE, help=f"Data directory (default: {DEFAULT_SOURCE}).")
+    common.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Threads (default: {DEFAULT_WORKERS}).")
+    parser = argparse.ArgumentParser(description="Incremental, deduplicated backups of packages/server/data.")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("snapshot", parents=[common], help="Take a snapshot (the default command).")
+    p.add_argument("--keep", type=int, default=0, help="Afterwards, prune to the newest N snapshots (default: keep all).")
+    p.add_argument("--max-read-mbps", type=float, default=DEFAULT_MAX_READ_MBPS,
+                   help=f"Cap on source reads in MiB/s, 0 for none (default: {DEFAULT_MAX_READ_MBPS:g}).")
+    p.add_argument("--full-read", action="store_true", help="Re-read every file instead of trusting mtime/appends.")
+    sub.add_parser("list", parents=[common], help="List snapshots.")
+    p = sub.add_parser("verify", parents=[common], help="Re-hash the chunks of a snapshot (default: the newest).")
+    p.add_argument("--snapshot", help="Snapshot name.")
+    p.add_argument("--all", action="store_true", help="Verify every snapshot.")
+    p = sub.add_parser("restore", parents=[common], help="Restore a snapshot (default: the newest) into a directory.")
+    p.add_argument("--snapshot", help="Snapshot name.")
+    p.add_argument("--to", type=Path, required=True, help="Target directory.")
+    p.add_argument("--force", action="store_true", help="Write into a non-empty directory (or the live one).")
+    p = sub.add_parser("prune", parents=[common], help="Keep the newest N snapshots and drop unused chunks.")
+    p.add_argument("--keep", type=int, required=True, help="Snapshots to keep.")
+
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in sub.choices and argv[0] not in ("-h", "--help"):
+        argv = ["snapshot"] + argv      # plain `backup-data.py [options]` keeps working from cron
+    args = parser.parse_args(argv)
+    if args.command == "snapshot" and args.keep < 0 or args.command == "prune" and args.keep < 1:
+        parser.error("--keep must be positive")
+    return {"snapshot": cmd_snapshot, "list": cmd_list, "verify": cmd_verify,
+            "restore": cmd_restore, "prune": cmd_prune}[args.command](args)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Backup cancelled by user")
+        sys.exit(1)
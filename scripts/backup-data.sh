@@ -1,11 +1,7 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
+# Incremental, deduplicated snapshots of packages/server/data (see backup-data.py).
+# Extra arguments are passed through, e.g. `backup-data.sh --keep 288` from cron.
 ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
-OUT_DIR="${BACKUP_DIR:-$ROOT/backups}"
-STAMP="$(date +%Y%m%d_%H%M%S)"
-TARGET="$OUT_DIR/spermrace-data_$STAMP.tgz"
-
-mkdir -p "$OUT_DIR"
-tar -czf "$TARGET" -C "$ROOT" packages/server/data
-echo "Backup written: $TARGET"
+exec python3 "$ROOT/scripts/backup-data.py" snapshot "$@"
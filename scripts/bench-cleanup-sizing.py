@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Benchmark cleanup-local-artifacts.py sizing and deletion
+
+Builds a synthetic node_modules-shaped tree (default 500k small files:
+packages -> nested dirs -> files, plus some pnpm-style hard links). Then it
+compares:
+
+  sizing    the old serial `rglob("*")` + `stat()` loop vs. tree_size()
+  deletion  shutil.rmtree vs. remove_tree()
+
+Each tool runs with several worker counts. The tree is rebuilt for every
+deletion run. With --drop-caches (root only) the page and dentry caches are
+dropped before each run, to measure cold-cache numbers.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    "cleanup_local_artifacts", Path(__file__).with_name("cleanup-local-artifacts.py")
+)
+cleanup = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = cleanup  # dataclasses look their module up here
+_spec.loader.exec_module(cleanup)
+
+
+def legacy_size(path: Path) -> int:
+    """The sizing loop remove_path() used before tree_size()."""
+    size = 0
+    for p in path.rglob("*"):
+        if p.is_file():
+            try:
+                size += p.stat().st_size
+            except Exception:
+                pass
+    return size
+
+
+def make_tree(root: Path, files: int, files_per_dir: int = 12, dirs_per_pkg: int = 6) -> int:
+    """Create ~`files` files shaped like node_modules; return the number of files made."""
+    payload = [os.urandom(n) for n in (64, 300, 1200, 4000, 9000)]
+    made = 0
+    pkg = 0
+    linked_from: str | None = None
+    while made < files:
+        pkg_dir = root / f"pkg-{pkg:05d}"
+        pkg += 1
+        for d in range(dirs_per_pkg):
+            sub = pkg_dir / ("lib" if d == 0 else f"lib/mod{d}/inner")
+            sub.mkdir(parents=True, exist_ok=True)
+            for f in range(files_per_dir):
+                if made >= files:
+                    return made
+                path = sub / f"f{f}.js"
+                if made % 50 == 0 and linked_from:
+                    os.link(linked_from, path)  # pnpm hard-links out of its store
+                else:
+                    path.write_bytes(payload[(made + f) % len(payload)])
+                    linked_from = str(path)
+                made += 1
+    return made
+
+
+def drop_caches() -> None:
+    os.sync()
+    with open("/proc/sys/vm/drop_caches", "w") as f:
+        f.write("3\n")
+
+
+def timed(fn, *args) -> tuple[float, object]:
+    started = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - started, out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cleanup sizing/deletion on a synthetic tree.")
+    parser.add_argument("--files", type=int, default=500_000)
+    parser.add_argument("--workers", default="1,2,4,8,16,32", help="Comma-separated worker counts.")
+    parser.add_argument("--dir", type=Path, help="Where to build the tree (default: a temp dir).")
+    parser.add_argument("--skip-delete", action="store_true", help="Only benchmark sizing.")
+    parser.add_argument("--drop-caches", action="store_true", help="Drop page/dentry caches before each run (root).")
+    args = parser.parse_args()
+    workers = [int(w) for w in args.workers.split(",")]
+
+    base = Path(tempfile.mkdtemp(prefix="bench-cleanup-", dir=args.dir))
+    try:
+        tree = base / "node_modules"
+        t, made = timed(make_tree, tree, args.files)
+        print(f"[bench] built {made} files in {t:.1f}s under {tree}")
+        prep = drop_caches if args.drop_caches else (lambda: None)
+
+        prep()
+        t_legacy, expected = timed(legacy_size, tree)
+        print(f"[bench] sizing  legacy rglob+stat      {t_legacy:7.2f}s  ({expected} bytes, hard links counted twice)")
+        for w in workers:
+            prep()
+            t, size = timed(cleanup.tree_size, tree, w)
+            print(f"[bench] sizing  tree_size workers={w:<3}  {t:7.2f}s  ({size} bytes)  x{t_legacy / t:.1f}")
+
+        if args.skip_delete:
+            return 0
+        prep()
+        t_rm, _ = timed(shutil.rmtree, tree)
+        print(f"[bench] delete  shutil.rmtree          {t_rm:7.2f}s")
+        for w in workers:
+            make_tree(tree, args.files)
+            prep()
+            t, _ = timed(cleanup.remove_tree, tree, w)
+            print(f"[bench] delete  remove_tree workers={w:<3} {t:7.2f}s  x{t_rm / t:.1f}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
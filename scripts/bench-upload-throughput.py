@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Upload throughput benchmark against a local SSH stand-in
+
+Starts an in-process paramiko SSH/SFTP server on 127.0.0.1 (optionally behind
+a relay that adds round-trip latency) and uploads a random artifact with:
+  - SCPClient.put (upload.scp_put, upload.put's fallback)
+  - deploylib.upload.parallel_put with 1..N exec-channel streams (the default)
+  - parallel_put with a forced disconnect halfway, resumed via reconnect()
+
+Usage:
+  pip install paramiko scp
+  python3 scripts/bench-upload-throughput.py --size-mb 64 --rtt-ms 60
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from deploylib import upload
+
+
+def print_header(text):
+    print("\n" + "=" * 70)
+    print(f"  {text}")
+    print("=" * 70 + "\n")
+
+
+def make_standin(root: Path):
+    """Return (ServerInterface class, SFTPServerInterface class) serving `root`."""
+    import paramiko
+
+    class Handle(paramiko.SFTPHandle):
+        def stat(self):
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+        def chattr(self, attr):
+            paramiko.SFTPServer.set_file_attr(self.filename, attr)
+            return paramiko.SFTP_OK
+
+    class SFTP(paramiko.SFTPServerInterface):
+        def _real(self, path):
+            return str(root / path.lstrip("/"))
+
+        def open(self, path, flags, attr):
+            real = self._real(path)
+            try:
+                fd = os.open(real, flags | getattr(os, "O_BINARY", 0), 0o644)
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+            mode = "r+b" if flags & (os.O_WRONLY | os.O_RDWR) else "rb"
+            if flags & os.O_WRONLY and not flags & os.O_RDWR:
+                mode = "wb" if not flags & os.O_APPEND else "ab"
+            f = os.fdopen(fd, mode)
+            h = Handle(flags)
+            h.filename = real
+            h.readfile = f
+            h.writefile = f
+            return h
+
+        def stat(self, path):
+            try:
+                return paramiko.SFTPAttributes.from_stat(os.stat(self._real(path)))
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+
+        lstat = stat
+
+        def chattr(self, path, attr):
+            try:
+                paramiko.SFTPServer.set_file_attr(self._real(path), attr)
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+            return paramiko.SFTP_OK
+
+        def remove(self, path):
+            try:
+                os.remove(self._real(path))
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+            return paramiko.SFTP_OK
+
+        def rename(self, oldpath, newpath):
+            os.replace(self._real(oldpath), self._real(newpath))
+            return paramiko.SFTP_OK
+
+        posix_rename = rename
+
+    class Server(paramiko.ServerInterface):
+        def check_auth_password(self, username, password):
+            return paramiko.AUTH_SUCCESSFUL
+
+        def get_allowed_auths(self, username):
+            return "password"
+
+        def check_channel_request(self, kind, chanid):
+            return paramiko.OPEN_SUCCEEDED
+
+        def check_channel_exec_request(self, channel, command):
+            threading.Thread(target=_run_exec, args=(channel, command.decode(), root), daemon=True).start()
+            return True
+
+    return Server, SFTP
+
+
+def _run_exec(channel, command: str, root: Path) -> None:
+    # Remote paths are absolute on the VPS; map them into the stand-in root.
+    command = command.replace(" /tmp/", f" {root}/tmp/")
+    proc = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def pump_in():
+        while True:
+            data = channel.recv(65536)
+            if not data:
+                break
+            proc.stdin.write(data)
+            proc.stdin.flush()
+        proc.stdin.close()
+
+    threading.Thread(target=pump_in, daemon=True).start()
+    for data in iter(lambda: proc.stdout.read1(65536), b""):
+        channel.sendall(data)
+    channel.send_exit_status(proc.wait())
+    channel.close()
+
+
+class StandIn:
+    """SSH server on 127.0.0.1 plus an optional latency relay in front of it."""
+
+    def __init__(self, root: Path, rtt_ms: float):
+        import paramiko
+
+        self.root = root
+        self.rtt = rtt_ms / 1000.0
+        self.key = paramiko.RSAKey.generate(2048)
+        self.server_cls, self.sftp_cls = make_standin(root)
+        self.transports = []
+        self._ssh_sock = socket.socket()
+        self._ssh_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._ssh_sock.bind(("127.0.0.1", 0))
+        self._ssh_sock.listen(16)
+        threading.Thread(target=self._accept, daemon=True).start()
+        self.port = self._ssh_sock.getsockname()[1]
+        if self.rtt > 0:
+            self._relay_sock = socket.socket()
+            self._relay_sock.bind(("127.0.0.1", 0))
+            self._relay_sock.listen(16)
+            threading.Thread(target=self._relay_accept, daemon=True).start()
+            self.port = self._relay_sock.getsockname()[1]
+
+    def _accept(self):
+        import paramiko
+
+        while True:
+            conn, _ = self._ssh_sock.accept()
+            t = paramiko.Transport(conn)
+            t.add_server_key(self.key)
+            t.set_subsystem_handler("sftp", paramiko.SFTPServer, self.sftp_cls)
+            t.start_server(server=self.server_cls())
+            self.transports.append(t)
+
+    def _relay_accept(self):
+        while True:
+            client, _ = self._relay_sock.accept()
+            upstream = socket.create_connection(("127.0.0.1", self._ssh_sock.getsockname()[1]))
+            for a, b in ((client, upstream), (upstream, client)):
+                q: queue.Queue = queue.Queue()
+                threading.Thread(target=self._relay_read, args=(a, q), daemon=True).start()
+                threading.Thread(target=self._relay_write, args=(b, q), daemon=True).start()
+
+    def _relay_read(self, sock, q):
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                data = b""
+            q.put((time.monotonic() + self.rtt / 2, data))
+            if not data:
+                return
+
+    def _relay_write(self, sock, q):
+        while True:
+            due, data = q.get()
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if not data:
+                try:
+                    sock.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+                return
+            try:
+                sock.sendall(data)
+            except OSError:
+                return
+
+    def client(self):
+        import paramiko
+
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh.connect("127.0.0.1", port=self.port, username="bench", password="bench",
+                    look_for_keys=False, allow_agent=False)
+        return ssh
+
+    def drop_all(self):
+        for t in self.transports:
+            t.close()
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark deploy artifact upload paths against a local SSH stand-in.")
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Round-trip latency added by a local relay.")
+    parser.add_argument("--streams", default="1,2,4,8", help="Comma-separated stream counts for parallel_put.")
+    args = parser.parse_args()
+
+    try:
+        import paramiko  # noqa: F401
+        import scp  # noqa: F401
+    except ImportError:
+        print("ERROR: Required packages not installed.")
+        print("Please run: pip install paramiko scp")
+        return 1
+
+    work = Path(tempfile.mkdtemp(prefix="upload-bench-"))
+    remote_root = work / "remote"
+    (remote_root / "tmp").mkdir(parents=True)
+    artifact = work / "artifact.bin"
+    with open(artifact, "wb") as f:
+        for _ in range(args.size_mb):
+            f.write(os.urandom(1024 * 1024))
+    expected = sha256_file(artifact)
+    upload.STATE_DIR = work / "state"
+
+    standin = StandIn(remote_root, args.rtt_ms)
+    print_header(f"Upload benchmark: {args.size_mb} MB, rtt={args.rtt_ms:.0f} ms")
+    rows = []
+
+    def check(name: str) -> None:
+        got = sha256_file(remote_root / "tmp" / name)
+        if got != expected:
+            raise SystemExit(f"[FAIL] {name}: digest mismatch")
+
+    ssh = standin.client()
+    try:
+        res = upload.scp_put(ssh, artifact, "/tmp/scp.bin")
+        check("scp.bin")
+        rows.append(("SCPClient.put", 1, res.seconds, res.mb_per_s, ""))
+
+        for n in [int(s) for s in args.streams.split(",") if s.strip()]:
+            res = upload.parallel_put(ssh, artifact, f"/tmp/par{n}.bin", streams=n)
+            check(f"par{n}.bin")
+            rows.append(("parallel_put", res.streams, res.seconds, res.mb_per_s, ""))
+
+        # Drop the connection once ~half the bytes are confirmed, then resume.
+        dropped = threading.Event()
+
+        def drop_at_half(_name, total, sent):
+            if not dropped.is_set() and sent >= total // 2:
+                dropped.set()
+                standin.drop_all()
+
+        def reconnect():
+            ssh.connect("127.0.0.1", port=standin.port, username="bench", password="bench",
+                        look_for_keys=False, allow_agent=False)
+
+        res = upload.parallel_put(ssh, artifact, "/tmp/resume.bin", streams=4,
+                                  progress=drop_at_half, reconnect=reconnect)
+        check("resume.bin")
+        rows.append(("parallel_put+drop", res.streams, res.seconds, res.mb_per_s,
+                     f"reconnects={res.reconnects}"))
+    finally:
+        ssh.close()
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"{'method':<20} {'streams':>7} {'seconds':>8} {'MB/s':>8}  notes")
+    for name, streams, secs, rate, notes in rows:
+        print(f"{name:<20} {streams:>7} {secs:>8.2f} {rate:>8.1f}  {notes}")
+    print("\n[OK] All uploads verified (sha256)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Build the release tarball the deploy scripts upload
+
+Writes TARBALL_LOCAL (default: spermrace-deploy.tar.gz at the repo root) plus
+spermrace-deploy.manifest.json. A .tar.gz name always gets gzip; pass
+--out spermrace-deploy.tar.zst (or .tar.xz) to let --codec pick zstd or xz. Output is reproducible, so a rebuild of an
+unchanged tree is detected and skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from deploylib import REPO_ROOT, release
+
+TARBALL_LOCAL = Path(os.environ.get("TARBALL_LOCAL") or (REPO_ROOT / "spermrace-deploy.tar.gz"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build a reproducible SpermRace.io release tarball.")
+    parser.add_argument("--out", type=Path, default=TARBALL_LOCAL, help=f"Archive path (default: {TARBALL_LOCAL}).")
+    parser.add_argument(
+        "--codec",
+        default="auto",
+        choices=["auto", *release.CODECS],
+        help="Compression codec; 'auto' measures each available one on a sample.",
+    )
+    parser.add_argument("--exclude", action="append", default=[], help="Extra glob (repo-relative path) to leave out.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the content digest is unchanged.")
+    args = parser.parse_args()
+
+    spec = release.ReleaseSpec(extra_excludes=tuple(args.exclude))
+    try:
+        result = release.build(args.out, spec=spec, codec=args.codec, force=args.force)
+    except release.CodecError as e:
+        print(f"❌ ERROR: {e}")
+        return 1
+
+    print(f"[release] files={result.files} input_bytes={result.input_bytes}")
+    for t in result.codec_trials:
+        print(f"[release]   {t['codec']:<8} ratio={t['ratio']:.3f} {t['mb_per_s']:>7.1f} MB/s est={t['estimate_s']:.1f}s")
+    if result.skipped:
+        print(f"[release] unchanged since last build; kept {result.archive}")
+    else:
+        print(f"[release] codec={result.codec} archive_bytes={result.archive_bytes} in {result.seconds:.2f}s")
+        print(f"[release] wrote {result.archive}")
+    print(f"[release] manifest {result.manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
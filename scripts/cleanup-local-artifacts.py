@@ -2,14 +2,36 @@
 from __future__ import annotations
 
 import argparse
+import base64
 import glob
+import json
 import os
+import queue
+import re
 import shutil
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 
+# scandir/stat/unlink release the GIL, so threads overlap the filesystem calls.
+# Past a handful they only contend on the directory locks: in
+# bench-cleanup-sizing.py deletion peaks around 4 workers and 32 is slower.
+DEFAULT_WORKERS = min(8, max(4, os.cpu_count() or 4))
+
+# --budget mode remembers last-access times here between runs; atime alone is
+# unreliable on relatime/noatime mounts.
+INDEX_PATH = REPO_ROOT / ".cache" / "cleanup-index.json"
+INDEX_VERSION = 1
+KEEP_RECENT_HOURS = 24.0
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
 
 def within_repo(path: Path) -> bool:
     try:
@@ -19,7 +41,100 @@ def within_repo(path: Path) -> bool:
         return False
 
 
-def remove_path(path: Path, apply: bool) -> tuple[bool, int, str]:
+def tree_size(root: Path, workers: int = DEFAULT_WORKERS) -> int:
+    """Total st_size of the files under `root`, without following symlinks."""
+    return tree_usage(root, workers)[0]
+
+
+def tree_usage(root: Path, workers: int = DEFAULT_WORKERS) -> tuple[int, float]:
+    """
+    (total st_size, newest file atime/mtime) under `root`, in one walk.
+
+    Directories go through a shared queue, so any idle worker picks up the
+    next subtree. Types come from the scandir d_type (no stat for
+    directories); hard-linked files (pnpm) are counted once per inode.
+    """
+    todo: "queue.Queue[str | None]" = queue.Queue()
+    totals: list[tuple[int, float]] = []
+    seen_inodes: set[tuple[int, int]] = set()
+    lock = threading.Lock()
+
+    def worker() -> None:
+        size, newest = 0, 0.0
+        while True:
+            path = todo.get()
+            if path is None:
+                break
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                todo.put(entry.path)
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        newest = max(newest, st.st_atime, st.st_mtime)
+                        if st.st_nlink > 1:
+                            key = (st.st_dev, st.st_ino)
+                            with lock:
+                                if key in seen_inodes:
+                                    continue
+                                seen_inodes.add(key)
+                        size += st.st_size
+            except OSError:
+                pass
+            finally:
+                todo.task_done()
+        with lock:
+            totals.append((size, newest))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    todo.put(str(root))
+    todo.join()
+    for _ in threads:
+        todo.put(None)
+    for t in threads:
+        t.join()
+    return sum(t[0] for t in totals), max((t[1] for t in totals), default=0.0)
+
+
+def _split_subtrees(root: Path, want: int) -> tuple[list[str], list[str], list[str]]:
+    """
+    Expand `root` breadth-first until there are at least `want` subtrees.
+    Returns (files, subtrees, expanded_dirs) with expanded_dirs in BFS order.
+    """
+    files: list[str] = []
+    expanded: list[str] = []
+    frontier = [str(root)]
+    while frontier and len(frontier) < want:
+        next_frontier: list[str] = []
+        for d in frontier:
+            expanded.append(d)
+            with os.scandir(d) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        next_frontier.append(entry.path)
+                    else:
+                        files.append(entry.path)
+        frontier = next_frontier
+    return files, frontier, expanded
+
+
+def remove_tree(root: Path, workers: int = DEFAULT_WORKERS) -> None:
+    """shutil.rmtree, with independent subtrees removed concurrently."""
+    files, subtrees, expanded = _split_subtrees(root, max(1, workers) * 4)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(os.unlink, files))
+        list(pool.map(shutil.rmtree, subtrees))
+    for d in reversed(expanded):
+        os.rmdir(d)
+
+
+def remove_path(path: Path, apply: bool, workers: int = DEFAULT_WORKERS) -> tuple[bool, int, str]:
     """
     Returns (removed, bytes_estimate, kind)
     """
@@ -44,18 +159,9 @@ def remove_path(path: Path, apply: bool) -> tuple[bool, int, str]:
 
         if path.is_dir():
             kind = "dir"
-            # best-effort size estimate (fast-ish)
-            try:
-                for p in path.rglob("*"):
-                    if p.is_file():
-                        try:
-                            size += p.stat().st_size
-                        except Exception:
-                            pass
-            except Exception:
-                pass
+            size = tree_size(path, workers)
             if apply:
-                shutil.rmtree(path, ignore_errors=False)
+                remove_tree(path, workers)
             return (True, size, kind)
     except Exception as e:
         return (False, 0, f"error:{e.__class__.__name__}:{e}")
@@ -63,6 +169,335 @@ def remove_path(path: Path, apply: bool) -> tuple[bool, int, str]:
     return (False, 0, "unknown")
 
 
+def parse_size(text: str) -> int:
+    """'500M', '2G', '1.5GiB', '4096' -> bytes (binary units)."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*", text, re.IGNORECASE)
+    if not m:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r} (try 500M or 2G)")
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()])
+
+
+def human(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+@dataclass
+class CacheEntry:
+    """
+    One evictable unit: `paths` are removed together. A pnpm package also
+    lists its store `content` files, which other packages may share.
+    """
+    key: str
+    kind: str
+    paths: list[str]
+    label: str = ""
+    size: int = 0
+    last_access: float = 0.0
+    pinned: bool = False
+    mtime_ns: int = 0
+    content: list[str] = field(default_factory=list)
+
+
+def load_index(path: Path = INDEX_PATH) -> dict[str, CacheEntry]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+        return {}
+    entries: dict[str, CacheEntry] = {}
+    for raw in data.get("entries", []):
+        try:
+            entry = CacheEntry(**raw)
+        except TypeError:
+            continue
+        entries[entry.key] = entry
+    return entries
+
+
+def save_index(entries: dict[str, CacheEntry], path: Path = INDEX_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({
+        "version": INDEX_VERSION,
+        "updated": time.time(),
+        "entries": [asdict(e) for e in entries.values()],
+    }))
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path):
+    """json.load without bumping the file's atime (O_NOATIME needs ownership)."""
+    flags = os.O_RDONLY | getattr(os, "O_NOATIME", 0)
+    try:
+        fd = os.open(path, flags)
+    except PermissionError:
+        fd = os.open(path, os.O_RDONLY)
+    try:
+        with os.fdopen(fd, "rb") as f:
+            return json.load(f)
+    except ValueError:
+        return None
+
+
+def _stat_many(paths: list[str], workers: int) -> dict[str, os.stat_result]:
+    def one(p: str):
+        try:
+            return p, os.stat(p, follow_symlinks=False)
+        except OSError:
+            return p, None
+
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return {p: st for p, st in pool.map(one, paths) if st is not None}
+
+
+def _touched(st: os.stat_result) -> float:
+    return max(st.st_atime, st.st_mtime)
+
+
+def _integrity_to_hex(integrity: str) -> str | None:
+    algo, _, digest = integrity.partition("-")
+    if algo != "sha512" or not digest:
+        return None
+    try:
+        return base64.b64decode(digest).hex()
+    except ValueError:
+        return None
+
+
+def _pnpm_package(index_file: Path) -> tuple[str, list[str]]:
+    """(label, content files) for one package index in a pnpm store."""
+    data = _read_json(index_file)
+    if not isinstance(data, dict):
+        return "", []
+    # <store>/v3/files/ab/<hash>-index.json and <store>/v10/index/ab/<hash>.json
+    version_dir = index_file.parents[2]
+    content = set()
+    for info in (data.get("files") or {}).values():
+        digest = _integrity_to_hex(info.get("integrity", ""))
+        if not digest:
+            continue
+        suffix = "-exec" if int(info.get("mode", 0)) & 0o111 else ""
+        content.add(str(version_dir / "files" / digest[:2] / f"{digest[2:]}{suffix}"))
+    label = f"{data['name']}@{data['version']}" if data.get("name") and data.get("version") else ""
+    return label, sorted(content)
+
+
+def _scan_pnpm(store: Path, old: dict[str, CacheEntry], workers: int,
+               content_sizes: dict[str, int]) -> list[CacheEntry]:
+    """
+    One entry per package index. Content is only stat()ed, never read, and
+    indexes are re-parsed only when their mtime changed. A package whose
+    content is hard-linked into a node_modules (nlink > 1) is in use: removing
+    it from the store would free nothing, so it is pinned.
+    """
+    index_files = []
+    for version_dir in sorted(store.glob("v*")):
+        index_files += version_dir.glob("files/*/*-index.json")
+        index_files += version_dir.glob("index/*/*.json")
+    index_stats = _stat_many([str(f) for f in index_files], workers)
+
+    packages = []
+    for f, st in index_stats.items():
+        key = f"pnpm:{f}"
+        prev = old.get(key)
+        if prev and prev.mtime_ns == st.st_mtime_ns:
+            label, content = prev.label, prev.content
+        else:
+            label, content = _pnpm_package(Path(f))
+        packages.append((key, f, st, label, content, prev))
+
+    content_stats = _stat_many(sorted({c for *_, content, _ in packages for c in content}), workers)
+    content_sizes.update((c, st.st_size) for c, st in content_stats.items())
+
+    entries = []
+    for key, f, st, label, content, prev in packages:
+        present = [c for c in content if c in content_stats]
+        stats = [content_stats[c] for c in present]
+        entries.append(CacheEntry(
+            key=key,
+            kind="pnpm-package",
+            paths=[f],
+            label=label,
+            size=st.st_size + sum(s.st_size for s in stats),
+            last_access=max([st.st_atime, prev.last_access if prev else 0.0] + [s.st_atime for s in stats]),
+            pinned=any(s.st_nlink > 1 for s in stats),
+            mtime_ns=st.st_mtime_ns,
+            content=present,
+        ))
+    return entries
+
+
+def _scan_vite(cache_dir: Path, workers: int) -> list[CacheEntry]:
+    """
+    The live dep-optimizer output of `node_modules/.vite` is one entry; files
+    no longer listed in a _metadata.json (superseded chunks, their maps) and
+    leftover deps_temp_* dirs are entries of their own, so they go first.
+    """
+    entries = []
+    live: list[str] = []
+    for child in sorted(cache_dir.iterdir()):
+        if not child.is_dir():
+            live.append(str(child))
+            continue
+        metadata = child / "_metadata.json"
+        if not metadata.is_file():
+            entries.append(CacheEntry(key=f"vite:{child}", kind="vite-stale", paths=[str(child)],
+                                      size=tree_size(child, workers),
+                                      last_access=_touched(child.stat())))
+            continue
+        data = _read_json(metadata) or {}
+        keep = {"_metadata.json", "package.json"}
+        for section in ("optimized", "chunks"):
+            for info in (data.get(section) or {}).values():
+                name = str(info.get("file", ""))
+                keep.update((name, name + ".map"))
+        for path in child.iterdir():
+            if path.name in keep or path.is_dir():
+                live.append(str(path))
+                continue
+            st = path.stat()
+            entries.append(CacheEntry(key=f"vite:{path}", kind="vite-stale", paths=[str(path)],
+                                      size=st.st_size, last_access=_touched(st)))
+    stats = _stat_many(live, workers)
+    entries.append(CacheEntry(
+        key=f"vite:{cache_dir}",
+        kind="vite-deps",
+        paths=[str(cache_dir)],
+        size=sum(tree_size(Path(p), workers) if Path(p).is_dir() else st.st_size for p, st in stats.items()),
+        last_access=max((_touched(st) for st in stats.values()), default=0.0),
+    ))
+    return entries
+
+
+def _scan_path(path: Path, kind: str, workers: int) -> CacheEntry:
+    st = path.lstat()
+    size, last_access = st.st_size, _touched(st)
+    if path.is_dir() and not path.is_symlink():
+        size, newest = tree_usage(path, workers)
+        last_access = max(last_access, newest)
+    return CacheEntry(key=f"{kind}:{path}", kind=kind, paths=[str(path)], size=size, last_access=last_access)
+
+
+def scan_cache_entries(store: Path, old: dict[str, CacheEntry], workers: int = DEFAULT_WORKERS
+                       ) -> tuple[dict[str, CacheEntry], dict[str, int]]:
+    """
+    Everything --budget may evict, keyed like the persistent index, plus the
+    size of every pnpm content file. Last-access times never go backwards.
+    """
+    content_sizes: dict[str, int] = {}
+    found: list[CacheEntry] = []
+    if store.is_dir():
+        found += _scan_pnpm(store, old, workers, content_sizes)
+
+    for pkg in sorted((REPO_ROOT / "packages").glob("*/node_modules")):
+        if (pkg / ".vite").is_dir():
+            found += _scan_vite(pkg / ".vite", workers)
+        if (pkg / ".vite-temp").exists():
+            found.append(_scan_path(pkg / ".vite-temp", "vite-temp", workers))
+
+    for p in sorted(glob.glob(str(REPO_ROOT / "packages" / "server" / "test-*.db*"))):
+        found.append(_scan_path(Path(p), "test-db", workers))
+    for p in sorted(glob.glob(str(REPO_ROOT / "packages" / "**" / "*.timestamp-*.mjs"), recursive=True)):
+        found.append(_scan_path(Path(p), "vite-timestamp", workers))
+    for rel in ("packages/client/coverage", "test-results", "playwright-report", "playwright/playwright-report"):
+        if (REPO_ROOT / rel).exists():
+            found.append(_scan_path(REPO_ROOT / rel, "report", workers))
+
+    entries: dict[str, CacheEntry] = {}
+    for entry in found:
+        prev = old.get(entry.key)
+        if prev:
+            entry.last_access = max(entry.last_access, prev.last_access)
+        entries[entry.key] = entry
+    return entries, content_sizes
+
+
+def plan_eviction(entries: dict[str, CacheEntry], content_sizes: dict[str, int], budget: int,
+                  keep_recent: float, now: float | None = None
+                  ) -> tuple[int, list[tuple[CacheEntry, int, list[str]]]]:
+    """
+    Least-recently-used entries to drop until the total fits `budget`.
+    Returns (total_bytes, [(entry, bytes_freed, paths_to_remove), ...]).
+    Pinned entries and entries used within `keep_recent` seconds stay, even
+    if that leaves the total over budget. Shared pnpm content is only freed
+    with the last package that references it.
+    """
+    now = time.time() if now is None else now
+    refs = Counter(c for e in entries.values() for c in e.content)
+    total = sum(e.size - sum(content_sizes.get(c, 0) for c in e.content) for e in entries.values())
+    total += sum(content_sizes.get(c, 0) for c in refs)
+
+    victims = []
+    candidates = [e for e in entries.values() if not e.pinned and now - e.last_access >= keep_recent]
+    for entry in sorted(candidates, key=lambda e: e.last_access):
+        if total <= budget:
+            break
+        paths = list(entry.paths)
+        freed = entry.size - sum(content_sizes.get(c, 0) for c in entry.content)
+        for c in entry.content:
+            refs[c] -= 1
+            if refs[c] == 0:
+                paths.append(c)
+                freed += content_sizes.get(c, 0)
+        victims.append((entry, freed, paths))
+        total -= freed
+    return total, victims
+
+
+def run_budget(args: argparse.Namespace) -> int:
+    started = time.time()
+    store = args.pnpm_store.resolve()
+    allowed = [REPO_ROOT, store]
+    old = load_index()
+    entries, content_sizes = scan_cache_entries(store, old, args.workers)
+    total, victims = plan_eviction(entries, content_sizes, args.budget, args.keep_recent * 3600, now=started)
+    freed = sum(f for _, f, _ in victims)
+
+    mode = "APPLY" if args.apply else "DRY-RUN"
+    print(f"[cleanup] mode={mode} budget={human(args.budget)} repo={REPO_ROOT}")
+    print(f"[cleanup] indexed={len(entries)} entries size={human(total + freed)} "
+          f"pinned={sum(e.pinned for e in entries.values())} scan={time.time() - started:.1f}s")
+
+    failed = 0
+    for entry, size, paths in victims:
+        idle = (started - entry.last_access) / 86400
+        where = entry.label or os.path.relpath(entry.paths[0], REPO_ROOT if within_repo(Path(entry.paths[0])) else store)
+        print(f" - evict {entry.kind}: {where} ({human(size)}, idle {idle:.1f}d)")
+        if not args.apply:
+            continue
+        for path in map(Path, paths):
+            if not any(path.resolve().is_relative_to(root) for root in allowed):
+                continue
+            try:
+                if path.is_dir() and not path.is_symlink():
+                    remove_tree(path, args.workers)
+                else:
+                    path.unlink(missing_ok=True)
+            except OSError as e:
+                failed += 1
+                print(f"   error: {path}: {e}")
+        entries.pop(entry.key, None)
+
+    if args.apply:
+        # A dry run only reports; the next real run rescans anyway.
+        save_index(entries)
+    verb = "freed" if args.apply else "would free"
+    print(f"[cleanup] evicted={len(victims)} {verb}={human(freed)} remaining={human(total)}")
+    if total > args.budget:
+        print(f"[cleanup] still {human(total - args.budget)} over budget: the rest is pinned "
+              f"(linked into node_modules) or used in the last {args.keep_recent:g}h.")
+    if not args.apply and victims:
+        print("[cleanup] Re-run with --apply to delete.")
+    return 1 if failed else 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Clean local/dev artifacts (safe, re-generated). Defaults to dry-run."
@@ -73,8 +508,36 @@ def main() -> int:
         action="store_true",
         help="Also remove repo root node_modules/ and .pnpm-store/ (forces reinstall).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Threads used to size and delete directory trees (default: {DEFAULT_WORKERS}).",
+    )
+    parser.add_argument(
+        "--budget",
+        type=parse_size,
+        help="Instead of wiping everything, evict least-recently-used cache entries "
+        "(pnpm store packages, stale Vite chunks, test DBs, reports) until they fit SIZE, e.g. 2G.",
+    )
+    parser.add_argument(
+        "--keep-recent",
+        type=float,
+        default=KEEP_RECENT_HOURS,
+        metavar="HOURS",
+        help=f"With --budget, never evict entries used in the last HOURS (default: {KEEP_RECENT_HOURS:g}).",
+    )
+    parser.add_argument(
+        "--pnpm-store",
+        type=Path,
+        default=REPO_ROOT / ".pnpm-store",
+        help="pnpm store to manage with --budget (default: .pnpm-store/ in the repo).",
+    )
     args = parser.parse_args()
 
+    if args.budget is not None:
+        return run_budget(args)
+
     # Only target known generated artifacts. Do NOT touch packages/**/data/* or env files.
     targets: list[Path] = []
 
@@ -129,7 +592,7 @@ def main() -> int:
             continue
         seen.add(tr)
 
-        ok, size, kind = remove_path(t, apply=args.apply)
+        ok, size, kind = remove_path(t, apply=args.apply, workers=args.workers)
         if ok:
             removed += 1
             bytes_removed += size
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Fleet Deployment
+Builds the prebuilt bundle once, stages it on every game node in parallel,
+then activates a canary followed by rolling batches. A batch whose nodes do
+not pass /api/readyz stops the rollout.
+Every node must already have been set up once with deploy-from-root.sh.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from deploylib import REPO_ROOT, fleet, prebuilt, release
+
+# Inventory and credentials (env-driven; no hardcoded secrets)
+FLEET_INVENTORY = Path(os.environ.get("FLEET_INVENTORY") or (REPO_ROOT / "ops" / "fleet" / "inventory.txt"))
+VPS_USER = os.environ.get("VPS_USER", "root")
+VPS_PASSWORD = os.environ.get("VPS_PASSWORD") or None  # unset: use SSH keys/agent
+
+BUNDLE_LOCAL = Path(os.environ.get("BUNDLE_LOCAL") or (REPO_ROOT / "spermrace-prebuilt.tar.gz"))
+
+def print_header(text):
+    print("\n" + "=" * 70)
+    print(f"  {text}")
+    print("=" * 70 + "\n")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SpermRace.io rolling deployment to several VPS nodes")
+    parser.add_argument("--inventory", type=Path, default=FLEET_INVENTORY,
+                        help=f"Host list, one `[name=]user@host[:port]` per line (default: {FLEET_INVENTORY}).")
+    parser.add_argument("--hosts", help="Comma-separated hosts instead of an inventory file.")
+    parser.add_argument("--canary", type=int, default=1, help="Hosts in the first, canary batch (0 to skip).")
+    parser.add_argument("--batch-size", type=int, default=2, help="Hosts activated at a time after the canary.")
+    parser.add_argument("--parallel", type=int, default=8, help="Hosts staged (uploaded to) at once.")
+    parser.add_argument("--ready-timeout", type=float, default=fleet.READY_TIMEOUT,
+                        help="Seconds a node gets to pass /api/readyz after activation.")
+    parser.add_argument("--full", action="store_true", help="Upload the whole bundle instead of only changed chunks.")
+    parser.add_argument("--skip-build", action="store_true", help="Reuse the existing packages/*/dist builds.")
+    parser.add_argument("--skip-install", action="store_true", help="Do not run `pnpm install --frozen-lockfile` first.")
+    parser.add_argument("--allow-native", action="store_true", help="Ship compiled .node addons.")
+    parser.add_argument("--codec", default="auto", choices=["auto", *release.CODECS], help="Bundle compression codec.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the batch plan and exit.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print_header("SpermRace.io - Fleet Deployment")
+
+    try:
+        if args.hosts:
+            hosts = fleet.parse_inventory("\n".join(args.hosts.split(",")), VPS_USER)
+        else:
+            hosts = fleet.load_inventory(args.inventory, VPS_USER)
+    except (OSError, fleet.InventoryError) as e:
+        print(f"❌ ERROR: {e}")
+        print("Pass --hosts or create an inventory (see ops/fleet/inventory.example.txt).")
+        sys.exit(1)
+    if not hosts:
+        print("❌ ERROR: Inventory is empty.")
+        sys.exit(1)
+
+    batches = fleet.plan_batches(hosts, args.canary, args.batch_size)
+    print(f"{len(hosts)} hosts, {len(batches)} batches:")
+    for n, batch in enumerate(batches, 1):
+        print(f"  {n}. " + ", ".join(f"{h.name} ({h.user}@{h.host}:{h.port})" for h in batch))
+    if args.dry_run:
+        return
+
+    # Check dependencies
+    try:
+        import paramiko  # noqa: F401
+        import scp  # noqa: F401
+    except ImportError:
+        print("❌ ERROR: Required packages not installed.")
+        print("\nInstall them with: pip install paramiko scp")
+        sys.exit(1)
+
+    print_header("Step 1: Build Bundle")
+    try:
+        result = prebuilt.build_bundle(
+            BUNDLE_LOCAL,
+            build=not args.skip_build,
+            install=not args.skip_install,
+            allow_native=args.allow_native,
+            codec=args.codec,
+        )
+    except prebuilt.PrebuiltError as e:
+        print(f"❌ ERROR: {e}")
+        sys.exit(1)
+    print(f"[OK] Bundle ready: {result.files} files, {result.archive_bytes / (1024 * 1024):.2f} MB\n")
+
+    print_header("Step 2: Stage and Roll Out")
+    rollout = fleet.Rollout(
+        hosts, BUNDLE_LOCAL, password=VPS_PASSWORD,
+        canary=args.canary, batch_size=args.batch_size, parallel=args.parallel,
+        full=args.full, ready_timeout=args.ready_timeout,
+    )
+    ok = rollout.run()
+
+    print_header("FLEET DEPLOYMENT " + ("SUCCESSFUL!" if ok else "HALTED"))
+    print(rollout.summary())
+    print()
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n❌ Deployment cancelled by user")
+        sys.exit(1)
@@ -92,7 +92,7 @@ fi
 # ====== SYSTEM PACKAGES ======
 info "📦 Installing system packages..."
 $NEED_SUDO apt update
-$NEED_SUDO apt install -y nginx curl build-essential ca-certificates ufw
+$NEED_SUDO apt install -y nginx curl build-essential ca-certificates ufw zstd xz-utils
 
 # ====== NODE.JS 20 ======
 if ! command -v node &>/dev/null || [[ "$(node -v | cut -d'.' -f1 | tr -d 'v')" -lt 20 ]]; then
@@ -139,7 +139,8 @@ $NEED_SUDO chown "$DEPLOY_USER":"$DEPLOY_USER" "$APP_DIR"
 cd "$APP_DIR"
 
 cp "$TARBALL_LOCATION" ./spermrace-deploy.tar.gz || die "Failed to copy tarball"
-tar -xzf spermrace-deploy.tar.gz || die "Failed to extract tarball"
+# -xf: GNU tar detects gzip/zstd/xz from the archive itself (see scripts/build-release.py)
+tar -xf spermrace-deploy.tar.gz || die "Failed to extract tarball"
 rm spermrace-deploy.tar.gz
 ok "Project extracted"
 
@@ -0,0 +1,107 @@
+#!/usr/bin/env bash
+# ============================================================================
+# SpermRace.io - Prebuilt Bundle Deploy (remote side)
+# Unpacks a bundle built by scripts/deploy-prebuilt.py and reloads pm2.
+# No pnpm install or builds run here. First-time setup (Node, pm2, nginx,
+# TLS, server .env) still goes through deploy-from-root.sh.
+# ============================================================================
+
+set -euo pipefail
+
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+CYAN='\033[0;36m'
+NC='\033[0m'
+
+info() { echo -e "${CYAN}[INFO]${NC} $*"; }
+ok() { echo -e "${GREEN}[OK]${NC} $*"; }
+warn() { echo -e "${YELLOW}[WARN]${NC} $*"; }
+die() { echo -e "${RED}[FATAL]${NC} $*"; exit 1; }
+
+BUNDLE="${1:-/tmp/spermrace-prebuilt.tar.gz}"
+APP_DIR="${APP_DIR:-/opt/spermrace}"
+WEB_ROOT="${WEB_ROOT:-/var/www/spermrace}"
+PM2_APP_NAME="${PM2_APP_NAME:-spermrace-server-ws}"
+HEALTH_URL="${HEALTH_URL:-http://127.0.0.1:8080/api/healthz}"
+SERVER_DIR="$APP_DIR/packages/server"
+
+if [[ $EUID -eq 0 ]]; then NEED_SUDO=""; else NEED_SUDO="sudo"; fi
+
+[[ -f "$BUNDLE" ]] || die "Bundle not found at $BUNDLE"
+[[ -f "$SERVER_DIR/.env" ]] || die "No $SERVER_DIR/.env - run deploy-from-root.sh once first"
+command -v pm2 &>/dev/null || die "pm2 not installed - run deploy-from-root.sh once first"
+[[ -L "$APP_DIR/current" ]] && die "$APP_DIR uses versioned releases - deploy with scripts/deploy-release.py"
+
+# ====== UNPACK ======
+info "📥 Unpacking prebuilt bundle..."
+STAGE="$(mktemp -d "$APP_DIR/.prebuilt.XXXXXX")"
+trap 'rm -rf "$STAGE"' EXIT
+tar -xf "$BUNDLE" -C "$STAGE" || die "Failed to extract bundle"
+[[ -d "$STAGE/server/dist" && -d "$STAGE/client" ]] || die "Bundle is missing server/dist or client/"
+ok "Bundle unpacked"
+
+# ====== SWAP SERVER RUNTIME ======
+info "🔁 Swapping server runtime..."
+swap_in() {
+  local name="$1"
+  rm -rf "$SERVER_DIR/$name.prev"
+  if [[ -e "$SERVER_DIR/$name" ]]; then mv "$SERVER_DIR/$name" "$SERVER_DIR/$name.prev"; fi
+  mv "$STAGE/server/$name" "$SERVER_DIR/$name"
+}
+swap_back() {
+  local name="$1"
+  if [[ -e "$SERVER_DIR/$name.prev" ]]; then
+    rm -rf "$SERVER_DIR/$name"
+    mv "$SERVER_DIR/$name.prev" "$SERVER_DIR/$name"
+  fi
+}
+for name in package.json node_modules dist; do swap_in "$name"; done
+ok "Server runtime in place"
+
+# ====== RELOAD PM2 ======
+info "🚀 Reloading backend..."
+cd "$SERVER_DIR"
+old_pid="$(pm2 pid "$PM2_APP_NAME" 2>/dev/null || true)"
+if pm2 describe "$PM2_APP_NAME" &>/dev/null; then
+  pm2 reload "$PM2_APP_NAME" --update-env
+else
+  pm2 start dist/server/src/index.js \
+    --name "$PM2_APP_NAME" \
+    --max-memory-restart 600M \
+    --env production
+fi
+
+# The old process can keep answering for a moment after the reload, so only
+# count a health check served by the new pid.
+healthy=""
+for _ in $(seq 1 30); do
+  new_pid="$(pm2 pid "$PM2_APP_NAME" 2>/dev/null || true)"
+  if [[ -n "$new_pid" && "$new_pid" != "0" && "$new_pid" != "$old_pid" ]] \
+     && curl -fsS "$HEALTH_URL" 2>/dev/null | grep -q "\"pid\":$new_pid[,}]"; then
+    healthy=1; break
+  fi
+  sleep 1
+done
+if [[ -z "$healthy" ]]; then
+  warn "Health check failed at $HEALTH_URL (new pid ${new_pid:-none}) - rolling back server runtime"
+  for name in package.json node_modules dist; do swap_back "$name"; done
+  pm2 reload "$PM2_APP_NAME" --update-env || true
+  die "Prebuilt deploy rolled back"
+fi
+pm2 save
+for name in package.json node_modules dist; do rm -rf "$SERVER_DIR/$name.prev"; done
+ok "Server healthy"
+
+# ====== DEPLOY FRONTEND ======
+# Copy over the old build instead of emptying the web root first, so there is
+# no window where index.html or assets 404. Stale hashed assets are harmless.
+info "🌐 Deploying frontend..."
+$NEED_SUDO mkdir -p "$WEB_ROOT"
+$NEED_SUDO cp -r "$STAGE/client/." "$WEB_ROOT/"
+$NEED_SUDO chown -R www-data:www-data "$WEB_ROOT"
+ok "Frontend deployed"
+
+rm -f "$BUNDLE"
+echo ""
+ok "🎉 Prebuilt deploy complete"
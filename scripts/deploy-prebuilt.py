@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Prebuilt Deployment
+Builds locally, ships only runtime artifacts and reloads pm2 on the VPS.
+The VPS must already have been set up once with deploy-from-root.sh.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from deploylib import REPO_ROOT, delta, phases, prebuilt, release
+from deploylib.session import Session
+
+# VPS configuration (env-driven; no hardcoded secrets)
+VPS_IP = os.environ.get("VPS_IP")
+VPS_USER = os.environ.get("VPS_USER", "root")
+VPS_PASSWORD = os.environ.get("VPS_PASSWORD")
+
+BUNDLE_LOCAL = Path(os.environ.get("BUNDLE_LOCAL") or (REPO_ROOT / "spermrace-prebuilt.tar.gz"))
+BUNDLE_REMOTE = "/tmp/spermrace-prebuilt.tar.gz"
+REMOTE_SCRIPT_REMOTE = "/tmp/deploy-prebuilt-remote.sh"
+
+def print_header(text):
+    print("\n" + "=" * 70)
+    print(f"  {text}")
+    print("=" * 70 + "\n")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SpermRace.io prebuilt VPS deployment")
+    parser.add_argument("--full", action="store_true", help="Upload the whole bundle instead of only changed chunks.")
+    parser.add_argument("--skip-build", action="store_true", help="Reuse the existing packages/*/dist builds.")
+    parser.add_argument("--skip-install", action="store_true", help="Do not run `pnpm install --frozen-lockfile` first.")
+    parser.add_argument("--allow-native", action="store_true",
+                        help="Ship compiled .node addons (only safe if this machine matches the VPS OS/arch/Node).")
+    parser.add_argument("--codec", default="auto", choices=["auto", *release.CODECS], help="Bundle compression codec.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print_header("SpermRace.io - Prebuilt VPS Deployment")
+
+    # Validate configuration
+    if not VPS_IP or not VPS_PASSWORD:
+        print("❌ ERROR: Set VPS_IP and VPS_PASSWORD in environment (no secrets in code).")
+        sys.exit(1)
+
+    # Check dependencies
+    try:
+        import paramiko
+        import scp  # noqa: F401
+    except ImportError:
+        print("❌ ERROR: Required packages not installed.")
+        print("\nInstall them with: pip install paramiko scp")
+        sys.exit(1)
+
+    print_header("Step 1: Build Bundle")
+    build_started = time.monotonic()
+    try:
+        result = prebuilt.build_bundle(
+            BUNDLE_LOCAL,
+            build=not args.skip_build,
+            install=not args.skip_install,
+            allow_native=args.allow_native,
+            codec=args.codec,
+        )
+    except prebuilt.PrebuiltError as e:
+        print(f"❌ ERROR: {e}")
+        sys.exit(1)
+    build_seconds = time.monotonic() - build_started
+    bundle_size = result.archive_bytes / (1024 * 1024)
+    state = "unchanged" if result.skipped else f"codec={result.codec}"
+    print(f"[OK] Bundle ready: {result.files} files, {bundle_size:.2f} MB ({state})\n")
+
+    print_header("Connecting to VPS")
+    print(f"Connecting to {VPS_USER}@{VPS_IP}...")
+    session = Session(VPS_IP, VPS_USER, VPS_PASSWORD)
+
+    try:
+        session.connect()
+        print("[OK] Connected to VPS\n")
+        script_upload = session.submit(session.put, prebuilt.REMOTE_SCRIPT_LOCAL, REMOTE_SCRIPT_REMOTE)
+
+        print_header("Step 2: Upload Bundle")
+        print(f"Uploading {bundle_size:.2f} MB to {BUNDLE_REMOTE} ({'full' if args.full else 'delta'})...")
+        upload = delta.upload_release(session.client, BUNDLE_LOCAL, BUNDLE_REMOTE, host=VPS_IP, full=args.full, progress=progress, reconnect=session.reconnect, store=prebuilt.DELTA_STORE, user=VPS_USER)
+        print(f"\n[OK] Bundle uploaded: {delta.describe(upload)}\n")
+
+        script_upload.result()
+        print("[OK] Remote script uploaded\n")
+
+        print_header("Step 3: Unpack and Reload")
+        print("=" * 70)
+        tracker = phases.PhaseTracker(lambda line: print(line, end=''))
+        tracker.add("build bundle", build_seconds)
+        tracker.add("upload", upload.seconds)
+        exit_status = session.stream(f"bash {REMOTE_SCRIPT_REMOTE} {BUNDLE_REMOTE}",
+                                     on_line=tracker, label="deploy-prebuilt-remote.sh")
+        phases.record(tracker, host=VPS_IP, script="deploy-prebuilt-remote.sh", status=exit_status)
+        print("\nPhase timings:")
+        print(tracker.summary())
+
+        print()
+        if exit_status == 0:
+            print_header("DEPLOYMENT SUCCESSFUL!")
+            print("Useful Commands:")
+            print(f"  ssh {VPS_USER}@{VPS_IP}")
+            print(f"  pm2 status")
+            print(f"  pm2 logs spermrace-server-ws")
+            print()
+        else:
+            print("=" * 70)
+            print("❌ Deployment failed with exit code:", exit_status)
+            print("=" * 70)
+            print("\nCheck the output above for errors.")
+            sys.exit(exit_status)
+
+    except paramiko.AuthenticationException:
+        print("❌ ERROR: Authentication failed")
+        print("Please check VPS credentials")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        if session.timings:
+            print("\nRemote timings:")
+            print(session.timing_report())
+        session.close()
+
+def progress(filename, size, sent):
+    """Progress callback for uploads"""
+    percent = float(sent) / float(size) * 100
+    bar_length = 50
+    filled = int(bar_length * percent / 100)
+    bar = '█' * filled + '░' * (bar_length - filled)
+
+    sys.stdout.write(f"\r  [{bar}] {percent:.1f}%")
+    sys.stdout.flush()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n❌ Deployment cancelled by user")
+        sys.exit(1)
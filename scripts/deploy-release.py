@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Zero-Downtime Release Deployment
+Ships the prebuilt bundle into a new versioned release directory, starts it
+on the idle side port, and switches nginx and the web root over only after
+/api/readyz, /api/ws-healthz and a WebSocket upgrade pass.
+
+  deploy-release.py deploy               build, upload, switch
+  deploy-release.py rollback [--to ID]   switch back (default: previous release)
+  deploy-release.py list                 releases on the VPS, * = live
+
+The VPS must already have been set up once with deploy-from-root.sh.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from deploylib import REPO_ROOT, delta, phases, prebuilt, release, releases
+from deploylib.session import Session
+
+# VPS configuration (env-driven; no hardcoded secrets)
+VPS_IP = os.environ.get("VPS_IP")
+VPS_USER = os.environ.get("VPS_USER", "root")
+VPS_PASSWORD = os.environ.get("VPS_PASSWORD")
+
+BUNDLE_LOCAL = Path(os.environ.get("BUNDLE_LOCAL") or (REPO_ROOT / "spermrace-prebuilt.tar.gz"))
+
+def print_header(text):
+    print("\n" + "=" * 70)
+    print(f"  {text}")
+    print("=" * 70 + "\n")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SpermRace.io zero-downtime release deployment")
+    parser.add_argument("--keep", type=int, default=releases.KEEP_RELEASES, help="Releases to keep on the VPS for rollback.")
+    parser.add_argument("--drain", type=int, default=releases.DRAIN_SECONDS,
+                        help="Seconds the old server keeps its open sockets after the switch.")
+    parser.add_argument("--ready-timeout", type=int, default=releases.READY_TIMEOUT,
+                        help="Seconds the new server gets to pass the readiness gate.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    deploy = sub.add_parser("deploy", help="Build, upload and switch to a new release.")
+    deploy.add_argument("--full", action="store_true", help="Upload the whole bundle instead of only changed chunks.")
+    deploy.add_argument("--skip-build", action="store_true", help="Reuse the existing packages/*/dist builds.")
+    deploy.add_argument("--skip-install", action="store_true", help="Do not run `pnpm install --frozen-lockfile` first.")
+    deploy.add_argument("--allow-native", action="store_true", help="Ship compiled .node addons.")
+    deploy.add_argument("--codec", default="auto", choices=["auto", *release.CODECS], help="Bundle compression codec.")
+
+    rollback = sub.add_parser("rollback", help="Switch back to an earlier release.")
+    rollback.add_argument("--to", default="", help="Release id (default: the one before the live release).")
+
+    sub.add_parser("list", help="List releases on the VPS.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print_header(f"SpermRace.io - Release {args.command.capitalize()}")
+
+    # Validate configuration
+    if not VPS_IP or not VPS_PASSWORD:
+        print("❌ ERROR: Set VPS_IP and VPS_PASSWORD in environment (no secrets in code).")
+        sys.exit(1)
+
+    # Check dependencies
+    try:
+        import paramiko
+        import scp  # noqa: F401
+    except ImportError:
+        print("❌ ERROR: Required packages not installed.")
+        print("\nInstall them with: pip install paramiko scp")
+        sys.exit(1)
+
+    build_seconds = 0.0
+    if args.command == "deploy":
+        print_header("Step 1: Build Bundle")
+        build_started = time.monotonic()
+        try:
+            result = prebuilt.build_bundle(
+                BUNDLE_LOCAL,
+                build=not args.skip_build,
+                install=not args.skip_install,
+                allow_native=args.allow_native,
+                codec=args.codec,
+            )
+        except prebuilt.PrebuiltError as e:
+            print(f"❌ ERROR: {e}")
+            sys.exit(1)
+        build_seconds = time.monotonic() - build_started
+        print(f"[OK] Bundle ready: {result.files} files, {result.archive_bytes / (1024 * 1024):.2f} MB\n")
+
+    print(f"Connecting to {VPS_USER}@{VPS_IP}...")
+    session = Session(VPS_IP, VPS_USER, VPS_PASSWORD)
+    opts = {"keep": args.keep, "drain": args.drain, "ready_timeout": args.ready_timeout}
+
+    try:
+        session.connect()
+        print("[OK] Connected to VPS\n")
+        script_upload = session.submit(releases.upload_script, session)
+
+        if args.command == "list":
+            script_upload.result()
+            rows = releases.list_releases(session)
+            if not rows:
+                print("No releases yet.")
+            for rel, live in rows:
+                print(f"  {'*' if live else ' '} {rel}")
+            return
+
+        tracker = phases.PhaseTracker(lambda line: print(line, end=''))
+        if args.command == "deploy":
+            print_header("Step 2: Upload Bundle")
+            upload = delta.upload_release(session.client, BUNDLE_LOCAL, releases.REMOTE_BUNDLE, host=VPS_IP,
+                                          progress=progress, full=args.full, reconnect=session.reconnect,
+                                          store=prebuilt.DELTA_STORE, user=VPS_USER)
+            print(f"\n[OK] Bundle uploaded: {delta.describe(upload)}\n")
+            tracker.add("build bundle", build_seconds)
+            tracker.add("upload", upload.seconds)
+            script_upload.result()
+            print_header("Step 3: Switch Release")
+            print("=" * 70)
+            exit_status = releases.activate(session, tracker, **opts)
+        else:
+            script_upload.result()
+            print("=" * 70)
+            exit_status = releases.rollback(session, tracker, release=args.to, **opts)
+        phases.record(tracker, host=VPS_IP, script=f"release-{args.command}", status=exit_status)
+
+        print()
+        if exit_status == 0:
+            print_header("RELEASE LIVE")
+            for rel, live in releases.list_releases(session)[:args.keep]:
+                print(f"  {'*' if live else ' '} {rel}")
+            print()
+            print(f"Roll back with: python3 scripts/deploy-release.py rollback")
+            print()
+        else:
+            print("=" * 70)
+            print("❌ Release switch failed with exit code:", exit_status)
+            print("   The previous release is still serving traffic.")
+            print("=" * 70)
+            sys.exit(exit_status)
+
+    except paramiko.AuthenticationException:
+        print("❌ ERROR: Authentication failed")
+        print("Please check VPS credentials")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        session.close()
+
+def progress(filename, size, sent):
+    """Progress callback for uploads"""
+    percent = float(sent) / float(size) * 100
+    bar_length = 50
+    filled = int(bar_length * percent / 100)
+    bar = '█' * filled + '░' * (bar_length - filled)
+
+    sys.stdout.write(f"\r  [{bar}] {percent:.1f}%")
+    sys.stdout.flush()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n❌ Deployment cancelled by user")
+        sys.exit(1)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Deploy performance report
+
+Reads the per-phase timings the deploy scripts append to
+.deploy-cache/deploy-history.jsonl. Lists recent deploys, then compares
+each phase of the latest one against the median of the deploys before it.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from deploylib import phases
+
+
+def _fmt_change(change: float | None) -> str:
+    return "" if change is None else f"{change * 100:+.0f}%"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-phase deploy timing trends and regressions.")
+    parser.add_argument("--history-file", type=Path, default=phases.HISTORY_PATH)
+    parser.add_argument("--host", help="Only deploys to this host.")
+    parser.add_argument("--script", help="Only this remote script (e.g. deploy-from-root.sh).")
+    parser.add_argument("--recent", type=int, default=10, help="Recent deploys to list.")
+    parser.add_argument("--window", type=int, default=10, help="Earlier successful deploys used as the baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative slowdown that counts as a regression.")
+    parser.add_argument("--min-delta", type=float, default=5.0, help="Ignore slowdowns smaller than this many seconds.")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 if the latest deploy regressed.")
+    args = parser.parse_args()
+
+    records = [
+        r for r in phases.load_history(args.history_file)
+        if (not args.host or r.host == args.host) and (not args.script or r.script == args.script)
+    ]
+    if not records:
+        print(f"No deploys recorded in {args.history_file}")
+        return 0
+
+    print(f"Recent deploys ({min(args.recent, len(records))} of {len(records)}):")
+    for r in records[-args.recent:]:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r.started))
+        slowest = max(r.phases, key=lambda p: p.seconds, default=None)
+        tail = f"  slowest: {slowest.key} {slowest.seconds:.1f}s" if slowest else ""
+        print(f"  {when}  {r.host:<15} {r.script:<26} exit={r.status:<3} {r.seconds:7.1f}s{tail}")
+
+    rows = phases.trends(records, window=args.window, threshold=args.threshold, min_delta=args.min_delta)
+    if not rows:
+        print("\nNo successful deploys to compare.")
+        return 0
+
+    width = max(len(t.key) for t in rows)
+    print(f"\nLatest successful deploy vs. median of up to {args.window} before it:")
+    print(f"  {'phase':<{width}}  {'runs':>4}  {'median':>8}  {'p90':>8}  {'latest':>8}  {'change':>7}")
+    for t in rows:
+        last = "-" if t.last is None else f"{t.last:.1f}s"
+        flag = "  <-- regression" if t.regression else ""
+        print(f"  {t.key:<{width}}  {t.runs:>4}  {t.median:>7.1f}s  {t.p90:>7.1f}s  {last:>8}  "
+              f"{_fmt_change(t.change):>7}{flag}")
+
+    regressions = [t for t in rows if t.regression]
+    if regressions:
+        print(f"\n{len(regressions)} phase(s) regressed: " + ", ".join(t.key for t in regressions))
+    return 1 if regressions and args.strict else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
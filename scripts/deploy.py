@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - VPS Deployment
+
+  deploy.py upload [--full]              send the release tarball
+  deploy.py deploy [--yes]               upload and run deploy-from-root.sh
+  deploy.py status [--remote]            config, recent deploys, pm2 and health
+  deploy.py rollback [--to ID]           switch back to an earlier release
+
+Values come from flags, then VPS_IP / VPS_PASSWORD / DEPLOY_DOMAIN / ... in
+the environment, then prompts when run from a terminal (without one, pass
+--yes to confirm deploy and rollback). --check validates everything
+without connecting.
+"""
+import sys
+
+from deploylib import cli
+
+if __name__ == "__main__":
+    sys.exit(cli.run())
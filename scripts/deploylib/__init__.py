@@ -0,0 +1,12 @@
+"""
+SpermRace.io - shared helpers for the Python deploy scripts
+
+Import paramiko/scp lazily inside functions; the scripts must still be able
+to print their own "pip install paramiko scp" hint when those are missing.
+"""
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Local state (chunk manifests, upload checkpoints, ...). Ignored by git.
+LOCAL_STATE_DIR = REPO_ROOT / ".deploy-cache"
@@ -0,0 +1,83 @@
+"""
+Remote half of the delta upload (see delta.py). Runs on the VPS as:
+
+    python3 - STATE_DIR PACK_PATH TARBALL_OUT < _remote_assemble.py
+
+Stdlib only, and kept compatible with the stock python3 of older Ubuntu LTS.
+Stores the packed chunks, rebuilds TARBALL_OUT from the new manifest, checks
+the tar digest, then swaps in the new manifest and prunes unreferenced chunks.
+"""
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+
+
+def chunk_path(store, digest):
+    return os.path.join(store, digest[:2], digest)
+
+
+def write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def main(state_dir, pack_path, tarball_out):
+    store = os.path.join(state_dir, "chunks")
+    os.makedirs(store, exist_ok=True)
+
+    with open(pack_path, "rb") as f:
+        (header_len,) = struct.unpack(">I", f.read(4))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        with gzip.GzipFile(fileobj=f, mode="rb") as gz:
+            for digest, size in header["pack"]:
+                data = gz.read(size)
+                if len(data) != size or hashlib.sha256(data).hexdigest() != digest:
+                    raise SystemExit("corrupt chunk in pack: %s" % digest)
+                path = chunk_path(store, digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                write_atomic(path, data)
+
+    manifest = header["manifest"]
+    tar_hash = hashlib.sha256()
+    tmp_out = tarball_out + ".tmp"
+    # Level 1: the tarball is extracted once and thrown away.
+    with gzip.open(tmp_out, "wb", compresslevel=1) as out:
+        for digest, size in manifest["chunks"]:
+            try:
+                with open(chunk_path(store, digest), "rb") as f:
+                    data = f.read()
+            except IOError:
+                raise SystemExit("missing chunk: %s" % digest)
+            if len(data) != size:
+                raise SystemExit("chunk size mismatch: %s" % digest)
+            tar_hash.update(data)
+            out.write(data)
+    if tar_hash.hexdigest() != manifest["tar_sha256"]:
+        os.unlink(tmp_out)
+        raise SystemExit("tar digest mismatch after assemble")
+    os.replace(tmp_out, tarball_out)
+
+    write_atomic(
+        os.path.join(state_dir, "manifest.json"),
+        json.dumps(manifest, separators=(",", ":")).encode("utf-8"),
+    )
+
+    live = set(d for d, _ in manifest["chunks"])
+    pruned = 0
+    for sub in os.listdir(store):
+        subdir = os.path.join(store, sub)
+        for name in os.listdir(subdir):
+            if name not in live:
+                os.unlink(os.path.join(subdir, name))
+                pruned += 1
+    os.unlink(pack_path)
+    print(json.dumps({"ok": True, "chunks": len(manifest["chunks"]), "pruned": pruned}))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:4])
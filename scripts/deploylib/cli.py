@@ -0,0 +1,476 @@
+"""
+The deploy CLI behind scripts/deploy.py and the older auto-deploy.py,
+auto-deploy-now.py, quick-deploy.py and upload-and-deploy.py wrappers.
+
+  upload     send the release tarball to the VPS (delta by default)
+  deploy     upload, then run deploy-from-root.sh with the answers it prompts for
+  status     local config and recent deploys; --remote adds pm2, health and releases
+  rollback   switch back to an earlier versioned release (see deploy-release.py)
+
+Every value comes from a flag, else its environment variable, else a prompt
+when stdin is a terminal and --non-interactive is not set, else its default.
+The two secrets (VPS_PASSWORD, PRIZE_POOL_SECRET_KEY) have no flag. Without a
+terminal, deploy and rollback only go ahead with --yes.
+That one resolution step replaces the separate prompt-driven, env-driven and
+"quick" scripts; they only differ in the flags their wrappers pass.
+
+Only argparse, os and pathlib are imported up front. paramiko, the Session
+pool and the delta/phases/releases modules are imported by the commands that
+use them, so --help, --check and plain `status` return before any of those
+load.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import REPO_ROOT
+
+TARBALL_LOCAL = Path(os.environ.get("TARBALL_LOCAL") or (REPO_ROOT / "spermrace-deploy.tar.gz"))
+DEPLOY_SCRIPT_LOCAL = Path(os.environ.get("DEPLOY_SCRIPT_LOCAL") or (REPO_ROOT / "scripts" / "deploy-from-root.sh"))
+TARBALL_REMOTE = os.environ.get("TARBALL_REMOTE") or "/tmp/spermrace-deploy.tar.gz"
+DEPLOY_SCRIPT_REMOTE = "/tmp/deploy-from-root.sh"
+DEFAULT_SOLANA_RPC = "https://api.mainnet-beta.solana.com"
+HEALTH_URL = "http://127.0.0.1:8080/api/healthz"
+PM2_APP = "spermrace-server-ws"
+
+
+class CliError(Exception):
+    """Reported as a one-line error and exit status 1."""
+
+
+# -- config ------------------------------------------------------------------
+
+# (name, env var, prompt, needed by, secret, default)
+FIELDS = (
+    ("host", "VPS_IP", "VPS IP or hostname", "ssh", False, ""),
+    ("user", "VPS_USER", "VPS user", "ssh", False, "root"),
+    ("password", "VPS_PASSWORD", "VPS password", "ssh", True, ""),
+    ("domain", "DEPLOY_DOMAIN", "Domain name (e.g., spermrace.io)", "deploy", False, ""),
+    ("email", "DEPLOY_EMAIL", "Email for Let's Encrypt", "deploy", False, ""),
+    ("solana_rpc", "SOLANA_RPC_ENDPOINT", "Solana RPC", "deploy", False, DEFAULT_SOLANA_RPC),
+    ("prize_wallet", "PRIZE_POOL_WALLET", "Prize Pool Wallet (public key)", "deploy", False, ""),
+    ("prize_secret", "PRIZE_POOL_SECRET_KEY", "Prize Pool Secret Key", "deploy", True, ""),
+    ("extra_origin", "VERCEL_ORIGIN", "Additional frontend origin (optional)", "deploy", False, ""),
+)
+OPTIONAL = {"extra_origin"}
+
+
+def interactive(args) -> bool:
+    return not args.non_interactive and not getattr(args, "check", False) and sys.stdin.isatty()
+
+
+def resolve(args, needs: tuple[str, ...]) -> dict[str, str]:
+    """Flag, then environment, then prompt (interactive only), then default, for every field in `needs`."""
+    ask = interactive(args)
+    config: dict[str, str] = {}
+    missing: list[str] = []
+    for name, env, prompt, group, secret, default in FIELDS:
+        if group not in needs:
+            continue
+        value = (getattr(args, name, None) or os.environ.get(env) or "").strip()
+        if not value and ask and name != "user":
+            if secret:
+                from getpass import getpass
+                value = getpass(f"{prompt} (input hidden): ").strip()
+            else:
+                suffix = f" [{default}]" if default else ""
+                value = input(f"{prompt}{suffix}: ").strip()
+        value = value or default
+        if "\n" in value or "\r" in value:
+            raise CliError(f"{env} must be a single line")
+        if not value and name not in OPTIONAL:
+            # Secrets have no flag on purpose (they would show up in ps and shell history).
+            missing.append(f"{env} (or --{name.replace('_', '-')})" if hasattr(args, name) else env)
+        config[name] = value
+    if missing:
+        how = "set them in the environment" if not ask else "they are required"
+        raise CliError(f"missing {', '.join(missing)} ({how})")
+    return config
+
+
+def require_files(*paths: Path) -> None:
+    for path in paths:
+        if not path.exists():
+            hint = "\nBuild it with: python3 scripts/build-release.py" if path.suffix == ".gz" else ""
+            raise CliError(f"{path} not found{hint}")
+
+
+SSH_MODULES = ("paramiko",)
+UPLOAD_MODULES = ("paramiko", "scp")     # scp: upload.put falls back to it
+
+
+def missing_modules(names: tuple[str, ...]) -> list[str]:
+    from importlib.util import find_spec
+    return [name for name in names if find_spec(name) is None]
+
+
+def show_config(config: dict[str, str]) -> None:
+    print("Deployment Configuration:")
+    print("-" * 70)
+    for name, env, _prompt, _group, secret, _default in FIELDS:
+        if name in config:
+            value = config[name]
+            shown = ("*" * 8 if value else "") if secret else value
+            print(f"  {env:<22} {shown or '(none)'}")
+    print()
+
+
+# -- output ------------------------------------------------------------------
+
+def print_header(text):
+    print("\n" + "=" * 70)
+    print(f"  {text}")
+    print("=" * 70 + "\n")
+
+
+def progress(filename, size, sent):
+    """Progress callback for the tarball upload"""
+    percent = float(sent) / float(size) * 100 if size else 100.0
+    bar_length = 40
+    filled = int(bar_length * percent / 100)
+    bar = '█' * filled + '░' * (bar_length - filled)
+
+    sys.stdout.write(f"\r  [{bar}] {percent:.1f}% ({sent}/{size} bytes)")
+    sys.stdout.flush()
+
+
+def echo(line):
+    # Remote output carries emoji that some Windows consoles cannot encode.
+    try:
+        print(line, end='')
+    except UnicodeEncodeError:
+        print(line.encode('ascii', 'ignore').decode('ascii'), end='')
+
+
+def confirm(args, question: str) -> bool:
+    if args.yes:
+        return True
+    if not interactive(args):
+        raise CliError(f'no terminal to confirm "{question}"; pass --yes to go ahead')
+    return input(f"{question} (y/n): ").strip().lower() == "y"
+
+
+# -- ssh ---------------------------------------------------------------------
+
+@contextmanager
+def connected(config: dict[str, str], modules: tuple[str, ...] = SSH_MODULES):
+    """A connected Session; paramiko is imported here and nowhere earlier."""
+    missing = missing_modules(modules)
+    if missing:
+        raise CliError(f"Required packages not installed.\n\nInstall them with: pip install {' '.join(missing)}")
+    import paramiko
+
+    from .session import Session
+
+    print(f"Connecting to {config['user']}@{config['host']}...")
+    session = Session(config["host"], config["user"], config["password"])
+    try:
+        try:
+            session.connect()
+        except paramiko.AuthenticationException:
+            raise CliError("Authentication failed\nPlease check VPS credentials") from None
+        except (paramiko.SSHException, OSError) as e:
+            raise CliError(f"SSH connection failed: {e}") from None
+        print("✓ Connected to VPS\n")
+        yield session
+    finally:
+        if session.timings:
+            print("\nRemote timings:")
+            print(session.timing_report())
+        session.close()
+
+
+def upload_tarball(args, session, host: str):
+    from . import delta
+
+    size_mb = args.tarball.stat().st_size / (1024 * 1024)
+    print(f"Uploading {size_mb:.2f} MB to {args.remote} ({'full' if args.full else 'delta'})...")
+    result = delta.upload_release(session.client, args.tarball, args.remote, host=host, full=args.full,
+                                  progress=progress, reconnect=session.reconnect, user=session.user)
+    print(f"\n✓ Tarball uploaded: {delta.describe(result)}\n")
+    return result
+
+
+# -- commands ----------------------------------------------------------------
+
+def cmd_upload(args) -> int:
+    require_files(args.tarball)
+    config = resolve(args, ("ssh",))
+    print(f"✓ Tarball found: {args.tarball.stat().st_size / (1024 * 1024):.2f} MB\n")
+    if args.check:
+        return check_ssh_deps(UPLOAD_MODULES)
+
+    with connected(config, UPLOAD_MODULES) as session:
+        upload_tarball(args, session, config["host"])
+        listing = session.run(f"ls -lh {args.remote}", check=True).stdout.strip()
+        if listing:
+            print("Uploaded file:")
+            print(listing)
+            print()
+    print("Finish the deploy with:")
+    print("  python3 scripts/deploy.py deploy")
+    print(f"or by hand on the VPS: bash deploy-from-root.sh (tarball location {args.remote})")
+    print(f"\n  ssh {config['user']}@{config['host']}")
+    return 0
+
+
+def cmd_deploy(args) -> int:
+    require_files(args.tarball, args.script)
+    size_mb = args.tarball.stat().st_size / (1024 * 1024)
+    print(f"✓ Tarball found: {size_mb:.2f} MB")
+    print("✓ Deploy script found")
+    print()
+    config = resolve(args, ("ssh", "deploy"))
+    show_config(config)
+    if args.check:
+        return check_ssh_deps(UPLOAD_MODULES)
+    if not confirm(args, "Continue with deployment?"):
+        print("Deployment cancelled.")
+        return 0
+
+    from . import phases
+
+    print_header("Connecting to VPS")
+    with connected(config, UPLOAD_MODULES) as session:
+        # The deploy script is tiny; send it alongside the tarball.
+        script_upload = session.submit(session.put, args.script, DEPLOY_SCRIPT_REMOTE, mode=0o755)
+
+        print_header("Step 1: Upload Tarball")
+        result = upload_tarball(args, session, config["host"])
+
+        print_header("Step 2: Upload Deployment Script")
+        script_upload.result()
+        print("✓ Deploy script uploaded\n")
+
+        print_header("Step 3: Running Deployment")
+        print("Starting deployment on VPS...")
+        print("(This will take 5-10 minutes - installing Node.js, building, etc.)")
+        print("=" * 70)
+
+        # Answers to deploy-from-root.sh's prompts, in the order it asks them.
+        answers = "\n".join([config["domain"], config["email"], args.remote, config["solana_rpc"],
+                             config["prize_wallet"], config["prize_secret"], config["extra_origin"]])
+        deploy_cmd = f"bash {DEPLOY_SCRIPT_REMOTE} << 'DEPLOY_INPUT'\n{answers}\nDEPLOY_INPUT\n"
+
+        tracker = phases.PhaseTracker(echo)
+        tracker.add("upload", result.seconds)
+        exit_status = session.stream(deploy_cmd, on_line=tracker, label="deploy-from-root.sh")
+        phases.record(tracker, host=config["host"], script="deploy-from-root.sh", status=exit_status)
+        print("\nPhase timings:")
+        print(tracker.summary())
+
+    print()
+    if exit_status != 0:
+        print("=" * 70)
+        print("❌ Deployment failed with exit code:", exit_status)
+        print("\nCheck the output above for errors.")
+        print(f"You can SSH manually to investigate:\n  ssh {config['user']}@{config['host']}")
+        print("=" * 70)
+        return exit_status
+
+    domain = config["domain"]
+    print_header("🎉 DEPLOYMENT SUCCESSFUL!")
+    print(f"✓ Frontend:       https://{domain}")
+    print(f"✓ WebSocket:      wss://{domain}/ws")
+    print(f"✓ Health Check:   https://{domain}/api/healthz")
+    print()
+    print("Next Steps:")
+    print(f"  1. Point DNS for {domain} to {config['host']}")
+    print("  2. Wait 5-30 minutes for DNS propagation")
+    print()
+    print("Useful Commands:")
+    print(f"  ssh {config['user']}@{config['host']}")
+    print("  pm2 status")
+    print(f"  pm2 logs {PM2_APP}")
+    print()
+    return 0
+
+
+def check_ssh_deps(modules: tuple[str, ...] = SSH_MODULES) -> int:
+    missing = missing_modules(modules)
+    if missing:
+        print(f"❌ not installed: {', '.join(missing)} (pip install {' '.join(missing)})")
+        return 1
+    print("✓ Configuration OK (nothing was sent; drop --check to run it)")
+    return 0
+
+
+def cmd_status(args) -> int:
+    import time
+
+    from . import phases
+
+    host = (args.host or os.environ.get("VPS_IP") or "").strip()
+    print("Local:")
+    for label, path in (("tarball", args.tarball), ("deploy script", DEPLOY_SCRIPT_LOCAL)):
+        if path.exists():
+            size = path.stat().st_size / (1024 * 1024)
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(path.stat().st_mtime))
+            print(f"  ✓ {label:<14} {path}  {size:.2f} MB, {when}")
+        else:
+            print(f"  ❌ {label:<14} {path} (missing)")
+    missing = missing_modules(UPLOAD_MODULES)
+    for name in UPLOAD_MODULES:
+        print(f"  {'❌' if name in missing else '✓'} {name:<14} {'not installed' if name in missing else 'installed'}")
+    for _name, env, _prompt, _group, secret, _default in FIELDS:
+        value = os.environ.get(env, "").strip()
+        shown = ("set" if value else "unset") if secret else (value or "unset")
+        print(f"    {env:<22} {shown}")
+
+    records = [r for r in phases.load_history() if not host or r.host == host]
+    print(f"\nRecent deploys{f' to {host}' if host else ''}:")
+    if not records:
+        print(f"  none recorded in {phases.HISTORY_PATH}")
+    for r in records[-args.recent:]:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r.started))
+        print(f"  {when}  {r.host:<15} {r.script:<26} exit={r.status:<3} {r.seconds:7.1f}s")
+
+    if not args.remote:
+        return 0
+    print()
+    config = resolve(args, ("ssh",))
+    return remote_status(session_config=config)
+
+
+def remote_status(session_config: dict[str, str]) -> int:
+    import json
+
+    from . import releases
+
+    with connected(session_config) as session:
+        script_upload = session.submit(releases.upload_script, session)
+        apps, health = session.run_many(["pm2 jlist", f"curl -fsS -m 5 {HEALTH_URL}"])
+        print("pm2:")
+        try:
+            rows = json.loads(apps.stdout[apps.stdout.find("["):]) if apps.ok else []
+        except ValueError:
+            rows = []
+        if not rows:
+            print(f"  (no pm2 apps{'' if apps.ok else ': ' + (apps.stderr or apps.stdout).strip()[-200:]})")
+        for app in rows:
+            env = app.get("pm2_env") or {}
+            mem = (app.get("monit") or {}).get("memory") or 0
+            print(f"  {app.get('name', '?'):<24} {env.get('status', '?'):<10} pid={app.get('pid') or '-':<8} "
+                  f"restarts={env.get('restart_time', 0):<4} mem={mem / (1024 * 1024):.0f} MB")
+        print(f"\nhealthz: {'✓ ' + health.stdout.strip()[:200] if health.ok else '❌ exit ' + str(health.status)}")
+        script_upload.result()
+        rels = releases.list_releases(session)
+        print("\nReleases:")
+        if not rels:
+            print("  none (deploy-release.py has not been used on this VPS)")
+        for rel, live in rels:
+            print(f"  {'*' if live else ' '} {rel}")
+    return 0 if health.ok else 1
+
+
+def cmd_rollback(args) -> int:
+    config = resolve(args, ("ssh",))
+    if args.check:
+        return check_ssh_deps()
+    target = args.to or "the previous release"
+    if not confirm(args, f"Switch {config['host']} back to {target}?"):
+        print("Rollback cancelled.")
+        return 0
+
+    from . import phases, releases
+
+    opts = {"keep": args.keep, "drain": args.drain, "ready_timeout": args.ready_timeout}
+    with connected(config) as session:
+        releases.upload_script(session)
+        tracker = phases.PhaseTracker(echo)
+        print("=" * 70)
+        exit_status = releases.rollback(session, tracker, release=args.to, **opts)
+        phases.record(tracker, host=config["host"], script="release-rollback", status=exit_status)
+        rels = releases.list_releases(session) if exit_status == 0 else []
+    print()
+    if exit_status != 0:
+        print("=" * 70)
+        print("❌ Rollback failed with exit code:", exit_status)
+        print("   The release that was live is still serving traffic.")
+        print("=" * 70)
+        return exit_status
+    print_header("ROLLED BACK")
+    for rel, live in rels:
+        print(f"  {'*' if live else ' '} {rel}")
+    return 0
+
+
+# -- argument parsing --------------------------------------------------------
+
+def build_parser(prog: str | None = None) -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--host", help="VPS address (env VPS_IP).")
+    common.add_argument("--user", help="SSH user (env VPS_USER, default root).")
+    common.add_argument("--non-interactive", action="store_true",
+                        help="Never prompt; fail listing the missing env vars instead (implied when stdin is not a terminal).")
+    common.add_argument("-y", "--yes", action="store_true", help="Skip the confirmation prompt (required when not interactive).")
+    common.add_argument("--check", action="store_true",
+                        help="Validate the configuration and local files, then exit without connecting.")
+
+    tarball = argparse.ArgumentParser(add_help=False)
+    tarball.add_argument("--tarball", type=Path, default=TARBALL_LOCAL,
+                         help="Release tarball (env TARBALL_LOCAL, default spermrace-deploy.tar.gz in the repo root).")
+    tarball.add_argument("--remote", default=TARBALL_REMOTE, help=f"Path on the VPS (env TARBALL_REMOTE, default {TARBALL_REMOTE}).")
+    tarball.add_argument("--full", action="store_true", help="Upload the whole tarball instead of only changed chunks.")
+
+    parser = argparse.ArgumentParser(prog=prog, description="SpermRace.io VPS deployment: upload, deploy, status, rollback.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("upload", parents=[common, tarball], help="Upload the release tarball only.")
+
+    deploy = sub.add_parser("deploy", parents=[common, tarball],
+                            help="Upload the tarball and run deploy-from-root.sh on the VPS.")
+    deploy.add_argument("--script", type=Path, default=DEPLOY_SCRIPT_LOCAL,
+                        help="Setup script to run (env DEPLOY_SCRIPT_LOCAL, default scripts/deploy-from-root.sh).")
+    deploy.add_argument("--domain", help="Env DEPLOY_DOMAIN.")
+    deploy.add_argument("--email", help="Let's Encrypt contact (env DEPLOY_EMAIL).")
+    deploy.add_argument("--solana-rpc", dest="solana_rpc", help=f"Env SOLANA_RPC_ENDPOINT, default {DEFAULT_SOLANA_RPC}.")
+    deploy.add_argument("--prize-wallet", dest="prize_wallet", help="Prize pool public key (env PRIZE_POOL_WALLET).")
+    deploy.add_argument("--extra-origin", dest="extra_origin", help="Additional allowed frontend origin (env VERCEL_ORIGIN).")
+
+    status = sub.add_parser("status", parents=[common],
+                            help="Local config and recent deploys; --remote adds pm2, health and releases.")
+    status.add_argument("--remote", action="store_true", help="Also connect and query the VPS.")
+    status.add_argument("--recent", type=int, default=5, help="Recent deploys to list (default: 5).")
+    status.set_defaults(tarball=TARBALL_LOCAL)
+
+    rollback = sub.add_parser("rollback", parents=[common], help="Switch back to an earlier versioned release.")
+    rollback.add_argument("--to", default="", help="Release id (default: the one before the live release).")
+    # Same defaults as deploylib.releases, repeated so --help does not import it.
+    rollback.add_argument("--keep", type=int, default=5, help="Releases to keep on the VPS.")
+    rollback.add_argument("--drain", type=int, default=30, help="Seconds the old server keeps its open sockets.")
+    rollback.add_argument("--ready-timeout", type=int, default=90, help="Seconds the target release gets to pass the readiness gate.")
+    return parser
+
+
+COMMANDS = {"upload": cmd_upload, "deploy": cmd_deploy, "status": cmd_status, "rollback": cmd_rollback}
+TITLES = {"upload": "Upload Tarball", "deploy": "Automated VPS Deployment", "status": "Deployment Status",
+          "rollback": "Release Rollback"}
+
+
+def main(argv: list[str] | None = None, prog: str | None = None) -> int:
+    args = build_parser(prog).parse_args(argv)
+    print_header(f"SpermRace.io - {TITLES[args.command]}")
+    try:
+        return COMMANDS[args.command](args)
+    except CliError as e:
+        print(f"❌ ERROR: {e}")
+        return 1
+
+
+def run(argv: list[str] | None = None, prog: str | None = None) -> int:
+    """main() with the scripts' Ctrl-C handling; what every entry point calls."""
+    try:
+        return main(argv, prog)
+    except KeyboardInterrupt:
+        print("\n\n❌ Deployment cancelled by user")
+        return 1
+    except Exception as e:
+        print(f"❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
@@ -0,0 +1,546 @@
+"""
+Delta upload of the release tarball using content-defined chunking.
+
+The gzip stream is useless for reuse (one changed byte reshuffles everything
+after it), so the *uncompressed* tar stream is cut into chunks with a gear
+rolling hash (FastCDC-style normalized chunking). Boundaries follow content,
+so an edit only changes the chunks around it. The hash is evaluated for a
+whole block of the stream at once with big-int arithmetic (_window_flags),
+in child processes on multi-core hosts, instead of byte by byte in Python.
+
+Both sides keep the manifest of the last deployed release:
+  - remote: REMOTE_STATE_DIR/manifest.json plus a store of its chunks
+  - local:  LOCAL_STATE_DIR/<target>.manifest.json, one per user, host, port
+            and remote path (target_name)
+
+Only chunks missing from the remote store are sent, as one gzip "pack" over
+the existing paramiko transport (through upload.put). New chunks are
+compressed into a temp file as they are cut, so memory does not grow with the
+size of the change. The remote helper (_remote_assemble.py) stores them, rebuilds the tarball at the usual /tmp path, checks the tar
+digest and prunes chunks the new release no longer references.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import lzma
+import multiprocessing
+import os
+import random
+import shlex
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+from . import LOCAL_STATE_DIR
+from . import upload
+
+MANIFEST_VERSION = 1
+
+AVG_CHUNK = 64 * 1024
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+WINDOW = 32                 # bytes the 32-bit gear hash depends on
+READ_BYTES = 1 << 20
+INLINE_BLOCKS = 8
+# Processes hashing blocks ahead of the chunker; the pool only pays off on multi-core hosts.
+CHUNK_WORKERS = int(os.environ.get("DEPLOY_CHUNK_WORKERS") or 4)
+
+REMOTE_STATE_DIR = "/var/cache/spermrace-deploy"
+REMOTE_PACK = "/tmp/spermrace-deploy.pack"
+
+_HELPER = Path(__file__).with_name("_remote_assemble.py")
+
+# Fixed seed: boundaries must be identical from one deploy to the next.
+_rng = random.Random(0x53524D43)
+_GEAR = tuple(_rng.getrandbits(32) for _ in range(256))
+del _rng
+
+
+class DeltaUnavailable(Exception):
+    """Delta mode cannot be used against this host; fall back to a full upload."""
+
+
+@dataclass
+class Manifest:
+    tar_sha256: str
+    tar_size: int
+    chunks: list[tuple[str, int]] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "chunker": {"avg": AVG_CHUNK, "min": MIN_CHUNK, "max": MAX_CHUNK},
+            "tar_sha256": self.tar_sha256,
+            "tar_size": self.tar_size,
+            "chunks": [[h, n] for h, n in self.chunks],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Manifest":
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"unsupported manifest version: {data.get('version')!r}")
+        return cls(
+            tar_sha256=data["tar_sha256"],
+            tar_size=int(data["tar_size"]),
+            chunks=[(h, int(n)) for h, n in data["chunks"]],
+        )
+
+
+@dataclass
+class UploadResult:
+    mode: str  # "delta" or "full"
+    total_bytes: int
+    sent_bytes: int
+    chunks_total: int = 0
+    chunks_sent: int = 0
+    seconds: float = 0.0
+    reason: str = ""
+
+
+def _masks(avg: int) -> tuple[int, int]:
+    """Normalized chunking: a stricter mask before the average size and a
+    looser one after it pulls chunk sizes towards `avg`."""
+    bits = avg.bit_length() - 1
+    return ((1 << (bits + 1)) - 1) << (31 - bits), ((1 << (bits - 1)) - 1) << (33 - bits)
+
+
+# Byte j of every gear value, as bytes.translate tables.
+_GEAR_PLANES = tuple(bytes((g >> (8 * j)) & 0xFF for g in _GEAR) for j in range(4))
+
+
+@lru_cache(maxsize=None)
+def _and_table(m: int) -> bytes:
+    return bytes(b & m for b in range(256))
+
+
+@lru_cache(maxsize=8)
+def _lane_mask(m: int, n: int) -> int:
+    return int.from_bytes(m.to_bytes(6, "little") * n, "little")
+
+
+def _window_flags(data: bytes, masks: tuple[int, ...]) -> list[bytes]:
+    """
+    For each mask, one byte per position of `data`: zero where the gear hash
+    of the WINDOW bytes ending there has none of the mask's bits set.
+
+    The hash shifts one bit per byte and keeps 32 bits, so after WINDOW bytes
+    it no longer depends on where it started:
+        h(i) = sum(GEAR[data[i - k]] << k for k < 32)  mod 2**32
+             = a(i) + (a(i - 16) << 16)                 mod 2**32
+        a(i) = sum(GEAR[data[i - k]] << k for k < 16)   < 2**48
+    All positions are computed at once with big-int arithmetic: GEAR values
+    go into 48-bit lanes of one integer, and four doublings (adding the
+    integer shifted by `step` lanes plus `step` bits) leave a(i) in lane i.
+    Positions before WINDOW - 1 see fewer bytes and are not meaningful.
+    """
+    n = len(data)
+    lanes = bytearray(6 * n)
+    for j, plane in enumerate(_GEAR_PLANES):
+        lanes[j::6] = data.translate(plane)
+    acc = int.from_bytes(lanes, "little")
+    del lanes
+    step = 1
+    while step < WINDOW // 2:
+        acc += acc << (49 * step)
+        step *= 2
+    # Truncate both halves first so a lane holds at most 2**33 and never carries into the next.
+    acc = (acc & _lane_mask(0xFFFFFFFF, n)) + ((acc & _lane_mask(0xFFFF, n)) << (48 * 16 + 16))
+    raw = acc.to_bytes(6 * (n + WINDOW), "little")
+    del acc
+    flags = []
+    for mask in masks:
+        hit = 0
+        for j in range(4):
+            m = (mask >> (8 * j)) & 0xFF
+            if m:
+                hit |= int.from_bytes(raw[j:6 * n:6].translate(_and_table(m)), "little")
+        flags.append(hit.to_bytes(n, "little"))
+    return flags
+
+
+def _flag_block(tail: bytes, block: bytes, masks: tuple[int, ...]) -> list[bytes]:
+    return [f[len(tail):] for f in _window_flags(tail + block, masks)]
+
+
+def _flagged_blocks(stream: BinaryIO, masks: tuple[int, ...], workers: int) -> Iterator[tuple[bytes, list[bytes]]]:
+    """
+    Blocks of `stream` with their window flags. Past the first few blocks
+    the flags are computed `workers` blocks ahead in child processes.
+    """
+    tail = b""
+    pending: deque = deque()
+    pool = None
+    seen = 0
+    try:
+        while True:
+            block = stream.read(READ_BYTES)
+            if not block:
+                break
+            seen += 1
+            # Small streams are done before a pool would have started.
+            if pool is None and workers > 1 and seen > INLINE_BLOCKS:
+                # spawn, not fork: the caller usually has paramiko's transport threads running.
+                pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            if pool is None:
+                yield block, _flag_block(tail, block, masks)
+            else:
+                pending.append((block, pool.submit(_flag_block, tail, block, masks)))
+                if len(pending) > 2 * workers:
+                    done, future = pending.popleft()
+                    yield done, future.result()
+            tail = (tail + block)[-(WINDOW - 1):]
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def iter_chunks(
+    stream: BinaryIO,
+    avg: int = AVG_CHUNK,
+    min_size: int = MIN_CHUNK,
+    max_size: int = MAX_CHUNK,
+    workers: int | None = None,
+) -> Iterator[bytes]:
+    """
+    Yield content-defined chunks of `stream` until EOF.
+
+    A chunk ends at the first position from `min_size` on where the gear
+    hash, restarted at `min_size`, clears the strict mask (before `avg`) or
+    the loose one (after it), and at `max_size` at the latest. Only the first
+    WINDOW - 1 hashes of each chunk depend on the restart; they are stepped
+    here, and every later one is looked up in the flags from _window_flags.
+    """
+    mask_s, mask_l = _masks(avg)
+    if workers is None:
+        workers = min(CHUNK_WORKERS, os.cpu_count() or 1)
+    gear = _GEAR
+    blocks = _flagged_blocks(stream, (mask_s, mask_l), workers)
+    buf = bytearray()
+    flags_s = bytearray()
+    flags_l = bytearray()
+    eof = False
+    while True:
+        while not eof and len(buf) < max_size:
+            item = next(blocks, None)
+            if item is None:
+                eof = True
+            else:
+                buf += item[0]
+                flags_s += item[1][0]
+                flags_l += item[1][1]
+        n = len(buf)
+        if not n:
+            return
+        cut = 0
+        if n <= min_size:
+            cut = n
+        else:
+            normal = min(avg, n)
+            end = min(max_size, n)
+            h = 0
+            for i in range(min_size, min(min_size + WINDOW - 1, end)):
+                h = ((h << 1) + gear[buf[i]]) & 0xFFFFFFFF
+                if not h & (mask_s if i < normal else mask_l):
+                    cut = i + 1
+                    break
+            if not cut:
+                first = min_size + WINDOW - 1
+                i = flags_s.find(0, first, normal) if first < normal else -1
+                if i < 0 and max(first, normal) < end:
+                    i = flags_l.find(0, max(first, normal), end)
+                cut = i + 1 if i >= 0 else end
+        yield bytes(buf[:cut])
+        del buf[:cut], flags_s[:cut], flags_l[:cut]
+
+
+@contextmanager
+def _open_tar_stream(tarball: Path) -> Iterator[BinaryIO]:
+    """Decompressed view of a release archive (gzip, xz or zstd; see release.py)."""
+    with open(tarball, "rb") as f:
+        magic = f.read(6)
+    if magic[:2] == b"\x1f\x8b":
+        with gzip.open(tarball, "rb") as stream:
+            yield stream
+    elif magic == b"\xfd7zXZ\x00":
+        with lzma.open(tarball, "rb") as stream:
+            yield stream
+    elif magic[:4] == b"\x28\xb5\x2f\xfd":
+        proc = subprocess.Popen(["zstd", "-dc", str(tarball)], stdout=subprocess.PIPE)
+        try:
+            yield proc.stdout
+        finally:
+            proc.stdout.close()
+            if proc.wait() != 0:
+                raise DeltaUnavailable(f"zstd -d failed for {tarball}")
+    else:
+        with open(tarball, "rb") as stream:
+            yield stream
+
+
+def build_manifest(tarball: Path, keep: set[str] | None = None, spool: BinaryIO | None = None,
+                   manifest: Manifest | None = None) -> tuple[Manifest, list[tuple[str, int]]]:
+    """
+    Chunk the tar stream of `tarball`.
+
+    Returns (manifest, packed): every chunk NOT in `keep` (the chunks the
+    remote already has) is gzip-compressed into `spool` as soon as it is cut,
+    and `packed` lists their (digest, size) in that order. Memory stays flat
+    however large the change is.
+
+    With a `manifest` from an earlier call on the same tarball (see
+    chunk_release), the stream is only cut at its recorded sizes; nothing is
+    chunked or hashed again except the chunks being packed.
+    """
+    if manifest is not None:
+        return manifest, _pack_known(tarball, manifest, keep or set(), spool)
+    keep = keep or set()
+    tar_hash = hashlib.sha256()
+    size = 0
+    chunks: list[tuple[str, int]] = []
+    packed: list[tuple[str, int]] = []
+    seen: set[str] = set()
+    gz = gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=6, mtime=0) if spool is not None else None
+    try:
+        with _open_tar_stream(tarball) as stream:
+            for chunk in iter_chunks(stream):
+                tar_hash.update(chunk)
+                size += len(chunk)
+                digest = hashlib.sha256(chunk).hexdigest()
+                chunks.append((digest, len(chunk)))
+                if digest not in keep and digest not in seen:
+                    seen.add(digest)
+                    packed.append((digest, len(chunk)))
+                    if gz is not None:
+                        gz.write(chunk)
+    finally:
+        if gz is not None:
+            gz.close()
+    return Manifest(tar_sha256=tar_hash.hexdigest(), tar_size=size, chunks=chunks), packed
+
+
+def chunk_release(tarball: Path) -> Manifest:
+    """Chunk `tarball` once, for uploading it to several hosts (upload_release(manifest=...))."""
+    return build_manifest(tarball)[0]
+
+
+def _pack_known(tarball: Path, manifest: Manifest, keep: set[str],
+                spool: BinaryIO | None) -> list[tuple[str, int]]:
+    packed: list[tuple[str, int]] = []
+    seen: set[str] = set()
+    gz = gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=6, mtime=0) if spool is not None else None
+    try:
+        with _open_tar_stream(tarball) as stream:
+            for digest, size in manifest.chunks:
+                if digest in keep or digest in seen:
+                    _skip(stream, size)
+                    continue
+                chunk = stream.read(size)
+                if len(chunk) != size or hashlib.sha256(chunk).hexdigest() != digest:
+                    raise DeltaUnavailable(f"{tarball} changed since it was chunked")
+                seen.add(digest)
+                packed.append((digest, size))
+                if gz is not None:
+                    gz.write(chunk)
+    finally:
+        if gz is not None:
+            gz.close()
+    return packed
+
+
+def _skip(stream: BinaryIO, n: int) -> None:
+    while n:
+        block = stream.read(min(n, READ_BYTES))
+        if not block:
+            raise DeltaUnavailable("tar stream ended early")
+        n -= len(block)
+
+
+def write_pack(manifest: Manifest, packed: list[tuple[str, int]], body: BinaryIO, out: BinaryIO) -> None:
+    """
+    Pack layout: u32 big-endian header length, JSON header, gzip(chunk bytes).
+
+    The header carries the full new manifest plus the (digest, size) order of
+    the packed chunks; `body` is the gzip stream build_manifest spooled.
+    """
+    header = json.dumps(
+        {"manifest": manifest.to_json(), "pack": [[h, n] for h, n in packed]},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    out.write(struct.pack(">I", len(header)))
+    out.write(header)
+    body.seek(0)
+    shutil.copyfileobj(body, out, 1 << 20)
+
+
+def _store_suffix(store: str) -> str:
+    return f"-{store}" if store else ""
+
+
+def target_name(host: str, port: int = 22, user: str = "", remote_path: str = "") -> str:
+    """File-name-safe key for one upload target, so targets sharing an address keep separate state."""
+    name = f"{user}@{host}" if user else host
+    if port != 22:
+        name += f"_{port}"
+    if remote_path:
+        name += "-" + hashlib.sha1(remote_path.encode("utf-8")).hexdigest()[:8]
+    return name.replace("/", "_").replace(":", "_")
+
+
+def local_manifest_path(target: str, store: str = "") -> Path:
+    return LOCAL_STATE_DIR / f"{target}{_store_suffix(store)}.manifest.json"
+
+
+def load_local_manifest(target: str, store: str = "") -> Manifest | None:
+    path = local_manifest_path(target, store)
+    try:
+        return Manifest.from_json(json.loads(path.read_text(encoding="utf-8")))
+    except Exception:
+        return None
+
+
+def save_local_manifest(target: str, manifest: Manifest, store: str = "") -> None:
+    path = local_manifest_path(target, store)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest.to_json(), separators=(",", ":")), encoding="utf-8")
+    tmp.replace(path)
+
+
+def _run(ssh, cmd: str, stdin_data: bytes | None = None) -> tuple[int, str, str]:
+    stdin, stdout, stderr = ssh.exec_command(cmd)
+    if stdin_data is not None:
+        stdin.write(stdin_data)
+        stdin.channel.shutdown_write()
+    out = stdout.read().decode("utf-8", "replace")
+    err = stderr.read().decode("utf-8", "replace")
+    return stdout.channel.recv_exit_status(), out, err
+
+
+def fetch_remote_manifest(ssh, state_dir: str = REMOTE_STATE_DIR) -> Manifest | None:
+    code, _, _ = _run(ssh, "command -v python3 >/dev/null")
+    if code != 0:
+        raise DeltaUnavailable("python3 not found on remote host")
+    sftp = ssh.open_sftp()
+    try:
+        with sftp.open(f"{state_dir}/manifest.json", "r") as f:
+            data = json.loads(f.read().decode("utf-8"))
+        return Manifest.from_json(data)
+    except (IOError, ValueError, KeyError):
+        return None
+    finally:
+        sftp.close()
+
+
+def upload_release(
+    ssh,
+    tarball: Path,
+    remote_path: str,
+    host: str,
+    full: bool = False,
+    progress: Callable | None = None,
+    reconnect: Callable[[], None] | None = None,
+    store: str = "",
+    port: int = 22,
+    user: str = "",
+    manifest: Manifest | None = None,
+) -> UploadResult:
+    """
+    Put `tarball` at `remote_path` on the host behind `ssh`.
+
+    Sends only new chunks unless `full` is set. Any failure in delta mode falls
+    back to a full upload; the reason is reported in the result. Artifacts
+    with different layouts (e.g. the source tarball and the prebuilt bundle)
+    should use separate `store` names so they do not prune each other's chunks.
+    `host`, `port`, `user` and `remote_path` together name the local state.
+    Pass the chunk_release() `manifest` when sending one tarball to many hosts.
+    """
+    tarball = Path(tarball)
+    total = tarball.stat().st_size
+    started = time.monotonic()
+    reason = "--full requested" if full else ""
+
+    if not full:
+        try:
+            target = target_name(host, port, user, remote_path)
+            return _delta_upload(ssh, tarball, remote_path, target, progress, reconnect, started, store, manifest)
+        except Exception as e:  # noqa: BLE001 - every failure means "send it all"
+            reason = f"{e.__class__.__name__}: {e}"
+
+    upload.put(ssh, tarball, remote_path, progress=progress, reconnect=reconnect)
+    return UploadResult(
+        mode="full", total_bytes=total, sent_bytes=total,
+        seconds=time.monotonic() - started, reason=reason,
+    )
+
+
+def _delta_upload(ssh, tarball: Path, remote_path: str, target: str, progress: Callable | None,
+                  reconnect: Callable[[], None] | None, started: float, store: str = "",
+                  known: Manifest | None = None) -> UploadResult:
+    state_dir = REMOTE_STATE_DIR + _store_suffix(store)
+    remote = fetch_remote_manifest(ssh, state_dir)
+    have = {h for h, _ in remote.chunks} if remote else set()
+    pack = LOCAL_STATE_DIR / f"{target}{_store_suffix(store)}.pack"
+    pack.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryFile(dir=pack.parent) as body:
+        manifest, packed = build_manifest(tarball, keep=have, spool=body, manifest=known)
+        with open(pack, "wb") as f:
+            write_pack(manifest, packed, body, f)
+    pack_size = pack.stat().st_size
+    upload.put(ssh, pack, REMOTE_PACK, progress=progress, reconnect=reconnect)
+    pack.unlink()
+
+    cmd = "python3 - {} {} {}".format(
+        shlex.quote(state_dir), shlex.quote(REMOTE_PACK), shlex.quote(remote_path)
+    )
+    code, out, err = _run(ssh, cmd, stdin_data=_HELPER.read_bytes())
+    if code != 0:
+        raise DeltaUnavailable(f"remote assemble failed ({code}): {(err or out).strip()[-300:]}")
+
+    reason = ""
+    if remote is None:
+        reason = "no remote chunk store yet; seeded it"
+        if load_local_manifest(target, store) is not None:
+            reason = "remote chunk store was reset; re-seeded it"
+    save_local_manifest(target, manifest, store)
+    return UploadResult(
+        mode="delta",
+        total_bytes=tarball.stat().st_size,
+        sent_bytes=pack_size,
+        chunks_total=len(manifest.chunks),
+        chunks_sent=len(packed),
+        seconds=time.monotonic() - started,
+        reason=reason,
+    )
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.2f} MB"
+
+
+def describe(result: UploadResult) -> str:
+    """One-line summary for the deploy scripts' console output."""
+    if result.mode == "delta":
+        text = (
+            f"delta, {result.chunks_sent}/{result.chunks_total} chunks, "
+            f"{_mb(result.sent_bytes)} sent for a {_mb(result.total_bytes)} tarball "
+            f"in {result.seconds:.1f}s"
+        )
+    else:
+        text = f"full, {_mb(result.sent_bytes)} in {result.seconds:.1f}s"
+    if result.reason:
+        text += f" ({result.reason})"
+    return text
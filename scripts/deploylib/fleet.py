@@ -0,0 +1,262 @@
+"""
+Fan a prebuilt bundle out to several game nodes.
+
+A rollout has two phases:
+
+  stage     upload the bundle (delta) and the remote script to every host at
+            once. Nothing changes on a host yet, so this is safe to run in
+            parallel across the whole fleet. The bundle is chunked once up
+            front; each host only packs the chunks it is missing. Hosts on
+            the versioned release layout (deploy-release.py) fail here, as
+            deploy-prebuilt-remote.sh would refuse them.
+  activate  run deploy-prebuilt-remote.sh host by host in batches: a canary
+            batch first, then `batch_size` hosts at a time. After a batch,
+            every host must answer /api/readyz on the node itself; any failure
+            stops the rollout before the next batch starts.
+
+Remote output is printed line by line prefixed with the host's name.
+"""
+from __future__ import annotations
+
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import delta, phases, prebuilt
+from .session import Session
+
+REMOTE_BUNDLE = "/tmp/spermrace-prebuilt.tar.gz"
+REMOTE_SCRIPT = "/tmp/deploy-prebuilt-remote.sh"
+REMOTE_APP_DIR = "/opt/spermrace"
+READY_URL = "http://127.0.0.1:8080/api/readyz"
+READY_TIMEOUT = 60.0
+
+
+@dataclass
+class Host:
+    name: str
+    host: str
+    user: str = "root"
+    port: int = 22
+
+
+@dataclass
+class HostResult:
+    host: Host
+    stage: str = "pending"  # pending, staged, ready, failed, skipped
+    error: str = ""
+    upload: str = ""
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.stage == "ready"
+
+
+class InventoryError(ValueError):
+    pass
+
+
+def parse_inventory(text: str, default_user: str = "root") -> list[Host]:
+    """
+    One host per line: `[name=]user@address[:port]` or just `address`.
+    Blank lines and `#` comments are ignored.
+    """
+    hosts: list[Host] = []
+    for lineno, raw in enumerate(text.splitlines(), 1):
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            continue
+        name, _, target = line.rpartition("=")
+        user, _, addr = target.rpartition("@")
+        address, _, port = addr.partition(":")
+        if not address or (port and not port.isdigit()):
+            raise InventoryError(f"inventory line {lineno}: cannot parse {raw.strip()!r}")
+        hosts.append(Host(name=name or address, host=address, user=user or default_user, port=int(port or 22)))
+    names = [h.name for h in hosts]
+    dupes = sorted({n for n in names if names.count(n) > 1})
+    if dupes:
+        raise InventoryError(f"duplicate host names in inventory: {', '.join(dupes)}")
+    return hosts
+
+
+def load_inventory(path: Path, default_user: str = "root") -> list[Host]:
+    return parse_inventory(Path(path).read_text(encoding="utf-8"), default_user)
+
+
+def plan_batches(hosts: list[Host], canary: int = 1, batch_size: int = 1) -> list[list[Host]]:
+    """Canary batch (if any) first, then fixed-size rolling batches."""
+    batches: list[list[Host]] = []
+    canary = max(0, min(canary, len(hosts)))
+    if canary:
+        batches.append(hosts[:canary])
+    rest = hosts[canary:]
+    step = max(1, batch_size)
+    batches.extend(rest[i:i + step] for i in range(0, len(rest), step))
+    return batches
+
+
+class _Printer:
+    """Serialises host-labelled lines from worker threads."""
+
+    def __init__(self, hosts: list[Host]):
+        self._width = max((len(h.name) for h in hosts), default=0)
+        self._lock = threading.Lock()
+
+    def __call__(self, host: Host, text: str) -> None:
+        label = f"[{host.name:<{self._width}}]"
+        with self._lock:
+            for line in text.rstrip("\r\n").splitlines() or [""]:
+                try:
+                    print(f"{label} {line}", flush=True)
+                except UnicodeEncodeError:
+                    print(f"{label} {line}".encode("ascii", "ignore").decode("ascii"), flush=True)
+
+
+def _progress(say, host: Host):
+    step = [25]
+
+    def report(_name, total, sent):
+        pct = sent * 100 // total if total else 100
+        if pct >= step[0]:
+            say(host, f"upload {pct}%")
+            while step[0] <= pct:
+                step[0] += 25
+    return report
+
+
+class Rollout:
+    def __init__(self, hosts: list[Host], bundle: Path, password: str | None = None,
+                 canary: int = 1, batch_size: int = 1, parallel: int = 4, full: bool = False,
+                 ready_url: str = READY_URL, ready_timeout: float = READY_TIMEOUT):
+        self.hosts = hosts
+        self.bundle = Path(bundle)
+        self.password = password
+        self.batches = plan_batches(hosts, canary, batch_size)
+        self.canary = 0 < canary < len(hosts)
+        self.parallel = max(1, parallel)
+        self.full = full
+        self.ready_url = ready_url
+        self.ready_timeout = ready_timeout
+        self.results = {h.name: HostResult(h) for h in hosts}
+        self.say = _Printer(hosts)
+        self._sessions: dict[str, Session] = {}
+        self._manifest: delta.Manifest | None = None
+
+    # -- phases -------------------------------------------------------------
+
+    def _session(self, host: Host) -> Session:
+        session = self._sessions.get(host.name)
+        if session is None:
+            session = Session(host.host, host.user, self.password, port=host.port)
+            self._sessions[host.name] = session
+            session.connect()
+        return session
+
+    def _stage(self, host: Host) -> None:
+        result = self.results[host.name]
+        started = time.monotonic()
+        try:
+            session = self._session(host)
+            if session.run(f"test -L {REMOTE_APP_DIR}/current", timeout=15, label="layout").ok:
+                raise RuntimeError(f"{REMOTE_APP_DIR} uses versioned releases - deploy it with scripts/deploy-release.py")
+            script = session.submit(session.put, prebuilt.REMOTE_SCRIPT_LOCAL, REMOTE_SCRIPT)
+            upload = delta.upload_release(
+                session.client, self.bundle, REMOTE_BUNDLE, host=host.host, port=host.port, user=host.user,
+                full=self.full, progress=_progress(self.say, host), reconnect=session.reconnect,
+                store=prebuilt.DELTA_STORE, manifest=self._manifest,
+            )
+            script.result()
+            result.upload = delta.describe(upload)
+            result.stage = "staged"
+            self.say(host, f"staged: {result.upload}")
+        except Exception as e:  # noqa: BLE001 - reported per host
+            result.stage, result.error = "failed", f"stage: {e}"
+            self.say(host, f"stage failed: {e}")
+        result.seconds += time.monotonic() - started
+
+    def _wait_ready(self, session: Session) -> bool:
+        deadline = time.monotonic() + self.ready_timeout
+        cmd = f"curl -fsS -m 5 {shlex.quote(self.ready_url)} >/dev/null"
+        while True:
+            if session.run(cmd, timeout=15, label="readyz").ok:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(2)
+
+    def _activate(self, host: Host) -> None:
+        result = self.results[host.name]
+        started = time.monotonic()
+        try:
+            session = self._session(host)
+            tracker = phases.PhaseTracker(lambda line: self.say(host, line))
+            tracker.add("stage", result.seconds)
+            status = session.stream(
+                f"bash {REMOTE_SCRIPT} {REMOTE_BUNDLE}",
+                on_line=tracker,
+                label="deploy-prebuilt-remote.sh",
+            )
+            phases.record(tracker, host=host.host, script="deploy-prebuilt-remote.sh", status=status)
+            if status != 0:
+                result.stage, result.error = "failed", f"remote script exited with {status}"
+            elif not self._wait_ready(session):
+                result.stage, result.error = "failed", f"{self.ready_url} not ready after {self.ready_timeout:.0f}s"
+            else:
+                result.stage = "ready"
+        except Exception as e:  # noqa: BLE001 - reported per host
+            result.stage, result.error = "failed", f"activate: {e}"
+        result.seconds += time.monotonic() - started
+        self.say(host, "ready" if result.ok else f"FAILED: {result.error}")
+
+    # -- driver -------------------------------------------------------------
+
+    def run(self) -> bool:
+        """Stage everywhere, then activate batch by batch. Returns True if every host is ready."""
+        if not self.full:
+            started = time.monotonic()
+            try:
+                self._manifest = delta.chunk_release(self.bundle)
+                print(f"Chunked the bundle once: {len(self._manifest.chunks)} chunks "
+                      f"({time.monotonic() - started:.1f}s)", flush=True)
+            except Exception as e:  # noqa: BLE001 - every host then chunks (or falls back) on its own
+                print(f"Could not chunk the bundle up front ({e}); each host will try itself", flush=True)
+        try:
+            with ThreadPoolExecutor(max_workers=self.parallel) as pool:
+                list(pool.map(self._stage, self.hosts))
+                for n, batch in enumerate(self.batches, 1):
+                    label = "canary" if n == 1 and self.canary else f"batch {n}"
+                    if any(self.results[h.name].stage == "failed" for h in batch):
+                        self._halt(n, f"{label}: staging failed")
+                        return False
+                    print(f"\n--- {label}: {', '.join(h.name for h in batch)} ---", flush=True)
+                    list(pool.map(self._activate, batch))
+                    if not all(self.results[h.name].ok for h in batch):
+                        self._halt(n + 1, f"{label} failed")
+                        return False
+            return True
+        finally:
+            for session in self._sessions.values():
+                session.close()
+
+    def _halt(self, next_batch: int, reason: str) -> None:
+        print(f"\n!!! Rollout halted: {reason}", flush=True)
+        for batch in self.batches[next_batch - 1:]:
+            for h in batch:
+                if self.results[h.name].stage in ("pending", "staged"):
+                    self.results[h.name].stage = "skipped"
+
+    def summary(self) -> str:
+        width = max(len(h.name) for h in self.hosts)
+        lines = []
+        for h in self.hosts:
+            r = self.results[h.name]
+            line = f"  {h.name:<{width}}  {r.stage:<8} {r.seconds:6.1f}s"
+            if r.error:
+                line += f"  {r.error}"
+            lines.append(line)
+        return "\n".join(lines)
+
@@ -0,0 +1,211 @@
+"""
+Per-phase deploy timing and a local deploy-history store.
+
+The remote deploy scripts announce each step with `info "..."` and usually
+close it with `ok "..."` (rendered as "[INFO] ..." / "[OK] ..."). PhaseTracker
+sits in the line stream: an [INFO] line opens a phase (closing any phase still
+open), an [OK] line closes it. A phase is keyed by its [INFO] text with emoji,
+colour codes and anything after the first ":" removed, so "📦 Installing
+pnpm..." and "🌐 Frontend:  https://x" become "installing pnpm" and
+"frontend" on every run.
+
+Finished deploys are appended to HISTORY_PATH (JSON lines), which
+scripts/deploy-report.py summarises.
+"""
+from __future__ import annotations
+
+import json
+import re
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+from . import LOCAL_STATE_DIR
+
+HISTORY_PATH = LOCAL_STATE_DIR / "deploy-history.jsonl"
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_MARKER = re.compile(r"^\s*\[(INFO|OK|WARN|FATAL|ERROR)\]\s*(.*)$")
+
+
+def phase_key(title: str) -> str:
+    title = title.split(":", 1)[0].replace("'", "")
+    words = re.sub(r"[^a-z0-9]+", " ", title.lower()).split()
+    return " ".join(words) or "unnamed"
+
+
+@dataclass
+class Phase:
+    key: str
+    title: str
+    seconds: float = 0.0
+    end: str = ""  # "ok", "next" (next [INFO] arrived first), "fatal" or "eof"
+    warnings: int = 0
+
+
+class PhaseTracker:
+    """Line callback for Session.stream that also forwards every line to `echo`."""
+
+    def __init__(self, echo: Callable[[str], None] | None = None, clock: Callable[[], float] = time.monotonic):
+        self._echo = echo
+        self._clock = clock
+        self._open: Phase | None = None
+        self._opened_at = 0.0
+        self.started = clock()
+        self.phases: list[Phase] = []
+
+    def __call__(self, line: str) -> None:
+        if self._echo is not None:
+            self._echo(line)
+        self.feed(line)
+
+    def feed(self, line: str) -> None:
+        m = _MARKER.match(_ANSI.sub("", line))
+        if not m:
+            return
+        kind, text = m.group(1), m.group(2).strip()
+        if kind == "INFO":
+            self._close("next")
+            self._open = Phase(phase_key(text), text)
+            self._opened_at = self._clock()
+        elif kind == "OK":
+            self._close("ok")
+        elif kind == "WARN" and self._open is not None:
+            self._open.warnings += 1
+        elif kind in ("FATAL", "ERROR"):
+            self._close("fatal")
+
+    def add(self, key: str, seconds: float, title: str = "") -> None:
+        """Record a phase timed outside the stream (e.g. the upload)."""
+        self.phases.append(Phase(key, title or key, seconds, "ok"))
+
+    def _close(self, end: str) -> None:
+        if self._open is None:
+            return
+        self._open.seconds = self._clock() - self._opened_at
+        self._open.end = end
+        self.phases.append(self._open)
+        self._open = None
+
+    def finish(self) -> list[Phase]:
+        self._close("eof")
+        return self.phases
+
+    def summary(self, min_seconds: float = 0.5) -> str:
+        total = sum(p.seconds for p in self.phases)
+        rows = [p for p in self.phases if p.seconds >= min_seconds]
+        lines = [f"  {p.seconds:7.1f}s  {p.key}" + ("" if p.end in ("ok", "next") else f"  ({p.end})") for p in rows]
+        lines.append(f"  {total:7.1f}s  total")
+        return "\n".join(lines)
+
+
+# -- history ---------------------------------------------------------------
+
+@dataclass
+class DeployRecord:
+    started: float
+    host: str
+    script: str
+    status: int
+    seconds: float
+    phases: list[Phase] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        data["phases"] = [asdict(p) for p in self.phases]
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> "DeployRecord":
+        return cls(
+            started=float(data["started"]),
+            host=data["host"],
+            script=data["script"],
+            status=int(data["status"]),
+            seconds=float(data["seconds"]),
+            phases=[Phase(**p) for p in data.get("phases", [])],
+        )
+
+
+def record(tracker: PhaseTracker, host: str, script: str, status: int, path: Path = HISTORY_PATH) -> DeployRecord:
+    """Close the tracker and append the deploy to the history file."""
+    phases = tracker.finish()
+    rec = DeployRecord(
+        started=time.time() - (time.monotonic() - tracker.started),
+        host=host,
+        script=script,
+        status=status,
+        seconds=sum(p.seconds for p in phases),
+        phases=phases,
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec.to_json(), separators=(",", ":")) + "\n")
+    return rec
+
+
+def load_history(path: Path = HISTORY_PATH) -> list[DeployRecord]:
+    records = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(DeployRecord.from_json(json.loads(line)))
+                except (ValueError, KeyError, TypeError):
+                    continue  # a torn last line from an interrupted deploy
+    except FileNotFoundError:
+        pass
+    return records
+
+
+# -- report ----------------------------------------------------------------
+
+@dataclass
+class PhaseTrend:
+    key: str
+    runs: int
+    median: float
+    p90: float
+    last: float | None
+    regression: bool
+
+    @property
+    def change(self) -> float | None:
+        if self.last is None or not self.median:
+            return None
+        return (self.last - self.median) / self.median
+
+
+def trends(records: Iterable[DeployRecord], window: int = 10, threshold: float = 0.25,
+           min_delta: float = 5.0) -> list[PhaseTrend]:
+    """
+    Compare each phase of the latest deploy with the median of the `window`
+    successful deploys before it. A phase regressed when it is more than
+    `threshold` (relative) and `min_delta` seconds (absolute) slower.
+    """
+    records = [r for r in records if r.status == 0]
+    if not records:
+        return []
+    latest, baseline = records[-1], records[-1 - window:-1]
+    last = {}
+    for p in latest.phases:
+        last[p.key] = last.get(p.key, 0.0) + p.seconds
+    history: dict[str, list[float]] = {}
+    for r in baseline:
+        per_run: dict[str, float] = {}
+        for p in r.phases:
+            per_run[p.key] = per_run.get(p.key, 0.0) + p.seconds
+        for key, seconds in per_run.items():
+            history.setdefault(key, []).append(seconds)
+
+    out = []
+    for key in list(last) + [k for k in history if k not in last]:
+        samples = sorted(history.get(key, []))
+        med = statistics.median(samples) if samples else 0.0
+        p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))] if samples else 0.0
+        cur = last.get(key)
+        regressed = bool(samples) and cur is not None and cur - med > min_delta and cur > med * (1 + threshold)
+        out.append(PhaseTrend(key, len(samples), med, p90, cur, regressed))
+    return out
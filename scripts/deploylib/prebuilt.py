@@ -0,0 +1,112 @@
+"""
+Build-once "prebuilt" release bundle.
+
+deploy-from-root.sh runs `pnpm install` and all three builds on the VPS that
+is serving live games. This builds everything locally instead and ships only
+what runs in production:
+
+  server/  `pnpm deploy --prod` output: package.json, dist/ and a pruned,
+           self-contained node_modules (workspace deps copied in)
+  client/  the static Vite build (packages/client/dist)
+
+deploy-prebuilt-remote.sh then only unpacks the bundle, keeps the existing
+server .env, reloads pm2 and refreshes the web root.
+"""
+from __future__ import annotations
+
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from . import REPO_ROOT, release
+
+REMOTE_SCRIPT_LOCAL = REPO_ROOT / "scripts" / "deploy-prebuilt-remote.sh"
+
+# Separate delta chunk store, so alternating with source deploys keeps both warm.
+DELTA_STORE = "prebuilt"
+
+# Same order as the root "build" script; core first because server depends on it.
+BUILD_STEPS = (
+    ("core", ["pnpm", "--filter", "@skidr/core", "build"]),
+    ("shared", ["pnpm", "--filter", "shared", "build"]),
+    ("server", ["pnpm", "--filter", "server", "build"]),
+    ("client", ["pnpm", "--filter", "client", "build"]),
+)
+
+# Ship everything in the staged bundle except secrets and junk.
+BUNDLE_SPEC = release.ReleaseSpec(
+    roots=("server", "client"),
+    root_files=(),
+    exclude_dirs=frozenset({".cache", ".vite", "__pycache__"}),
+    exclude_paths=frozenset(),
+    exclude_globs=("*.log", "*.map.tmp", ".DS_Store"),
+)
+
+
+class PrebuiltError(Exception):
+    pass
+
+
+def _run(argv: list[str], cwd: Path = REPO_ROOT) -> None:
+    print(f"  $ {' '.join(argv)}")
+    proc = subprocess.run(argv, cwd=cwd)
+    if proc.returncode != 0:
+        raise PrebuiltError(f"{' '.join(argv)} exited with {proc.returncode}")
+
+
+def _pnpm_major() -> int:
+    out = subprocess.run(["pnpm", "--version"], capture_output=True, text=True, check=True).stdout
+    return int(out.strip().split(".")[0])
+
+
+def build_workspace(install: bool = True) -> None:
+    if shutil.which("pnpm") is None:
+        raise PrebuiltError("pnpm not found on PATH")
+    if install:
+        _run(["pnpm", "install", "--frozen-lockfile"])
+    for _name, argv in BUILD_STEPS:
+        _run(argv)
+
+
+def stage_bundle(stage: Path) -> None:
+    """Populate `stage` with server/ (pruned prod deploy) and client/ (static build)."""
+    client_dist = REPO_ROOT / "packages" / "client" / "dist"
+    if not (client_dist / "index.html").exists():
+        raise PrebuiltError(f"client build missing: {client_dist}")
+
+    deploy = ["pnpm", "--filter", "server", "deploy", "--prod"]
+    if _pnpm_major() >= 10:
+        # pnpm 10 only copies workspace deps with injected packages or --legacy.
+        deploy.append("--legacy")
+    _run(deploy + [str(stage / "server")])
+    if not (stage / "server" / "dist").is_dir():
+        raise PrebuiltError("pnpm deploy produced no server/dist (is packages/server built?)")
+
+    shutil.copytree(client_dist, stage / "client", symlinks=True)
+
+
+def native_addons(entries: list[release.FileEntry]) -> list[str]:
+    """Compiled .node addons are tied to the build machine's OS/arch/Node ABI."""
+    return [e.path for e in entries if e.path.endswith(".node")]
+
+
+def build_bundle(out: Path, build: bool = True, install: bool = True,
+                 allow_native: bool = False, codec: str = "auto") -> release.BuildResult:
+    try:
+        release.check_codec(out, codec)
+    except release.CodecError as e:
+        raise PrebuiltError(str(e)) from None
+    if build:
+        build_workspace(install=install)
+    with tempfile.TemporaryDirectory(prefix="spermrace-prebuilt-") as tmp:
+        stage = Path(tmp)
+        stage_bundle(stage)
+        native = native_addons(release.collect(BUNDLE_SPEC, stage))
+        if native and not allow_native:
+            raise PrebuiltError(
+                "bundle contains native addons that may not run on the VPS: "
+                + ", ".join(native[:5])
+                + (" ..." if len(native) > 5 else "")
+            )
+        return release.build(out, spec=BUNDLE_SPEC, codec=codec, root=stage)
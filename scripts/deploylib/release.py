@@ -0,0 +1,491 @@
+"""
+Deterministic release tarball builder.
+
+Walks the workspace packages the VPS needs, applies exclusion rules and
+writes a reproducible tar stream: entries sorted by path, mtimes pinned to
+SOURCE_DATE_EPOCH, owners root:root, modes normalized to 0644/0755. The same
+tree therefore always yields the same tar bytes, which keeps delta uploads
+small and lets an unchanged release be detected and skipped outright.
+
+Compression is multi-threaded. "auto" compresses a sample of the release
+with every available codec and picks the one with the lowest estimated
+compress + upload time for DEPLOY_LINK_MBPS. An archive named .tar.gz, .tgz,
+.tar.zst or .tar.xz is only ever written with that family, because the VPS
+scripts and anyone unpacking by hand go by the name. Next to the archive
+goes a JSON manifest with per-file sha256/size/mode and a codec-independent
+content digest.
+"""
+from __future__ import annotations
+
+import fnmatch
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+import time
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+from . import REPO_ROOT
+
+MANIFEST_VERSION = 1
+
+# 1980-01-01, the oldest timestamp zip/wheel tooling accepts; tar won't warn about it.
+DEFAULT_SOURCE_DATE_EPOCH = 315532800
+
+LINK_MBPS = float(os.environ.get("DEPLOY_LINK_MBPS") or 10)
+THREADS = os.cpu_count() or 1
+GZIP_BLOCK = 1024 * 1024
+SAMPLE_BYTES = 8 * 1024 * 1024
+SAMPLE_PIECE = 64 * 1024
+
+
+@dataclass
+class ReleaseSpec:
+    """What goes into a release archive (paths are relative to the repo root)."""
+
+    roots: tuple[str, ...] = ("packages/core", "packages/shared", "packages/server", "packages/client", "ops")
+    root_files: tuple[str, ...] = ("package.json", "pnpm-lock.yaml", "pnpm-workspace.yaml")
+    exclude_dirs: frozenset[str] = frozenset({
+        "node_modules", ".pnpm-store", "dist", "coverage", ".vite", ".vite-temp",
+        "__pycache__", ".git", "test-results", "playwright-report", ".ralph",
+    })
+    exclude_paths: frozenset[str] = frozenset({"packages/server/data", "packages/server/logs"})
+    exclude_globs: tuple[str, ...] = (
+        "*.log", "*.db", "*.db-wal", "*.db-shm", "*.db-journal", "*.timestamp-*.mjs", ".DS_Store",
+    )
+    extra_excludes: tuple[str, ...] = ()
+
+    def excluded(self, rel: str, name: str, is_dir: bool) -> bool:
+        if rel in self.exclude_paths:
+            return True
+        if is_dir:
+            return name in self.exclude_dirs
+        # Never ship secrets; templates like .env.example are fine.
+        if name == ".env" or (name.startswith(".env.") and not name.endswith(".example")):
+            return True
+        if any(fnmatch.fnmatch(name, g) for g in self.exclude_globs):
+            return True
+        return any(fnmatch.fnmatch(rel, g) for g in self.extra_excludes)
+
+
+@dataclass
+class FileEntry:
+    path: str  # POSIX, relative to the repo root
+    size: int
+    mode: int
+    sha256: str = ""
+    link: str = ""  # symlink target, if any
+
+    def to_json(self) -> dict:
+        data = {"path": self.path, "size": self.size, "mode": f"{self.mode:o}", "sha256": self.sha256}
+        if self.link:
+            data["link"] = self.link
+        return data
+
+
+@dataclass
+class BuildResult:
+    archive: Path
+    manifest: Path
+    codec: str
+    files: int
+    input_bytes: int
+    archive_bytes: int
+    seconds: float
+    skipped: bool = False
+    codec_trials: list[dict] = field(default_factory=list)
+
+
+def collect(spec: ReleaseSpec, root: Path = REPO_ROOT) -> list[FileEntry]:
+    """Walk the spec'd roots; return entries sorted by path."""
+    entries: list[FileEntry] = []
+
+    def add(abs_path: Path, rel: str) -> None:
+        st = abs_path.lstat()
+        if stat.S_ISLNK(st.st_mode):
+            entries.append(FileEntry(rel, 0, 0o777, link=os.readlink(abs_path)))
+        elif stat.S_ISREG(st.st_mode):
+            mode = 0o755 if st.st_mode & 0o111 else 0o644
+            entries.append(FileEntry(rel, st.st_size, mode))
+
+    for name in spec.root_files:
+        p = root / name
+        if p.exists():
+            add(p, name)
+    for top in spec.roots:
+        base = root / top
+        if not base.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            rel_dir = Path(dirpath).relative_to(root).as_posix()
+            kept = []
+            for d in dirnames:
+                if spec.excluded(f"{rel_dir}/{d}", d, True):
+                    continue
+                # os.walk lists symlinked dirs here, not in filenames; ship them as links
+                # (pnpm's node_modules/<pkg> -> .pnpm/...) instead of following them.
+                if os.path.islink(os.path.join(dirpath, d)):
+                    add(Path(dirpath) / d, f"{rel_dir}/{d}")
+                else:
+                    kept.append(d)
+            dirnames[:] = kept
+            for f in filenames:
+                rel = f"{rel_dir}/{f}"
+                if not spec.excluded(rel, f, False):
+                    add(Path(dirpath) / f, rel)
+    entries.sort(key=lambda e: e.path)
+    return entries
+
+
+def _hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_entries(entries: list[FileEntry], root: Path = REPO_ROOT) -> None:
+    """Fill in sha256 for every regular file (hashlib releases the GIL, so threads help)."""
+    files = [e for e in entries if not e.link]
+    with ThreadPoolExecutor(max_workers=THREADS * 2) as pool:
+        for e, digest in zip(files, pool.map(lambda e: _hash_file(root / e.path), files)):
+            e.sha256 = digest
+    for e in entries:
+        if e.link:
+            e.sha256 = hashlib.sha256(e.link.encode("utf-8")).hexdigest()
+
+
+def content_digest(entries: list[FileEntry]) -> str:
+    """Digest of (path, mode, sha256) for the whole release, independent of codec."""
+    h = hashlib.sha256()
+    for e in entries:
+        h.update(f"{e.path}\0{e.mode:o}\0{e.sha256}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Codecs
+# ---------------------------------------------------------------------------
+
+class ParallelGzipWriter:
+    """
+    gzip compressor that spreads fixed-size blocks over a thread pool.
+
+    Each block becomes its own gzip member (mtime=0); concatenated members are
+    a valid gzip stream for `tar -xzf`, and fixed block boundaries keep the
+    output identical whatever the thread count.
+    """
+
+    def __init__(self, out: BinaryIO, level: int, threads: int = THREADS, block: int = GZIP_BLOCK):
+        self._out = out
+        self._level = level
+        self._block = block
+        self._threads = max(1, threads)
+        self._pool = ThreadPoolExecutor(max_workers=self._threads)
+        self._pending: deque = deque()
+        self._buf = bytearray()
+
+    def _compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=self._level, mtime=0)
+
+    def _drain(self, keep: int) -> None:
+        while len(self._pending) > keep:
+            self._out.write(self._pending.popleft().result())
+
+    def write(self, data) -> int:
+        self._buf += data
+        while len(self._buf) >= self._block:
+            self._pending.append(self._pool.submit(self._compress, bytes(self._buf[: self._block])))
+            del self._buf[: self._block]
+            self._drain(self._threads * 2)
+        return len(data)
+
+    def close(self) -> None:
+        if self._buf:
+            self._pending.append(self._pool.submit(self._compress, bytes(self._buf)))
+            self._buf = bytearray()
+        self._drain(0)
+        self._pool.shutdown()
+
+
+class _PipeWriter:
+    """Feed an external multi-threaded compressor (zstd/xz -T0) through stdin."""
+
+    def __init__(self, out: BinaryIO, argv: list[str]):
+        self._proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=out)
+
+    def write(self, data) -> int:
+        self._proc.stdin.write(data)
+        return len(data)
+
+    def close(self) -> None:
+        self._proc.stdin.close()
+        if self._proc.wait() != 0:
+            raise RuntimeError(f"compressor exited with {self._proc.returncode}")
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str  # e.g. "gzip-6", "zstd-3"
+    family: str  # gzip | zstd | xz
+    level: int
+
+    def available(self) -> bool:
+        return self.family == "gzip" or shutil.which(self.family) is not None
+
+    def open(self, out: BinaryIO):
+        if self.family == "gzip":
+            return ParallelGzipWriter(out, self.level)
+        return _PipeWriter(out, [self.family, "-q", "-T0", f"-{self.level}", "-c"])
+
+    def compress(self, data: bytes) -> bytes:
+        if self.family == "gzip":
+            buf = io.BytesIO()
+            w = self.open(buf)
+            w.write(data)
+            w.close()
+            return buf.getvalue()
+        proc = subprocess.run([self.family, "-q", "-T0", f"-{self.level}", "-c"], input=data,
+                              stdout=subprocess.PIPE, check=True)
+        return proc.stdout
+
+
+CODECS = {
+    c.name: c
+    for c in (
+        Codec("gzip-1", "gzip", 1),
+        Codec("gzip-6", "gzip", 6),
+        Codec("zstd-3", "zstd", 3),
+        Codec("zstd-10", "zstd", 10),
+        Codec("xz-6", "xz", 6),
+    )
+}
+
+
+def _sample(entries: list[FileEntry], root: Path) -> bytes:
+    """
+    Up to SAMPLE_BYTES from across the release: SAMPLE_PIECE slices at evenly
+    spaced byte offsets of the files laid end to end (a slice that reaches
+    the end of a file carries on into the next one).
+    """
+    files = [e for e in entries if not e.link and e.size]
+    if not files:
+        return b""
+    starts = []
+    total = 0
+    for e in files:
+        starts.append(total)
+        total += e.size
+    pieces = max(1, SAMPLE_BYTES // SAMPLE_PIECE)
+    step = max(total / pieces, SAMPLE_PIECE)
+    out = bytearray()
+    pos = 0.0
+    while pos < total and len(out) < SAMPLE_BYTES:
+        at = int(pos)
+        k = bisect_right(starts, at) - 1
+        offset = at - starts[k]
+        need = SAMPLE_PIECE
+        while need and k < len(files):
+            e = files[k]
+            with open(root / e.path, "rb") as f:
+                f.seek(offset)
+                data = f.read(min(need, e.size - offset))
+            out += data
+            need -= len(data)
+            k += 1
+            offset = 0
+        pos += step
+    return bytes(out[:SAMPLE_BYTES])
+
+
+# Archive names that promise a compression family.
+SUFFIX_FAMILY = {".tar.gz": "gzip", ".tgz": "gzip", ".tar.zst": "zstd", ".tar.xz": "xz"}
+
+
+class CodecError(ValueError):
+    """The requested codec does not match the archive's name."""
+
+
+def family_for(archive: Path) -> str | None:
+    for suffix, family in SUFFIX_FAMILY.items():
+        if archive.name.endswith(suffix):
+            return family
+    return None
+
+
+def check_codec(archive: Path, codec: str) -> None:
+    family = family_for(Path(archive))
+    if codec != "auto" and family and CODECS[codec].family != family:
+        raise CodecError(f"{Path(archive).name} is a {family} name; pick a {family} codec or an archive "
+                         f"name that matches {codec} (.tar.zst for zstd, .tar.xz for xz)")
+
+
+def choose_codec(entries: list[FileEntry], root: Path = REPO_ROOT,
+                 link_mbps: float = LINK_MBPS, family: str | None = None) -> tuple[Codec, list[dict]]:
+    """
+    Pick the codec with the lowest estimated compress + upload time,
+    among those of `family` when one is given.
+
+    Returns (codec, trials) where each trial records the measured ratio and
+    speed on the sample.
+    """
+    sample = _sample(entries, root)
+    total = sum(e.size for e in entries)
+    link_bps = link_mbps * 1_000_000 / 8
+    trials = []
+    best: tuple[float, Codec] | None = None
+    for codec in CODECS.values():
+        if not codec.available() or not sample or (family and codec.family != family):
+            continue
+        t0 = time.perf_counter()
+        out = codec.compress(sample)
+        secs = max(time.perf_counter() - t0, 1e-6)
+        ratio = len(out) / len(sample)
+        estimate = total * secs / len(sample) + total * ratio / link_bps
+        trials.append({
+            "codec": codec.name,
+            "ratio": round(ratio, 4),
+            "mb_per_s": round(len(sample) / secs / 1e6, 1),
+            "estimate_s": round(estimate, 2),
+        })
+        if best is None or estimate < best[0]:
+            best = (estimate, codec)
+    if best:
+        return best[1], trials
+    fallback = next((c for c in CODECS.values() if c.family == family), None) if family else None
+    return fallback or CODECS["gzip-6"], trials
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _tarinfo(e: FileEntry, mtime: int) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(e.path)
+    info.mtime = mtime
+    info.uid = info.gid = 0
+    info.uname = info.gname = "root"
+    if e.link:
+        info.type = tarfile.SYMTYPE
+        info.linkname = e.link
+        info.mode = 0o777
+    else:
+        info.size = e.size
+        info.mode = e.mode
+    return info
+
+
+def write_tar(entries: list[FileEntry], out, root: Path = REPO_ROOT, mtime: int | None = None) -> None:
+    """Write the reproducible tar stream for `entries` to the file-like `out`."""
+    if mtime is None:
+        mtime = int(os.environ.get("SOURCE_DATE_EPOCH") or DEFAULT_SOURCE_DATE_EPOCH)
+    with tarfile.open(fileobj=out, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+        for e in entries:
+            info = _tarinfo(e, mtime)
+            if e.link:
+                tar.addfile(info)
+            else:
+                with open(root / e.path, "rb") as f:
+                    tar.addfile(info, f)
+
+
+def manifest_path_for(archive: Path) -> Path:
+    name = archive.name
+    for suffix in (".tar.gz", ".tar.zst", ".tar.xz", ".tgz"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    return archive.with_name(name + ".manifest.json")
+
+
+def load_manifest(path: Path) -> dict | None:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if data.get("version") == MANIFEST_VERSION else None
+
+
+def build(
+    archive: Path,
+    spec: ReleaseSpec | None = None,
+    codec: str = "auto",
+    force: bool = False,
+    root: Path = REPO_ROOT,
+) -> BuildResult:
+    """
+    Build `archive` and its manifest. Skips the build when the previous
+    manifest has the same content digest and the archive is still intact.
+    """
+    started = time.monotonic()
+    spec = spec or ReleaseSpec()
+    archive = Path(archive)
+    manifest_path = manifest_path_for(archive)
+    check_codec(archive, codec)
+    family = family_for(archive)
+
+    entries = collect(spec, root)
+    hash_entries(entries, root)
+    digest = content_digest(entries)
+    input_bytes = sum(e.size for e in entries)
+
+    previous = load_manifest(manifest_path)
+    if (
+        not force
+        and previous
+        and previous.get("content_digest") == digest
+        and archive.exists()
+        and archive.stat().st_size == previous["archive"]["size"]
+        and (codec == "auto" or codec == previous["codec"])
+        and (family is None or previous["codec"].split("-")[0] == family)
+    ):
+        return BuildResult(
+            archive=archive, manifest=manifest_path, codec=previous["codec"], files=len(entries),
+            input_bytes=input_bytes, archive_bytes=archive.stat().st_size,
+            seconds=time.monotonic() - started, skipped=True,
+        )
+
+    trials: list[dict] = []
+    if codec == "auto":
+        chosen, trials = choose_codec(entries, root, family=family)
+    else:
+        chosen = CODECS[codec]
+
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    tmp = archive.with_name(archive.name + ".tmp")
+    with open(tmp, "wb") as raw:
+        writer = chosen.open(raw)
+        try:
+            write_tar(entries, writer, root)
+        finally:
+            writer.close()
+    tmp.replace(archive)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "content_digest": digest,
+        "codec": chosen.name,
+        "source_date_epoch": int(os.environ.get("SOURCE_DATE_EPOCH") or DEFAULT_SOURCE_DATE_EPOCH),
+        "archive": {"name": archive.name, "size": archive.stat().st_size, "sha256": _hash_file(archive)},
+        "files": [e.to_json() for e in entries],
+    }
+    if trials:
+        manifest["codec_trials"] = trials
+    manifest_path.write_text(json.dumps(manifest, indent=1) + "\n", encoding="utf-8")
+
+    return BuildResult(
+        archive=archive, manifest=manifest_path, codec=chosen.name, files=len(entries),
+        input_bytes=input_bytes, archive_bytes=archive.stat().st_size,
+        seconds=time.monotonic() - started, codec_trials=trials,
+    )
@@ -0,0 +1,50 @@
+"""
+Versioned releases with a zero-downtime switch.
+
+The remote half is release-switch-remote.sh (see its header for the layout);
+this module uploads it and runs its subcommands over a Session. Bundles are
+the same prebuilt server/ + client/ archives as prebuilt.py produces.
+"""
+from __future__ import annotations
+
+import shlex
+from typing import Callable
+
+from . import REPO_ROOT
+from .session import Session
+
+REMOTE_SCRIPT_LOCAL = REPO_ROOT / "scripts" / "release-switch-remote.sh"
+REMOTE_SCRIPT = "/tmp/release-switch-remote.sh"
+REMOTE_BUNDLE = "/tmp/spermrace-prebuilt.tar.gz"
+
+KEEP_RELEASES = 5
+DRAIN_SECONDS = 30
+READY_TIMEOUT = 90
+
+
+def _command(action: str, *args: str, keep: int = KEEP_RELEASES, drain: int = DRAIN_SECONDS,
+             ready_timeout: int = READY_TIMEOUT) -> str:
+    env = f"KEEP_RELEASES={int(keep)} DRAIN_SECONDS={int(drain)} READY_TIMEOUT={int(ready_timeout)}"
+    argv = " ".join(shlex.quote(a) for a in (action, *args))
+    return f"{env} bash {REMOTE_SCRIPT} {argv}"
+
+
+def upload_script(session: Session) -> None:
+    session.put(REMOTE_SCRIPT_LOCAL, REMOTE_SCRIPT, mode=0o755)
+
+
+def activate(session: Session, on_line: Callable[[str], None], bundle: str = REMOTE_BUNDLE, **opts) -> int:
+    """Unpack `bundle` into a new release and switch to it; returns the remote exit status."""
+    return session.stream(_command("activate", bundle, **opts), on_line=on_line, label="release activate")
+
+
+def rollback(session: Session, on_line: Callable[[str], None], release: str = "", **opts) -> int:
+    """Switch back to `release` (default: the one before the current release)."""
+    args = (release,) if release else ()
+    return session.stream(_command("rollback", *args, **opts), on_line=on_line, label="release rollback")
+
+
+def list_releases(session: Session) -> list[tuple[str, bool]]:
+    """[(release_id, is_current), ...], newest first."""
+    out = session.run(_command("list"), check=True, label="release list").stdout
+    return [(line[2:].strip(), line.startswith("*")) for line in out.splitlines() if line.strip()]
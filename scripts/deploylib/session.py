@@ -0,0 +1,255 @@
+"""
+One SSH session shared by everything a deploy does on a host.
+
+The deploy scripts used to open an SCPClient per file, fire `chmod` through
+exec_command without reading its status and then `time.sleep(1)` to "let it
+finish". On a high-latency link each of those is one or more round trips.
+Session keeps one authenticated transport and:
+
+  - hands out SFTP clients from a small pool instead of opening a new
+    subsystem channel per file;
+  - runs commands on their own channels, at most `max_channels` at once
+    (sshd's MaxSessions defaults to 10), so independent commands and uploads
+    can be in flight together via submit()/run_many();
+  - waits on the real exit status of every command;
+  - records how long every command and upload took (`timings`).
+
+`client` is the underlying paramiko.SSHClient, for code such as
+delta.upload_release that takes one; pass `reconnect` alongside it.
+"""
+from __future__ import annotations
+
+import os
+import select
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+MAX_CHANNELS = 8
+CONNECT_TIMEOUT = 30
+KEEPALIVE_SECONDS = 30
+
+
+@dataclass
+class CommandResult:
+    command: str
+    status: int
+    stdout: str
+    stderr: str
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 0
+
+
+class CommandError(Exception):
+    """A remote command exited non-zero (raised only when `check=True`)."""
+
+    def __init__(self, result: CommandResult):
+        detail = (result.stderr or result.stdout).strip()[-300:]
+        super().__init__(f"`{result.command}` exited with {result.status}" + (f": {detail}" if detail else ""))
+        self.result = result
+
+
+class CommandTimeout(CommandError):
+    def __init__(self, result: CommandResult):
+        Exception.__init__(self, f"`{result.command}` timed out after {result.seconds:.1f}s")
+        self.result = result
+
+
+@dataclass
+class Timing:
+    label: str
+    kind: str  # "run", "stream" or "put"
+    seconds: float
+    status: int = 0
+
+
+class Session:
+    def __init__(self, host: str, user: str = "root", password: str | None = None, port: int = 22,
+                 key_filename: str | None = None, timeout: float = CONNECT_TIMEOUT,
+                 max_channels: int = MAX_CHANNELS):
+        import paramiko
+
+        self.host = host
+        self.user = user
+        self._password = password
+        self._port = port
+        self._key_filename = key_filename
+        self._timeout = timeout
+        self.client = paramiko.SSHClient()
+        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self._slots = threading.BoundedSemaphore(max_channels)
+        self._pool = ThreadPoolExecutor(max_workers=max_channels, thread_name_prefix=f"ssh-{host}")
+        self._sftp_idle: list = []
+        self._lock = threading.Lock()
+        self.timings: list[Timing] = []
+
+    # -- connection ---------------------------------------------------------
+
+    @property
+    def transport(self):
+        return self.client.get_transport()
+
+    def connect(self) -> "Session":
+        """(Re)connect. Reuses the same SSHClient so holders of `client` see the new transport."""
+        with self._lock:
+            for sftp in self._sftp_idle:
+                sftp.close()
+            self._sftp_idle.clear()
+        self.client.connect(
+            self.host,
+            port=self._port,
+            username=self.user,
+            password=self._password,
+            key_filename=self._key_filename,
+            timeout=self._timeout,
+            banner_timeout=self._timeout,
+        )
+        self.transport.set_keepalive(KEEPALIVE_SECONDS)
+        return self
+
+    def reconnect(self) -> None:
+        self.connect()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            for sftp in self._sftp_idle:
+                sftp.close()
+            self._sftp_idle.clear()
+        self.client.close()
+
+    def __enter__(self) -> "Session":
+        return self.connect()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- timing -------------------------------------------------------------
+
+    def _record(self, label: str, kind: str, seconds: float, status: int = 0) -> None:
+        with self._lock:
+            self.timings.append(Timing(label, kind, seconds, status))
+
+    def timing_report(self) -> str:
+        """One line per command/upload, slowest first, plus the total."""
+        with self._lock:
+            timings = sorted(self.timings, key=lambda t: t.seconds, reverse=True)
+        lines = [f"  {t.seconds:7.2f}s  {t.kind:<6} {t.label}" + (f"  (exit {t.status})" if t.status else "")
+                 for t in timings]
+        lines.append(f"  {sum(t.seconds for t in timings):7.2f}s  total (overlapping work counted per item)")
+        return "\n".join(lines)
+
+    # -- sftp ---------------------------------------------------------------
+
+    @contextmanager
+    def sftp(self) -> Iterator:
+        """Borrow a pooled SFTP client."""
+        import paramiko
+
+        transport = self.transport
+        with self._lock:
+            sftp = self._sftp_idle.pop() if self._sftp_idle else None
+        if sftp is None or sftp.get_channel().get_transport() is not transport or sftp.get_channel().closed:
+            sftp = paramiko.SFTPClient.from_transport(transport)
+        try:
+            yield sftp
+        except Exception:
+            sftp.close()
+            raise
+        else:
+            with self._lock:
+                self._sftp_idle.append(sftp)
+
+    def put(self, local, remote: str, mode: int | None = None) -> None:
+        """Upload a small file and optionally chmod it (an SFTP setstat, not a shell round trip)."""
+        started = time.monotonic()
+        with self._slots, self.sftp() as sftp:
+            sftp.put(os.fspath(local), remote)
+            if mode is not None:
+                sftp.chmod(remote, mode)
+        self._record(f"{os.path.basename(os.fspath(local))} -> {remote}", "put", time.monotonic() - started)
+
+    # -- commands -----------------------------------------------------------
+
+    def run(self, command: str, stdin: bytes | None = None, timeout: float | None = None,
+            check: bool = False, label: str | None = None) -> CommandResult:
+        """Run `command`, collect stdout/stderr and wait for its exit status."""
+        started = time.monotonic()
+        deadline = started + timeout if timeout else None
+        out: list[bytes] = []
+        err: list[bytes] = []
+        with self._slots:
+            chan = self.transport.open_session(timeout=self._timeout)
+            try:
+                chan.exec_command(command)
+                if stdin is not None:
+                    chan.sendall(stdin)
+                chan.shutdown_write()
+                while True:
+                    while chan.recv_ready():
+                        out.append(chan.recv(65536))
+                    while chan.recv_stderr_ready():
+                        err.append(chan.recv_stderr(65536))
+                    if chan.exit_status_ready() and not chan.recv_ready() and not chan.recv_stderr_ready():
+                        break
+                    wait = 1.0
+                    if deadline is not None:
+                        wait = deadline - time.monotonic()
+                        if wait <= 0:
+                            result = CommandResult(command, -1, _decode(out), _decode(err), time.monotonic() - started)
+                            self._record(label or command, "run", result.seconds, -1)
+                            raise CommandTimeout(result)
+                        wait = min(wait, 1.0)
+                    select.select([chan], [], [], wait)
+                status = chan.recv_exit_status()
+            finally:
+                chan.close()
+        result = CommandResult(command, status, _decode(out), _decode(err), time.monotonic() - started)
+        self._record(label or command, "run", result.seconds, status)
+        if check and status != 0:
+            raise CommandError(result)
+        return result
+
+    def stream(self, command: str, on_line: Callable[[str], None] = print, get_pty: bool = True,
+               label: str | None = None) -> int:
+        """Run a long command, passing each output line to `on_line`; return its exit status."""
+        started = time.monotonic()
+        with self._slots:
+            chan = self.transport.open_session(timeout=self._timeout)
+            try:
+                if get_pty:
+                    chan.get_pty()
+                chan.exec_command(command)
+                stdout = chan.makefile("r")
+                for line in iter(stdout.readline, ""):
+                    on_line(line)
+                status = chan.recv_exit_status()
+            finally:
+                chan.close()
+        self._record(label or command.strip().splitlines()[0], "stream", time.monotonic() - started, status)
+        return status
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Run `fn` (typically self.run or self.put) in the background on this session."""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def run_many(self, commands: list[str], check: bool = False,
+                 timeout: float | None = None) -> list[CommandResult]:
+        """Run independent commands concurrently; results come back in input order."""
+        futures = [self.submit(self.run, cmd, timeout=timeout) for cmd in commands]
+        results = [f.result() for f in futures]
+        if check:
+            for r in results:
+                if not r.ok:
+                    raise CommandError(r)
+        return results
+
+
+def _decode(parts: list[bytes]) -> str:
+    return b"".join(parts).decode("utf-8", "replace")
@@ -0,0 +1,396 @@
+"""
+Upload engines for deploy artifacts: SCP (the default) and a parallel,
+resumable upload over exec channels.
+
+put() picks the engine from DEPLOY_UPLOAD_ENGINE ("parallel", the default,
+or "scp"; the old name "sftp" still selects parallel_put). Files under
+MIN_PARALLEL_BYTES, and hosts without python3, go through SCP either way.
+scripts/bench-upload-throughput.py, 64 MB through the local stand-in:
+
+                  rtt=0       rtt=60 ms
+  SCP             100 MB/s    26 MB/s
+  parallel x1      86 MB/s    19 MB/s
+  parallel x4      73 MB/s    36 MB/s
+
+parallel_put splits a file into byte ranges and streams each one through its
+own exec channel on the one authenticated transport, into a small python3
+receiver (RECEIVER) that writes the bytes at their offset in the remote
+".part" file:
+
+  - The receiver hashes what it writes as it writes it, and every
+    CHECKPOINT_BYTES it reports "<offset> <sha256 of the bytes since the last
+    checkpoint>". The sender compares that with its own digest of the same
+    bytes. There is no second read of the range on the VPS and no extra
+    round trip; the acks come back while the next bytes are already on the
+    way.
+  - A verified checkpoint is the only thing recorded as sent: the state file
+    and progress callbacks only count acknowledged, matching bytes.
+  - The state file is keyed on host, port and remote path, and only resumed
+    when the local file has the same size and sha256, so a rebuilt but
+    identical artifact (like a delta pack) resumes too. After a disconnect
+    (in-process via `reconnect`, or on the next run) each range restarts
+    from its last verified checkpoint into the same ".part" file.
+  - Progress callbacks are rate-limited to PROGRESS_INTERVAL.
+
+The remote file only appears under its final name once every range has been
+acknowledged. The receiver needs python3 on the VPS (delta uploads need it
+anyway).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shlex
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from . import LOCAL_STATE_DIR
+
+ENGINE = os.environ.get("DEPLOY_UPLOAD_ENGINE") or "parallel"   # or "scp" ("sftp" is an old alias)
+DEFAULT_STREAMS = int(os.environ.get("DEPLOY_UPLOAD_STREAMS") or 4)
+BLOCK_BYTES = 32 * 1024
+CHECKPOINT_BYTES = 4 * 1024 * 1024
+MIN_PARALLEL_BYTES = 8 * 1024 * 1024
+MAX_RECONNECTS = 3
+PROGRESS_INTERVAL = 0.25
+
+STATE_DIR = LOCAL_STATE_DIR / "uploads"
+
+# Remote side of one range: argv = part path, start, end, checkpoint bytes.
+RECEIVER = """
+import hashlib, os, sys
+path, pos, end, every = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+src, fd = sys.stdin.buffer, os.open(path, os.O_WRONLY)
+os.lseek(fd, pos, 0)
+h, mark = hashlib.sha256(), pos
+while pos < end:
+    block = src.read(min(65536, end - pos, mark + every - pos))
+    if not block:
+        sys.exit("input ended at byte %d of %d" % (pos, end))
+    view = memoryview(block)
+    while view:
+        view = view[os.write(fd, view):]
+    h.update(block)
+    pos += len(block)
+    if pos - mark == every or pos == end:
+        sys.stdout.write("%d %s\\n" % (pos, h.hexdigest()))
+        sys.stdout.flush()
+        h, mark = hashlib.sha256(), pos
+os.close(fd)
+"""
+
+
+class RangeCorrupt(Exception):
+    """The receiver acknowledged different bytes than were streamed."""
+
+
+class ReceiverFailed(Exception):
+    """The remote receiver exited with an error (no python3, disk full, ...); retrying will not help."""
+
+
+@dataclass
+class Range:
+    start: int
+    end: int
+    sent: int = 0  # bytes the remote acknowledged with a matching digest
+
+    @property
+    def done(self) -> bool:
+        return self.sent == self.end - self.start
+
+
+@dataclass
+class PutResult:
+    total_bytes: int
+    sent_bytes: int
+    resumed_bytes: int
+    streams: int
+    reconnects: int
+    seconds: float
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.sent_bytes / (1024 * 1024) / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class _State:
+    path: Path
+    remote: str
+    size: int
+    sha256: str
+    ranges: list[Range] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @classmethod
+    def load(cls, target: str, remote: str, local: Path, streams: int) -> tuple["_State", bool]:
+        """Return (state, resumed). A state for other content, or an unreadable one, starts over."""
+        size, digest = local.stat().st_size, _file_digest(local)
+        key = hashlib.sha1(f"{target}:{remote}".encode("utf-8")).hexdigest()[:16]
+        path = STATE_DIR / f"{key}.json"
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if (data["remote"], data["size"], data["sha256"]) == (remote, size, digest):
+                ranges = [Range(**r) for r in data["ranges"]]
+                return cls(path, remote, size, digest, ranges), True
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return cls(path, remote, size, digest, _split(size, streams)), False
+
+    def save(self) -> None:
+        with self._lock:
+            data = {
+                "remote": self.remote,
+                "size": self.size,
+                "sha256": self.sha256,
+                "ranges": [asdict(r) for r in self.ranges],
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            tmp.replace(self.path)
+
+    def reset(self, streams: int) -> None:
+        self.ranges = _split(self.size, streams)
+
+    def discard(self) -> None:
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+class Progress:
+    """Sum byte counts from all workers; call `callback(name, total, sent)` at most every `interval` seconds."""
+
+    def __init__(self, callback: Callable | None, name: str, total: int, sent: int = 0,
+                 interval: float = PROGRESS_INTERVAL):
+        self._callback = callback
+        self._name = name
+        self._total = total
+        self._sent = sent
+        self._interval = interval
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, n: int) -> None:
+        if self._callback is None:
+            return
+        with self._lock:
+            self._sent += n
+            now = time.monotonic()
+            if now - self._last < self._interval and self._sent < self._total:
+                return
+            self._last = now
+            sent = self._sent
+        self._callback(self._name, self._total, sent)
+
+
+def _split(size: int, streams: int) -> list[Range]:
+    if size < MIN_PARALLEL_BYTES or streams <= 1:
+        return [Range(0, size)]
+    step = -(-size // streams)
+    step = -(-step // BLOCK_BYTES) * BLOCK_BYTES
+    return [Range(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _send_range(transport, local: Path, part: str, rng: Range, state: _State, progress: Progress) -> None:
+    """Stream the unacknowledged rest of `rng` into RECEIVER and check every checkpoint it reports."""
+    pos = rng.start + rng.sent
+    expected: deque[tuple[int, str]] = deque()      # (offset, digest) of checkpoints not acknowledged yet
+    pending = b""
+
+    def take_acks(data: bytes) -> None:
+        nonlocal pending
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            offset, digest = line.decode("ascii", "replace").split()
+            want = expected.popleft() if expected else None
+            if want != (int(offset), digest):
+                raise RangeCorrupt(f"range {rng.start}-{rng.end}: receiver acknowledged {offset} {digest[:12]}…, "
+                                   f"expected {want}")
+            progress.add(int(offset) - rng.start - rng.sent)
+            rng.sent = int(offset) - rng.start
+            state.save()
+
+    chan = transport.open_session()
+    try:
+        chan.exec_command("python3 -c {} {} {} {} {}".format(
+            shlex.quote(RECEIVER), shlex.quote(part), pos, rng.end, CHECKPOINT_BYTES))
+        with open(local, "rb") as src:
+            src.seek(pos)
+            h, mark = hashlib.sha256(), pos
+            while pos < rng.end:
+                block = src.read(min(BLOCK_BYTES, rng.end - pos, mark + CHECKPOINT_BYTES - pos))
+                if not block:
+                    raise IOError("local file shrank during upload")
+                chan.sendall(block)
+                h.update(block)
+                pos += len(block)
+                if pos - mark == CHECKPOINT_BYTES or pos == rng.end:
+                    expected.append((pos, h.hexdigest()))
+                    h, mark = hashlib.sha256(), pos
+                while chan.recv_ready():
+                    take_acks(chan.recv(4096))
+        chan.shutdown_write()
+        for data in iter(lambda: chan.recv(4096), b""):
+            take_acks(data)
+        status = chan.recv_exit_status()
+        if status > 0:
+            err = chan.recv_stderr(4096).decode("utf-8", "replace").strip()
+            raise ReceiverFailed(f"receiver for range {rng.start}-{rng.end} exited with {status}: {err[-300:]}")
+        if expected:
+            raise EOFError(f"connection closed before range {rng.start}-{rng.end} was acknowledged")
+    finally:
+        chan.close()
+
+
+def _prepare_part(sftp, part: str, state: _State, resumed: bool, streams: int) -> bool:
+    """Make sure the remote .part file matches the state; return whether we resume."""
+    if resumed:
+        try:
+            if sftp.stat(part).st_size == state.size:
+                return True
+        except IOError:
+            pass
+        state.reset(streams)
+    with sftp.open(part, "w"):
+        pass
+    sftp.truncate(part, state.size)
+    state.save()
+    return False
+
+
+def _finalize(sftp, part: str, remote: str) -> None:
+    try:
+        sftp.posix_rename(part, remote)
+    except IOError:
+        try:
+            sftp.remove(remote)
+        except IOError:
+            pass
+        sftp.rename(part, remote)
+
+
+def parallel_put(
+    ssh,
+    local_path,
+    remote_path: str,
+    streams: int | None = None,
+    progress: Callable | None = None,
+    reconnect: Callable[[], None] | None = None,
+) -> PutResult:
+    """
+    Upload `local_path` to `remote_path` through `ssh` (a connected SSHClient).
+
+    `progress(name, total, sent)` matches the SCPClient callback signature.
+    `reconnect()` should re-establish `ssh` after a dropped connection; without
+    it the error propagates and the next run resumes from the saved state.
+    """
+    import paramiko
+
+    local = Path(local_path)
+    streams = max(1, streams or DEFAULT_STREAMS)
+    started = time.monotonic()
+    address, port = ssh.get_transport().getpeername()[:2]
+    state, resumed = _State.load(f"{address}:{port}", remote_path, local, streams)
+    part = remote_path + ".part"
+
+    sftp = ssh.open_sftp()
+    try:
+        resumed = _prepare_part(sftp, part, state, resumed, streams)
+    finally:
+        sftp.close()
+
+    resumed_bytes = sum(r.sent for r in state.ranges) if resumed else 0
+    tracker = Progress(progress, os.path.basename(remote_path), state.size, sent=resumed_bytes)
+    reconnects = 0
+    while True:
+        pending = [r for r in state.ranges if not r.done]
+        if not pending:
+            break
+        transport = ssh.get_transport()
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            futures = [pool.submit(_send_range, transport, local, part, r, state, tracker) for r in pending]
+            errors = [f.exception() for f in futures]
+        errors = [e for e in errors if e is not None]
+        if not errors:
+            continue
+        retryable = all(isinstance(e, (OSError, EOFError, paramiko.SSHException, RangeCorrupt)) for e in errors)
+        if not retryable or reconnect is None or reconnects >= MAX_RECONNECTS:
+            raise errors[0]
+        reconnects += 1
+        if not ssh.get_transport() or not ssh.get_transport().is_active():
+            reconnect()
+
+    sftp = ssh.open_sftp()
+    try:
+        _finalize(sftp, part, remote_path)
+    finally:
+        sftp.close()
+    state.discard()
+
+    return PutResult(
+        total_bytes=state.size,
+        sent_bytes=state.size - resumed_bytes,
+        resumed_bytes=resumed_bytes,
+        streams=len(state.ranges),
+        reconnects=reconnects,
+        seconds=time.monotonic() - started,
+    )
+
+
+def _has_python3(ssh) -> bool:
+    _stdin, stdout, _stderr = ssh.exec_command("command -v python3 >/dev/null")
+    return stdout.channel.recv_exit_status() == 0
+
+
+def scp_put(ssh, local_path, remote_path: str, progress: Callable | None = None) -> PutResult:
+    """Upload `local_path` with SCPClient.put: one stream, no resume, restarts from zero on a drop."""
+    from scp import SCPClient
+
+    local = Path(local_path)
+    size = local.stat().st_size
+    started = time.monotonic()
+    with SCPClient(ssh.get_transport(), progress=progress) as scp:
+        scp.put(str(local), remote_path)
+    return PutResult(total_bytes=size, sent_bytes=size, resumed_bytes=0, streams=1, reconnects=0,
+                     seconds=time.monotonic() - started)
+
+
+def put(
+    ssh,
+    local_path,
+    remote_path: str,
+    progress: Callable | None = None,
+    reconnect: Callable[[], None] | None = None,
+    engine: str | None = None,
+) -> PutResult:
+    """
+    Upload with `engine` ("parallel" or "scp"; default ENGINE). `reconnect` is
+    only used by parallel, which falls back to SCP for small files and hosts
+    without python3.
+    """
+    engine = engine or ENGINE
+    if engine in ("parallel", "sftp"):
+        if Path(local_path).stat().st_size >= MIN_PARALLEL_BYTES and _has_python3(ssh):
+            return parallel_put(ssh, local_path, remote_path, progress=progress, reconnect=reconnect)
+        engine = "scp"
+    if engine != "scp":
+        raise ValueError(f"unknown upload engine {engine!r} (DEPLOY_UPLOAD_ENGINE must be scp or parallel)")
+    return scp_put(ssh, local_path, remote_path, progress=progress)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - synthetic-scale database profiler
+
+Builds a copy of the DatabaseService schema filled with generated players,
+games, payouts and paid_players at the sizes given (1M-50M rows), then runs
+the server's own leaderboard, stats, player and payout queries against it:
+the plan of each (EXPLAIN QUERY PLAN on SQLite, EXPLAIN ANALYZE on
+Postgres), its median time, whether it scans a whole table or index, and,
+for the queries that do, the speedup of each candidate index (created,
+timed, dropped again). With several sizes the timings are compared, so a
+query that grows with the table shows up before production gets there.
+
+  python3 scripts/loadtest/db-profile.py --players 1M --games 4M
+  python3 scripts/loadtest/db-profile.py --players 1M,5M,20M --games-per-player 4
+  python3 scripts/loadtest/db-profile.py --dsn postgresql://localhost/scratch --players 2M --games 10M
+
+The default engine is a scratch SQLite file under .cache/loadtest, reused
+while its size and seed match (--rebuild to regenerate). --dsn builds the
+tables in a scratch schema (--schema, dropped afterwards unless --keep)
+of a Postgres database instead; never point it at production. Writes
+.cache/loadtest/dbprofile-<engine>-<utc>.json.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from loadlib import RESULTS_DIR
+from loadlib.dbscale import QUERIES, Scale, build, parse_count, profile
+from loadlib.series import write_json
+
+SCAN_GROWTH_SHARE = 0.3     # flag queries whose time grows by more than this share of the row growth (seeks grow ~log n)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Profile the server's queries against a synthetic-scale copy of its schema.")
+    parser.add_argument("--players", default="1M", help="Comma-separated player counts, one database each (default: 1M).")
+    parser.add_argument("--games", help="Comma-separated game counts matching --players (default: players x --games-per-player).")
+    parser.add_argument("--games-per-player", type=float, default=4, help="Games per player when --games is not given (default: 4).")
+    parser.add_argument("--paid-share", type=float, default=0.3, help="Share of games with an entry fee and a payout row (default: 0.3).")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query (default: 5).")
+    parser.add_argument("--query", action="append", choices=[q.name for q in QUERIES], help="Only these queries (repeatable).")
+    parser.add_argument("--no-candidates", action="store_true", help="Skip trying candidate indexes.")
+    parser.add_argument("--seed", type=int, default=1, help="Data seed (default: 1).")
+    parser.add_argument("--db-dir", type=Path, default=RESULTS_DIR, help="Where the SQLite files go (default: .cache/loadtest).")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the data even if a matching copy exists.")
+    parser.add_argument("--dsn", help="Postgres DSN to build the copy in (needs psycopg) instead of SQLite.")
+    parser.add_argument("--schema", default="dbscale", help="Scratch Postgres schema (default: dbscale).")
+    parser.add_argument("--keep", action="store_true", help="Keep the Postgres scratch schema afterwards.")
+    parser.add_argument("--out", type=Path, help="Result file (default: .cache/loadtest/dbprofile-<engine>-<utc>.json).")
+    args = parser.parse_args()
+    try:
+        args.player_counts = [parse_count(x) for x in args.players.split(",") if x.strip()]
+        if args.games:
+            args.game_counts = [parse_count(x) for x in args.games.split(",") if x.strip()]
+        else:
+            args.game_counts = [int(p * args.games_per_player) for p in args.player_counts]
+    except ValueError as e:
+        parser.error(f"bad row count: {e}")
+    if not args.player_counts or len(args.game_counts) != len(args.player_counts):
+        parser.error("--games needs one count per --players entry")
+    if min(args.player_counts) < 1 or args.repeat < 1 or not 0 <= args.paid_share <= 1:
+        parser.error("--players and --repeat must be >= 1, --paid-share within 0..1")
+    if args.dsn and len(args.player_counts) > 1 and args.keep:
+        parser.error("--keep only makes sense with a single size")
+    return args
+
+
+def open_engine(args, scale: Scale):
+    if args.dsn:
+        from loadlib.dbscale import PostgresEngine
+        return PostgresEngine(args.dsn, args.schema)
+    from loadlib.dbscale import SqliteEngine
+    return SqliteEngine(args.db_dir / f"dbscale-{scale.players}-{scale.games}-s{scale.seed}.sqlite")
+
+
+def progress(table: str, done: int, total: int, elapsed: float) -> None:
+    rate = done / elapsed if elapsed > 0 else 0
+    print(f"\r[db] {table:12} {done:>12,}/{total:,} rows  {rate:>10,.0f} rows/s", end="", flush=True)
+    if done >= total:
+        print()
+
+
+def print_profile(rows: list[dict]) -> None:
+    print(f"  {'query':24} {'median ms':>10} {'max ms':>9}  plan")
+    for row in rows:
+        flags = []
+        if row["plan"]["table_scans"]:
+            flags.append("FULL SCAN")
+        elif row["plan"]["index_scans"]:
+            flags.append("full index scan" if row["full_scan"] else "ordered index walk")
+        if row["plan"]["sorts"]:
+            flags.append("sort")
+        print(f"  {row['name']:24} {row['median_ms']:10.2f} {row['max_ms']:9.2f}  {', '.join(flags) or 'seek'}")
+        for line in row["plan"]["lines"]:
+            print(f"  {'':24} {'':10} {'':9}    {line}")
+        for cand in row["candidates"]:
+            print(f"  {'':24} {cand['median_ms']:10.2f} {cand['max_ms']:9.2f}  with {cand['index']}  "
+                  f"({cand['speedup']:.1f}x)")
+        if row["note"] and row["full_scan"]:
+            print(f"  {'':24} {'':10} {'':9}  note: {row['note']}")
+
+
+def main() -> int:
+    args = parse_args()
+    if args.dsn:
+        try:
+            import psycopg  # noqa: F401
+        except ImportError:
+            print("❌ ERROR: Required packages not installed.")
+            print("\nInstall them with: pip install psycopg")
+            return 1
+
+    only = set(args.query) if args.query else None
+    result = {"engine": "postgres" if args.dsn else "sqlite", "started": time.time(), "scales": []}
+    for players, games in zip(args.player_counts, args.game_counts):
+        scale = Scale(players, games, paid_share=args.paid_share, seed=args.seed)
+        engine = open_engine(args, scale)
+        try:
+            entry = {"scale": scale.key(), "load": None}
+            if args.rebuild or engine.stored_scale() != scale.key():
+                print(f"[db] building {engine.name} copy: {players:,} players, {games:,} games, "
+                      f"{scale.payouts:,} payouts")
+                load = build(engine, scale, progress)
+                entry["load"] = {table: {"rows": n, "seconds": round(s, 2)} for table, (n, s) in load.items()}
+                print(f"[db] indexes + ANALYZE in {load['indexes+analyze'][1]:.1f}s")
+            else:
+                print(f"[db] reusing {engine.name} copy: {players:,} players, {games:,} games")
+            entry["size_bytes"] = engine.size_bytes()
+            print(f"[db] {entry['size_bytes'] / 2**20:,.0f} MiB; running {args.repeat} timed passes per query")
+            entry["queries"] = profile(engine, scale, args.repeat, not args.no_candidates, only)
+            print_profile(entry["queries"])
+            result["scales"].append(entry)
+        finally:
+            if args.dsn and not args.keep:
+                engine.drop_schema()
+            engine.close()
+
+    # Across sizes: a query whose time grows with the rows is a scan, whatever its plan says.
+    if len(result["scales"]) > 1:
+        first, last = result["scales"][0], result["scales"][-1]
+        growth = last["scale"]["players"] / first["scale"]["players"]
+        print(f"\nGrowth from {first['scale']['players']:,} to {last['scale']['players']:,} players ({growth:.1f}x rows):")
+        before = {q["name"]: q for q in first["queries"]}
+        for q in last["queries"]:
+            base = before.get(q["name"])
+            if not base or base["median_ms"] <= 0:
+                continue
+            ratio = q["median_ms"] / base["median_ms"]
+            warn = "  ⚠️  grows with the table" if ratio > growth * SCAN_GROWTH_SHARE else ""
+            print(f"  {q['name']:24} {base['median_ms']:9.2f} -> {q['median_ms']:9.2f} ms ({ratio:.1f}x){warn}")
+
+    scans = [(q["name"], q) for q in result["scales"][-1]["queries"] if q["full_scan"]]
+    if scans:
+        print("\nFull scans at the largest size:")
+        for name, q in scans:
+            best = max(q["candidates"], key=lambda c: c["speedup"], default=None)
+            hint = f"best candidate {best['speedup']:.1f}x: {best['index']}" if best else (q["note"] or "no candidate")
+            print(f"  - {name} ({q['source']}, {q['median_ms']:.1f} ms): {hint}")
+    out = args.out or RESULTS_DIR / f"dbprofile-{result['engine']}-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    write_json(out, result)
+    print(f"- result: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Profiling cancelled by user")
+        sys.exit(1)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - open-loop HTTP benchmark for the leaderboard, stats and player routes
+
+Drives /api/leaderboard/{wins,earnings,kills,skill-rating}, /api/stats and
+/api/player/:wallet/stats at fixed request rates over a pool of keep-alive
+connections, one rate level after another, and reports latency percentiles
+per route. Requests are scheduled open-loop and timed from when they were
+due, so a server stall is charged to every request it delayed (see
+loadlib/httpbench.py). These routes run on the same Node process as the game
+loop, so /api/ws-healthz is polled throughout on its own connection: its
+latency per level, against a probe-only baseline, shows whether the API
+load is slowing the process that ticks the game.
+
+  python3 scripts/loadtest/http-bench.py --url http://127.0.0.1:8080 --rps 10,50,100 --seconds 30
+  python3 scripts/loadtest/http-bench.py --endpoints stats=1,player=3 --rps 200 --forwarded-for 500
+  python3 scripts/loadtest/http-bench.py --standin --rps 20,100 --seconds 10
+
+The routes are rate-limited per client address (60/min). Benchmark a server
+started with TRUST_PROXY=1 and pass --forwarded-for N to spread requests
+over N synthetic addresses; otherwise most answers are 429, which are
+counted separately. Player wallets come from --wallets (one per line) or
+the wins leaderboard. Writes .cache/loadtest/httpbench-<label>-<utc>.json.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+from loadlib import RESULTS_DIR
+from loadlib.http import HttpClient, HttpError
+from loadlib.httpbench import ENDPOINTS, GLOBAL_LIMIT_PER_MIN, Driver, HealthProbe, Pool, probe_addresses
+from loadlib.series import write_json
+
+RATE_LIMITED_WARN = 0.1     # hint about TRUST_PROXY / --forwarded-for above this share of 429s
+
+
+def parse_endpoints(spec: str) -> list[tuple[str, str, float]]:
+    """'wins=1,stats=2' or '/api/foo=1' -> [(name, path, weight)]."""
+    out = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, weight = part.rpartition("=") if "=" in part else (part, "", "1")
+        if name.startswith("/"):
+            path = name
+        elif name in ENDPOINTS:
+            path = ENDPOINTS[name]
+        else:
+            raise ValueError(f"unknown endpoint {name!r} (known: {', '.join(ENDPOINTS)}, or a /path)")
+        out.append((name, path, float(weight)))
+    if not out or sum(w for *_, w in out) <= 0:
+        raise ValueError("no endpoints")
+    return out
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Open-loop HTTP benchmark for the leaderboard, stats and player routes.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Server base URL (default: http://127.0.0.1:8080).")
+    parser.add_argument("--endpoints", default=",".join(f"{name}=1" for name in ENDPOINTS),
+                        help="Weighted endpoint mix, e.g. stats=1,player=3 or /api/path=1 (default: all, equal).")
+    parser.add_argument("--rps", default="10,50,100", help="Comma-separated total request rates, one level each (default: 10,50,100).")
+    parser.add_argument("--seconds", type=float, default=30, help="Time per level (default: 30).")
+    parser.add_argument("--baseline", type=float, default=10, help="Probe-only seconds before the first level (default: 10).")
+    parser.add_argument("--connections", type=int, default=32, help="Keep-alive connections in the pool (default: 32).")
+    parser.add_argument("--timeout", type=float, default=5, help="Per-request timeout in seconds (default: 5).")
+    parser.add_argument("--arrival", choices=("constant", "poisson"), default="constant", help="Arrival process (default: constant).")
+    parser.add_argument("--probe-hz", type=float, default=1.5,
+                        help="/api/ws-healthz polls per second (default: 1.5; above 2 a single address hits the "
+                             "server's 120/min limit unless --forwarded-for is set).")
+    parser.add_argument("--healthz-threshold", type=float, default=10,
+                        help="Flag levels where ws-healthz p99 rises by more than this many ms over baseline (default: 10).")
+    parser.add_argument("--forwarded-for", type=int, default=0, metavar="N",
+                        help="Rotate X-Forwarded-For over N addresses from 198.18.0.0/15 (server needs TRUST_PROXY=1).")
+    parser.add_argument("--wallets", type=Path, help="File of wallet addresses for /api/player/:wallet/stats.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for arrivals and wallet choice.")
+    parser.add_argument("--label", default="run", help="Build label stored in the result (default: run).")
+    parser.add_argument("--out", type=Path, help="Result file (default: .cache/loadtest/httpbench-<label>-<utc>.json).")
+    parser.add_argument("--standin", action="store_true", help="Benchmark a local stand-in server (ignores --url).")
+    args = parser.parse_args()
+    try:
+        args.endpoint_list = parse_endpoints(args.endpoints)
+        args.levels = [float(x) for x in args.rps.split(",") if x.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.levels or min(args.levels) <= 0 or args.connections < 1 or args.probe_hz <= 0:
+        parser.error("--rps levels, --connections and --probe-hz must be > 0")
+    return args
+
+
+async def find_wallets(args, base_url: str) -> list[str]:
+    if args.wallets:
+        return [w.strip() for w in args.wallets.read_text().splitlines() if w.strip()]
+    client = HttpClient(base_url, timeout=args.timeout)
+    try:
+        status, body = await client.get(ENDPOINTS["wins"])
+        if status == 200:
+            return [row["wallet_address"] for row in json.loads(body).get("leaderboard", []) if row.get("wallet_address")]
+    except (HttpError, ValueError, AttributeError):
+        pass
+    finally:
+        await client.close()
+    return []
+
+
+def fmt_latency(s: dict) -> str:
+    if not s.get("count"):
+        return f"{'-':>8}" * 5
+    return "".join(f"{s[k]:8.1f}" for k in ("p50", "p90", "p99", "p999", "max"))
+
+
+async def measure_probe(probe: HealthProbe, seconds: float) -> dict:
+    probe.reset()
+    await asyncio.sleep(seconds)
+    return probe.summary()
+
+
+async def run(args) -> int:
+    standin = None
+    base_url = args.url
+    if args.standin:
+        from loadlib.standin import StandIn
+        standin = await StandIn().start()
+        base_url = standin.http_url
+        print(f"[bench] stand-in server on {base_url}")
+
+    rng = random.Random(args.seed)
+    wallets: list[str] = []
+    if any("{wallet}" in path for _, path, _ in args.endpoint_list):
+        wallets = await find_wallets(args, base_url)
+        if not wallets:
+            wallets = ["".join(rng.choice("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz") for _ in range(44))
+                       for _ in range(100)]
+            print("[bench] no wallets found; /api/player requests use random wallets (404)")
+        else:
+            print(f"[bench] {len(wallets)} wallets for /api/player")
+
+    pool = Pool(base_url, args.connections, args.timeout)
+    # The probe gets addresses of its own, past the ones the load rotates over.
+    probe = HealthProbe(base_url, args.probe_hz, args.timeout,
+                        probe_addresses(args.probe_hz, args.forwarded_for) if args.forwarded_for else None)
+    if not args.forwarded_for and args.probe_hz * 60 > GLOBAL_LIMIT_PER_MIN:
+        print(f"⚠️  --probe-hz {args.probe_hz:g} is over the server's {GLOBAL_LIMIT_PER_MIN}/min limit for one "
+              f"address; ws-healthz will get 429s (pass --forwarded-for with TRUST_PROXY=1, or lower it)")
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe.run(stop))
+    addresses = itertools.count()
+    total_weight = sum(w for *_, w in args.endpoint_list)
+    result = {"label": args.label, "url": base_url, "started": time.time(),
+              "config": {"endpoints": {name: {"path": path, "weight": w} for name, path, w in args.endpoint_list},
+                         "connections": args.connections, "arrival": args.arrival, "timeout": args.timeout,
+                         "forwarded_for": args.forwarded_for, "probe_hz": args.probe_hz},
+              "baseline": None, "levels": []}
+    flagged = []
+    rate_limited = 0
+    completed = 0
+    try:
+        if args.baseline > 0:
+            print(f"[bench] baseline: ws-healthz only for {args.baseline:g}s")
+            result["baseline"] = await measure_probe(probe, args.baseline)
+        for level in args.levels:
+            drivers = [Driver(name, path, level * w / total_weight, pool, random.Random(rng.random()),
+                              poisson=args.arrival == "poisson", wallets=wallets, addresses=addresses,
+                              spread=args.forwarded_for)
+                       for name, path, w in args.endpoint_list]
+            print(f"[bench] {level:g} req/s over {len(drivers)} endpoints for {args.seconds:g}s")
+            probe.reset()
+            started = time.monotonic()
+            await asyncio.gather(*(d.run(args.seconds) for d in drivers))
+            elapsed = time.monotonic() - started
+            row = {"rps": level, "seconds": round(elapsed, 2), "endpoints": {}, "probe": probe.summary()}
+            print(f"  {'endpoint':14} {'rps':>6} {'done/s':>7} {'ok':>6} {'429':>6} {'other':>6} "
+                  f"{'p50':>8}{'p90':>8}{'p99':>8}{'p999':>8}{'max':>8} {'svc p99':>8} {'queued':>6}")
+            for d in drivers:
+                s = d.stats.summary(args.seconds)
+                s["response_hist"] = d.stats.response.to_dict()
+                s["service_hist"] = d.stats.service.to_dict()
+                row["endpoints"][d.stats.name] = s
+                rate_limited += s["rate_limited"]
+                completed += s["completed"]
+                other = s["client_errors"] + s["server_errors"] + sum(s["errors"].values())
+                svc = s["service_ms"].get("p99", float("nan"))
+                print(f"  {d.stats.name:14} {s['target_rps']:6.1f} {s['achieved_rps']:7.1f} {s['ok']:6} "
+                      f"{s['rate_limited']:6} {other:6} {fmt_latency(s['response_ms'])} {svc:8.1f} {s['max_waiting']:6}")
+            p = row["probe"]
+            line = f"  ws-healthz: {fmt_latency(p['latency_ms'])} ms (p50 p90 p99 p999 max)"
+            base = result["baseline"]
+            if base and base["latency_ms"].get("count") and p["latency_ms"].get("count"):
+                delta = p["latency_ms"]["p99"] - base["latency_ms"]["p99"]
+                row["probe"]["p99_delta_ms"] = delta
+                line += f", p99 {delta:+.1f} ms vs baseline"
+                if delta > args.healthz_threshold:
+                    flagged.append((level, delta))
+            if "ws_avg_latency_ms" in p:
+                line += f", WS heartbeat RTT {p['ws_avg_latency_ms']:.0f} ms"
+            print(line, flush=True)
+            if p["rate_limited"]:
+                print(f"  ⚠️  ws-healthz probe got {p['rate_limited']} x 429 (rate limited); those polls are left "
+                      f"out, lower --probe-hz", flush=True)
+            result["levels"].append(row)
+    finally:
+        stop.set()
+        await asyncio.gather(probe_task, return_exceptions=True)
+        await pool.close()
+        if standin is not None:
+            await standin.stop()
+
+    if result["baseline"]:
+        b = result["baseline"]["latency_ms"]
+        if b.get("count"):
+            print(f"\nws-healthz baseline: p50 {b['p50']:.1f} ms, p99 {b['p99']:.1f} ms")
+        if result["baseline"]["rate_limited"]:
+            print(f"⚠️  the baseline probe got {result['baseline']['rate_limited']} x 429; lower --probe-hz")
+    for level, delta in flagged:
+        print(f"⚠️  ws-healthz p99 up {delta:.1f} ms at {level:g} req/s: API load is slowing the game process")
+    if completed and rate_limited / completed > RATE_LIMITED_WARN:
+        print(f"⚠️  {rate_limited / completed:.0%} of requests were rate limited (429). Start the server with "
+              f"TRUST_PROXY=1 and pass --forwarded-for N (N >= total req/s) to measure the routes themselves.")
+    print(f"- pool: {args.connections} connections, {pool.connects} connects")
+    out = args.out or RESULTS_DIR / f"httpbench-{args.label}-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    write_json(out, result)
+    print(f"- result: {out}")
+    return 0 if completed else 1
+
+
+def main() -> int:
+    args = parse_args()
+    if args.standin:
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            print("❌ ERROR: Required packages not installed.")
+            print("\nInstall them with: pip install websockets")
+            return 1
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Benchmark cancelled by user")
+        sys.exit(1)
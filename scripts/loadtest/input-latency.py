@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - input-to-state latency harness
+
+Measures how long a playerInput takes to show up in what the server
+broadcasts: a few probe clients send turning inputs and time the first
+gameStateUpdate (and, for trailDelta clients, the first trailDelta) that
+reflects each one (see loadlib/latency.py for how inputs are matched).
+Latencies go into HDR histograms, one set per load level, where a level is a
+number of background clients run by the WebSocket swarm (ws-swarm.py).
+
+  python3 scripts/loadtest/input-latency.py --url ws://127.0.0.1:8080/ws --levels 0,200,1000 --label main
+  python3 scripts/loadtest/input-latency.py --standin --levels 0,50 --seconds 20
+  python3 scripts/loadtest/input-latency.py --compare .cache/loadtest/latency-main-*.json .cache/loadtest/latency-pr-*.json
+
+The floor is set by the server loops, not the network: an input waits up to
+one physics tick and then up to one BROADCAST_INTERVAL (67 ms) for the next
+state frame, or two of them for the next trail delta. Results (percentiles
+plus the full histograms, so runs can be merged or re-read later) are
+written to .cache/loadtest/latency-<label>-<utc>.json.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+from loadlib import RESULTS_DIR
+from loadlib.hdr import Histogram
+from loadlib.latency import Probe, ProbeStats
+from loadlib.series import write_json
+
+CHANNELS = ("state", "trail", "first")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Input-to-state latency histograms per load level.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8080/ws", help="WebSocket URL (default: ws://127.0.0.1:8080/ws).")
+    parser.add_argument("--levels", default="0", help="Comma-separated background client counts (default: 0).")
+    parser.add_argument("--probes", type=int, default=4, help="Probe clients per level (default: 4).")
+    parser.add_argument("--seconds", type=float, default=30, help="Measuring time per level (default: 30).")
+    parser.add_argument("--behavior", default="broadcast", help="Background client behaviour mix (ws-swarm.py --behavior).")
+    parser.add_argument("--workers", type=int, default=None, help="Background worker processes (default: CPU count).")
+    parser.add_argument("--ramp", type=float, default=500, help="Background connections per second (default: 500).")
+    parser.add_argument("--full-frames", action="store_true",
+                        help="Probes skip clientHello trailDelta and get trails inside gameStateUpdate (no trail channel).")
+    parser.add_argument("--label", default="run", help="Build label stored in the result (default: run).")
+    parser.add_argument("--out", type=Path, help="Result file (default: .cache/loadtest/latency-<label>-<utc>.json).")
+    parser.add_argument("--standin", action="store_true", help="Run against a local stand-in server (ignores --url).")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASE", "NEW"),
+                        help="Compare two result files instead of measuring.")
+    args = parser.parse_args()
+    if not args.compare:
+        try:
+            args.level_list = [int(x) for x in args.levels.split(",") if x.strip()]
+        except ValueError:
+            parser.error("--levels must be comma-separated integers")
+        if not args.level_list or min(args.level_list) < 0 or args.probes < 1:
+            parser.error("--levels needs counts >= 0 and --probes must be >= 1")
+    return args
+
+
+async def run_level(url: str, background: int, args) -> dict:
+    from loadlib.swarm import Stats, Swarm, SwarmConfig, default_workers
+
+    loop = asyncio.get_running_loop()
+    swarm = None
+    if background:
+        ramp_s = background / max(1.0, args.ramp)
+        workers = min(args.workers or default_workers(), background)
+        swarm = Swarm(SwarmConfig(url=url, clients=background, seconds=ramp_s + args.seconds + 60, workers=workers,
+                                  ramp=args.ramp, behaviors=args.behavior, seed=background))
+        swarm.start()
+        print(f"[latency] level {background}: ramping background clients ({workers} workers)...")
+        deadline = time.monotonic() + ramp_s + 30
+        opened = Stats()
+        while time.monotonic() < deadline:
+            await loop.run_in_executor(None, swarm.poll, 1.0)
+            opened = swarm.totals()
+            if opened.connects + opened.connect_failures >= background:
+                break
+        print(f"[latency] level {background}: {opened.open} background clients open")
+
+    stats = ProbeStats()
+    stop = asyncio.Event()
+    probes = [Probe(i, url, stats, trail_delta=not args.full_frames, seed=background) for i in range(args.probes)]
+    tasks = [asyncio.create_task(p.run(stop)) for p in probes]
+    background_open = []
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < args.seconds:
+            if swarm is not None:
+                await loop.run_in_executor(None, swarm.poll, 1.0)
+                background_open.append(swarm.totals().open)
+            else:
+                await asyncio.sleep(1.0)
+            print(f"[latency] level {background}: {time.monotonic() - started:4.0f}s "
+                  f"sent={stats.sent} state={stats.state.total} trail={stats.trail.total} "
+                  f"lost={stats.lost_state}/{stats.lost_trail}", flush=True)
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if swarm is not None:
+            swarm.stop()
+            await loop.run_in_executor(None, swarm.join)
+
+    level = {
+        "background": background,
+        "probes": args.probes,
+        "clients": background + args.probes,
+        "background_open_min": min(background_open) if background_open else 0,
+        "seconds": args.seconds,
+        "sent": stats.sent,
+        "lost_state": stats.lost_state,
+        "lost_trail": stats.lost_trail,
+        "aborted": stats.aborted,
+        "rounds": stats.rounds,
+        "probe_connect_failures": stats.connect_failures,
+        # State frames seen from the probe until the turn showed (1 = the very next broadcast).
+        "state_frames_to_reflect": {"p50": stats.frames.value_at(50), "p99": stats.frames.value_at(99),
+                                    "max": stats.frames.max},
+    }
+    for channel in CHANNELS:
+        hist = getattr(stats, channel)
+        level[channel] = {"summary_ms": hist.summary_ms(), "histogram": hist.to_dict()}
+    return level
+
+
+def print_level(level: dict) -> None:
+    print(f"- {level['clients']} clients ({level['background']} background): sent={level['sent']} "
+          f"lost state/trail={level['lost_state']}/{level['lost_trail']} aborted={level['aborted']}")
+    for channel in CHANNELS:
+        s = level[channel]["summary_ms"]
+        if s.get("count"):
+            print(f"    {channel:5} n={s['count']:<6} p50={s['p50']:7.1f} p90={s['p90']:7.1f} "
+                  f"p99={s['p99']:7.1f} p999={s['p999']:7.1f} max={s['max']:7.1f} ms")
+
+
+def compare(base_path: Path, new_path: Path) -> int:
+    try:
+        base, new = (json.loads(p.read_text()) for p in (base_path, new_path))
+    except (OSError, ValueError) as e:
+        print(f"❌ ERROR: cannot read result: {e}")
+        return 1
+    print(f"Latency: {base.get('label')} ({base_path.name}) -> {new.get('label')} ({new_path.name})")
+    new_levels = {lv["background"]: lv for lv in new.get("levels", [])}
+    shared = [lv for lv in base.get("levels", []) if lv["background"] in new_levels]
+    if not shared:
+        print("❌ ERROR: the two runs have no load level in common")
+        return 1
+    for lv in shared:
+        other = new_levels[lv["background"]]
+        print(f"- {lv['clients']} clients ({lv['background']} background)")
+        for channel in CHANNELS:
+            a = Histogram.from_dict(lv[channel]["histogram"])
+            b = Histogram.from_dict(other[channel]["histogram"])
+            if not (a.total and b.total):
+                continue
+            cells = []
+            for name, q in (("p50", 50), ("p90", 90), ("p99", 99), ("p999", 99.9)):
+                va, vb = a.value_at(q) / 1000, b.value_at(q) / 1000
+                cells.append(f"{name} {va:6.1f} -> {vb:6.1f} ({(vb - va) / va * 100 if va else 0:+5.1f}%)")
+            print(f"    {channel:5} " + "  ".join(cells))
+    return 0
+
+
+async def run(args) -> int:
+    standin = None
+    url = args.url
+    if args.standin:
+        from loadlib.standin import StandIn
+        standin = await StandIn().start()
+        url = standin.ws_url
+        print(f"[latency] stand-in server on {url}")
+
+    out = args.out or RESULTS_DIR / f"latency-{args.label}-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    result = {
+        "label": args.label,
+        "url": url,
+        "started": time.time(),
+        "config": {"probes": args.probes, "seconds": args.seconds, "behavior": args.behavior,
+                   "full_frames": args.full_frames, "ramp": args.ramp},
+        "levels": [],
+    }
+    try:
+        for background in args.level_list:
+            result["levels"].append(await run_level(url, background, args))
+            write_json(out, result)  # keep finished levels if a later one is interrupted
+    finally:
+        if standin is not None:
+            await standin.stop()
+
+    print("\nInput latency summary (ms, send -> first reflecting frame):")
+    for level in result["levels"]:
+        print_level(level)
+    print(f"- result: {out}")
+    return 0 if any(level["state"]["summary_ms"]["count"] for level in result["levels"]) else 1
+
+
+def main() -> int:
+    args = parse_args()
+    if args.compare:
+        return compare(*args.compare)
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        print("❌ ERROR: Required packages not installed.")
+        print("\nInstall them with: pip install websockets")
+        return 1
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Latency run cancelled by user")
+        sys.exit(1)
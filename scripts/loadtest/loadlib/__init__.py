@@ -0,0 +1,13 @@
+"""
+SpermRace.io - shared helpers for the Python load and ops tools in scripts/loadtest
+
+Only the standard library is imported at module level. Import websockets
+lazily inside functions; the HTTP-only tools must run without it, and the
+WebSocket tools print their own "pip install websockets" hint.
+"""
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+# Snapshots, histograms and captures written by the tools. Ignored by git.
+RESULTS_DIR = REPO_ROOT / ".cache" / "loadtest"
@@ -0,0 +1,173 @@
+"""
+What a virtual client does once it has joined a lobby.
+
+A behaviour is instantiated once per client, so it may keep state. The swarm
+asks it for the delay before the first input, then repeatedly for the next
+input and the delay after it; all clients of a worker share one timer heap,
+so an input costs no per-client timer. Server messages are only parsed for
+behaviours that ask for them (wants()), since json.loads on every 15 Hz state
+frame is most of the CPU a client would otherwise burn.
+
+Built-in behaviours are listed in BEHAVIORS. Anything else can be plugged in
+as "package.module:Class" or "path/to/file.py:Class".
+"""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import math
+import random
+from pathlib import Path
+
+from . import protocol
+
+
+class Behavior:
+    name = "base"
+    trail_delta = True   # clientHello {trailDelta}; False gets full frames with trails inlined
+    rejoin = True        # joinLobby again after roundEnd
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.player_id: str | None = None
+
+    def first_input_delay(self) -> float | None:
+        """Seconds after joining until the first input; None never sends any."""
+        return None
+
+    def next_input(self, now: float) -> tuple[str | None, float]:
+        """(playerInput text or None to skip this turn, seconds until asked again)."""
+        return None, 1.0
+
+    def wants(self, kind: str) -> bool:
+        """Whether on_message should get messages of this type (parsed)."""
+        return False
+
+    def on_message(self, kind: str, msg: dict) -> None:
+        pass
+
+
+class Idle(Behavior):
+    """Joins and only listens: pure broadcast fan-out cost."""
+    name = "idle"
+
+
+class Broadcast(Behavior):
+    """ws-broadcast.js: random screen targets every 40-80 ms, accelerating 30% of the time."""
+    name = "broadcast"
+
+    def first_input_delay(self) -> float | None:
+        return self.rng.uniform(0.1, 0.3)
+
+    def next_input(self, now: float) -> tuple[str | None, float]:
+        return protocol.random_input(self.rng), self.rng.uniform(0.04, 0.08)
+
+
+class AggressiveBoost(Behavior):
+    """Inputs at the 60/s cap, always accelerating, boosting half the time."""
+    name = "aggressive-boost"
+
+    def first_input_delay(self) -> float | None:
+        return self.rng.uniform(0.0, 0.05)
+
+    def next_input(self, now: float) -> tuple[str | None, float]:
+        text = protocol.player_input(self.rng.randint(0, protocol.SCREEN_W), self.rng.randint(0, protocol.SCREEN_H),
+                                     True, boost=self.rng.random() < 0.5)
+        return text, 1 / 60
+
+
+class Bot(Behavior):
+    """
+    Steers like a player: a heading that wanders, turns away from the walls
+    and occasionally boosts, aimed 300 px ahead of its own position. Inputs
+    at 10 Hz; reads every 4th gameStateUpdate to learn where it is.
+    """
+    name = "bot"
+    STATE_EVERY = 4
+
+    def __init__(self, rng: random.Random):
+        super().__init__(rng)
+        self.heading = rng.uniform(-math.pi, math.pi)
+        self.pos: tuple[float, float] | None = None
+        self._states = 0
+
+    def first_input_delay(self) -> float | None:
+        return self.rng.uniform(0.1, 0.5)
+
+    def next_input(self, now: float) -> tuple[str | None, float]:
+        if self.pos is None:
+            return None, 0.1
+        x, y = self.pos
+        self.heading += self.rng.gauss(0, 0.35)
+        margin = 300
+        if not margin < x < protocol.WORLD_WIDTH - margin or not margin < y < protocol.WORLD_HEIGHT - margin:
+            self.heading = math.atan2(protocol.WORLD_HEIGHT / 2 - y, protocol.WORLD_WIDTH / 2 - x)
+        tx, ty = x + 300 * math.cos(self.heading), y + 300 * math.sin(self.heading)
+        return protocol.player_input(round(tx, 1), round(ty, 1), self.rng.random() < 0.8,
+                                     boost=self.rng.random() < 0.05), 0.1
+
+    def wants(self, kind: str) -> bool:
+        if kind == "authenticated":
+            return True
+        if kind == "gameStateUpdate":
+            self._states += 1
+            return self._states % self.STATE_EVERY == 1
+        return False
+
+    def on_message(self, kind: str, msg: dict) -> None:
+        payload = msg.get("payload") or {}
+        if kind == "authenticated":
+            self.player_id = payload.get("playerId")
+            return
+        for p in payload.get("players") or ():
+            if p.get("id") == self.player_id:
+                pos = (p.get("sperm") or {}).get("position") or {}
+                if isinstance(pos.get("x"), (int, float)) and isinstance(pos.get("y"), (int, float)):
+                    self.pos = (pos["x"], pos["y"])
+                return
+
+
+BEHAVIORS: dict[str, type[Behavior]] = {b.name: b for b in (Idle, Broadcast, AggressiveBoost, Bot)}
+
+
+def load_behavior(spec: str) -> type[Behavior]:
+    """A BEHAVIORS name, "package.module:Class" or "path/to/file.py:Class"."""
+    if spec in BEHAVIORS:
+        return BEHAVIORS[spec]
+    module_name, sep, class_name = spec.rpartition(":")
+    if not sep:
+        raise ValueError(f"unknown behavior {spec!r} (built in: {', '.join(BEHAVIORS)}; or module:Class)")
+    if module_name.endswith(".py"):
+        path = Path(module_name).resolve()
+        mod_spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+        if mod_spec is None or mod_spec.loader is None:
+            raise ValueError(f"cannot load {path}")
+        module = importlib.util.module_from_spec(mod_spec)
+        mod_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    cls = getattr(module, class_name, None)
+    if not (isinstance(cls, type) and issubclass(cls, Behavior)):
+        raise ValueError(f"{spec}: not a loadlib.behaviors.Behavior subclass")
+    return cls
+
+
+def parse_mix(text: str) -> list[tuple[type[Behavior], float]]:
+    """"bot=3,idle=1" -> [(Bot, 0.75), (Idle, 0.25)]; a bare name means weight 1."""
+    mix = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        spec, _, weight = part.rpartition("=") if "=" in part.split(":")[-1] else (part, "", "1")
+        mix.append((load_behavior(spec), float(weight or 1)))
+    total = sum(w for _, w in mix)
+    if not mix or total <= 0:
+        raise ValueError(f"empty behavior mix: {text!r}")
+    return [(cls, w / total) for cls, w in mix]
+
+
+def pick(mix: list[tuple[type[Behavior], float]], rng: random.Random) -> type[Behavior]:
+    r = rng.random()
+    for cls, weight in mix:
+        r -= weight
+        if r < 0:
+            return cls
+    return mix[-1][0]
@@ -0,0 +1,307 @@
+"""
+Capture files of real /ws sessions, for deterministic replay.
+
+File layout (all integers are unsigned LEB128 varints unless noted):
+
+  magic    b"SRWSCAP" + format version (1 byte)
+  header   varint length + UTF-8 JSON ({"created": ms, "upstream": url, ...})
+  records  varint length + record body, until EOF; the record stream is a
+           raw deflate stream, sync-flushed once a second, so the repeated
+           JSON of inputs costs a few bytes each and a recorder that dies
+           loses at most its last second
+
+  record body = kind (1 byte) + session + dt_us + fields
+    dt_us     microseconds since the previous record in the file (monotonic
+              clock of the recorder), so a record usually costs 3-5 bytes of
+              framing on top of the message it carries
+    OPEN      fields: UTF-8 JSON {"path": ..., "origin": ...}
+    TEXT      fields: the client->server text frame as sent
+    BINARY    fields: the client->server binary frame as sent
+    ANCHOR    fields: anchor kind (1 byte) + varint delay_us
+    CLOSE     fields: close code (2 bytes, big-endian)
+
+Replays must not drift away from the server's own phases (an input sent
+before goAtMs is ignored; joinLobby after roundEnd only makes sense once the
+round is over), so client frames are timed relative to server events rather
+than to the start of the session. The recorder writes an ANCHOR record for
+each of those events: authenticated, gameStarting, go (goAtMs reached, taken
+from the first state frame after gameStarting, hence the delay) and
+roundEnd. Every client frame is then stored as "n-th anchor of kind K plus
+offset"; a replayer waits for its own n-th K and adds offset / speed. The
+connection open is anchor ("open", 0).
+
+A truncated tail (recorder killed mid-write) ends the file cleanly.
+Credentials are never written: authenticate payloads are dropped (replays
+log in as guests), entryFeeSignature frames are not recorded and guestLogin
+loses guestId / resumeToken and, unless asked to keep them, the name.
+"""
+from __future__ import annotations
+
+import io
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from . import protocol
+
+MAGIC = b"SRWSCAP"
+VERSION = 1
+
+OPEN, TEXT, BINARY, ANCHOR, CLOSE = 1, 2, 3, 4, 5
+ANCHOR_KINDS = ("open", "authenticated", "gameStarting", "go", "roundEnd")
+_ANCHOR_CODE = {name: i for i, name in enumerate(ANCHOR_KINDS)}
+
+
+def write_varint(out, value: int) -> None:
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def read_varint(buf, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        if pos >= len(buf):
+            raise EOFError
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+class AnchorTracker:
+    """Turns server->client frames into anchors; the same logic runs when recording and replaying."""
+
+    def __init__(self):
+        self._await_go = False
+
+    def feed(self, raw: bytes | str, now: float) -> tuple[str, float] | None:
+        """(anchor kind, effective time) if this frame is an anchor."""
+        kind = protocol.peek_type(raw)
+        if kind in ("authenticated", "gameStarting", "roundEnd"):
+            self._await_go = kind == "gameStarting"
+            return kind, now
+        if kind == "gameStateUpdate" and self._await_go:
+            try:
+                payload = json.loads(raw).get("payload") or {}
+                delay_ms = max(0.0, float(payload["goAtMs"]) - float(payload["timestamp"]))
+            except (ValueError, KeyError, TypeError):
+                return None
+            self._await_go = False
+            return "go", now + delay_ms / 1000
+        return None
+
+
+def redact(text: str, keep_names: bool = False) -> str | None:
+    """The client frame as it may be stored; None drops it."""
+    kind = protocol.peek_type(text)
+    if kind == "entryFeeSignature":
+        return None
+    if kind == "authenticate":
+        return protocol.dumps({"type": "authenticate"})
+    if kind == "guestLogin":
+        try:
+            payload = json.loads(text).get("payload") or {}
+        except ValueError:
+            return text
+        name = payload.get("guestName") if keep_names else "Guest"
+        return protocol.dumps({"type": "guestLogin", "payload": {"guestName": name or "Guest"}})
+    return text
+
+
+class CaptureWriter:
+    def __init__(self, path: Path, meta: dict, clock):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "wb")
+        self._clock = clock
+        self._last = clock()
+        self._sessions = 0
+        self._z = zlib.compressobj(6, zlib.DEFLATED, -15)
+        self.records = 0
+        self.raw_bytes = 0
+        head = bytearray(MAGIC + bytes([VERSION]))
+        meta_bytes = json.dumps(meta, separators=(",", ":")).encode()
+        write_varint(head, len(meta_bytes))
+        head += meta_bytes
+        self._f.write(head)
+
+    def new_session(self, info: dict) -> int:
+        self._sessions += 1
+        self._record(OPEN, self._sessions, json.dumps(info, separators=(",", ":")).encode())
+        return self._sessions
+
+    def text(self, session: int, text: str) -> None:
+        self._record(TEXT, session, text.encode())
+
+    def binary(self, session: int, data: bytes) -> None:
+        self._record(BINARY, session, bytes(data))
+
+    def anchor(self, session: int, kind: str, at: float) -> None:
+        fields = bytearray([_ANCHOR_CODE[kind]])
+        write_varint(fields, max(0, round((at - self._clock()) * 1e6)))
+        self._record(ANCHOR, session, bytes(fields))
+
+    def close_session(self, session: int, code: int | None) -> None:
+        self._record(CLOSE, session, struct.pack(">H", code if code is not None else 1006))
+
+    def _record(self, kind: int, session: int, fields: bytes) -> None:
+        now = self._clock()
+        body = bytearray([kind])
+        write_varint(body, session)
+        write_varint(body, max(0, round((now - self._last) * 1e6)))
+        self._last = now
+        body += fields
+        frame = bytearray()
+        write_varint(frame, len(body))
+        frame += body
+        self._f.write(self._z.compress(frame))
+        self.records += 1
+        self.raw_bytes += len(frame)
+
+    def flush(self) -> None:
+        self._f.write(self._z.flush(zlib.Z_SYNC_FLUSH))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.write(self._z.flush())
+        self._f.close()
+
+
+@dataclass(slots=True)
+class Frame:
+    anchor: tuple[str, int]      # (kind, occurrence) this frame is timed from
+    offset: float                # seconds after that anchor
+    data: str | bytes
+
+
+@dataclass
+class Session:
+    id: int
+    start: float                 # seconds since the first record of the capture
+    info: dict
+    frames: list[Frame] = field(default_factory=list)
+    close_code: int | None = None
+    duration: float = 0.0
+
+
+def read_capture(path: Path, only: set[int] | None = None) -> tuple[dict, list[Session]]:
+    """
+    (header, sessions in start order); each session's frames are anchored.
+    Session ids count up from 1 in the order the sessions opened; `only`
+    limits decoding to those ids (a replay worker needs just its share).
+    """
+    buf = Path(path).read_bytes()
+    if not buf.startswith(MAGIC):
+        raise ValueError(f"{path}: not a capture file")
+    if buf[len(MAGIC)] != VERSION:
+        raise ValueError(f"{path}: capture format {buf[len(MAGIC)]}, expected {VERSION}")
+    pos = len(MAGIC) + 1
+    n, pos = read_varint(buf, pos)
+    meta = json.loads(buf[pos:pos + n])
+    buf = zlib.decompressobj(-15).decompress(memoryview(buf)[pos + n:])
+    pos = 0
+
+    sessions: dict[int, Session] = {}
+    # Per session: anchors seen so far as [(effective time, kind, occurrence)], and counts per kind.
+    anchors: dict[int, list[tuple[float, str, int]]] = {}
+    counts: dict[int, dict[str, int]] = {}
+    t = 0.0
+    while pos < len(buf):
+        try:
+            length, body_at = read_varint(buf, pos)
+        except EOFError:
+            break
+        if body_at + length > len(buf):
+            break  # truncated tail
+        body = memoryview(buf)[body_at:body_at + length]
+        pos = body_at + length
+        kind = body[0]
+        sid, p = read_varint(body, 1)
+        dt, p = read_varint(body, p)
+        t += dt / 1e6
+        fields = body[p:]
+        if only is not None and sid not in only:
+            continue
+        if kind == OPEN:
+            sessions[sid] = Session(id=sid, start=t, info=json.loads(bytes(fields)))
+            anchors[sid] = [(t, "open", 0)]
+            counts[sid] = {"open": 1}
+            continue
+        session = sessions.get(sid)
+        if session is None:
+            continue
+        if kind == ANCHOR:
+            name = ANCHOR_KINDS[fields[0]]
+            delay, _ = read_varint(fields, 1)
+            n = counts[sid].get(name, 0)
+            counts[sid][name] = n + 1
+            anchors[sid].append((t + delay / 1e6, name, n))
+            anchors[sid].sort(key=lambda a: a[0])
+        elif kind in (TEXT, BINARY):
+            at, name, n = next(a for a in reversed(anchors[sid]) if a[0] <= t)
+            data = bytes(fields).decode() if kind == TEXT else bytes(fields)
+            session.frames.append(Frame(anchor=(name, n), offset=t - at, data=data))
+        elif kind == CLOSE:
+            session.close_code = struct.unpack(">H", bytes(fields[:2]))[0]
+            session.duration = t - session.start
+    for session in sessions.values():
+        if not session.duration:
+            session.duration = t - session.start
+    return meta, sorted(sessions.values(), key=lambda s: s.start)
+
+
+def rewrite_for_replay(data: str | bytes, client: int, keep_tiers: bool = False) -> str | bytes | None:
+    """Make a recorded frame valid for a fresh guest connection; None skips it."""
+    if not isinstance(data, str):
+        return data
+    kind = protocol.peek_type(data)
+    if kind in ("authenticate", "guestLogin"):
+        return protocol.guest_login(f"replay_{client:06d}"[:20])
+    if kind == "joinLobby" and not keep_tiers:
+        try:
+            payload = json.loads(data).get("payload") or {}
+        except ValueError:
+            return data
+        if payload.get("entryFeeTier", 0) != 0:
+            return protocol.join_lobby(0, payload.get("mode") or "practice")
+    return data
+
+
+def summarize(sessions: list[Session]) -> dict:
+    types: dict[str, int] = {}
+    size = 0
+    for s in sessions:
+        for f in s.frames:
+            kind = protocol.peek_type(f.data) if isinstance(f.data, str) else "binary"
+            types[kind] = types.get(kind, 0) + 1
+            size += len(f.data)
+    return {
+        "sessions": len(sessions),
+        "frames": sum(len(s.frames) for s in sessions),
+        "frame_bytes": size,
+        "span_s": max((s.start + s.duration for s in sessions), default=0.0),
+        "types": dict(sorted(types.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def dump_frames(sessions: list[Session]) -> str:
+    """Human-readable listing, one line per frame (for `info --frames`)."""
+    out = io.StringIO()
+    for s in sessions:
+        out.write(f"session {s.id} start={s.start:.3f}s {s.info}\n")
+        for f in s.frames:
+            text = f.data if isinstance(f.data, str) else f"<{len(f.data)} bytes>"
+            out.write(f"  {f.anchor[0]}#{f.anchor[1]} +{f.offset * 1000:9.1f} ms  {text[:120]}\n")
+    return out.getvalue()
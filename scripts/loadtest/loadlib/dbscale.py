@@ -0,0 +1,480 @@
+"""
+Synthetic-scale copies of the server database and plans/timings of the
+queries DatabaseService.ts runs against it.
+
+Schema and queries are transcribed from packages/server/src/DatabaseService.ts
+(players, games, payouts, paid_players, the indexes init() creates, and the
+SQL behind the leaderboard cache, /api/stats, player lookups, ELO updates
+and the payout admin routes). Production is Postgres; the same tables can be
+built in a scratch SQLite file (stdlib, runs anywhere, plans from EXPLAIN
+QUERY PLAN) or in a scratch schema of a Postgres database (psycopg, plans
+from EXPLAIN ANALYZE). SQLite plans are close enough to find full scans and
+missing indexes; use Postgres for numbers you want to quote.
+
+Rows are generated from the row index alone (wallet i is a hash of i), so
+the players a game or payout refers to never have to be held in memory and
+a given seed always builds the same database. Tables are bulk-loaded with
+executemany in large transactions before the indexes are created, then
+analysed, like a restore.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+BATCH_ROWS = 50_000
+DAY_S = 86_400
+BASE58 = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_TO_BASE58 = bytes(BASE58[b % 58] for b in range(256))
+
+TABLES = ("players", "games", "payouts", "paid_players")
+
+# DatabaseService.init(), with the types each engine understands.
+SCHEMA = {
+    "postgres": [
+        """CREATE TABLE players (
+             wallet_address TEXT PRIMARY KEY, username TEXT, total_games INTEGER DEFAULT 0,
+             total_wins INTEGER DEFAULT 0, total_kills INTEGER DEFAULT 0, total_earnings BIGINT DEFAULT 0,
+             skill_rating INTEGER DEFAULT 1200, created_at TIMESTAMPTZ DEFAULT NOW())""",
+        """CREATE TABLE games (
+             game_id TEXT PRIMARY KEY, winner_wallet TEXT, prize_lamports BIGINT, player_count INTEGER,
+             ended_at TIMESTAMPTZ DEFAULT NOW())""",
+        """CREATE TABLE payouts (
+             round_id TEXT PRIMARY KEY, match_id TEXT, lobby_id TEXT, mode TEXT, winner_wallet TEXT NOT NULL,
+             prize_lamports BIGINT NOT NULL, platform_fee_bps INTEGER NOT NULL, tx_signature TEXT,
+             status TEXT NOT NULL, error TEXT, created_at TIMESTAMPTZ DEFAULT NOW(),
+             updated_at TIMESTAMPTZ DEFAULT NOW())""",
+        """CREATE TABLE paid_players (
+             wallet_address TEXT PRIMARY KEY, lamports BIGINT NOT NULL, tier INTEGER NOT NULL, signature TEXT,
+             paid_at TIMESTAMPTZ DEFAULT NOW())""",
+    ],
+    "sqlite": [
+        """CREATE TABLE players (
+             wallet_address TEXT PRIMARY KEY, username TEXT, total_games INTEGER DEFAULT 0,
+             total_wins INTEGER DEFAULT 0, total_kills INTEGER DEFAULT 0, total_earnings INTEGER DEFAULT 0,
+             skill_rating INTEGER DEFAULT 1200, created_at TEXT)""",
+        """CREATE TABLE games (
+             game_id TEXT PRIMARY KEY, winner_wallet TEXT, prize_lamports INTEGER, player_count INTEGER,
+             ended_at TEXT)""",
+        """CREATE TABLE payouts (
+             round_id TEXT PRIMARY KEY, match_id TEXT, lobby_id TEXT, mode TEXT, winner_wallet TEXT NOT NULL,
+             prize_lamports INTEGER NOT NULL, platform_fee_bps INTEGER NOT NULL, tx_signature TEXT,
+             status TEXT NOT NULL, error TEXT, created_at TEXT, updated_at TEXT)""",
+        """CREATE TABLE paid_players (
+             wallet_address TEXT PRIMARY KEY, lamports INTEGER NOT NULL, tier INTEGER NOT NULL, signature TEXT,
+             paid_at TEXT)""",
+    ],
+}
+
+INDEXES = [
+    "CREATE INDEX idx_players_wins ON players(total_wins DESC, total_earnings DESC)",
+    "CREATE INDEX idx_players_earnings ON players(total_earnings DESC, total_wins DESC)",
+    "CREATE INDEX idx_players_kills ON players(total_kills DESC)",
+    "CREATE INDEX idx_players_skill_rating ON players(skill_rating DESC)",
+    "CREATE INDEX idx_games_ended ON games(ended_at DESC)",
+    "CREATE INDEX idx_payouts_status ON payouts(status, updated_at DESC)",
+]
+
+
+@dataclass
+class Query:
+    name: str
+    source: str                   # the DatabaseService method it comes from
+    sql: str                      # "?" marks parameters; "{wallets}" a list of wallets (IN / = ANY)
+    params: str = ""              # what to bind: "wallet", "round", "wallets"
+    candidates: list[str] = field(default_factory=list)   # CREATE INDEX statements worth trying
+    note: str = ""                # when a scan is expected and no index is the fix
+
+
+def _leaderboard(column: str) -> Query:
+    return Query(
+        f"leaderboard_{column}", "_fetchLeaderboard",
+        f"SELECT wallet_address, username, {column} AS metric_value, total_games "
+        f"FROM players WHERE total_games > 0 ORDER BY {column} DESC LIMIT 100",
+        candidates=[f"CREATE INDEX cand_lb_{column} ON players({column} DESC) WHERE total_games > 0"])
+
+
+QUERIES = [
+    _leaderboard("total_wins"),
+    _leaderboard("total_earnings"),
+    _leaderboard("total_kills"),
+    _leaderboard("skill_rating"),
+    Query("stats_games", "getTotalStats", "SELECT COUNT(*) FROM games",
+          note="COUNT(*) reads every row (or index entry) on both engines; keep a running total if it matters"),
+    Query("stats_players", "getTotalStats", "SELECT COUNT(*) FROM players WHERE total_games > 0",
+          candidates=["CREATE INDEX cand_players_active ON players(total_games) WHERE total_games > 0"]),
+    Query("stats_prizes", "getTotalStats", "SELECT SUM(prize_lamports) FROM games",
+          candidates=["CREATE INDEX cand_games_prize ON games(prize_lamports)"]),
+    Query("player_stats", "getPlayerStats", "SELECT * FROM players WHERE wallet_address = ?", "wallet"),
+    Query("players_elo", "_updateSkillRatings",
+          "SELECT wallet_address, skill_rating, total_games FROM players WHERE {wallets}", "wallets"),
+    Query("recent_games", "getRecentGames", "SELECT * FROM games ORDER BY ended_at DESC LIMIT 20"),
+    Query("payout_by_round", "getPayoutByRoundId", "SELECT * FROM payouts WHERE round_id = ?", "round"),
+    Query("failed_payouts", "getFailedPayouts",
+          "SELECT * FROM payouts WHERE status = 'failed' ORDER BY updated_at DESC LIMIT 50"),
+    Query("paid_players", "getAllPaidPlayers", "SELECT wallet_address, lamports, tier, signature FROM paid_players",
+          note="reads the whole table by design; it only holds players with an entry fee in flight"),
+]
+
+
+def parse_count(text: str) -> int:
+    """'1M' / '500k' / '2500000' -> int."""
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000, "g": 1_000_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+# Data ------------------------------------------------------------------------------
+
+
+@dataclass
+class Scale:
+    players: int
+    games: int
+    paid_share: float = 0.3         # games with an entry fee, hence a payout row
+    paid_players: int = 2_000
+    days: int = 365
+    seed: int = 1
+
+    @property
+    def payouts(self) -> int:
+        return int(self.games * self.paid_share)
+
+    def key(self) -> dict:
+        return {"players": self.players, "games": self.games, "paid_share": self.paid_share,
+                "paid_players": self.paid_players, "days": self.days, "seed": self.seed}
+
+
+def wallet(i: int, seed: int = 1) -> str:
+    digest = hashlib.blake2b(i.to_bytes(8, "little"), digest_size=44, salt=seed.to_bytes(8, "little")).digest()
+    return digest.translate(_TO_BASE58).decode()
+
+
+def round_id(i: int, seed: int = 1) -> str:
+    h = hashlib.blake2b(i.to_bytes(8, "little"), digest_size=16, person=b"round",
+                        salt=seed.to_bytes(8, "little")).hexdigest()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _iso(ts: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(ts))
+
+
+def player_rows(scale: Scale, now: float):
+    rng = random.Random(scale.seed * 7919 + 1)
+    for i in range(scale.players):
+        # ensurePlayer() creates a row on first connect, so many players never finish a game.
+        games = 0 if rng.random() < 0.4 else int(rng.paretovariate(1.1))
+        wins = round(games * min(1.0, max(0.0, rng.gauss(0.125, 0.06))))
+        paid_wins = int(wins * scale.paid_share)
+        yield (wallet(i, scale.seed), f"player{i}" if rng.random() < 0.3 else None, games, wins,
+               int(games * rng.uniform(0, 2)), paid_wins * rng.choice((9_000_000, 45_000_000, 90_000_000)),
+               1200 + int(rng.gauss(0, 40 + min(games, 500) / 2)), _iso(now - rng.random() * scale.days * DAY_S))
+
+
+def game_rows(scale: Scale, now: float):
+    rng = random.Random(scale.seed * 7919 + 2)
+    start = now - scale.days * DAY_S
+    step = scale.days * DAY_S / max(1, scale.games)
+    for i in range(scale.games):
+        winner = int(scale.players * rng.random() ** 3)   # a few players win most games
+        paid = rng.random() < scale.paid_share
+        yield (round_id(i, scale.seed), wallet(winner, scale.seed),
+               rng.choice((9_000_000, 45_000_000, 90_000_000)) if paid else 0, rng.randint(2, 16),
+               _iso(start + i * step))
+
+
+def payout_rows(scale: Scale, now: float):
+    rng = random.Random(scale.seed * 7919 + 3)
+    start = now - scale.days * DAY_S
+    step = scale.days * DAY_S / max(1, scale.payouts)
+    for i in range(scale.payouts):
+        r = rng.random()
+        status = "sent" if r < 0.96 else "failed" if r < 0.98 else "skipped" if r < 0.99 else "planned"
+        created = start + i * step
+        rid = round_id(i, scale.seed + 1)
+        yield (rid, rid, f"lobby_{i % 10_000}", rng.choice(("tournament", "practice")),
+               wallet(int(scale.players * rng.random() ** 3), scale.seed), rng.choice((9_000_000, 45_000_000)),
+               1500, rid.replace("-", "") * 2 if status == "sent" else None, status,
+               "blockhash not found" if status == "failed" else None, _iso(created), _iso(created + rng.uniform(1, 30)))
+
+
+def paid_player_rows(scale: Scale, now: float):
+    rng = random.Random(scale.seed * 7919 + 4)
+    for i in range(min(scale.paid_players, scale.players)):
+        yield (wallet(scale.players - 1 - i, scale.seed), rng.choice((10_000_000, 50_000_000)), rng.randint(1, 3),
+               None, _iso(now - rng.random() * 600))
+
+
+ROWS = {"players": player_rows, "games": game_rows, "payouts": payout_rows, "paid_players": paid_player_rows}
+COLUMNS = {"players": 8, "games": 5, "payouts": 12, "paid_players": 5}
+
+
+def batches(rows, size: int = BATCH_ROWS):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Engines ---------------------------------------------------------------------------
+
+
+class SqliteEngine:
+    name = "sqlite"
+
+    def __init__(self, path: Path):
+        import sqlite3
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        # A scratch copy: durability does not matter, load speed does.
+        for pragma in ("journal_mode=OFF", "synchronous=OFF", "temp_store=MEMORY", "cache_size=-262144"):
+            self.conn.execute(f"PRAGMA {pragma}")
+
+    def stored_scale(self) -> dict | None:
+        try:
+            row = self.conn.execute("SELECT value FROM dbscale_meta WHERE key = 'scale'").fetchone()
+        except Exception:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def reset(self, scale: Scale) -> None:
+        for table in TABLES + ("dbscale_meta",):
+            self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        for ddl in SCHEMA["sqlite"]:
+            self.conn.execute(ddl)
+        self.conn.execute("CREATE TABLE dbscale_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def load(self, table: str, batch: list[tuple]) -> None:
+        marks = ",".join("?" * COLUMNS[table])
+        self.conn.execute("BEGIN")
+        self.conn.executemany(f"INSERT INTO {table} VALUES ({marks})", batch)
+        self.conn.execute("COMMIT")
+
+    def finish(self, scale: Scale) -> None:
+        for ddl in INDEXES:
+            self.conn.execute(ddl)
+        self.conn.execute("ANALYZE")
+        self.conn.execute("INSERT INTO dbscale_meta VALUES ('scale', ?)", (json.dumps(scale.key()),))
+
+    def render(self, query: Query, n_wallets: int) -> str:
+        return query.sql.replace("{wallets}", f"wallet_address IN ({','.join('?' * n_wallets)})")
+
+    def bind(self, query: Query, value) -> tuple:
+        return tuple(value) if query.params == "wallets" else ((value,) if query.params else ())
+
+    def plan(self, sql: str, params: tuple) -> dict:
+        details = [row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        return {
+            "lines": details,
+            "table_scans": [d for d in details if d.startswith("SCAN ") and " INDEX " not in d],
+            "index_scans": [d for d in details if d.startswith("SCAN ") and " INDEX " in d],
+            "sorts": [d for d in details if "TEMP B-TREE" in d],
+        }
+
+    def run(self, sql: str, params: tuple) -> float:
+        t0 = time.perf_counter()
+        self.conn.execute(sql, params).fetchall()
+        return time.perf_counter() - t0
+
+    def create_index(self, ddl: str) -> None:
+        self.conn.execute(ddl)
+        self.conn.execute("ANALYZE")
+
+    def drop_index(self, ddl: str) -> None:
+        self.conn.execute(f"DROP INDEX IF EXISTS {_index_name(ddl)}")
+        self.conn.execute("ANALYZE")
+
+    def size_bytes(self) -> int:
+        return self.path.stat().st_size
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class PostgresEngine:
+    """Tables in a scratch schema (`search_path` set to it), so the real ones are never touched."""
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, schema: str):
+        import psycopg
+
+        self.schema = schema
+        self.conn = psycopg.connect(dsn, autocommit=True)
+        self.conn.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        self.conn.execute(f"SET search_path TO {schema}")
+
+    def stored_scale(self) -> dict | None:
+        try:
+            row = self.conn.execute("SELECT value FROM dbscale_meta WHERE key = 'scale'").fetchone()
+        except Exception:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def reset(self, scale: Scale) -> None:
+        for table in TABLES + ("dbscale_meta",):
+            self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        for ddl in SCHEMA["postgres"]:
+            self.conn.execute(ddl)
+        self.conn.execute("CREATE TABLE dbscale_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def load(self, table: str, batch: list[tuple]) -> None:
+        marks = ",".join(["%s"] * COLUMNS[table])
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.executemany(f"INSERT INTO {table} VALUES ({marks})", batch)
+
+    def finish(self, scale: Scale) -> None:
+        for ddl in INDEXES:
+            self.conn.execute(ddl)
+        self.conn.execute("ANALYZE")
+        self.conn.execute("INSERT INTO dbscale_meta VALUES ('scale', %s)", (json.dumps(scale.key()),))
+
+    def render(self, query: Query, n_wallets: int) -> str:
+        return query.sql.replace("{wallets}", "wallet_address = ANY(%s)").replace("?", "%s")
+
+    def bind(self, query: Query, value) -> tuple:
+        return (list(value),) if query.params == "wallets" else ((value,) if query.params else ())
+
+    def plan(self, sql: str, params: tuple) -> dict:
+        row = self.conn.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params).fetchone()
+        doc = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+        out = {"lines": [], "table_scans": [], "index_scans": [], "sorts": []}
+
+        def walk(node: dict, depth: int) -> None:
+            kind = node.get("Node Type", "")
+            rel = node.get("Relation Name", "")
+            text = f"{kind} {rel} {node.get('Index Name', '')}".strip()
+            out["lines"].append("  " * depth + f"{text} rows={node.get('Actual Rows')} "
+                                               f"ms={node.get('Actual Total Time')}")
+            if kind == "Seq Scan":
+                out["table_scans"].append(text)
+            elif kind in ("Index Scan", "Index Only Scan") and "Index Cond" not in node:
+                out["index_scans"].append(text)
+            elif kind in ("Sort", "Incremental Sort"):
+                out["sorts"].append(text)
+            for child in node.get("Plans", []):
+                walk(child, depth + 1)
+
+        walk(doc[0]["Plan"], 0)
+        return out
+
+    def run(self, sql: str, params: tuple) -> float:
+        t0 = time.perf_counter()
+        self.conn.execute(sql, params).fetchall()
+        return time.perf_counter() - t0
+
+    def create_index(self, ddl: str) -> None:
+        self.conn.execute(ddl)
+        self.conn.execute(f"ANALYZE {_index_table(ddl)}")
+
+    def drop_index(self, ddl: str) -> None:
+        self.conn.execute(f"DROP INDEX IF EXISTS {_index_name(ddl)}")
+
+    def size_bytes(self) -> int:
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(pg_total_relation_size(c.oid)), 0) FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = %s AND c.relkind = 'r'",
+            (self.schema,)).fetchone()
+        return int(row[0])
+
+    def drop_schema(self) -> None:
+        self.conn.execute(f"DROP SCHEMA IF EXISTS {self.schema} CASCADE")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _index_name(ddl: str) -> str:
+    return ddl.split()[2]
+
+
+def _index_table(ddl: str) -> str:
+    return ddl.split(" ON ", 1)[1].split("(", 1)[0].strip()
+
+
+# Build and profile -------------------------------------------------------------------
+
+
+def build(engine, scale: Scale, progress=None) -> dict:
+    """Load every table; {table: (rows, seconds)}."""
+    now = time.time()
+    engine.reset(scale)
+    counts = {"players": scale.players, "games": scale.games, "payouts": scale.payouts,
+              "paid_players": min(scale.paid_players, scale.players)}
+    out = {}
+    for table in TABLES:
+        t0 = time.perf_counter()
+        done = 0
+        for batch in batches(ROWS[table](scale, now)):
+            engine.load(table, batch)
+            done += len(batch)
+            if progress is not None:
+                progress(table, done, counts[table], time.perf_counter() - t0)
+        out[table] = (done, time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    engine.finish(scale)
+    out["indexes+analyze"] = (len(INDEXES), time.perf_counter() - t0)
+    return out
+
+
+def sample_params(query: Query, scale: Scale, rng: random.Random):
+    if query.params == "wallet":
+        return wallet(rng.randrange(scale.players), scale.seed)
+    if query.params == "wallets":
+        return [wallet(rng.randrange(scale.players), scale.seed) for _ in range(8)]
+    if query.params == "round":
+        return round_id(rng.randrange(max(1, scale.payouts)), scale.seed + 1)
+    return None
+
+
+def time_query(engine, query: Query, scale: Scale, repeat: int, rng: random.Random) -> dict:
+    """Median / min / max over `repeat` runs (after one warm-up), each with fresh parameters."""
+    samples = []
+    sql = engine.render(query, 8)
+    engine.run(sql, engine.bind(query, sample_params(query, scale, rng)))
+    for _ in range(repeat):
+        samples.append(engine.run(sql, engine.bind(query, sample_params(query, scale, rng))) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples), "max_ms": max(samples)}
+
+
+def profile(engine, scale: Scale, repeat: int = 5, try_candidates: bool = True,
+            only: set[str] | None = None) -> list[dict]:
+    rng = random.Random(scale.seed)
+    results = []
+    for query in QUERIES:
+        if only and query.name not in only:
+            continue
+        sql = engine.render(query, 8)
+        plan = engine.plan(sql, engine.bind(query, sample_params(query, scale, rng)))
+        timing = time_query(engine, query, scale, repeat, rng)
+        # An index walked in order under a LIMIT stops early; without one it reads the whole index.
+        full_scan = bool(plan["table_scans"] or (plan["index_scans"] and " LIMIT " not in sql))
+        row = {"name": query.name, "source": query.source, "sql": sql, "plan": plan, **timing,
+               "full_scan": full_scan, "note": query.note, "candidates": []}
+        if try_candidates and full_scan and query.candidates:
+            for ddl in query.candidates:
+                engine.create_index(ddl)
+                try:
+                    after_plan = engine.plan(sql, engine.bind(query, sample_params(query, scale, rng)))
+                    after = time_query(engine, query, scale, repeat, rng)
+                finally:
+                    engine.drop_index(ddl)
+                row["candidates"].append({
+                    "index": ddl, "plan": after_plan, **after,
+                    "speedup": timing["median_ms"] / after["median_ms"] if after["median_ms"] > 0 else math.inf,
+                })
+        results.append(row)
+    return results
@@ -0,0 +1,154 @@
+"""
+HDR-style latency histogram: log-linear buckets with a fixed relative error.
+
+Values are recorded as integer microseconds. With `digits` significant
+decimal digits every recorded value lands in a bucket no wider than
+10**-digits of its value (3 digits: 0.1%), from 1 us up to `highest` with a
+constant number of counters, so a run of millions of samples costs the same
+~100 KB as a run of ten. The bucket layout is HdrHistogram's (power-of-two
+buckets each split into 2**k linear sub-buckets), and percentiles report the
+highest value equivalent to the bucket they fall in, like HdrHistogram's
+getValueAtPercentile.
+
+Histograms with the same layout merge by adding counts, and serialise to a
+sparse {index: count} form so saved runs can be re-percentiled or compared
+later.
+"""
+from __future__ import annotations
+
+import math
+from array import array
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class Histogram:
+    def __init__(self, highest_us: int = 60_000_000, digits: int = 3):
+        if not 1 <= digits <= 5:
+            raise ValueError("digits must be 1..5")
+        self.highest = int(highest_us)
+        self.digits = digits
+        largest_single_unit = 2 * 10 ** digits
+        self._sub_magnitude = max(1, math.ceil(math.log2(largest_single_unit))) - 1
+        self._sub_half = 1 << self._sub_magnitude
+        self._sub_mask = (self._sub_half << 1) - 1
+        buckets = 1
+        while (self._sub_half << 1) << (buckets - 1) <= self.highest:
+            buckets += 1
+        self.counts = array("Q", bytes(8 * ((buckets + 1) * self._sub_half)))
+        self.total = 0
+        self.min = 0
+        self.max = 0
+        self._sum = 0
+        self.overflow = 0
+
+    # Layout --------------------------------------------------------------------
+
+    def _index(self, value: int) -> int:
+        bucket = max(0, (value | self._sub_mask).bit_length() - (self._sub_magnitude + 1))
+        sub = value >> bucket
+        return ((bucket + 1) << self._sub_magnitude) + sub - self._sub_half
+
+    def _bounds(self, index: int) -> tuple[int, int]:
+        """(lowest, highest) value equivalent to counts[index]."""
+        bucket = (index >> self._sub_magnitude) - 1
+        sub = (index & (self._sub_half - 1)) + self._sub_half
+        if bucket < 0:
+            sub -= self._sub_half
+            bucket = 0
+        low = sub << bucket
+        return low, low + (1 << bucket) - 1
+
+    # Recording -----------------------------------------------------------------
+
+    def record(self, value_us: float, count: int = 1) -> None:
+        value = max(0, int(round(value_us)))
+        if value > self.highest:
+            self.overflow += count
+            value = self.highest
+        self.counts[self._index(value)] += count
+        if self.total == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.total += count
+        self._sum += value * count
+
+    def record_ms(self, value_ms: float) -> None:
+        self.record(value_ms * 1000.0)
+
+    def merge(self, other: "Histogram") -> None:
+        if (other.digits, len(other.counts)) != (self.digits, len(self.counts)):
+            raise ValueError("histogram layouts differ")
+        if other.total == 0:
+            return
+        for i, n in enumerate(other.counts):
+            if n:
+                self.counts[i] += n
+        self.min = other.min if self.total == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.total += other.total
+        self._sum += other._sum
+        self.overflow += other.overflow
+
+    # Reading -------------------------------------------------------------------
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.total if self.total else math.nan
+
+    def value_at(self, q: float) -> int:
+        """Highest equivalent value at percentile q (0..100), in microseconds."""
+        if self.total == 0:
+            return 0
+        rank = max(1, math.ceil(q / 100.0 * self.total))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= rank:
+                    return min(self._bounds(i)[1], self.max)
+        return self.max
+
+    def percentiles_ms(self, qs: tuple[float, ...] = DEFAULT_PERCENTILES) -> dict[str, float]:
+        """{"p50": ms, "p90": ms, "p99": ms, "p999": ms} for the default qs."""
+        return {_label(q): self.value_at(q) / 1000.0 for q in qs}
+
+    def summary_ms(self) -> dict:
+        out = {"count": self.total}
+        if self.total:
+            out.update(min=self.min / 1000.0, mean=round(self.mean / 1000.0, 3), max=self.max / 1000.0)
+            out.update(self.percentiles_ms())
+        return out
+
+    # Serialisation -------------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        return {
+            "unit": "us",
+            "digits": self.digits,
+            "highest": self.highest,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "sum": self._sum,
+            "overflow": self.overflow,
+            "counts": {str(i): n for i, n in enumerate(self.counts) if n},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        h = cls(highest_us=data["highest"], digits=data["digits"])
+        for i, n in data.get("counts", {}).items():
+            h.counts[int(i)] = n
+        h.total = data["total"]
+        h.min = data["min"]
+        h.max = data["max"]
+        h._sum = data["sum"]
+        h.overflow = data.get("overflow", 0)
+        return h
+
+
+def _label(q: float) -> str:
+    """50 -> "p50", 99.9 -> "p999"."""
+    return "p" + f"{q:g}".replace(".", "")
@@ -0,0 +1,106 @@
+"""
+Minimal keep-alive HTTP/1.1 GET client on asyncio streams.
+
+Polling /api/metrics ten times a second through urllib would open a new TCP
+(and TLS) connection per request; HttpClient keeps one connection per
+endpoint and reconnects only when the server closes it.
+"""
+from __future__ import annotations
+
+import asyncio
+import ssl
+from urllib.parse import urlsplit
+
+
+class HttpError(Exception):
+    pass
+
+
+class HttpClient:
+    """One connection, one request in flight at a time. Not safe to share between tasks."""
+
+    def __init__(self, base_url: str, headers: dict[str, str] | None = None, timeout: float = 2.0):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise HttpError(f"unsupported URL scheme: {base_url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        host_header = self.host if parts.port is None else f"{self.host}:{self.port}"
+        self._headers = {"Host": host_header, "User-Agent": "spermrace-loadtest", "Accept": "*/*", **(headers or {})}
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self.connects = 0
+
+    async def get(self, path: str, headers: dict[str, str] | None = None) -> tuple[int, bytes]:
+        """(status, body). Retries once on a fresh connection if a reused one was closed under us."""
+        reused = self._writer is not None
+        try:
+            return await asyncio.wait_for(self._get(path, headers), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            await self.close()
+            if not reused:
+                raise HttpError(f"GET {path}: {e!r}") from e
+        except asyncio.TimeoutError as e:
+            await self.close()
+            raise HttpError(f"GET {path}: timed out after {self.timeout}s") from e
+        try:
+            return await asyncio.wait_for(self._get(path, headers), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            await self.close()
+            raise HttpError(f"GET {path}: {e!r}") from e
+
+    async def _get(self, path: str, extra: dict[str, str] | None = None) -> tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+            self.connects += 1
+        fields = {**self._headers, **extra} if extra else self._headers
+        head = "".join(f"{k}: {v}\r\n" for k, v in fields.items())
+        self._writer.write(f"GET {self.prefix}{path} HTTP/1.1\r\n{head}\r\n".encode("latin-1"))
+        await self._writer.drain()
+
+        raw = await self._reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = raw.decode("latin-1").split("\r\n")
+        try:
+            version, status, *_ = status_line.split(" ", 2)
+            status_code = int(status)
+        except ValueError:
+            raise HttpError(f"bad status line: {status_line!r}") from None
+        headers: dict[str, str] = {}
+        for line in header_lines:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        else:
+            body = await self._reader.read()
+            keep_alive = False
+        if not keep_alive:
+            await self.close()
+        return status_code, body
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                await self._reader.readuntil(b"\r\n")
+                return b"".join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readexactly(2)
+
+    async def close(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
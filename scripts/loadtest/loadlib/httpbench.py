@@ -0,0 +1,257 @@
+"""
+Open-loop HTTP benchmark over a pool of keep-alive connections.
+
+Every endpoint gets its own arrival schedule (constant rate, or Poisson with
+the same mean) that does not wait for responses: request n is due at
+start + n / rps whether or not request n-1 has come back. When every pooled
+connection is busy, due requests queue for one, and their latency is still
+counted from when they were due, not from when they were sent. A closed
+loop ("send the next request when the last one returns") slows itself down
+exactly when the server does and hides that stall from its own percentiles
+(coordinated omission); here a stall shows up in every request scheduled
+during it. The time from actual send to response is kept separately as
+service time, so queueing in the pool can be told apart from server time.
+
+Requests that fail or time out are recorded at the time they took, so a
+wall of timeouts moves the tail instead of vanishing from it.
+
+The server rate-limits these routes per client address (express-rate-limit,
+60/min on the leaderboard and stats routes, 120/min overall). A server
+started with TRUST_PROXY=1 takes the address from X-Forwarded-For; with
+`forwarded_for` > 0 requests rotate over that many addresses from
+198.18.0.0/15 (the benchmarking range), so the limiter sees many clients.
+Against TRUST_PROXY=0 the header is ignored and most requests get 429,
+which are counted apart from the rest.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+
+from .hdr import Histogram
+from .http import HttpClient, HttpError
+
+# Short names for the routes under test; "{wallet}" is filled per request.
+ENDPOINTS = {
+    "wins": "/api/leaderboard/wins?limit=100",
+    "earnings": "/api/leaderboard/earnings?limit=100",
+    "kills": "/api/leaderboard/kills?limit=100",
+    "skill-rating": "/api/leaderboard/skill-rating?limit=100",
+    "stats": "/api/stats",
+    "player": "/api/player/{wallet}/stats",
+}
+WS_HEALTHZ_PATH = "/api/ws-healthz"
+GLOBAL_LIMIT_PER_MIN = 120  # the server's global limiter, per client address; the probe must stay under it
+PROBE_PER_ADDRESS_PER_MIN = 90
+DRAIN_TIMEOUT_S = 10.0      # wait this long for the requests still in flight at the end of a level
+
+
+def forwarded_address(n: int) -> str:
+    """The n-th address of 198.18.0.0/15."""
+    n %= 1 << 17
+    return f"198.{18 + (n >> 16)}.{(n >> 8) & 0xFF}.{n & 0xFF}"
+
+
+@dataclass
+class EndpointStats:
+    name: str
+    rps: float = 0.0
+    due: int = 0
+    completed: int = 0
+    errors: Counter = field(default_factory=Counter)
+    statuses: Counter = field(default_factory=Counter)
+    response: Histogram = field(default_factory=Histogram)   # from when the request was due
+    service: Histogram = field(default_factory=Histogram)    # from when it was sent
+    waiting: int = 0
+    max_waiting: int = 0
+
+    def summary(self, seconds: float) -> dict:
+        limited = self.statuses.get(429, 0)
+        ok = sum(n for code, n in self.statuses.items() if 200 <= code < 400)
+        return {
+            "target_rps": self.rps,
+            "achieved_rps": self.completed / seconds if seconds else 0.0,
+            "due": self.due,
+            "completed": self.completed,
+            "ok": ok,
+            "rate_limited": limited,
+            "client_errors": sum(n for code, n in self.statuses.items() if 400 <= code < 500 and code != 429),
+            "server_errors": sum(n for code, n in self.statuses.items() if code >= 500),
+            "errors": dict(self.errors),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "max_waiting": self.max_waiting,
+            "response_ms": self.response.summary_ms(),
+            "service_ms": self.service.summary_ms(),
+        }
+
+
+class Pool:
+    """
+    `size` keep-alive connections, one request at a time each. They connect
+    on first use; a request that finds none idle queues for one, first come
+    first served.
+    """
+
+    def __init__(self, base_url: str, size: int, timeout: float):
+        self.clients = [HttpClient(base_url, timeout=timeout) for _ in range(size)]
+        self._idle: asyncio.Queue[HttpClient] = asyncio.Queue()
+        for client in self.clients:
+            self._idle.put_nowait(client)
+
+    @property
+    def connects(self) -> int:
+        return sum(c.connects for c in self.clients)
+
+    async def acquire(self) -> HttpClient:
+        return await self._idle.get()
+
+    def release(self, client: HttpClient) -> None:
+        self._idle.put_nowait(client)
+
+    async def close(self) -> None:
+        await asyncio.gather(*(c.close() for c in self.clients), return_exceptions=True)
+
+
+class Driver:
+    """Runs one endpoint's open-loop schedule against a pool."""
+
+    def __init__(self, name: str, path: str, rps: float, pool: Pool, rng: random.Random, poisson: bool = False,
+                 wallets: list[str] | None = None, addresses: "itertools.count | None" = None, spread: int = 0):
+        self.path = path
+        self.pool = pool
+        self.rng = rng
+        self.poisson = poisson
+        self.wallets = wallets or []
+        self.addresses = addresses
+        self.spread = spread
+        self.stats = EndpointStats(name, rps)
+        self._inflight: set[asyncio.Task] = set()
+
+    async def run(self, seconds: float) -> None:
+        stats = self.stats
+        if stats.rps <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        # A random phase, so endpoints with the same rate do not all fire at the same instant.
+        start = loop.time() + self.rng.random() / stats.rps
+        due = start
+        n = 0
+        while True:
+            if self.poisson:
+                due += self.rng.expovariate(stats.rps)
+            else:
+                due = start + n / stats.rps
+            if due - start >= seconds:
+                break
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self._one(due))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+            n += 1
+        if self._inflight:
+            await asyncio.wait(set(self._inflight), timeout=DRAIN_TIMEOUT_S)
+        for task in list(self._inflight):
+            task.cancel()
+
+    async def _one(self, due: float) -> None:
+        stats = self.stats
+        loop = asyncio.get_running_loop()
+        stats.due += 1
+        path = self.path
+        if "{wallet}" in path:
+            path = path.replace("{wallet}", self.rng.choice(self.wallets) if self.wallets else "unknown")
+        headers = None
+        if self.spread:
+            headers = {"X-Forwarded-For": forwarded_address(next(self.addresses) % self.spread)}
+        stats.waiting += 1
+        stats.max_waiting = max(stats.max_waiting, stats.waiting)
+        try:
+            client = await self.pool.acquire()
+        finally:
+            stats.waiting -= 1      # also when cancelled while still queued
+        sent = loop.time()
+        try:
+            status, _ = await client.get(path, headers)
+            stats.statuses[status] += 1
+        except HttpError as e:
+            stats.errors[type(e.__cause__).__name__ if e.__cause__ else "HttpError"] += 1
+        except asyncio.CancelledError:
+            await client.close()   # a half-read response: never reuse the connection
+            raise
+        finally:
+            self.pool.release(client)
+        now = loop.time()
+        stats.completed += 1
+        stats.response.record((now - due) * 1e6)
+        stats.service.record((now - sent) * 1e6)
+
+
+def probe_addresses(hz: float, first: int) -> list[str]:
+    """Enough forwarded addresses, from `first` on, to keep each under PROBE_PER_ADDRESS_PER_MIN polls."""
+    count = max(1, -(-int(hz * 60) // PROBE_PER_ADDRESS_PER_MIN))
+    return [forwarded_address(first + i) for i in range(count)]
+
+
+class HealthProbe:
+    """
+    Closed-loop /api/ws-healthz poller on its own connection (it is the victim, not the load).
+
+    The route sits behind the global limiter, so above GLOBAL_LIMIT_PER_MIN
+    polls a minute from one address it measures 429s. With `addresses` the
+    polls rotate over them. 429s are counted apart and kept out of the latency.
+    """
+
+    def __init__(self, base_url: str, hz: float, timeout: float, addresses: list[str] | None = None):
+        self.client = HttpClient(base_url, timeout=timeout)
+        self.interval = 1.0 / hz
+        self.headers = itertools.cycle([{"X-Forwarded-For": a} for a in addresses]) if addresses else None
+        self.latency = Histogram()
+        self.errors = 0
+        self.rate_limited = 0
+        self.ws_latency_ms: list[float] = []    # avgLatencyMs the server reported (heartbeat RTT of WS clients)
+
+    def reset(self) -> None:
+        self.latency = Histogram()
+        self.errors = 0
+        self.rate_limited = 0
+        self.ws_latency_ms = []
+
+    async def run(self, stop: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while not stop.is_set():
+            t0 = loop.time()
+            try:
+                status, body = await self.client.get(WS_HEALTHZ_PATH, next(self.headers) if self.headers else None)
+            except HttpError:
+                self.errors += 1
+                status, body = 0, b""
+            if status == 429:
+                self.rate_limited += 1
+            else:
+                self.latency.record((loop.time() - t0) * 1e6)
+            if status == 200:
+                try:
+                    avg = json.loads(body).get("avgLatencyMs")
+                except ValueError:
+                    avg = None
+                if isinstance(avg, (int, float)):
+                    self.ws_latency_ms.append(float(avg))
+            next_at = max(next_at + self.interval, loop.time())
+            try:
+                await asyncio.wait_for(stop.wait(), next_at - loop.time())
+            except asyncio.TimeoutError:
+                pass
+        await self.client.close()
+
+    def summary(self) -> dict:
+        out = {"latency_ms": self.latency.summary_ms(), "errors": self.errors, "rate_limited": self.rate_limited}
+        if self.ws_latency_ms:
+            out["ws_avg_latency_ms"] = sum(self.ws_latency_ms) / len(self.ws_latency_ms)
+        return out
@@ -0,0 +1,520 @@
+"""
+Rootless network impairment: a TCP proxy that degrades each connection
+through it according to a scripted profile, in one asyncio event loop.
+
+Works on the byte stream, so it needs no root, no tc/netem and no second
+interface, and TLS or any WebSocket extension passes through untouched.
+Every connection is given a profile from a weighted mix when it is accepted.
+A profile is a list of phases; each phase sets
+
+  latency_ms / jitter_ms   one-way delay added in each direction, normal
+                           jitter, never reordering bytes (it is still TCP)
+  up_kbps / down_kbps      bandwidth cap client->server / server->client;
+                           the proxy stops reading once QUEUE_LIMIT bytes
+                           wait in a direction, so the sender feels it as a
+                           full socket (this is what drives the server's
+                           bufferedAmount and 4004 Slow consumer)
+  loss / rto_ms            per-segment loss chance; TCP hides loss as a
+                           head-of-line stall, so a lost segment holds it
+                           and everything behind it for rto_ms
+  stalls_per_min/stall_ms  blackouts in both directions (wifi handover,
+                           tunnel); stall_ms varies by +-50 %
+  flaps_per_min            abrupt resets (RST to both sides)
+  cut                      reset every connection on the profile when the
+                           phase starts: a reconnect storm on cue
+  blackout                 forward nothing while the phase lasts (the
+                           connections stay open and silent)
+  refuse                   reset new connections while the phase lasts
+
+Each phase inherits the values of the one before it, except `cut`,
+`blackout` and `refuse`, which hold for their own phase only. Phase
+times run on the connection's own clock (seconds since it was accepted) or,
+with "clock": "proxy", on the proxy's, which is what synchronised cuts need;
+"loop": S repeats the phases every S seconds.
+
+The proxy follows the WebSocket framing in both directions (when the stream
+starts with an HTTP upgrade) to tell how each connection ended: closed by
+the server (its close code, 4001/4003/4004/4005/...) or by the client,
+whichever sent the first close frame; reset by the proxy itself; or just
+gone.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import json
+import math
+import random
+import socket
+import struct
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+
+SEGMENT = 1460
+QUEUE_LIMIT = 256 * 1024      # bytes waiting per direction before the proxy stops reading
+TICK_S = 0.25                 # flap / stall / phase evaluation interval
+
+# How a connection ended.
+SERVER_CLOSE, CLIENT_CLOSE, CUT, FLAP, REFUSED, UPSTREAM_FAILED, RESET, STOPPED = (
+    "server_close", "client_close", "cut", "flap", "refused", "upstream_failed", "reset", "stopped")
+
+
+@dataclass(frozen=True)
+class Phase:
+    at: float = 0.0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    up_kbps: float = 0.0
+    down_kbps: float = 0.0
+    loss: float = 0.0
+    rto_ms: float = 200.0
+    stalls_per_min: float = 0.0
+    stall_ms: float = 0.0
+    flaps_per_min: float = 0.0
+    cut: bool = False
+    blackout: bool = False
+    refuse: bool = False
+
+
+_PHASE_FIELDS = {f.name for f in fields(Phase)}
+
+
+@dataclass
+class Profile:
+    name: str
+    phases: list[Phase]
+    clock: str = "connection"      # or "proxy"
+    loop: float = 0.0
+
+    @classmethod
+    def from_dict(cls, name: str, spec: dict) -> "Profile":
+        spec = dict(spec)
+        clock = spec.pop("clock", "connection")
+        loop = float(spec.pop("loop", 0.0))
+        raw_phases = spec.pop("phases", None)
+        if raw_phases is None:
+            raw_phases, spec = [spec], {}
+        if spec:
+            raise ValueError(f"profile {name}: unknown keys {sorted(spec)}")
+        if clock not in ("connection", "proxy"):
+            raise ValueError(f"profile {name}: clock must be 'connection' or 'proxy'")
+        phases: list[Phase] = []
+        prev = Phase()
+        for raw in raw_phases:
+            unknown = set(raw) - _PHASE_FIELDS
+            if unknown:
+                raise ValueError(f"profile {name}: unknown phase keys {sorted(unknown)}")
+            phase = replace(prev, **{"cut": False, "blackout": False, "refuse": False, **raw})
+            if phases and phase.at <= phases[-1].at:
+                raise ValueError(f"profile {name}: phase times must increase")
+            phases.append(phase)
+            prev = phase
+        if phases[0].at > 0:
+            phases.insert(0, replace(Phase(), at=0.0))
+        if loop and loop <= phases[-1].at:
+            raise ValueError(f"profile {name}: loop must be longer than the last phase start")
+        return cls(name, phases, clock, loop)
+
+    def phase_at(self, t: float) -> tuple[Phase, tuple[int, int]]:
+        """(phase in force t seconds into the profile clock, key that changes whenever a phase starts)."""
+        cycle = 0
+        if self.loop:
+            cycle, t = divmod(max(0.0, t), self.loop)
+        i = max(0, bisect.bisect_right([p.at for p in self.phases], t) - 1)
+        return self.phases[i], (int(cycle), i)
+
+
+BUILTIN_PROFILES: dict[str, dict] = {
+    "clean": {},
+    "wifi": {"latency_ms": 15, "jitter_ms": 5, "loss": 0.002},
+    "4g": {"latency_ms": 45, "jitter_ms": 15, "down_kbps": 8000, "up_kbps": 2000, "loss": 0.005},
+    "3g": {"latency_ms": 150, "jitter_ms": 50, "down_kbps": 1000, "up_kbps": 384, "loss": 0.01,
+           "stalls_per_min": 2, "stall_ms": 800},
+    # Below what a full lobby broadcasts: the server's send buffer fills until 4004.
+    "congested": {"latency_ms": 80, "jitter_ms": 60, "down_kbps": 128, "up_kbps": 64},
+    "flappy": {"latency_ms": 45, "jitter_ms": 15, "flaps_per_min": 2},
+    # Everyone is cut at 25 s, then every 30 s.
+    "storm": {"clock": "proxy", "loop": 30, "phases": [{"at": 0}, {"at": 25, "cut": True}]},
+    # 10 s outage from 20 s in: open connections go silent, new ones are refused.
+    "outage": {"clock": "proxy", "phases": [{"at": 0}, {"at": 20, "blackout": True, "refuse": True}, {"at": 30}]},
+}
+
+
+def load_profiles(path: Path | None = None) -> dict[str, Profile]:
+    """Built-in profiles, plus (overriding them) those in a JSON file of {name: spec}."""
+    specs = dict(BUILTIN_PROFILES)
+    if path is not None:
+        specs.update(json.loads(Path(path).read_text()))
+    return {name: Profile.from_dict(name, spec) for name, spec in specs.items()}
+
+
+def parse_profile_mix(spec: str, profiles: dict[str, Profile]) -> list[tuple[Profile, float]]:
+    """'4g=3,wifi=1' -> [(profile, weight)]."""
+    mix = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, weight = part.partition("=")
+        if name not in profiles:
+            raise ValueError(f"unknown profile {name!r} (known: {', '.join(profiles)})")
+        mix.append((profiles[name], float(weight or 1)))
+    if not mix or sum(w for _, w in mix) <= 0:
+        raise ValueError("empty profile mix")
+    return mix
+
+
+class WsSniffer:
+    """Follows one direction of a WebSocket stream far enough to see its close frame."""
+
+    __slots__ = ("buf", "skip", "handshake", "active", "close_code")
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.skip = 0
+        self.handshake = True
+        self.active = True
+        self.close_code: int | None = None
+
+    def feed(self, data: bytes) -> None:
+        if not self.active:
+            return
+        if self.skip >= len(data):
+            self.skip -= len(data)
+            return
+        self.buf += data[self.skip:]
+        self.skip = 0
+        buf = self.buf
+        if self.handshake:
+            if len(buf) < 4:
+                return
+            if buf[:4] not in (b"GET ", b"HTTP"):
+                self.active = False   # TLS or not a WebSocket: nothing to see
+                return
+            end = buf.find(b"\r\n\r\n")
+            if end < 0:
+                if len(buf) > 16384:
+                    self.active = False
+                return
+            del buf[:end + 4]
+            self.handshake = False
+        pos = 0
+        while len(buf) - pos >= 2:
+            b0, b1 = buf[pos], buf[pos + 1]
+            n = b1 & 0x7F
+            head = 2
+            if n == 126:
+                head = 4
+            elif n == 127:
+                head = 10
+            masked = b1 & 0x80
+            if masked:
+                head += 4
+            if len(buf) - pos < head:
+                break
+            if n == 126:
+                n = struct.unpack_from(">H", buf, pos + 2)[0]
+            elif n == 127:
+                n = struct.unpack_from(">Q", buf, pos + 2)[0]
+            if b0 & 0x0F == 0x8:
+                if len(buf) - pos < head + n:
+                    break
+                if n >= 2:
+                    code = bytearray(buf[pos + head:pos + head + 2])
+                    if masked:
+                        mask = buf[pos + head - 4:pos + head]
+                        code[0] ^= mask[0]
+                        code[1] ^= mask[1]
+                    self.close_code = struct.unpack(">H", code)[0]
+                else:
+                    self.close_code = 1005
+                self.active = False
+                buf.clear()
+                return
+            if len(buf) - pos < head + n:
+                self.skip = head + n - (len(buf) - pos)
+                pos = len(buf)
+                break
+            pos += head + n
+        del buf[:pos]
+
+
+@dataclass
+class ProfileStats:
+    accepted: int = 0
+    open: int = 0
+    bytes_up: int = 0
+    bytes_down: int = 0
+    stalls: int = 0
+    ended: Counter = field(default_factory=Counter)          # cause -> connections
+    server_codes: Counter = field(default_factory=Counter)   # code of closes the server started
+    client_codes: Counter = field(default_factory=Counter)   # and of those the client started
+    connected_s: float = 0.0
+
+
+class _Pipe:
+    """One direction of a link: read, delay, pace, write."""
+
+    def __init__(self, link: "Link", reader: asyncio.StreamReader, writer: asyncio.StreamWriter, up: bool):
+        self.link = link
+        self.reader = reader
+        self.writer = writer
+        self.up = up
+        self.sniffer = WsSniffer()
+        self.queue: deque[tuple[float, bytes | None]] = deque()
+        self.queued = 0
+        self.last_due = 0.0
+        self.free_at = 0.0
+        self.wake = asyncio.Event()
+        self.drained = asyncio.Event()
+
+    async def read(self) -> None:
+        link = self.link
+        loop = asyncio.get_running_loop()
+        rng = link.rng
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                now = loop.time()
+                sniffer = self.sniffer
+                if sniffer.active:
+                    sniffer.feed(data)
+                    if sniffer.close_code is not None and link.closed_by is None:
+                        link.closed_by = CLIENT_CLOSE if self.up else SERVER_CLOSE
+                p = link.phase
+                due = now + p.latency_ms / 1000
+                if p.jitter_ms:
+                    due += max(-p.latency_ms, rng.gauss(0.0, p.jitter_ms)) / 1000
+                if p.loss and rng.random() < 1 - (1 - p.loss) ** math.ceil(len(data) / SEGMENT):
+                    due += p.rto_ms / 1000
+                due = max(due, self.last_due)
+                kbps = p.up_kbps if self.up else p.down_kbps
+                if kbps:
+                    self.free_at = max(due, self.free_at) + len(data) * 8 / (kbps * 1000)
+                    due = self.free_at
+                self.last_due = due
+                self.queue.append((due, data))
+                self.queued += len(data)
+                self.wake.set()
+                while self.queued > QUEUE_LIMIT:
+                    self.drained.clear()
+                    await self.drained.wait()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.queue.append((0.0, None))
+            self.wake.set()
+
+    async def write(self) -> None:
+        link = self.link
+        stats = link.stats
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                while not self.queue:
+                    self.wake.clear()
+                    await self.wake.wait()
+                due, data = self.queue[0]
+                if data is None:
+                    if self.writer.can_write_eof():
+                        self.writer.write_eof()
+                    return
+                while True:
+                    wait = max(due, link.blocked_until) - loop.time()
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                self.queue.popleft()
+                self.writer.write(data)
+                await self.writer.drain()
+                self.queued -= len(data)
+                if self.up:
+                    stats.bytes_up += len(data)
+                else:
+                    stats.bytes_down += len(data)
+                if self.queued <= QUEUE_LIMIT:
+                    self.drained.set()
+        except (ConnectionError, OSError):
+            pass
+
+
+class Link:
+    """One proxied client connection."""
+
+    def __init__(self, proxy: "ImpairProxy", idx: int, profile: Profile, reader, writer):
+        self.proxy = proxy
+        self.idx = idx
+        self.profile = profile
+        self.stats = proxy.stats[profile.name]
+        self.rng = random.Random(proxy.seed * 1_000_003 + idx)
+        self.client = (reader, writer)
+        self.upstream: tuple | None = None
+        self.opened = proxy.clock()
+        self.phase, self.phase_key = proxy.phase_for(self, self.opened)
+        self.blocked_until = 0.0
+        self.closed_by: str | None = None    # whoever sent the first close frame
+        self.cause: str | None = None
+        self._task: asyncio.Task | None = None
+
+    async def run(self) -> None:
+        reader, writer = self.client
+        proxy = self.proxy
+        stats = self.stats
+        stats.accepted += 1
+        if self.phase.refuse:
+            self._finish(REFUSED)
+            _reset(writer)
+            return
+        try:
+            up_reader, up_writer = await asyncio.wait_for(
+                asyncio.open_connection(proxy.upstream_host, proxy.upstream_port), 10)
+        except (OSError, asyncio.TimeoutError):
+            self._finish(UPSTREAM_FAILED)
+            _reset(writer)
+            return
+        except asyncio.CancelledError:
+            self._finish(self.cause or CUT)   # cut while still connecting
+            return
+        self.upstream = (up_reader, up_writer)
+        for w in (writer, up_writer):
+            sock = w.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stats.open += 1
+        up = _Pipe(self, reader, up_writer, up=True)
+        down = _Pipe(self, up_reader, writer, up=False)
+        tasks = [asyncio.create_task(c) for c in (up.read(), up.write(), down.read(), down.write())]
+        try:
+            # Done when both directions have delivered their EOF, or the proxy cut the link.
+            await asyncio.gather(tasks[1], tasks[3])
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            stats.open -= 1
+            stats.connected_s += proxy.clock() - self.opened
+            if self.closed_by == SERVER_CLOSE:
+                stats.server_codes[down.sniffer.close_code] += 1
+            elif self.closed_by == CLIENT_CLOSE:
+                stats.client_codes[up.sniffer.close_code] += 1
+            self._finish(self.cause or self.closed_by or RESET)
+            for w in (writer, up_writer):
+                w.close()
+
+    def reset(self, cause: str) -> None:
+        """Abort both sides with a RST, as a dropped NAT mapping or a dead path would look."""
+        if self.cause is not None:
+            return
+        self.cause = cause
+        _reset(self.client[1])
+        if self.upstream is not None:
+            _reset(self.upstream[1])
+        if self._task is not None:
+            self._task.cancel()
+
+    def _finish(self, cause: str) -> None:
+        self.cause = cause
+        self.stats.ended[cause] += 1
+        self.proxy.links.pop(self.idx, None)
+
+
+def _reset(writer: asyncio.StreamWriter) -> None:
+    sock = writer.get_extra_info("socket")
+    try:
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    except OSError:
+        pass
+    writer.transport.abort()
+
+
+class ImpairProxy:
+    def __init__(self, listen: tuple[str, int], upstream: tuple[str, int], mix: list[tuple[Profile, float]],
+                 seed: int = 1):
+        self.listen = listen
+        self.upstream_host, self.upstream_port = upstream
+        self.mix = mix
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.links: dict[int, Link] = {}
+        self.stats: dict[str, ProfileStats] = {p.name: ProfileStats() for p, _ in mix}
+        self.events: list[tuple[float, str, str, int]] = []   # (t, profile, "cut"/"flaps", connections)
+        self.clock = time.monotonic
+        self.started = self.clock()
+        self._accepted = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._ticker: asyncio.Task | None = None
+
+    async def start(self) -> "ImpairProxy":
+        self.clock = asyncio.get_running_loop().time
+        self.started = self.clock()
+        self._server = await asyncio.start_server(self._accept, *self.listen, backlog=4096)
+        self.listen = self._server.sockets[0].getsockname()[:2]
+        self._ticker = asyncio.create_task(self._tick())
+        return self
+
+    async def stop(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+        if self._server is not None:
+            self._server.close()
+        for link in list(self.links.values()):
+            link.reset(STOPPED)
+        await asyncio.sleep(0.05)
+
+    def phase_for(self, link: Link, now: float) -> tuple[Phase, tuple[int, int]]:
+        base = link.opened if link.profile.clock == "connection" else self.started
+        return link.profile.phase_at(now - base)
+
+    async def _accept(self, reader, writer) -> None:
+        idx = self._accepted
+        self._accepted += 1
+        profiles, weights = zip(*self.mix)
+        link = Link(self, idx, self.rng.choices(profiles, weights)[0], reader, writer)
+        self.links[idx] = link
+        link._task = asyncio.current_task()
+        await link.run()
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(TICK_S)
+            now = self.clock()
+            cuts: Counter = Counter()
+            for link in list(self.links.values()):
+                phase, key = self.phase_for(link, now)
+                if key != link.phase_key:
+                    link.phase, link.phase_key = phase, key
+                    if phase.cut:
+                        link.reset(CUT)
+                        cuts[(link.profile.name, CUT)] += 1
+                        continue
+                if phase.blackout:
+                    link.blocked_until = max(link.blocked_until, now + 2 * TICK_S)
+                rng = link.rng
+                if phase.flaps_per_min and rng.random() < phase.flaps_per_min * TICK_S / 60:
+                    link.reset(FLAP)
+                    cuts[(link.profile.name, FLAP)] += 1
+                    continue
+                if phase.stalls_per_min and link.blocked_until < now \
+                        and rng.random() < phase.stalls_per_min * TICK_S / 60:
+                    link.blocked_until = now + phase.stall_ms / 1000 * rng.uniform(0.5, 1.5)
+                    link.stats.stalls += 1
+            for (name, cause), n in cuts.items():
+                self.events.append((now - self.started, name, cause, n))
+
+    def totals(self) -> ProfileStats:
+        total = ProfileStats()
+        for s in self.stats.values():
+            for name in ("accepted", "open", "bytes_up", "bytes_down", "stalls"):
+                setattr(total, name, getattr(total, name) + getattr(s, name))
+            total.connected_s += s.connected_s
+            total.ended.update(s.ended)
+            total.server_codes.update(s.server_codes)
+            total.client_codes.update(s.client_codes)
+        return total
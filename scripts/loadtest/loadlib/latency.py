@@ -0,0 +1,255 @@
+"""
+Input-to-state latency probes.
+
+The protocol has no input sequence numbers, so a probe input is tagged by
+its effect instead. A probe client flies straight until two consecutive
+gameStateUpdates show the same heading, then sends one playerInput aimed
+well off that heading. Player.setInput clamps the request to a turn of
+MAX_TURN_DELTA, and the next physics tick starts rotating the sperm, so the
+input is "reflected" by:
+
+  state  the first gameStateUpdate whose own angle has moved off the
+         pre-probe heading, in the probed direction, by more than rounding
+         (optimizePlayerData rounds angles to 0.01 rad);
+  trail  the first trailDelta carrying an own trail point that sits off the
+         pre-probe line of travel on the probed side.
+
+Latency is measured on the client's monotonic clock from just before
+ws.send() to the arrival of that frame, so it covers the send, the server's
+input handling, the wait for the next tick and the next broadcast (or trail
+delta) and the trip back. Only the server-relative goAtMs is used, so client
+and server clocks need not agree. Turns go towards the world centre, which
+keeps probes away from wall bounces; frames where the heading changed
+without a probe in flight hold the next probe back until it is steady again.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+from dataclasses import dataclass, field
+
+from . import protocol
+from .hdr import Histogram
+
+ANGLE_EPS = 0.02          # rad; twice the wire rounding
+TRAIL_EPS_PX = 2.0        # px off the line, plus 1% of the distance travelled (heading rounding)
+PROBE_TURN = 1.0          # rad asked for; the server grants MAX_TURN_DELTA
+PROBE_REACH = 400.0       # px from the sperm to the probe target
+PROBE_TIMEOUT = 2.0       # s before an unreflected probe counts as lost
+STEADY_FRAMES = 2
+
+
+def wrap(a: float) -> float:
+    return (a + math.pi) % (2 * math.pi) - math.pi
+
+
+@dataclass
+class ProbeStats:
+    state: Histogram = field(default_factory=Histogram)
+    trail: Histogram = field(default_factory=Histogram)
+    first: Histogram = field(default_factory=Histogram)
+    frames: Histogram = field(default_factory=lambda: Histogram(highest_us=1000, digits=2))  # counts, not us
+    sent: int = 0
+    lost_state: int = 0
+    lost_trail: int = 0
+    aborted: int = 0          # round ended or player died with a probe in flight
+    connect_failures: int = 0
+    rounds: int = 0
+
+    def merge(self, other: "ProbeStats") -> None:
+        for name in ("state", "trail", "first", "frames"):
+            getattr(self, name).merge(getattr(other, name))
+        for name in ("sent", "lost_state", "lost_trail", "aborted", "connect_failures", "rounds"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+@dataclass
+class _InFlight:
+    sent_at: float
+    sign: int
+    angle: float
+    origin: tuple[float, float]
+    state_frames: int = 0
+    state_at: float | None = None
+    trail_at: float | None = None
+
+
+class Probe:
+    """One probe client; runs until `stop` is set."""
+
+    def __init__(self, idx: int, url: str, stats: ProbeStats, *, trail_delta: bool = True, tier: int = 0,
+                 mode: str = "practice", gap: tuple[float, float] = (0.2, 0.6), seed: int = 1):
+        self.idx = idx
+        self.url = url
+        self.stats = stats
+        self.trail_delta = trail_delta
+        self.tier = tier
+        self.mode = mode
+        self.gap = gap
+        self.rng = random.Random(seed * 7919 + idx)
+        self.player_id: str | None = None
+        self.go_at: float | None = None          # loop time when inputs start counting
+        self.alive = False
+        self.angle: float | None = None
+        self.pos: tuple[float, float] | None = None
+        self.steady = 0
+        self.inflight: _InFlight | None = None
+        self.next_probe_at = 0.0
+
+    async def run(self, stop: asyncio.Event) -> None:
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import ConnectionClosed
+
+        loop = asyncio.get_running_loop()
+        try:
+            ws = await connect(self.url, compression=None, open_timeout=10, ping_interval=None, close_timeout=2,
+                               max_size=16 * 1024 * 1024)
+        except Exception:
+            self.stats.connect_failures += 1
+            return
+        async with ws:
+            for text in (protocol.guest_login(f"latency_{self.idx:03d}"), protocol.client_hello(self.trail_delta),
+                         protocol.join_lobby(self.tier, self.mode)):
+                await ws.send(text)
+            driver = asyncio.create_task(self._drive(ws, stop))
+            try:
+                while not stop.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(decode=False), 0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    now = loop.time()
+                    kind = protocol.peek_type(raw)
+                    if kind == "gameStateUpdate":
+                        self._on_state(json.loads(raw).get("payload") or {}, now)
+                    elif kind == "trailDelta" and self.inflight is not None:
+                        self._on_trail(json.loads(raw).get("payload") or {}, now)
+                    elif kind == "authenticated":
+                        self.player_id = (json.loads(raw).get("payload") or {}).get("playerId")
+                    elif kind == "roundEnd":
+                        self._abort()
+                        self.go_at = None
+                        self.alive = False
+                        self.stats.rounds += 1
+                        await ws.send(protocol.join_lobby(self.tier, self.mode))
+                    self._expire(now)
+            except ConnectionClosed:
+                pass
+            finally:
+                driver.cancel()
+                await asyncio.gather(driver, return_exceptions=True)
+
+    # Frames --------------------------------------------------------------------
+
+    def _on_state(self, payload: dict, now: float) -> None:
+        if self.go_at is None and isinstance(payload.get("goAtMs"), (int, float)) \
+                and isinstance(payload.get("timestamp"), (int, float)):
+            # Server-relative: how long after this frame the server accepts inputs.
+            self.go_at = now + max(0.0, payload["goAtMs"] - payload["timestamp"]) / 1000 + 0.05
+        me = next((p for p in payload.get("players") or () if p.get("id") == self.player_id), None)
+        if me is None:
+            return
+        sperm = me.get("sperm") or {}
+        pos = sperm.get("position") or {}
+        angle = sperm.get("angle")
+        if not isinstance(angle, (int, float)):
+            return
+        self.alive = bool(me.get("isAlive", True))
+        if not self.alive:
+            self._abort()
+        prev, self.angle = self.angle, float(angle)
+        self.pos = (float(pos.get("x", 0.0)), float(pos.get("y", 0.0)))
+        self.steady = self.steady + 1 if prev is not None and abs(wrap(self.angle - prev)) < ANGLE_EPS / 2 else 0
+
+        f = self.inflight
+        if f is not None and f.state_at is None:
+            f.state_frames += 1
+            if wrap(self.angle - f.angle) * f.sign >= ANGLE_EPS:
+                f.state_at = now
+                self._record("state", f, now)
+                self.stats.frames.record(f.state_frames)
+                self._settle(now)
+
+    def _on_trail(self, payload: dict, now: float) -> None:
+        f = self.inflight
+        if f is None or f.trail_at is not None:
+            return
+        for delta in payload.get("deltas") or ():
+            if delta.get("playerId") != self.player_id:
+                continue
+            ux, uy = math.cos(f.angle), math.sin(f.angle)
+            for point in delta.get("points") or ():
+                dx, dy = point.get("x", 0.0) - f.origin[0], point.get("y", 0.0) - f.origin[1]
+                along = dx * ux + dy * uy
+                side = (ux * dy - uy * dx) * f.sign
+                if along > 0 and side > TRAIL_EPS_PX + 0.01 * along:
+                    f.trail_at = now
+                    self._record("trail", f, now)
+                    self._settle(now)
+                    return
+
+    def _record(self, channel: str, f: _InFlight, now: float) -> None:
+        getattr(self.stats, channel).record((now - f.sent_at) * 1e6)
+        if channel == "state" and f.trail_at is None or channel == "trail" and f.state_at is None:
+            self.stats.first.record((now - f.sent_at) * 1e6)
+
+    def _settle(self, now: float) -> None:
+        f = self.inflight
+        if f is not None and f.state_at is not None and (f.trail_at is not None or not self.trail_delta):
+            self.inflight = None
+            self.steady = 0
+            self.next_probe_at = now + self.rng.uniform(*self.gap)
+
+    def _expire(self, now: float) -> None:
+        f = self.inflight
+        if f is None or now - f.sent_at < PROBE_TIMEOUT:
+            return
+        if f.state_at is None:
+            self.stats.lost_state += 1
+        if self.trail_delta and f.trail_at is None:
+            self.stats.lost_trail += 1
+        self.inflight = None
+        self.steady = 0
+        self.next_probe_at = now + self.rng.uniform(*self.gap)
+
+    def _abort(self) -> None:
+        if self.inflight is not None:
+            self.stats.aborted += 1
+            self.inflight = None
+        self.steady = 0
+
+    # Probing -------------------------------------------------------------------
+
+    async def _drive(self, ws, stop: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        cruising = False
+        while not stop.is_set():
+            await asyncio.sleep(0.01)
+            now = loop.time()
+            if self.go_at is None or now < self.go_at or not self.alive or self.pos is None:
+                cruising = False
+                continue
+            if not cruising:
+                # Straight ahead at speed first, so the trail has a line to leave.
+                await ws.send(self._input_towards(self.angle, accelerate=True))
+                cruising = True
+                self.steady = 0
+                continue
+            if self.inflight is not None or self.steady < STEADY_FRAMES or now < self.next_probe_at:
+                continue
+            x, y = self.pos
+            to_centre = wrap(math.atan2(protocol.WORLD_HEIGHT / 2 - y, protocol.WORLD_WIDTH / 2 - x) - self.angle)
+            sign = 1 if to_centre > 0 else -1
+            if abs(to_centre) < 0.1:
+                sign = self.rng.choice((-1, 1))
+            text = self._input_towards(self.angle + sign * PROBE_TURN, accelerate=True)
+            self.inflight = _InFlight(sent_at=loop.time(), sign=sign, angle=self.angle, origin=(x, y))
+            self.stats.sent += 1
+            await ws.send(text)
+
+    def _input_towards(self, heading: float, accelerate: bool) -> str:
+        x, y = self.pos
+        return protocol.player_input(round(x + PROBE_REACH * math.cos(heading), 2),
+                                     round(y + PROBE_REACH * math.sin(heading), 2), accelerate)
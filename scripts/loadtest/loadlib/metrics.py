@@ -0,0 +1,138 @@
+"""
+High-frequency poller for /api/metrics and /api/ws-healthz.
+
+Each endpoint gets its own keep-alive connection and its own fixed-rate loop,
+so a slow /api/metrics never delays the ws-healthz sample. A tick that is
+still waiting on the previous response is skipped and counted as missed
+instead of queuing up behind it. Samples are stamped with the midpoint of
+the request, which is when the server most likely produced them.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+
+from .http import HttpClient, HttpError
+from .series import COUNTER, GAUGE, SeriesStore
+
+METRICS_PATH = "/api/metrics"
+WS_HEALTHZ_PATH = "/api/ws-healthz"
+
+# /api/ws-healthz JSON field -> series name
+WS_HEALTHZ_FIELDS = {
+    "total": "ws_healthz_total",
+    "alive": "ws_healthz_alive",
+    "avgLatencyMs": "ws_healthz_avg_latency_ms",
+}
+
+
+def parse_prometheus(text: str) -> tuple[dict[str, float], dict[str, str]]:
+    """({name: value}, {name: kind}) from the text exposition format; labels stay in the name."""
+    values: dict[str, float] = {}
+    kinds: dict[str, str] = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            parts = line.split()
+            if len(parts) >= 4 and parts[1] == "TYPE":
+                kinds[parts[2]] = COUNTER if parts[3] == "counter" else GAUGE
+            continue
+        if "}" in line:
+            name, rest = line.rsplit("}", 1)
+            name += "}"
+        else:
+            name, _, rest = line.partition(" ")
+        try:
+            values[name.strip()] = float(rest.split()[0])
+        except (ValueError, IndexError):
+            continue
+    return values, kinds
+
+
+@dataclass
+class EndpointStats:
+    path: str
+    ok: int = 0
+    errors: int = 0
+    missed: int = 0
+    last_error: str = ""
+
+
+class Scraper:
+    def __init__(self, base_url: str, store: SeriesStore, interval: float = 0.1,
+                 headers: dict[str, str] | None = None, timeout: float | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.store = store
+        self.interval = interval
+        self.headers = headers or {}
+        self.timeout = timeout if timeout is not None else max(1.0, interval * 10)
+        self.stats = {path: EndpointStats(path) for path in (METRICS_PATH, WS_HEALTHZ_PATH)}
+        self._stop = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def run(self, seconds: float = 0) -> None:
+        """Poll until stop() or for `seconds` (0 = forever)."""
+        tasks = [asyncio.create_task(self._poll(path)) for path in self.stats]
+        try:
+            if seconds:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), seconds)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self._stop.wait()
+        finally:
+            self._stop.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _poll(self, path: str) -> None:
+        stats = self.stats[path]
+        client = HttpClient(self.base_url, self.headers, timeout=self.timeout)
+        loop = asyncio.get_running_loop()
+        latency_series = f"scrape_{path.rsplit('/', 1)[-1].replace('-', '_')}_ms"
+        next_tick = loop.time()
+        try:
+            while not self._stop.is_set():
+                started = time.time()
+                try:
+                    status, body = await client.get(path)
+                    if status != 200:
+                        raise HttpError(f"GET {path}: HTTP {status}")
+                    finished = time.time()
+                    self._record(path, (started + finished) / 2, body)
+                    self.store.add(finished, latency_series, (finished - started) * 1000)
+                    stats.ok += 1
+                except (HttpError, OSError, ValueError) as e:
+                    stats.errors += 1
+                    stats.last_error = str(e)
+
+                next_tick += self.interval
+                now = loop.time()
+                if now > next_tick:
+                    skipped = int((now - next_tick) / self.interval) + 1
+                    stats.missed += skipped
+                    next_tick += skipped * self.interval
+                try:
+                    await asyncio.wait_for(self._stop.wait(), next_tick - now)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await client.close()
+
+    def _record(self, path: str, t: float, body: bytes) -> None:
+        if path == METRICS_PATH:
+            values, kinds = parse_prometheus(body.decode("utf-8", "replace"))
+            for name, value in values.items():
+                self.store.add(t, name, value, kinds.get(name, GAUGE))
+            return
+        data = json.loads(body)
+        for field, name in WS_HEALTHZ_FIELDS.items():
+            value = data.get(field)
+            if isinstance(value, (int, float)):
+                self.store.add(t, name, float(value), GAUGE)
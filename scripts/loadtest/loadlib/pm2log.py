@@ -0,0 +1,371 @@
+"""
+Incremental, rotation-safe reading and aggregation of the server's pm2 logs.
+
+ops/pm2/ecosystem.config.js sends the server's stdout and stderr to
+.pm2/logs/spermrace-out.log and spermrace-err.log (`time: true` puts a
+timestamp and ": " before every line). Those hold two kinds of line:
+
+  - console.log text, usually tagged: "[DB] ✅ Recorded game: ...",
+    "[PAYMENT] ...", "[ELO] ...", "[ABUSE] ..."; stack traces follow
+    errors on indented "    at ..." lines
+  - with LOG_JSON=true, one JSON object per HTTP request:
+    {"level","ts","requestId","method","url","status","durationMs","ip"}
+
+The pipeline is a chain of generators, so memory stays flat whatever the
+size of the log: `LogSource.read()` yields complete lines from the saved
+byte offset on, `parse()` turns them into `Record`s, and `Analyzer.feed()`
+folds those into per-tag and per-route counters, per-minute buckets and
+latency histograms of fixed size. Offsets and aggregates round-trip through
+`to_state()` / `from_state()`, so the next run only reads what was added.
+
+Rotation (pm2-logrotate, or logrotate with copytruncate) is recognised by
+the log's inode changing, by it shrinking below the saved offset, or by its
+first KiB no longer matching what was there before. In each case the rest of
+the old file is read from the rotated copy next to it (plain or .gz) before
+the new file is started from byte 0.
+"""
+from __future__ import annotations
+
+import calendar
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+
+from .hdr import Histogram
+
+READ_BLOCK = 1 << 20
+HEAD_BYTES = 1024
+MINUTES_KEPT = 24 * 60          # per-minute buckets kept per tag
+MAX_ROUTES = 200                # routes beyond this are folded into "(other)"
+HTTP_TAG = "HTTP"
+UNTAGGED = "-"
+
+_PM2_TIME = re.compile(rb"^(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})(?:\.\d+)?(Z|[+-]\d{2}:?\d{2})?: ")
+_TAG = re.compile(rb"^\W{0,4}\[([A-Z][A-Z0-9_]{1,23})\]")
+_MS = re.compile(rb"(\d+(?:\.\d+)?)\s?ms\b")
+_FAILURE = re.compile(rb"fail|error|\xe2\x9d\x8c", re.IGNORECASE)    # \xe2\x9d\x8c is the ❌ the server logs
+_WALLET_SEGMENT = re.compile(r"/[1-9A-HJ-NP-Za-km-z]{32,44}(?=/|$)")
+_NUMBER_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+@dataclass
+class Record:
+    ts: float                   # seconds since the epoch (pm2 prefix, JSON ts, or read time)
+    stream: str                 # "out" | "err"
+    tag: str
+    failed: bool
+    latency_ms: float | None = None
+    route: str | None = None
+    status: int | None = None
+
+
+# Reading ------------------------------------------------------------------------------
+
+
+def _head(path: Path, n: int = HEAD_BYTES) -> bytes:
+    opener = gzip.open if path.suffix == ".gz" else open
+    try:
+        with opener(path, "rb") as f:
+            return f.read(n)
+    except (OSError, EOFError):
+        return b""
+
+
+def _digest(path: Path, n: int) -> str:
+    return hashlib.sha1(_head(path, n)).hexdigest()
+
+
+@dataclass
+class LogSource:
+    """One log file and how far it has been read."""
+    path: Path
+    stream: str
+    inode: int = 0
+    offset: int = 0
+    head: str = ""              # sha1 of the first head_len bytes, to spot copytruncate
+    head_len: int = 0
+    rotations: int = 0
+
+    def to_state(self) -> dict:
+        return {"path": str(self.path), "stream": self.stream, "inode": self.inode, "offset": self.offset,
+                "head": self.head, "head_len": self.head_len, "rotations": self.rotations}
+
+    @classmethod
+    def from_state(cls, data: dict) -> "LogSource":
+        return cls(Path(data["path"]), data["stream"], data.get("inode", 0), data.get("offset", 0),
+                   data.get("head", ""), data.get("head_len", 0), data.get("rotations", 0))
+
+    def _rotated_copy(self) -> Path | None:
+        """The sibling that now holds the bytes read so far: same inode, or same first KiB."""
+        stem = self.path.name[: -len(self.path.suffix)] if self.path.suffix else self.path.name
+        candidates = [p for p in self.path.parent.iterdir()
+                      if p != self.path and (p.name.startswith(stem + "__") or p.name.startswith(self.path.name + "."))]
+        candidates.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+        for p in candidates:
+            if p.suffix != ".gz" and p.stat().st_ino == self.inode:
+                return p
+        for p in candidates:
+            if self.head_len and _digest(p, self.head_len) == self.head:
+                return p
+        return None
+
+    def _read_from(self, path: Path, final: bool) -> Iterator[bytes]:
+        """
+        Lines of `path` after `self.offset`, advancing the offset past each line
+        as it is handed out, so state saved between two lines is exact. Without
+        `final`, a trailing partial line is left for the next read.
+        """
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rb") as f:
+            f.seek(self.offset)     # gzip seeks by decompressing up to it
+            pending = b""
+            while True:
+                block = f.read(READ_BLOCK)
+                if not block:
+                    break
+                block = pending + block
+                cut = block.rfind(b"\n")
+                if cut < 0:
+                    pending = block
+                    continue
+                pending = block[cut + 1:]
+                for line in block[:cut].split(b"\n"):
+                    self.offset += len(line) + 1
+                    yield line
+            if final and pending:
+                self.offset += len(pending)
+                yield pending
+
+    def read(self) -> Iterator[bytes]:
+        """Every complete line added since the last read, following a rotation if there was one."""
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return
+        if self.inode and st.st_ino != self.inode:
+            rotated = True
+        elif st.st_size < self.offset:
+            rotated = True
+        elif self.head_len:
+            rotated = _digest(self.path, self.head_len) != self.head
+        else:
+            rotated = False
+        if rotated:
+            # The inode is only updated once the old file is done with, so an
+            # interrupted catch-up finds the rotated copy again next time.
+            old = self._rotated_copy()
+            if old is not None:
+                yield from self._read_from(old, final=True)
+            self.rotations += 1
+            self.offset = 0
+            self.head, self.head_len = "", 0
+        self.inode = st.st_ino
+        yield from self._read_from(self.path, final=False)
+        if self.head_len < min(HEAD_BYTES, self.offset):
+            self.head_len = min(HEAD_BYTES, self.offset)
+            self.head = _digest(self.path, self.head_len)
+
+
+# Parsing ------------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=256)
+def _prefix_time(stamp: bytes, tz: bytes | None) -> float:
+    """Epoch seconds of a pm2 timestamp; cached, as every line in the same second shares one."""
+    parsed = time.strptime(stamp.decode().replace(" ", "T"), "%Y-%m-%dT%H:%M:%S")
+    if tz is None:
+        return time.mktime(parsed)           # pm2 writes local time without an offset
+    epoch = calendar.timegm(parsed)
+    if tz == b"Z":
+        return epoch
+    sign = 1 if tz[:1] == b"+" else -1
+    digits = tz[1:].replace(b":", b"")
+    return epoch - sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+
+
+def normalise_route(url: str) -> str:
+    path = url.split("?", 1)[0]
+    path = _WALLET_SEGMENT.sub("/:wallet", path)
+    return _NUMBER_SEGMENT.sub("/:n", path)
+
+
+def parse(lines: Iterator[bytes], stream: str) -> Iterator[Record]:
+    """Records from raw lines; stack-trace continuation lines are dropped."""
+    for line in lines:
+        if not line:
+            continue
+        now = None
+        m = _PM2_TIME.match(line)
+        if m:
+            try:
+                now = _prefix_time(m.group(1), m.group(2))
+            except ValueError:
+                now = None
+            line = line[m.end():]
+        if line[:1] in (b" ", b"\t") or line.startswith(b"}") or not line.strip():
+            continue        # "    at fn (file:line)" and the tail of multi-line error objects
+        if line[:1] == b"{":
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = None
+            if isinstance(entry, dict):
+                ts = entry.get("ts")
+                ts = ts / 1000.0 if isinstance(ts, (int, float)) else (now or time.time())
+                if "durationMs" in entry and "url" in entry:
+                    status = entry.get("status") if isinstance(entry.get("status"), int) else 0
+                    yield Record(ts, stream, HTTP_TAG, status >= 500, float(entry["durationMs"]),
+                                 normalise_route(str(entry["url"])), status)
+                else:
+                    level = str(entry.get("level", ""))
+                    msg = str(entry.get("msg", "")).encode()
+                    tm = _TAG.match(msg)
+                    yield Record(ts, stream, tm.group(1).decode() if tm else UNTAGGED,
+                                 level in ("error", "fatal") or stream == "err")
+                continue
+        tm = _TAG.match(line)
+        ms = _MS.search(line)
+        yield Record(now or time.time(), stream, tm.group(1).decode() if tm else UNTAGGED,
+                     stream == "err" or bool(_FAILURE.search(line)), float(ms.group(1)) if ms else None)
+
+
+# Aggregation ----------------------------------------------------------------------------
+
+
+def _histogram() -> Histogram:
+    return Histogram(highest_us=600_000_000, digits=2)     # up to 10 min, 1% buckets, ~30 KB
+
+
+@dataclass
+class TagStats:
+    count: int = 0
+    errors: int = 0
+    stderr: int = 0
+    minutes: dict[int, int] = field(default_factory=dict)       # minute (epoch // 60) -> lines
+    latency: Histogram | None = None
+
+    def add(self, rec: Record) -> None:
+        self.count += 1
+        self.errors += rec.failed
+        self.stderr += rec.stream == "err"
+        minute = int(rec.ts // 60)
+        self.minutes[minute] = self.minutes.get(minute, 0) + 1
+        if rec.latency_ms is not None:
+            if self.latency is None:
+                self.latency = _histogram()
+            self.latency.record_ms(rec.latency_ms)
+
+    def per_minute(self, window_min: int, now: float) -> float:
+        last = int(now // 60)
+        return sum(n for m, n in self.minutes.items() if last - window_min < m <= last) / window_min
+
+    def trim(self, now: float) -> None:
+        oldest = int(now // 60) - MINUTES_KEPT
+        for m in [m for m in self.minutes if m <= oldest]:
+            del self.minutes[m]
+
+    def to_state(self) -> dict:
+        return {"count": self.count, "errors": self.errors, "stderr": self.stderr,
+                "minutes": {str(k): v for k, v in self.minutes.items()},
+                "latency": self.latency.to_dict() if self.latency else None}
+
+    @classmethod
+    def from_state(cls, data: dict) -> "TagStats":
+        return cls(data["count"], data["errors"], data.get("stderr", 0),
+                   {int(k): v for k, v in data.get("minutes", {}).items()},
+                   Histogram.from_dict(data["latency"]) if data.get("latency") else None)
+
+
+@dataclass
+class RouteStats:
+    count: int = 0
+    statuses: Counter = field(default_factory=Counter)      # "2xx", "4xx", "429", "5xx"
+    latency: Histogram = field(default_factory=_histogram)
+
+    def add(self, rec: Record) -> None:
+        self.count += 1
+        status = rec.status or 0
+        self.statuses["429" if status == 429 else f"{status // 100}xx"] += 1
+        self.latency.record_ms(rec.latency_ms or 0.0)
+
+    def to_state(self) -> dict:
+        return {"count": self.count, "statuses": dict(self.statuses), "latency": self.latency.to_dict()}
+
+    @classmethod
+    def from_state(cls, data: dict) -> "RouteStats":
+        return cls(data["count"], Counter(data.get("statuses", {})), Histogram.from_dict(data["latency"]))
+
+
+class Analyzer:
+    def __init__(self):
+        self.tags: dict[str, TagStats] = {}
+        self.routes: dict[str, RouteStats] = {}
+        self.lines = 0
+        self.first_ts: float | None = None
+        self.last_ts: float | None = None
+
+    def feed(self, records: Iterator[Record]) -> int:
+        n = 0
+        tags, routes = self.tags, self.routes
+        for rec in records:
+            n += 1
+            stats = tags.get(rec.tag)
+            if stats is None:
+                stats = tags[rec.tag] = TagStats()
+            stats.add(rec)
+            if rec.route is not None:
+                route = rec.route if rec.route in routes or len(routes) < MAX_ROUTES else "(other)"
+                r = routes.get(route)
+                if r is None:
+                    r = routes[route] = RouteStats()
+                r.add(rec)
+            if self.first_ts is None or rec.ts < self.first_ts:
+                self.first_ts = rec.ts
+            if self.last_ts is None or rec.ts > self.last_ts:
+                self.last_ts = rec.ts
+        self.lines += n
+        return n
+
+    def trim(self, now: float) -> None:
+        for stats in self.tags.values():
+            stats.trim(now)
+
+    def to_state(self) -> dict:
+        return {"lines": self.lines, "first_ts": self.first_ts, "last_ts": self.last_ts,
+                "tags": {k: v.to_state() for k, v in self.tags.items()},
+                "routes": {k: v.to_state() for k, v in self.routes.items()}}
+
+    @classmethod
+    def from_state(cls, data: dict) -> "Analyzer":
+        a = cls()
+        a.lines = data.get("lines", 0)
+        a.first_ts, a.last_ts = data.get("first_ts"), data.get("last_ts")
+        a.tags = {k: TagStats.from_state(v) for k, v in data.get("tags", {}).items()}
+        a.routes = {k: RouteStats.from_state(v) for k, v in data.get("routes", {}).items()}
+        return a
+
+
+def save_state(path: Path, sources: list[LogSource], analyzer: Analyzer) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"version": 1, "saved": time.time(), "sources": [s.to_state() for s in sources],
+                               "analyzer": analyzer.to_state()}, separators=(",", ":")))
+    os.replace(tmp, path)
+
+
+def load_state(path: Path) -> tuple[list[LogSource], Analyzer] | None:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != 1:
+        return None
+    return [LogSource.from_state(s) for s in data["sources"]], Analyzer.from_state(data["analyzer"])
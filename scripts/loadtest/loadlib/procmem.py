@@ -0,0 +1,252 @@
+"""
+Memory and CPU of one process from /proc, and what the samples say about leaks.
+
+pm2 restarts spermrace-server-ws when its RSS passes max_memory_restart
+(500M in ops/pm2/ecosystem.config.js). `ProcSampler` reads the three files
+that matter for that, from file descriptors kept open between samples:
+
+  /proc/<pid>/status        VmRSS (what pm2 compares), RssAnon, RssFile, VmHWM, VmSwap, Threads
+  /proc/<pid>/stat          utime + stime (CPU) and page faults
+  /proc/<pid>/smaps_rollup  Pss_Anon, Private_Dirty; costs a walk over every mapping,
+                            so it is read less often than the other two
+
+`analyse()` takes one row per step, each with memory next to the load at that
+moment (players, lobbies), and splits the run into load and idle phases. It
+fits memory against players over the load phases (MB per player, and where
+that puts the 500M limit), and compares every idle phase after load with the
+idle baseline before it. V8 gives memory back lazily, so an idle phase is
+judged on its second half, and a small residue is tolerated. Memory that
+stays up after lobbies have ended, or ends a little higher after every cycle,
+points at something that outlives the players (StateHistory snapshots,
+ObjectPool growth, maps keyed by player or lobby) rather than at player count.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+STATUS_FIELDS = {"VmRSS": "rss_kb", "RssAnon": "anon_kb", "RssFile": "file_kb", "RssShmem": "shmem_kb",
+                 "VmHWM": "hwm_kb", "VmSwap": "swap_kb", "Threads": "threads"}
+SMAPS_FIELDS = {"Pss": "pss_kb", "Pss_Anon": "pss_anon_kb", "Private_Dirty": "private_dirty_kb",
+                "Anonymous": "anonymous_kb", "SwapPss": "swap_pss_kb"}
+
+# Defaults for analyse(); the CLI exposes them.
+TOLERANCE_MB = 16.0             # idle residue above baseline that is not worth a flag
+RETURN_SHARE = 0.25             # ... nor is one below this share of the load phase's rise
+DRIFT_MB_PER_MIN = 2.0          # growth at steady players that counts as drift
+STEADY_SHARE = 0.95             # rows with players within 5% of the phase peak are "steady"
+
+
+_WRAPPERS = {"sh", "bash", "dash", "zsh", "timeout", "sudo", "env", "nohup"}
+
+
+class ProcessGone(Exception):
+    """The process exited (or pm2 restarted it under a new pid)."""
+
+
+def _read(fd: int) -> bytes:
+    os.lseek(fd, 0, os.SEEK_SET)
+    chunks = []
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+class ProcSampler:
+    def __init__(self, pid: int):
+        self.pid = pid
+        base = Path(f"/proc/{pid}")
+        try:
+            self._status = os.open(base / "status", os.O_RDONLY)
+            self._stat = os.open(base / "stat", os.O_RDONLY)
+        except FileNotFoundError:
+            raise ProcessGone(f"no process {pid}") from None
+        try:
+            self._smaps = os.open(base / "smaps_rollup", os.O_RDONLY)
+        except OSError:
+            self._smaps = None      # kernel < 4.14, or another user's process without ptrace access
+        self.tick = os.sysconf("SC_CLK_TCK")
+
+    def close(self) -> None:
+        for fd in (self._status, self._stat, self._smaps):
+            if fd is not None:
+                os.close(fd)
+
+    @property
+    def has_smaps(self) -> bool:
+        return self._smaps is not None
+
+    def sample(self) -> dict:
+        """status + stat: memory in kB, cpu_s (utime + stime), minflt, majflt."""
+        try:
+            status = _read(self._status)
+            stat = _read(self._stat)
+        except (ProcessLookupError, FileNotFoundError):
+            raise ProcessGone(f"process {self.pid} exited") from None
+        if not status:
+            raise ProcessGone(f"process {self.pid} exited")
+        out = {}
+        for line in status.split(b"\n"):
+            name, _, rest = line.partition(b":")
+            key = STATUS_FIELDS.get(name.decode())
+            if key:
+                out[key] = int(rest.split()[0])
+        fields = stat.rpartition(b")")[2].split()
+        out["minflt"] = int(fields[7])
+        out["majflt"] = int(fields[9])
+        out["cpu_s"] = (int(fields[11]) + int(fields[12])) / self.tick
+        return out
+
+    def sample_smaps(self) -> dict:
+        if self._smaps is None:
+            return {}
+        try:
+            data = _read(self._smaps)
+        except (ProcessLookupError, FileNotFoundError, PermissionError):
+            return {}
+        out = {}
+        for line in data.split(b"\n"):
+            name, _, rest = line.partition(b":")
+            key = SMAPS_FIELDS.get(name.decode())
+            if key and rest.strip():
+                out[key] = int(rest.split()[0])
+        return out
+
+
+def find_pid(spec: str) -> int | None:
+    """A pid, a pm2 app name (pm2 jlist), or a substring of the command line."""
+    if spec.isdigit():
+        return int(spec)
+    if shutil.which("pm2"):
+        try:
+            apps = json.loads(subprocess.run(["pm2", "jlist"], capture_output=True, text=True, timeout=10).stdout)
+            for app in apps:
+                if app.get("name") == spec and app.get("pid"):
+                    return int(app["pid"])
+        except (OSError, ValueError, subprocess.SubprocessError):
+            pass
+    me = os.getpid()
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit() or int(entry.name) == me:
+            continue
+        try:
+            argv = (entry / "cmdline").read_bytes().split(b"\0")
+        except OSError:
+            continue
+        cmdline = b" ".join(argv).decode(errors="replace")
+        # Skip shells and wrappers whose own command line mentions the server (pm2's bash -c, timeout ...).
+        if spec in cmdline and "proc-sample" not in cmdline and os.path.basename(argv[0].decode(errors="replace")) not in _WRAPPERS:
+            return int(entry.name)
+    return None
+
+
+# Analysis -------------------------------------------------------------------------------
+
+
+def fit(xs: list[float], ys: list[float]) -> dict | None:
+    """Least-squares line: slope, intercept, r2."""
+    n = len(xs)
+    if n < 3:
+        return None
+    mx, my = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return None
+    sxy = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    syy = sum((y - my) ** 2 for y in ys)
+    slope = sxy / sxx
+    return {"slope": slope, "intercept": my - slope * mx, "r2": (sxy * sxy / (sxx * syy)) if syy else 1.0, "n": n}
+
+
+def median(values: list[float]) -> float | None:
+    if not values:
+        return None
+    s = sorted(values)
+    mid = len(s) // 2
+    return s[mid] if len(s) % 2 else (s[mid - 1] + s[mid]) / 2
+
+
+def split_phases(rows: list[dict]) -> list[dict]:
+    """Runs of rows with load (players or lobbies) and without."""
+    phases: list[dict] = []
+    for i, row in enumerate(rows):
+        kind = "load" if (row.get("players") or 0) > 0 or (row.get("lobbies") or 0) > 0 else "idle"
+        if phases and phases[-1]["kind"] == kind:
+            phases[-1]["end"] = i + 1
+        else:
+            phases.append({"kind": kind, "start": i, "end": i + 1})
+    return phases
+
+
+def analyse(rows: list[dict], limit_mb: float = 500.0, tolerance_mb: float = TOLERANCE_MB,
+            return_share: float = RETURN_SHARE, drift_mb_per_min: float = DRIFT_MB_PER_MIN) -> dict:
+    """
+    Phases, fits and flags from step rows with t, players, lobbies, rss_mb and
+    anon_mb. Leak checks use anon memory (the JS heap and native buffers);
+    the limit projection uses RSS, which is what pm2 compares.
+    """
+    phases = split_phases(rows)
+    flags: list[dict] = []
+    out = {"phases": [], "flags": flags}
+    load_rows = [r for p in phases if p["kind"] == "load" for r in rows[p["start"]:p["end"]]]
+
+    baseline = None
+    for p in phases:
+        seg = rows[p["start"]:p["end"]]
+        info = {"kind": p["kind"], "t0": seg[0]["t"], "t1": seg[-1]["t"], "rows": len(seg),
+                "peak_players": max((r.get("players") or 0) for r in seg),
+                "peak_lobbies": max((r.get("lobbies") or 0) for r in seg),
+                "peak_rss_mb": max(r.get("rss_max_mb", r["rss_mb"]) for r in seg),
+                "peak_anon_mb": max(r["anon_mb"] for r in seg)}
+        if p["kind"] == "idle":
+            tail = seg[len(seg) // 2:]
+            info["settled_anon_mb"] = median([r["anon_mb"] for r in tail])
+            info["settled_rss_mb"] = median([r["rss_mb"] for r in tail])
+            if baseline is None:
+                baseline = info["settled_anon_mb"]
+                info["baseline"] = True
+            else:
+                residue = info["settled_anon_mb"] - baseline
+                prev_load = next((q for q in reversed(out["phases"]) if q["kind"] == "load"), None)
+                rise = (prev_load["peak_anon_mb"] - baseline) if prev_load else 0.0
+                info["residue_mb"] = residue
+                info["returned_share"] = min(1.0, max(0.0, 1 - residue / rise)) if rise > 0 else None
+                if residue > max(tolerance_mb, return_share * rise):
+                    flags.append({"flag": "not_returned", "t": info["t0"],
+                                  "detail": f"{residue:.1f} MB above the idle baseline after lobbies ended "
+                                            f"({rise:.1f} MB rise under load)"})
+        else:
+            peak = info["peak_players"]
+            steady = [r for r in seg if peak and (r.get("players") or 0) >= STEADY_SHARE * peak]
+            drift = fit([r["t"] / 60 for r in steady], [r["anon_mb"] for r in steady])
+            info["steady_rows"] = len(steady)
+            info["steady_drift_mb_per_min"] = drift["slope"] if drift else None
+            per_player = fit([r.get("players") or 0 for r in seg], [r["anon_mb"] for r in seg])
+            info["anon_kb_per_player"] = per_player["slope"] * 1024 if per_player else None
+            if drift and len(steady) >= 30 and drift["slope"] > drift_mb_per_min:
+                flags.append({"flag": "drift", "t": info["t0"],
+                              "detail": f"+{drift['slope']:.1f} MB/min at a steady {peak} players"})
+        out["phases"].append(info)
+
+    # Every cycle ending higher than the last is the clearest leak signature.
+    residues = [p["residue_mb"] for p in out["phases"] if "residue_mb" in p]
+    if len(residues) >= 2 and all(b - a > tolerance_mb / 2 for a, b in zip(residues, residues[1:])):
+        flags.append({"flag": "ratchet", "t": None,
+                      "detail": "idle memory ends higher after every load cycle: "
+                                + " -> ".join(f"+{r:.0f}" for r in residues) + " MB"})
+
+    out["baseline_anon_mb"] = baseline
+    anon = fit([r.get("players") or 0 for r in load_rows], [r["anon_mb"] for r in load_rows])
+    rss = fit([r.get("players") or 0 for r in load_rows], [r["rss_mb"] for r in load_rows])
+    out["anon_per_player"] = anon and {"kb_per_player": anon["slope"] * 1024, "base_mb": anon["intercept"], "r2": anon["r2"]}
+    out["rss_per_player"] = rss and {"kb_per_player": rss["slope"] * 1024, "base_mb": rss["intercept"], "r2": rss["r2"]}
+    if rss and rss["slope"] > 0:
+        out["players_at_limit"] = int((limit_mb - rss["intercept"]) / rss["slope"])
+    out["limit_mb"] = limit_mb
+    out["peak_rss_mb"] = max((r.get("rss_max_mb", r["rss_mb"]) for r in rows), default=None)
+    return out
@@ -0,0 +1,92 @@
+"""
+The client side of the /ws protocol (packages/shared/src/schemas.ts), plus
+the game constants from packages/shared/src/constants.ts that the tools and
+the stand-in need.
+
+Builders return the JSON text that goes on the wire; payloads match what
+ws-broadcast.js and ws-regression-test.js send.
+"""
+from __future__ import annotations
+
+import json
+import math
+import random
+import time
+
+WORLD_WIDTH = 3500
+WORLD_HEIGHT = 2500
+TICK_INTERVAL_MS = 1000 // 66          # TICK.INTERVAL_MS
+BROADCAST_INTERVAL_MS = 1000 / 15      # BROADCAST_INTERVAL in packages/server/src/index.ts
+TRAIL_DELTA_INTERVAL_MS = BROADCAST_INTERVAL_MS * 2
+TRAIL_EMIT_INTERVAL_MS = 40            # TRAIL.EMIT_INTERVAL_MS
+TRAIL_LIFETIME_MS = 8000               # TRAIL.BASE_LIFETIME_MS
+MAX_SPEED = 480                        # PHYSICS.MAX_SPEED
+TURN_RATE = 4.4 * 1.5                  # MOVEMENT.TURN_RATE in Player.ts (rad/s towards the target angle)
+MAX_TURN_DELTA = math.pi * 0.15        # Player.setInput: largest heading change one input can ask for
+INPUT_MIN_INTERVAL_MS = 16             # INPUT.MAX_BURST_INTERVAL_MS
+
+# Inputs land in a 1920x1080 "screen" like the JS load tests.
+SCREEN_W = 1920
+SCREEN_H = 1080
+
+_TYPE_PREFIX = '{"type":"'
+_TYPE_PREFIX_BYTES = _TYPE_PREFIX.encode()
+
+
+def dumps(obj) -> str:
+    """Compact JSON, like JSON.stringify."""
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def guest_login(name: str) -> str:
+    return dumps({"type": "guestLogin", "payload": {"guestName": name}})
+
+
+def client_hello(trail_delta: bool = True) -> str:
+    return dumps({"type": "clientHello", "payload": {"trailDelta": bool(trail_delta)}})
+
+
+def join_lobby(tier: int = 0, mode: str = "practice") -> str:
+    return dumps({"type": "joinLobby", "payload": {"entryFeeTier": tier, "mode": mode}})
+
+
+def leave_lobby() -> str:
+    return dumps({"type": "leaveLobby"})
+
+
+def player_input(x: float, y: float, accelerate: bool, boost: bool | None = None,
+                 client_timestamp: float | None = None) -> str:
+    payload: dict = {"target": {"x": x, "y": y}, "accelerate": accelerate}
+    if boost is not None:
+        payload["boost"] = boost
+    if client_timestamp is not None:
+        payload["clientTimestamp"] = client_timestamp
+    return dumps({"type": "playerInput", "payload": payload})
+
+
+def random_input(rng: random.Random, accelerate_p: float = 0.3) -> str:
+    """The ws-broadcast.js input: random screen target, accelerate 30% of the time."""
+    return player_input(rng.randint(0, SCREEN_W), rng.randint(0, SCREEN_H), rng.random() < accelerate_p)
+
+
+def peek_type(raw: str | bytes) -> str:
+    """
+    Message type without a full json.loads. The server builds every message
+    as {type, payload} with JSON.stringify, so "type" is always the first key;
+    anything else falls back to parsing.
+    """
+    prefix = _TYPE_PREFIX_BYTES if isinstance(raw, (bytes, bytearray)) else _TYPE_PREFIX
+    if raw.startswith(prefix):
+        end = raw.find(prefix[-1:], len(prefix))
+        if end > 0:
+            kind = raw[len(prefix):end]
+            return kind.decode("ascii", "replace") if isinstance(kind, (bytes, bytearray)) else kind
+    try:
+        msg = json.loads(raw)
+    except ValueError:
+        return "invalid"
+    return str(msg.get("type", "unknown")) if isinstance(msg, dict) else "invalid"
+
+
+def now_ms() -> float:
+    return time.time() * 1000
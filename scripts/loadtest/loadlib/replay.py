@@ -0,0 +1,219 @@
+"""
+Replay of captured sessions (loadlib.capture) against a server, sharded over
+worker processes with the swarm's plumbing.
+
+Client i replays session i % N of the capture (N sessions), so a capture of
+200 real sessions can drive 5000 connections. Its connection opens at the
+session's recorded start divided by the speed, plus `repeat_gap` seconds per
+earlier copy of the same session, but never sooner than i / ramp. Every
+frame is then sent at its anchor's time in this connection plus the
+recorded offset divided by the speed (speed=inf sends as soon as the anchor
+is there). All workers share one wall-clock epoch, so the schedule of a run
+depends only on the capture and the flags, not on how fast the workers
+spawned; how far the sends actually trailed that schedule is reported as
+send lag.
+
+Frames are rewritten for a fresh guest (loadlib.capture.rewrite_for_replay).
+A connection whose next anchor never comes (e.g. its lobby never starts)
+gives up after `anchor_timeout` seconds and counts an anchor timeout. When
+the server reaches a phase sooner than it did in the recording (a lobby
+fills faster), frames still due on the earlier anchor are sent anyway, in
+order, and counted as phase-shifted rather than as send lag, so the lag
+histogram only measures whether the replayer kept up.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from . import capture, protocol
+from .hdr import Histogram
+from .swarm import Stats, raise_nofile
+
+LATE_MS = 50.0  # a send this far behind schedule counts as late
+
+
+@dataclass
+class ReplayConfig:
+    url: str
+    capture: str
+    sessions: int                  # sessions in the capture
+    clients: int
+    workers: int
+    speed: float = 1.0             # math.inf: as fast as the anchors allow
+    ramp: float = 500.0            # new connections per second at most, all workers together
+    repeat_gap: float = 0.25       # seconds between copies of the same session
+    anchor_timeout: float = 60.0
+    keep_tiers: bool = False
+    seconds: float = 0.0           # stop after this long; 0 runs until every session is done
+    epoch: float = 0.0             # wall-clock time of schedule zero (set by the parent)
+
+
+@dataclass
+class ReplayStats(Stats):
+    frames_skipped: int = 0
+    anchor_timeouts: int = 0
+    sessions_done: int = 0
+    late_sends: int = 0
+    phase_shifted: int = 0
+    lag: Histogram = field(default_factory=lambda: Histogram(highest_us=600_000_000, digits=2))
+
+    COUNTERS = Stats.COUNTERS + ("frames_skipped", "anchor_timeouts", "sessions_done", "late_sends", "phase_shifted")
+
+    def add(self, other: "Stats") -> None:
+        super().add(other)
+        if isinstance(other, ReplayStats):
+            self.lag.merge(other.lag)
+
+
+def start_offset(cfg: ReplayConfig, client: int, session_start: float) -> float:
+    """Seconds after the epoch at which `client` connects."""
+    recorded = 0.0 if math.isinf(cfg.speed) else session_start / cfg.speed
+    return max(recorded + (client // cfg.sessions) * cfg.repeat_gap, client / max(cfg.ramp, 1e-6))
+
+
+class ReplayWorker:
+    def __init__(self, worker_id: int, cfg: ReplayConfig, indices: list[int]):
+        self.id = worker_id
+        self.cfg = cfg
+        self.indices = indices
+        self.stats = ReplayStats()
+        self._closing = False
+
+    async def run(self, report, stop) -> None:
+        cfg = self.cfg
+        loop = asyncio.get_running_loop()
+        _, sessions = capture.read_capture(cfg.capture, only={i % cfg.sessions + 1 for i in self.indices})
+        by_id = {s.id: s for s in sessions}
+        base = loop.time() + (cfg.epoch - time.time())
+        tasks = [asyncio.create_task(self._client(i, by_id[i % cfg.sessions + 1], base))
+                 for i in self.indices if i % cfg.sessions + 1 in by_id]
+        reporter = asyncio.create_task(self._report(report))
+        deadline = base + cfg.seconds if cfg.seconds > 0 else math.inf
+        while not stop.is_set() and loop.time() < deadline and not all(t.done() for t in tasks):
+            await asyncio.sleep(0.2)
+        self._closing = True
+        for t in tasks:
+            t.cancel()
+        reporter.cancel()
+        await asyncio.gather(*tasks, reporter, return_exceptions=True)
+        report.put(("final", self.id, self.stats))
+
+    async def _report(self, report) -> None:
+        while True:
+            await asyncio.sleep(1.0)
+            snapshot = ReplayStats(**{k: getattr(self.stats, k) for k in ReplayStats.COUNTERS})
+            snapshot.types = Counter(self.stats.types)
+            report.put(("tick", self.id, snapshot))
+
+    async def _client(self, idx: int, session: capture.Session, base: float) -> None:
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import ConnectionClosed
+
+        cfg = self.cfg
+        stats = self.stats
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max(0.0, base + start_offset(cfg, idx, session.start) - loop.time()))
+        kwargs = {}
+        if session.info.get("origin"):
+            kwargs["origin"] = session.info["origin"]
+        stats.connecting += 1
+        t0 = loop.time()
+        try:
+            ws = await connect(cfg.url, compression=None, open_timeout=10, ping_interval=None, close_timeout=2,
+                               max_size=64 * 1024 * 1024, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats.failures[type(e).__name__] += 1
+            stats.connect_failures += 1
+            return
+        finally:
+            stats.connecting -= 1
+        stats.connect_ms.append((loop.time() - t0) * 1000)
+        stats.connects += 1
+        stats.open += 1
+
+        anchors: dict[tuple[str, int], float] = {("open", 0): loop.time()}
+        arrived = asyncio.Event()
+        receiver = asyncio.create_task(self._receive(ws, anchors, arrived))
+        speed = cfg.speed
+        last_due = 0.0
+        try:
+            for frame in session.frames:
+                while frame.anchor not in anchors:
+                    arrived.clear()
+                    try:
+                        await asyncio.wait_for(arrived.wait(), cfg.anchor_timeout)
+                    except asyncio.TimeoutError:
+                        stats.anchor_timeouts += 1
+                        return
+                    if receiver.done():
+                        return
+                due = anchors[frame.anchor] + (0.0 if math.isinf(speed) else frame.offset / speed)
+                if due < last_due:
+                    stats.phase_shifted += 1
+                    due = last_due
+                last_due = due
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                data = capture.rewrite_for_replay(frame.data, idx, cfg.keep_tiers)
+                if data is None:
+                    stats.frames_skipped += 1
+                    continue
+                await ws.send(data)
+                lag_ms = max(0.0, (loop.time() - due) * 1000)
+                stats.lag.record_ms(lag_ms)
+                if lag_ms > LATE_MS:
+                    stats.late_sends += 1
+                stats.msgs_out += 1
+                stats.bytes_out += len(data)
+            stats.sessions_done += 1
+            await asyncio.sleep(0.5)  # let the last frames land before closing
+        except ConnectionClosed:
+            pass
+        finally:
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+            await ws.close()
+            stats.open -= 1
+
+    async def _receive(self, ws, anchors: dict, arrived: asyncio.Event) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        stats = self.stats
+        loop = asyncio.get_running_loop()
+        tracker = capture.AnchorTracker()
+        counts: Counter = Counter()
+        try:
+            while True:
+                raw = await ws.recv(decode=False)
+                stats.msgs_in += 1
+                stats.bytes_in += len(raw)
+                kind = protocol.peek_type(raw)
+                stats.types[kind] += 1
+                if kind == "error":
+                    stats.server_errors += 1
+                hit = tracker.feed(raw, loop.time())
+                if hit is not None:
+                    name, at = hit
+                    anchors[(name, counts[name])] = at
+                    counts[name] += 1
+                    arrived.set()
+        except ConnectionClosed as e:
+            if not self._closing:
+                stats.closed_by_server += 1
+                stats.close_codes[e.rcvd.code if e.rcvd else 1006] += 1
+            arrived.set()
+
+
+def worker_main(worker_id: int, cfg: ReplayConfig, indices: list[int], report, stop) -> None:
+    raise_nofile(len(indices) + 256)
+    try:
+        asyncio.run(ReplayWorker(worker_id, cfg, indices).run(report, stop))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,243 @@
+"""
+In-memory time series for high-frequency scrapes.
+
+Samples live in fixed-capacity rings backed by array('d') (8 bytes per field,
+no per-sample objects), so a 10 Hz scrape of a handful of series can run for
+hours in a few MB. Every series also feeds downsampled rollups (min / max /
+sum / count / last per bucket) at coarser steps, which outlive the raw ring.
+
+Rates and percentiles are computed on demand over a trailing window of the
+raw samples; timestamps are wall-clock seconds and must be appended in order.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from array import array
+from pathlib import Path
+
+COUNTER = "counter"
+GAUGE = "gauge"
+
+# (bucket seconds, buckets kept): 10 min at 1 s, 6 h at 10 s, 1 day at 1 min.
+DEFAULT_ROLLUPS = ((1.0, 600), (10.0, 2160), (60.0, 1440))
+
+
+class Ring:
+    """Fixed-capacity ring of rows; each field is its own array('d')."""
+
+    __slots__ = ("capacity", "fields", "_cols", "_start", "_len")
+
+    def __init__(self, capacity: int, fields: tuple[str, ...] = ("t", "v")):
+        self.capacity = max(1, int(capacity))
+        self.fields = fields
+        self._cols = [array("d", bytes(8 * self.capacity)) for _ in fields]
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def append(self, *row: float) -> None:
+        if self._len < self.capacity:
+            i = (self._start + self._len) % self.capacity
+            self._len += 1
+        else:
+            i = self._start
+            self._start = (self._start + 1) % self.capacity
+        for col, value in zip(self._cols, row):
+            col[i] = value
+
+    def row(self, n: int) -> tuple[float, ...]:
+        """The n-th oldest row (negative n counts from the newest)."""
+        if n < 0:
+            n += self._len
+        if not 0 <= n < self._len:
+            raise IndexError(n)
+        i = (self._start + n) % self.capacity
+        return tuple(col[i] for col in self._cols)
+
+    def column(self, field: str, first: int = 0) -> list[float]:
+        """Field values from the `first`-th oldest row onwards, oldest first."""
+        col = self._cols[self.fields.index(field)]
+        a = self._start + first
+        b = self._start + self._len
+        if b <= self.capacity:
+            return col[a:b].tolist()
+        if a >= self.capacity:
+            return col[a - self.capacity:b - self.capacity].tolist()
+        return col[a:].tolist() + col[:b - self.capacity].tolist()
+
+    def first_at_or_after(self, t: float) -> int:
+        """Index of the oldest row whose first field is >= t (binary search)."""
+        lo, hi = 0, self._len
+        col = self._cols[0]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if col[(self._start + mid) % self.capacity] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @property
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in self._cols)
+
+
+class Rollup:
+    """Bucketed min/max/sum/count/last at a fixed step; the open bucket is kept outside the ring."""
+
+    FIELDS = ("t", "min", "max", "sum", "count", "last")
+
+    def __init__(self, step: float, capacity: int):
+        self.step = step
+        self.ring = Ring(capacity, self.FIELDS)
+        self._open: list[float] | None = None
+
+    def add(self, t: float, v: float) -> None:
+        bucket = math.floor(t / self.step) * self.step
+        cur = self._open
+        if cur is not None and cur[0] == bucket:
+            cur[1] = min(cur[1], v)
+            cur[2] = max(cur[2], v)
+            cur[3] += v
+            cur[4] += 1
+            cur[5] = v
+            return
+        if cur is not None:
+            self.ring.append(*cur)
+        self._open = [bucket, v, v, v, 1.0, v]
+
+    def rows(self) -> list[list[float]]:
+        """[[bucket_start, min, max, mean, last], ...] including the open bucket."""
+        rows = [self.ring.row(i) for i in range(len(self.ring))]
+        if self._open is not None:
+            rows.append(tuple(self._open))
+        return [[t, lo, hi, s / n, last] for t, lo, hi, s, n, last in rows]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of an already sorted list."""
+    if not sorted_values:
+        return math.nan
+    k = (len(sorted_values) - 1) * q / 100.0
+    lo = math.floor(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Series:
+    """
+    One metric. Counters are stored as scraped (monotonic totals); their
+    "values" over a window are the per-interval rates, with a counter reset
+    (server restart) counted as a fresh start from zero.
+    """
+
+    def __init__(self, name: str, kind: str = GAUGE, capacity: int = 36_000,
+                 rollups: tuple[tuple[float, int], ...] = DEFAULT_ROLLUPS):
+        self.name = name
+        self.kind = kind
+        self.raw = Ring(capacity)
+        self.rollups = [Rollup(step, n) for step, n in rollups]
+        self._prev: tuple[float, float] | None = None
+
+    def add(self, t: float, v: float) -> None:
+        self.raw.append(t, v)
+        if self.kind == COUNTER:
+            # Roll up the rate, which is what anyone looks at for a counter.
+            prev, self._prev = self._prev, (t, v)
+            if prev is None or t <= prev[0]:
+                return
+            v = (v - prev[1] if v >= prev[1] else v) / (t - prev[0])
+        for r in self.rollups:
+            r.add(t, v)
+
+    def window(self, seconds: float, now: float | None = None) -> tuple[list[float], list[float]]:
+        """(timestamps, values) of the raw samples in the trailing window."""
+        if not len(self.raw):
+            return [], []
+        now = self.raw.row(-1)[0] if now is None else now
+        first = self.raw.first_at_or_after(now - seconds)
+        return self.raw.column("t", first), self.raw.column("v", first)
+
+    def values(self, seconds: float, now: float | None = None) -> list[float]:
+        ts, vs = self.window(seconds, now)
+        if self.kind != COUNTER:
+            return vs
+        out = []
+        for i in range(1, len(vs)):
+            dt = ts[i] - ts[i - 1]
+            if dt > 0:
+                out.append((vs[i] - vs[i - 1] if vs[i] >= vs[i - 1] else vs[i]) / dt)
+        return out
+
+    def rate(self, seconds: float, now: float | None = None) -> float:
+        """Average per-second increase of a counter over the window."""
+        ts, vs = self.window(seconds, now)
+        if len(ts) < 2 or ts[-1] <= ts[0]:
+            return 0.0
+        increase = sum(b - a if b >= a else b for a, b in zip(vs, vs[1:]))
+        return increase / (ts[-1] - ts[0])
+
+    def summary(self, seconds: float, now: float | None = None,
+                quantiles: tuple[float, ...] = (50, 90, 99)) -> dict:
+        vals = sorted(self.values(seconds, now))
+        out: dict = {"n": len(vals)}
+        if not vals:
+            return out
+        if self.kind == COUNTER:
+            out["rate"] = self.rate(seconds, now)
+        out["min"] = vals[0]
+        out["max"] = vals[-1]
+        out["mean"] = sum(vals) / len(vals)
+        for q in quantiles:
+            out[f"p{q:g}"] = percentile(vals, q)
+        return out
+
+    @property
+    def last(self) -> float | None:
+        return self.raw.row(-1)[1] if len(self.raw) else None
+
+
+class SeriesStore:
+    def __init__(self, capacity: int = 36_000, rollups: tuple[tuple[float, int], ...] = DEFAULT_ROLLUPS):
+        self.capacity = capacity
+        self.rollup_spec = rollups
+        self.series: dict[str, Series] = {}
+
+    def add(self, t: float, name: str, value: float, kind: str = GAUGE) -> None:
+        s = self.series.get(name)
+        if s is None:
+            s = self.series[name] = Series(name, kind, self.capacity, self.rollup_spec)
+        s.add(t, value)
+
+    def get(self, name: str) -> Series | None:
+        return self.series.get(name)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.raw.nbytes + sum(r.ring.nbytes for r in s.rollups) for s in self.series.values())
+
+    def snapshot(self, windows: tuple[float, ...] = (1, 10, 60), now: float | None = None) -> dict:
+        now = time.time() if now is None else now
+        out = {}
+        for name, s in sorted(self.series.items()):
+            out[name] = {
+                "kind": s.kind,
+                "last": s.last,
+                "samples": len(s.raw),
+                "windows": {f"{w:g}s": s.summary(w, now) for w in windows},
+                "rollups": {f"{r.step:g}s": r.rows() for r in s.rollups},
+            }
+        return out
+
+
+def write_json(path: Path, data: dict) -> None:
+    """Atomic write, so a reader never sees half a snapshot."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
@@ -0,0 +1,516 @@
+"""
+A local stand-in for packages/server, for running the load tools without a
+real deployment (no Solana RPC, no database, no pnpm build).
+
+It answers the ops endpoints the tools read (/api/healthz, /api/ws-healthz,
+/api/metrics, same formats as index.ts), the leaderboard, /api/stats and
+/api/player/:wallet/stats routes over a synthetic table of `players` rows
+(leaderboards from a cache rebuilt every 60 s like DatabaseService, totals
+counted per request), and speaks the guest side of /ws:
+guestLogin, clientHello, joinLobby, playerInput and leaveLobby. Lobbies of
+`lobby_size` start after `lobby_wait` seconds (or when full), rounds have a
+goAtMs countdown, and a 66 Hz physics loop plus separate 15 Hz
+gameStateUpdate and 7.5 Hz trailDelta loops mirror the server's
+setIntervals, including the slim (trailDelta clients) and full (trails
+inlined) state frames and the bufferedAmount back-pressure skip. Movement
+follows Player.ts loosely: each input turns the target heading by at most
+MAX_TURN_DELTA, and the physics tick rotates towards it at TURN_RATE; there
+are no collisions.
+
+With churn=True it also adds phantom connections that come and go in
+lobby-sized spikes, so a scraper has something to see with no clients.
+
+Needs websockets (imported when the server starts).
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+
+from . import protocol
+
+LOBBY_SIZE = 8
+LEADERBOARD_TTL_S = 60.0   # DatabaseService CACHE_TTL
+BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+# /api/leaderboard/<kind> -> (players column, response type)
+LEADERBOARDS = {"wins": ("total_wins", "wins"), "earnings": ("total_earnings", "earnings"),
+                "kills": ("total_kills", "kills"), "skill-rating": ("skill_rating", "skillRating")}
+BACKPRESSURE_MAX_BUFFERED = 1_000_000  # bytes queued before a state frame is skipped
+
+
+@dataclass
+class Counters:
+    """The fields of the `metrics` object in index.ts."""
+    ws_connections_total: int = 0
+    ws_connected_current: int = 0
+    http_requests_total: int = 0
+    lobby_active: int = 0
+
+
+@dataclass
+class SimPlayer:
+    id: str
+    ws: object | None
+    x: float = 0.0
+    y: float = 0.0
+    angle: float = 0.0
+    speed: float = 0.0
+    target_angle: float | None = None
+    accelerate: bool = False
+    boost: bool = False
+    trail: list[dict] = field(default_factory=list)
+    last_emit_ms: float = 0.0
+    last_sent_created_at: float | None = None
+
+    def state(self, include_trail: bool) -> dict:
+        """optimizePlayerData() in index.ts."""
+        vx, vy = math.cos(self.angle) * self.speed, math.sin(self.angle) * self.speed
+        out = {
+            "id": self.id,
+            "sperm": {
+                "position": {"x": round(self.x, 2), "y": round(self.y, 2)},
+                "velocity": {"x": round(vx, 2), "y": round(vy, 2)},
+                "angle": round(self.angle, 2),
+                "angularVelocity": 0,
+                "color": "#ff66cc",
+            },
+            "isAlive": True,
+        }
+        if self.boost:
+            out["status"] = {"boostActive": True, "boostEndTimeMs": protocol.now_ms() + 500}
+        if include_trail and self.trail:
+            out["trail"] = [{"x": p["x"], "y": p["y"], "expiresAt": p["expiresAt"]} for p in self.trail]
+        return out
+
+
+@dataclass
+class Lobby:
+    id: str
+    tier: int
+    mode: str
+    players: list[str] = field(default_factory=list)
+    created: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class Match:
+    id: str
+    players: dict[str, SimPlayer]
+    go_at_ms: float
+    ends_at_ms: float
+
+
+class StandIn:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, churn: bool = False, seed: int | None = None,
+                 lobby_size: int = LOBBY_SIZE, lobby_wait: float = 2.0, go_delay: float = 3.0,
+                 round_seconds: float = 45.0, players: int = 5000):
+        self.host = host
+        self.port = port
+        self.churn = churn
+        self.lobby_size = lobby_size
+        self.lobby_wait = lobby_wait
+        self.go_delay = go_delay
+        self.round_seconds = round_seconds
+        self.counters = Counters()
+        self.clients: set = set()
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._phantom_connections = 0
+        self._phantom_lobbies = 0
+        self._server = None
+        self._tasks: list[asyncio.Task] = []
+        self.player_of: dict[object, str] = {}      # ws -> playerId
+        self.socket_of: dict[str, object] = {}      # playerId -> ws
+        self.trail_delta: set = set()               # sockets that sent clientHello {trailDelta: true}
+        self.lobbies: dict[str, Lobby] = {}
+        self.lobby_of: dict[str, str] = {}          # playerId -> lobbyId
+        self.matches: dict[str, Match] = {}
+        self.match_of: dict[str, str] = {}          # playerId -> matchId
+        self.player_rows = players
+        self._players: dict[str, dict] | None = None  # wallet -> players row, built on first use
+        self._leaderboards: dict[str, list[dict]] = {}
+        self._leaderboards_at = -math.inf
+
+    @property
+    def http_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    async def start(self) -> "StandIn":
+        from websockets.asyncio.server import serve
+
+        self._server = await serve(self._handler, self.host, self.port, process_request=self._http,
+                                   compression=None, max_size=64_000)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks += [
+            asyncio.create_task(self._every(protocol.TICK_INTERVAL_MS, self._physics)),
+            asyncio.create_task(self._every(protocol.BROADCAST_INTERVAL_MS, self._broadcast_state)),
+            asyncio.create_task(self._every(protocol.TRAIL_DELTA_INTERVAL_MS, self._broadcast_trails)),
+            asyncio.create_task(self._every(250, self._start_lobbies)),
+        ]
+        if self.churn:
+            self._tasks.append(asyncio.create_task(self._churn()))
+        return self
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "StandIn":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    # HTTP --------------------------------------------------------------------
+
+    def _http(self, connection, request):
+        self.counters.http_requests_total += 1
+        path = request.path.split("?", 1)[0]
+        if path == "/ws":
+            return None  # WebSocket handshake
+        if path == "/api/healthz":
+            return _response(200, "application/json", json.dumps({"ok": True, "port": self.port, "now": _now_ms()}))
+        if path == "/api/ws-healthz":
+            return _response(200, "application/json", json.dumps(self._ws_health()))
+        if path == "/api/metrics":
+            return _response(200, "text/plain", self._metrics_text())
+        if path.startswith("/api/leaderboard/") or path == "/api/stats" or path.startswith("/api/player/"):
+            return self._database_route(path, request.path)
+        return _response(404, "text/plain", "Not Found")
+
+    def _database_route(self, path: str, full_path: str):
+        players = self.players()
+        if path == "/api/stats":
+            games = sum(p["total_games"] for p in players.values()) // LOBBY_SIZE
+            active = sum(1 for p in players.values() if p["total_games"] > 0)
+            prizes = sum(p["total_earnings"] for p in players.values())
+            return _response(200, "application/json",
+                             json.dumps({"totalGames": games, "totalPlayers": active, "totalPrizes": prizes}))
+        if path.startswith("/api/player/"):
+            wallet = path[len("/api/player/"):].rsplit("/stats", 1)[0]
+            row = players.get(wallet)
+            if row is None:
+                return _response(404, "application/json", json.dumps({"error": "Player not found"}))
+            return _response(200, "application/json", json.dumps({"player": row}))
+        kind = path[len("/api/leaderboard/"):]
+        if kind not in LEADERBOARDS:
+            return _response(404, "text/plain", "Not Found")
+        now = time.monotonic()
+        if now - self._leaderboards_at > LEADERBOARD_TTL_S:
+            self._leaderboards = {name: self._leaderboard(column) for name, (column, _) in LEADERBOARDS.items()}
+            self._leaderboards_at = now
+        query = full_path.partition("?")[2]
+        limit = 100
+        for part in query.split("&"):
+            key, _, value = part.partition("=")
+            if key == "limit" and value.isdigit():
+                limit = min(int(value), 100)
+        board = self._leaderboards[kind][:limit]
+        return _response(200, "application/json",
+                         json.dumps({"leaderboard": board, "type": LEADERBOARDS[kind][1], "count": len(board)}))
+
+    def players(self) -> dict[str, dict]:
+        """The synthetic players table (wallet -> row, columns as in DatabaseService)."""
+        if self._players is None:
+            rng = random.Random(7)
+            self._players = {}
+            for _ in range(self.player_rows):
+                wallet = "".join(rng.choice(BASE58) for _ in range(44))
+                games = int(rng.paretovariate(1.2)) - 1
+                wins = sum(1 for _ in range(min(games, 500)) if rng.random() < 1 / LOBBY_SIZE)
+                self._players[wallet] = {
+                    "wallet_address": wallet, "username": None, "total_games": games, "total_wins": wins,
+                    "total_kills": int(games * rng.uniform(0, 2)), "total_earnings": wins * rng.randint(0, 50_000_000),
+                    "skill_rating": 1200 + int(rng.gauss(0, 150)), "created_at": "2025-01-01T00:00:00.000Z",
+                }
+        return self._players
+
+    def _leaderboard(self, column: str) -> list[dict]:
+        rows = sorted(self.players().values(), key=lambda p: p[column], reverse=True)[:100]
+        return [{"wallet_address": p["wallet_address"], "username": p["username"], "metric_value": p[column],
+                 "total_games": p["total_games"], "rank": i + 1} for i, p in enumerate(rows)]
+
+    def _ws_health(self) -> dict:
+        latencies = [c.latency * 1000 for c in self.clients if c.latency]
+        total = len(self.clients) + self._phantom_connections
+        if self._phantom_connections:
+            latencies += [self._rng.uniform(15, 60) for _ in range(min(50, self._phantom_connections))]
+        avg = round(sum(latencies) / len(latencies)) if latencies else None
+        return {"ok": True, "total": total, "alive": total, "avgLatencyMs": avg}
+
+    def _metrics_text(self) -> str:
+        c = self.counters
+        c.ws_connected_current = len(self.clients) + self._phantom_connections
+        c.lobby_active = self.lobby_count() + self._phantom_lobbies
+        lines = []
+        for name, kind in (("ws_connections_total", "counter"), ("ws_connected_current", "gauge"),
+                           ("http_requests_total", "counter"), ("lobby_active", "gauge")):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {getattr(c, name)}")
+        return "\n".join(lines)
+
+    def lobby_count(self) -> int:
+        return len(self.lobbies)
+
+    # WebSocket ---------------------------------------------------------------
+
+    async def _handler(self, ws) -> None:
+        self.clients.add(ws)
+        self.counters.ws_connections_total += 1
+        try:
+            async for raw in ws:
+                try:
+                    msg = json.loads(raw)
+                except ValueError:
+                    await ws.send(json.dumps({"type": "error", "payload": {"message": "Invalid message schema"}}))
+                    continue
+                await self.on_message(ws, msg)
+        except Exception:
+            pass
+        finally:
+            self.clients.discard(ws)
+            self.trail_delta.discard(ws)
+            player_id = self.player_of.pop(ws, None)
+            if player_id:
+                self.socket_of.pop(player_id, None)
+                self._leave_lobby(player_id)
+                match = self.matches.get(self.match_of.get(player_id, ""))
+                if match and player_id in match.players:
+                    match.players[player_id].ws = None  # stays in the round, like a dropped client
+
+    async def on_message(self, ws, msg: dict) -> None:
+        kind = msg.get("type")
+        payload = msg.get("payload") or {}
+        player_id = self.player_of.get(ws)
+        if kind == "guestLogin":
+            player_id = f"guest-{next(self._ids):06d}"
+            self.player_of[ws] = player_id
+            self.socket_of[player_id] = ws
+            await ws.send(protocol.dumps({"type": "authenticated",
+                                          "payload": {"playerId": player_id, "resumeToken": f"rt-{player_id}"}}))
+        elif kind == "clientHello":
+            if payload.get("trailDelta"):
+                self.trail_delta.add(ws)
+            else:
+                self.trail_delta.discard(ws)
+        elif not player_id:
+            await ws.send(protocol.dumps({"type": "error", "payload": {"message": "Authenticate first"}}))
+        elif kind == "joinLobby":
+            if payload.get("entryFeeTier") != 0:
+                await ws.send(protocol.dumps({"type": "error", "payload": {"message": "Guests can only play free mode"}}))
+                return
+            self._join_lobby(player_id, 0, str(payload.get("mode") or "practice"))
+        elif kind == "leaveLobby":
+            self._leave_lobby(player_id)
+        elif kind == "playerInput":
+            match = self.matches.get(self.match_of.get(player_id, ""))
+            target = payload.get("target") or {}
+            if match is None or protocol.now_ms() < match.go_at_ms:
+                return  # ignored before GO, like GameWorld.handlePlayerInput
+            p = match.players[player_id]
+            try:
+                want = math.atan2(float(target["y"]) - p.y, float(target["x"]) - p.x)
+            except (KeyError, TypeError, ValueError):
+                return
+            base = p.angle if p.target_angle is None else p.target_angle
+            turn = (want - base + math.pi) % (2 * math.pi) - math.pi
+            p.target_angle = base + max(-protocol.MAX_TURN_DELTA, min(protocol.MAX_TURN_DELTA, turn))
+            p.accelerate = bool(payload.get("accelerate"))
+            p.boost = bool(payload.get("boost"))
+
+    # Lobbies and rounds ------------------------------------------------------
+
+    def _join_lobby(self, player_id: str, tier: int, mode: str) -> None:
+        if player_id in self.lobby_of or player_id in self.match_of:
+            return
+        lobby = next((l for l in self.lobbies.values()
+                      if l.tier == tier and l.mode == mode and len(l.players) < self.lobby_size), None)
+        if lobby is None:
+            lobby = Lobby(id=f"lobby-{next(self._ids):06d}", tier=tier, mode=mode)
+            self.lobbies[lobby.id] = lobby
+        lobby.players.append(player_id)
+        self.lobby_of[player_id] = lobby.id
+        self._send_lobby(lobby, {"type": "lobbyState", "payload": {
+            "lobbyId": lobby.id, "players": lobby.players, "maxPlayers": self.lobby_size,
+            "entryFee": tier, "mode": mode, "status": "waiting",
+            "playerNames": {pid: "Guest" for pid in lobby.players},
+        }})
+
+    def _leave_lobby(self, player_id: str) -> None:
+        lobby = self.lobbies.get(self.lobby_of.pop(player_id, ""))
+        if lobby is not None:
+            lobby.players.remove(player_id)
+            if not lobby.players:
+                del self.lobbies[lobby.id]
+
+    def _send_lobby(self, lobby: Lobby, message: dict) -> None:
+        text = protocol.dumps(message)
+        self._send({self.socket_of[pid] for pid in lobby.players if pid in self.socket_of}, text)
+
+    def _start_lobbies(self, now_ms: float) -> None:
+        now = time.monotonic()
+        for lobby in list(self.lobbies.values()):
+            if len(lobby.players) < self.lobby_size and now - lobby.created < self.lobby_wait:
+                continue
+            del self.lobbies[lobby.id]
+            self._send_lobby(lobby, {"type": "gameStarting", "payload": {"countdown": 0, "rules": []}})
+            players = {}
+            for i, pid in enumerate(lobby.players):
+                self.lobby_of.pop(pid, None)
+                a = 2 * math.pi * i / len(lobby.players)
+                players[pid] = SimPlayer(
+                    id=pid, ws=self.socket_of.get(pid), angle=a + math.pi,
+                    x=protocol.WORLD_WIDTH / 2 + math.cos(a) * 800,
+                    y=protocol.WORLD_HEIGHT / 2 + math.sin(a) * 800,
+                )
+            match = Match(id=lobby.id.replace("lobby", "match"), players=players,
+                          go_at_ms=now_ms + self.go_delay * 1000,
+                          ends_at_ms=now_ms + (self.go_delay + self.round_seconds) * 1000)
+            self.matches[match.id] = match
+            for pid in players:
+                self.match_of[pid] = match.id
+
+    def _end_round(self, match: Match) -> None:
+        del self.matches[match.id]
+        winner = self._rng.choice(list(match.players))
+        text = protocol.dumps({"type": "roundEnd", "payload": {"winnerId": winner, "prizeAmount": 0}})
+        self._send({p.ws for p in match.players.values() if p.ws is not None}, text)
+        for pid in match.players:
+            self.match_of.pop(pid, None)
+
+    # Game loops --------------------------------------------------------------
+
+    async def _every(self, interval_ms: float, fn) -> None:
+        """setInterval: fixed period, no catch-up burst after a stall."""
+        loop = asyncio.get_running_loop()
+        period = interval_ms / 1000
+        next_at = loop.time() + period
+        while True:
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            fn(protocol.now_ms())
+            next_at = max(next_at + period, loop.time())
+
+    def _physics(self, now_ms: float) -> None:
+        dt = protocol.TICK_INTERVAL_MS / 1000
+        for match in list(self.matches.values()):
+            if now_ms >= match.ends_at_ms:
+                self._end_round(match)
+                continue
+            if now_ms < match.go_at_ms:
+                continue
+            for p in match.players.values():
+                if p.target_angle is not None:
+                    turn = (p.target_angle - p.angle + math.pi) % (2 * math.pi) - math.pi
+                    limit = protocol.TURN_RATE * dt
+                    p.angle += max(-limit, min(limit, turn))
+                top = protocol.MAX_SPEED * (1.4 if p.boost else 1.0)
+                p.speed = min(top, p.speed + 600 * dt) if p.accelerate else p.speed * 0.988 + 60 * dt
+                p.x += math.cos(p.angle) * p.speed * dt
+                p.y += math.sin(p.angle) * p.speed * dt
+                if not 0 <= p.x <= protocol.WORLD_WIDTH:
+                    p.x = min(max(p.x, 0.0), protocol.WORLD_WIDTH)
+                    p.angle = math.pi - p.angle
+                if not 0 <= p.y <= protocol.WORLD_HEIGHT:
+                    p.y = min(max(p.y, 0.0), protocol.WORLD_HEIGHT)
+                    p.angle = -p.angle
+                if p.target_angle is not None and (p.x in (0.0, protocol.WORLD_WIDTH) or p.y in (0.0, protocol.WORLD_HEIGHT)):
+                    p.target_angle = p.angle  # bounced: keep going the new way
+                if now_ms - p.last_emit_ms >= protocol.TRAIL_EMIT_INTERVAL_MS:
+                    p.last_emit_ms = now_ms
+                    p.trail.append({"x": round(p.x, 2), "y": round(p.y, 2),
+                                    "expiresAt": now_ms + protocol.TRAIL_LIFETIME_MS, "createdAt": now_ms})
+                    while p.trail and p.trail[0]["expiresAt"] <= now_ms:
+                        p.trail.pop(0)
+
+    def _broadcast_state(self, now_ms: float) -> None:
+        for match in self.matches.values():
+            world = {"width": protocol.WORLD_WIDTH, "height": protocol.WORLD_HEIGHT}
+            frames = {}
+            for slim in (True, False):
+                sockets = {p.ws for p in match.players.values()
+                           if p.ws is not None and (p.ws in self.trail_delta) == slim}
+                if not sockets:
+                    continue
+                frames[slim] = protocol.dumps({"type": "gameStateUpdate", "payload": {
+                    "timestamp": int(now_ms),
+                    "goAtMs": int(match.go_at_ms),
+                    "players": [p.state(include_trail=not slim) for p in match.players.values()],
+                    "world": world,
+                    "aliveCount": len(match.players),
+                }})
+                self._send(sockets, frames[slim])
+
+    def _broadcast_trails(self, now_ms: float) -> None:
+        for match in self.matches.values():
+            sockets = {p.ws for p in match.players.values() if p.ws is not None and p.ws in self.trail_delta}
+            if not sockets:
+                continue
+            deltas = []
+            for p in match.players.values():
+                start = 0
+                if p.last_sent_created_at is not None:
+                    start = next((i + 1 for i in range(len(p.trail) - 1, -1, -1)
+                                  if p.trail[i]["createdAt"] == p.last_sent_created_at), 0)
+                points = p.trail[start:]
+                if points:
+                    p.last_sent_created_at = points[-1]["createdAt"]
+                    deltas.append({"playerId": p.id, "points": points})
+            if deltas:
+                self._send(sockets, protocol.dumps({"type": "trailDelta",
+                                                    "payload": {"timestamp": int(now_ms), "deltas": deltas}}))
+
+    def _send(self, sockets, text: str) -> None:
+        """safeSend(): skip sockets with too much queued, never wait for a slow one."""
+        from websockets.asyncio.server import broadcast
+
+        ready = [ws for ws in sockets
+                 if ws.transport is not None and ws.transport.get_write_buffer_size() <= BACKPRESSURE_MAX_BUFFERED]
+        if ready:
+            broadcast(ready, text)
+
+    # Synthetic load ----------------------------------------------------------
+
+    async def _churn(self) -> None:
+        """A baseline of phantom players plus short lobby-sized spikes."""
+        baseline = 3 * LOBBY_SIZE
+        spikes: list[tuple[float, int]] = []  # (ends_at, lobbies)
+        while True:
+            now = time.monotonic()
+            spikes = [s for s in spikes if s[0] > now]
+            if self._rng.random() < 0.02:  # ~ one spike every 5 s at 10 Hz
+                spikes.append((now + self._rng.uniform(1.0, 4.0), self._rng.randint(2, 8)))
+            lobbies = 3 + sum(n for _, n in spikes)
+            target = baseline + sum(n for _, n in spikes) * LOBBY_SIZE + self._rng.randint(-2, 2)
+            if target > self._phantom_connections:
+                self.counters.ws_connections_total += target - self._phantom_connections
+            self._phantom_connections = max(0, target)
+            self._phantom_lobbies = lobbies
+            await asyncio.sleep(0.1)
+
+
+def _response(status: int, content_type: str, body: str):
+    from http import HTTPStatus
+
+    from websockets.datastructures import Headers
+    from websockets.http11 import Response
+
+    data = body.encode()
+    headers = Headers([("Content-Type", content_type), ("Content-Length", str(len(data))), ("Connection", "close")])
+    return Response(status, HTTPStatus(status).phrase, headers, data)
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
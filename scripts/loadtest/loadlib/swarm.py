@@ -0,0 +1,349 @@
+"""
+WebSocket swarm: virtual clients sharded across worker processes, one event
+loop per worker.
+
+Client i lives in worker i % workers. Each worker ramps its share of the
+connections up at `ramp / workers` per second, sends guestLogin, clientHello
+and joinLobby like ws-regression-test.js, and from then on lets the client's
+behaviour (loadlib.behaviors) decide its inputs. Inputs of all clients of a
+worker come off one timer heap, and incoming frames are counted by type from
+their first bytes (protocol.peek_type) rather than parsed.
+
+Workers are spawned (behaviour mixes travel as their text spec and are
+loaded again in each worker) and report cumulative Stats to the parent once
+a second over a multiprocessing queue; the parent sums the latest report of
+every worker.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import multiprocessing as mp
+import os
+import queue as queue_mod
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from . import protocol
+from .behaviors import Behavior, parse_mix, pick
+
+# Bytes queued on a client socket before its next input is dropped instead of sent.
+INPUT_WRITE_LIMIT = 64 * 1024
+
+# WebSocketWithReconnect.ts: after any close but a clean 1000, retry after
+# 1 s * 2^(attempt-1), at most 30 s, no jitter; attempts reset on open.
+RECONNECT_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+
+@dataclass
+class SwarmConfig:
+    url: str
+    clients: int
+    seconds: float
+    workers: int
+    ramp: float = 500.0                      # new connections per second, all workers together
+    behaviors: str = "broadcast"             # behaviors.parse_mix spec, e.g. "bot=3,idle=1"
+    tier: int = 0
+    mode: str = "practice"
+    deflate: bool = False
+    bind: list[str] = field(default_factory=list)  # local source addresses, round-robin
+    open_timeout: float = 10.0
+    seed: int = 1
+    reconnect: bool = False                  # reconnect like the game client after an unclean close
+
+
+@dataclass
+class Stats:
+    connecting: int = 0
+    open: int = 0
+    connects: int = 0
+    connect_failures: int = 0
+    closed_by_server: int = 0
+    msgs_in: int = 0
+    bytes_in: int = 0
+    msgs_out: int = 0
+    bytes_out: int = 0
+    inputs_dropped: int = 0
+    server_errors: int = 0
+    reconnects: int = 0
+    types: Counter = field(default_factory=Counter)
+    close_codes: Counter = field(default_factory=Counter)
+    failures: Counter = field(default_factory=Counter)
+    connect_ms: list[float] = field(default_factory=list)
+
+    COUNTERS = ("connecting", "open", "connects", "connect_failures", "closed_by_server", "msgs_in", "bytes_in",
+                "msgs_out", "bytes_out", "inputs_dropped", "server_errors", "reconnects")
+
+    def add(self, other: "Stats") -> None:
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.types.update(other.types)
+        self.close_codes.update(other.close_codes)
+        self.failures.update(other.failures)
+        self.connect_ms.extend(other.connect_ms)
+
+
+class _Client:
+    __slots__ = ("idx", "ws", "behavior", "closed")
+
+    def __init__(self, idx: int, ws, behavior: Behavior):
+        self.idx = idx
+        self.ws = ws
+        self.behavior = behavior
+        self.closed = False
+
+
+class Worker:
+    def __init__(self, worker_id: int, cfg: SwarmConfig, indices: list[int]):
+        self.id = worker_id
+        self.cfg = cfg
+        self.indices = indices
+        self.mix = parse_mix(cfg.behaviors)
+        self.stats = Stats()
+        self.clients: dict[int, _Client] = {}
+        self._heap: list[tuple[float, int]] = []
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+    async def run(self, report, stop: "mp.synchronize.Event") -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.cfg.seconds
+        tasks: list[asyncio.Task] = []
+        pump = asyncio.create_task(self._pump())
+        reporter = asyncio.create_task(self._report(report))
+        per_worker_rate = max(1e-6, self.cfg.ramp / self.cfg.workers)
+        started = loop.time()
+        for n, idx in enumerate(self.indices):
+            if stop.is_set() or loop.time() >= deadline:
+                break
+            tasks.append(asyncio.create_task(self._client(idx)))
+            await asyncio.sleep(max(0.0, started + (n + 1) / per_worker_rate - loop.time()))
+        while loop.time() < deadline and not stop.is_set():
+            await asyncio.sleep(min(0.2, max(0.0, deadline - loop.time())))
+
+        self._stopping = True
+        pump.cancel()
+        reporter.cancel()
+        await asyncio.gather(*(c.ws.close() for c in list(self.clients.values())), return_exceptions=True)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, pump, reporter, return_exceptions=True)
+        report.put(("final", self.id, self.stats))
+
+    async def _report(self, report) -> None:
+        while True:
+            await asyncio.sleep(1.0)
+            snapshot = Stats(**{k: getattr(self.stats, k) for k in Stats.COUNTERS})
+            snapshot.types = Counter(self.stats.types)
+            report.put(("tick", self.id, snapshot))
+
+    async def _client(self, idx: int) -> None:
+        rng = random.Random(self.cfg.seed * 1_000_003 + idx)
+        behavior_cls = pick(self.mix, rng)
+        attempts = 0
+        while True:
+            opened, code = await self._session(idx, behavior_cls(rng), rng)
+            if not self.cfg.reconnect or self._stopping or code == 1000:
+                return
+            attempts = 1 if opened else attempts + 1
+            await asyncio.sleep(min(RECONNECT_DELAY * 2 ** (attempts - 1), RECONNECT_MAX_DELAY))
+            if self._stopping:
+                return
+            self.stats.reconnects += 1
+
+    async def _session(self, idx: int, behavior: Behavior, rng: random.Random) -> tuple[bool, int | None]:
+        """One connection of client idx: (whether it opened, close code or None if it never did)."""
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import ConnectionClosed
+
+        cfg = self.cfg
+        kwargs = {}
+        if cfg.bind:
+            kwargs["local_addr"] = (cfg.bind[idx % len(cfg.bind)], 0)
+        loop = asyncio.get_running_loop()
+        self.stats.connecting += 1
+        t0 = loop.time()
+        try:
+            ws = await connect(cfg.url, compression="deflate" if cfg.deflate else None, open_timeout=cfg.open_timeout,
+                               ping_interval=None, close_timeout=2, max_size=16 * 1024 * 1024, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats.failures[type(e).__name__] += 1
+            self.stats.connect_failures += 1
+            return False, None
+        finally:
+            self.stats.connecting -= 1
+        self.stats.connect_ms.append((loop.time() - t0) * 1000)
+        self.stats.connects += 1
+        self.stats.open += 1
+        client = self.clients[idx] = _Client(idx, ws, behavior)
+        code = None
+        try:
+            for text in (protocol.guest_login(f"swarm_{idx:05d}"), protocol.client_hello(behavior.trail_delta),
+                         protocol.join_lobby(cfg.tier, cfg.mode)):
+                await self._send(client, text)
+            delay = behavior.first_input_delay()
+            if delay is not None:
+                self._schedule(loop.time() + delay, idx)
+            while True:
+                raw = await ws.recv(decode=False)
+                self.stats.msgs_in += 1
+                self.stats.bytes_in += len(raw)
+                kind = protocol.peek_type(raw)
+                self.stats.types[kind] += 1
+                if kind == "error":
+                    self.stats.server_errors += 1
+                elif kind == "roundEnd" and behavior.rejoin:
+                    loop.call_later(rng.uniform(0.5, 2.0), self._rejoin, client)
+                if behavior.wants(kind):
+                    behavior.on_message(kind, json.loads(raw))
+        except ConnectionClosed as e:
+            code = e.rcvd.code if e.rcvd else 1006
+            if not self._stopping:
+                self.stats.closed_by_server += 1
+                self.stats.close_codes[code] += 1
+        finally:
+            client.closed = True
+            self.stats.open -= 1
+            self.clients.pop(idx, None)
+        return True, code
+
+    def _rejoin(self, client: _Client) -> None:
+        if not client.closed and not self._stopping:
+            asyncio.ensure_future(self._send(client, protocol.join_lobby(self.cfg.tier, self.cfg.mode)))
+
+    async def _send(self, client: _Client, text: str) -> None:
+        try:
+            await client.ws.send(text)
+        except Exception:
+            return
+        self.stats.msgs_out += 1
+        self.stats.bytes_out += len(text)
+
+    def _schedule(self, due: float, idx: int) -> None:
+        heapq.heappush(self._heap, (due, idx))
+        if self._heap[0][1] == idx:
+            self._wake.set()
+
+    async def _pump(self) -> None:
+        """All inputs of this worker, in due order, from one heap."""
+        loop = asyncio.get_running_loop()
+        heap = self._heap
+        while True:
+            now = loop.time()
+            while heap and heap[0][0] <= now:
+                due, idx = heapq.heappop(heap)
+                client = self.clients.get(idx)
+                if client is None or client.closed:
+                    continue
+                text, delay = client.behavior.next_input(now)
+                if text is not None:
+                    transport = client.ws.transport
+                    if transport is None or transport.get_write_buffer_size() > INPUT_WRITE_LIMIT:
+                        self.stats.inputs_dropped += 1
+                    else:
+                        await self._send(client, text)
+                # Keep the cadence, but do not fire a burst to catch up after a stall.
+                heapq.heappush(heap, (max(due + delay, now), idx))
+                now = loop.time()
+            self._wake.clear()
+            timeout = heap[0][0] - loop.time() if heap else 0.5
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+
+def raise_nofile(want: int) -> None:
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else max(soft, want)
+    if soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def _worker_main(worker_id: int, cfg: SwarmConfig, indices: list[int], report, stop) -> None:
+    raise_nofile(len(indices) + 256)
+    try:
+        asyncio.run(Worker(worker_id, cfg, indices).run(report, stop))
+    except KeyboardInterrupt:
+        pass
+
+
+class Swarm:
+    """
+    Parent side: starts the workers and merges their reports. `target` is the
+    worker entry point, called as target(worker_id, cfg, indices, report,
+    stop); other client engines (loadlib.replay) reuse the plumbing with
+    their own config, which needs `clients` and `workers`.
+    """
+
+    def __init__(self, cfg, target=None):
+        self.cfg = cfg
+        self.latest: dict[int, Stats] = {}
+        self.final: dict[int, Stats] = {}
+        # spawn, not fork: the parent may already run an event loop (and a stand-in server).
+        ctx = mp.get_context("spawn")
+        self._report = ctx.Queue()
+        self._stop = ctx.Event()
+        self._procs = [
+            ctx.Process(target=target or _worker_main, name=f"swarm-{w}", daemon=True,
+                        args=(w, cfg, list(range(w, cfg.clients, cfg.workers)), self._report, self._stop))
+            for w in range(cfg.workers)
+        ]
+
+    def start(self) -> None:
+        for p in self._procs:
+            p.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def poll(self, timeout: float) -> None:
+        """Drain worker reports for up to `timeout` seconds."""
+        end = time.monotonic() + timeout
+        while True:
+            try:
+                kind, worker, stats = self._report.get(timeout=max(0.0, end - time.monotonic()))
+            except queue_mod.Empty:
+                return
+            if kind == "final":
+                self.final[worker] = stats
+            self.latest[worker] = stats
+            if time.monotonic() >= end:
+                return
+
+    def totals(self, cls: type[Stats] = Stats) -> Stats:
+        total = cls()
+        for stats in self.latest.values():
+            total.add(stats)
+        return total
+
+    @property
+    def done(self) -> bool:
+        return len(self.final) == len(self._procs) or not any(p.is_alive() for p in self._procs)
+
+    def join(self, timeout: float = 10.0) -> None:
+        end = time.monotonic() + timeout
+        while not self.done and time.monotonic() < end:
+            self.poll(0.2)
+        for p in self._procs:
+            p.join(max(0.0, end - time.monotonic()))
+            if p.is_alive():
+                p.terminate()
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
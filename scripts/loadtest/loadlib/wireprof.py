@@ -0,0 +1,255 @@
+"""
+Per-message-type wire profile of the /ws protocol, as seen by observers.
+
+The server has no spectator mode, so an observer is a guest that joins a
+lobby and never sends an input (it still occupies a player slot). For every
+frame it receives it records:
+
+  size      bytes on the wire per message type, plus what permessage-deflate
+            with context takeover would make of the same stream (zlib,
+            sync-flushed per message, one compressor per observer);
+  timing    inter-arrival time of the two broadcast types on the client
+            clock, and the spacing of the server's own payload timestamps,
+            so setInterval drift on the server can be told apart from
+            delivery jitter;
+  layout    for gameStateUpdate and trailDelta, how the bytes split into a
+            frame base and per-player entries (each entry re-serialised the
+            way JSON.stringify wrote it), which is what egress projections
+            for other lobby sizes are built from;
+  growth    mean bytes per player entry by seconds since goAtMs, to catch
+            frames that grow with match duration (full frames with inlined
+            trails do, until trails expire).
+
+Everything is aggregated as it arrives (HDR histograms and running sums);
+nothing per message is kept.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import zlib
+from dataclasses import dataclass, field
+
+from . import protocol
+from .hdr import Histogram
+
+GROWTH_BUCKET_S = 5.0
+LATE_FACTOR = 1.5      # an interval this many times nominal counts as late
+BURST_FACTOR = 0.5     # and one below this as a catch-up burst
+
+NOMINAL_INTERVAL_MS = {
+    "gameStateUpdate": protocol.BROADCAST_INTERVAL_MS,
+    "trailDelta": protocol.TRAIL_DELTA_INTERVAL_MS,
+}
+
+
+@dataclass
+class Running:
+    """Count / mean / standard deviation without keeping the samples."""
+    n: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+
+    def add(self, v: float) -> None:
+        self.n += 1
+        self.total += v
+        self.total_sq += v * v
+
+    def merge(self, other: "Running") -> None:
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else math.nan
+
+    @property
+    def stdev(self) -> float:
+        if self.n < 2:
+            return 0.0
+        return math.sqrt(max(0.0, (self.total_sq - self.total * self.total / self.n) / (self.n - 1)))
+
+
+@dataclass
+class TypeStats:
+    count: int = 0
+    bytes: int = 0
+    deflated: int = 0
+    size: Histogram = field(default_factory=lambda: Histogram(highest_us=64 * 1024 * 1024, digits=2))
+    interval: Histogram = field(default_factory=lambda: Histogram(highest_us=60_000_000, digits=3))
+    interval_ms: Running = field(default_factory=Running)
+    server_interval_ms: Running = field(default_factory=Running)
+    late: int = 0
+    bursts: int = 0
+    # Layout (gameStateUpdate / trailDelta only).
+    base_bytes: Running = field(default_factory=Running)
+    entry_bytes: Running = field(default_factory=Running)
+    entries: Running = field(default_factory=Running)
+    growth: dict[int, Running] = field(default_factory=dict)   # bucket -> bytes per entry
+
+    def merge(self, other: "TypeStats") -> None:
+        self.count += other.count
+        self.bytes += other.bytes
+        self.deflated += other.deflated
+        self.size.merge(other.size)
+        self.interval.merge(other.interval)
+        for name in ("interval_ms", "server_interval_ms", "base_bytes", "entry_bytes", "entries"):
+            getattr(self, name).merge(getattr(other, name))
+        self.late += other.late
+        self.bursts += other.bursts
+        for bucket, running in other.growth.items():
+            self.growth.setdefault(bucket, Running()).merge(running)
+
+    def growth_slope(self) -> tuple[float, float]:
+        """(bytes per entry at the first bucket, least-squares bytes/entry per second of match)."""
+        points = sorted((b * GROWTH_BUCKET_S, r.mean) for b, r in self.growth.items() if r.n)
+        if len(points) < 2:
+            return (points[0][1] if points else math.nan), 0.0
+        mx = sum(t for t, _ in points) / len(points)
+        my = sum(v for _, v in points) / len(points)
+        var = sum((t - mx) ** 2 for t, _ in points)
+        slope = sum((t - mx) * (v - my) for t, v in points) / var if var else 0.0
+        return points[0][1], slope
+
+
+class Observer:
+    """One passive client; kind is "slim" (clientHello trailDelta) or "full" (trails inlined)."""
+
+    def __init__(self, idx: int, url: str, full: bool, tier: int = 0, mode: str = "practice"):
+        self.idx = idx
+        self.url = url
+        self.full = full
+        self.kind = "full" if full else "slim"
+        self.tier = tier
+        self.mode = mode
+        self.types: dict[str, TypeStats] = {}
+        self.connected_s = 0.0
+        self.connect_failed = False
+        self._deflate = zlib.compressobj(6, zlib.DEFLATED, -15)
+        self._last: dict[str, tuple[float, float | None, float | None]] = {}  # type -> (arrival, server ts, goAtMs)
+        self._go_at_ms: float | None = None
+
+    async def run(self, stop: asyncio.Event) -> None:
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import ConnectionClosed
+
+        loop = asyncio.get_running_loop()
+        try:
+            ws = await connect(self.url, compression=None, open_timeout=10, ping_interval=None, close_timeout=2,
+                               max_size=64 * 1024 * 1024)
+        except Exception:
+            self.connect_failed = True
+            return
+        started = loop.time()
+        async with ws:
+            for text in (protocol.guest_login(f"observer_{self.idx:03d}"), protocol.client_hello(not self.full),
+                         protocol.join_lobby(self.tier, self.mode)):
+                await ws.send(text)
+            try:
+                while not stop.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(decode=False), 0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    kind = self.on_frame(raw, loop.time())
+                    if kind == "roundEnd":
+                        await ws.send(protocol.join_lobby(self.tier, self.mode))
+            except ConnectionClosed:
+                pass
+        self.connected_s = loop.time() - started
+
+    def on_frame(self, raw: bytes, now: float) -> str:
+        kind = protocol.peek_type(raw)
+        stats = self.types.get(kind)
+        if stats is None:
+            stats = self.types[kind] = TypeStats()
+        size = len(raw)
+        stats.count += 1
+        stats.bytes += size
+        stats.size.record(size)
+        stats.deflated += len(self._deflate.compress(raw)) + len(self._deflate.flush(zlib.Z_SYNC_FLUSH)) - 4
+
+        server_ts = None
+        if kind in NOMINAL_INTERVAL_MS:
+            payload = json.loads(raw).get("payload") or {}
+            server_ts = payload.get("timestamp")
+            if kind == "gameStateUpdate" and isinstance(payload.get("goAtMs"), (int, float)):
+                self._go_at_ms = payload["goAtMs"]
+            self._layout(kind, stats, payload, size)
+        elif kind == "roundEnd":
+            self._last.clear()
+            self._go_at_ms = None
+
+        if kind not in NOMINAL_INTERVAL_MS:
+            return kind
+        last = self._last.get(kind)
+        if last is not None and last[2] == self._go_at_ms:  # only within one match
+            gap_ms = (now - last[0]) * 1000
+            stats.interval.record(gap_ms * 1000)
+            stats.interval_ms.add(gap_ms)
+            if isinstance(server_ts, (int, float)) and isinstance(last[1], (int, float)):
+                stats.server_interval_ms.add(server_ts - last[1])
+            nominal = NOMINAL_INTERVAL_MS[kind]
+            if gap_ms > LATE_FACTOR * nominal:
+                stats.late += 1
+            elif gap_ms < BURST_FACTOR * nominal:
+                stats.bursts += 1
+        self._last[kind] = (now, server_ts, self._go_at_ms)
+        return kind
+
+    def _layout(self, kind: str, stats: TypeStats, payload: dict, size: int) -> None:
+        entries = payload.get("players" if kind == "gameStateUpdate" else "deltas") or []
+        entry_sizes = [len(protocol.dumps(e)) for e in entries]
+        # Entries are comma-separated inside the array.
+        entry_total = sum(entry_sizes) + max(0, len(entry_sizes) - 1)
+        stats.base_bytes.add(size - entry_total)
+        stats.entries.add(len(entries))
+        for n in entry_sizes:
+            stats.entry_bytes.add(n + 1)
+        ts = payload.get("timestamp")
+        if entry_sizes and self._go_at_ms is not None and isinstance(ts, (int, float)) and ts >= self._go_at_ms:
+            bucket = int((ts - self._go_at_ms) / 1000 / GROWTH_BUCKET_S)
+            stats.growth.setdefault(bucket, Running()).add(sum(entry_sizes) / len(entry_sizes))
+
+
+def merge_observers(observers: list[Observer]) -> tuple[dict[str, dict[str, TypeStats]], dict[str, float]]:
+    """({kind: {type: TypeStats}}, {kind: observer-seconds}) over all observers."""
+    merged: dict[str, dict[str, TypeStats]] = {}
+    seconds: dict[str, float] = {}
+    for obs in observers:
+        seconds[obs.kind] = seconds.get(obs.kind, 0.0) + obs.connected_s
+        by_type = merged.setdefault(obs.kind, {})
+        for kind, stats in obs.types.items():
+            by_type.setdefault(kind, TypeStats()).merge(stats)
+    return merged, seconds
+
+
+def frame_bytes(stats: TypeStats, players: int) -> float:
+    """Projected size of one frame with `players` entries."""
+    return stats.base_bytes.mean + players * stats.entry_bytes.mean
+
+
+def project(by_type: dict[str, TypeStats], observer_seconds: float, players: int) -> dict[str, float]:
+    """
+    Bytes/s the server sends one client of this kind, and one lobby, with
+    `players` players per lobby. Frame rates are the measured per-client
+    rates; trailDelta carries an entry only for players that moved, at the
+    measured share of players per delta.
+    """
+    per_client = 0.0
+    for kind, stats in by_type.items():
+        if not stats.count or observer_seconds <= 0:
+            continue
+        rate = stats.count / observer_seconds
+        if kind in NOMINAL_INTERVAL_MS and stats.entries.n and stats.entry_bytes.n:
+            share = 1.0
+            if kind == "trailDelta":
+                state = by_type.get("gameStateUpdate")
+                seen = state.entries.mean if state and state.entries.n else stats.entries.mean
+                share = min(1.0, stats.entries.mean / seen) if seen else 1.0
+            per_client += rate * frame_bytes(stats, max(1, round(players * share)))
+        else:
+            per_client += stats.bytes / observer_seconds
+    return {"client_bytes_per_s": per_client, "lobby_bytes_per_s": per_client * players}
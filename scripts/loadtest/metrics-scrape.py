@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - High-frequency /api/metrics and /api/ws-healthz scraper
+
+Polls both endpoints every --interval seconds (default 100 ms, vs. the 15 s
+Prometheus example in ops/nginx), keeps the samples in ring buffers with
+1 s / 10 s / 1 min rollups, prints a live line with rates and percentiles,
+and writes a JSON snapshot every --snapshot-every seconds and on exit.
+
+  python3 scripts/loadtest/metrics-scrape.py --url http://127.0.0.1:8080 --seconds 120
+  python3 scripts/loadtest/metrics-scrape.py --standin --seconds 30
+
+/api/metrics is ops-only: from a non-local address pass --ops-token (or set
+OPS_TOKEN). --standin starts a local stand-in server with synthetic lobby
+spikes and scrapes that instead (needs websockets).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+from loadlib import RESULTS_DIR
+from loadlib.metrics import METRICS_PATH, WS_HEALTHZ_PATH, Scraper
+from loadlib.series import SeriesStore, write_json
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape /api/metrics and /api/ws-healthz at high frequency.")
+    parser.add_argument("--url", default=os.environ.get("SCRAPE_URL", "http://127.0.0.1:8080"),
+                        help="Server base URL (default: $SCRAPE_URL or http://127.0.0.1:8080).")
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between polls per endpoint (default: 0.1).")
+    parser.add_argument("--seconds", type=float, default=0, help="Stop after this long (default: until Ctrl-C).")
+    parser.add_argument("--ops-token", default=os.environ.get("OPS_TOKEN", ""), help="Sent as x-ops-token (default: $OPS_TOKEN).")
+    parser.add_argument("--capacity", type=int, default=36_000,
+                        help="Raw samples kept per series (default: 36000, one hour at 10 Hz).")
+    parser.add_argument("--out", type=Path, help="Snapshot file (default: .cache/loadtest/metrics-<utc>.json).")
+    parser.add_argument("--snapshot-every", type=float, default=5.0, help="Seconds between snapshot writes (0 = only on exit).")
+    parser.add_argument("--quiet", action="store_true", help="No live status line.")
+    parser.add_argument("--standin", action="store_true", help="Scrape a local stand-in server with synthetic load.")
+    args = parser.parse_args()
+    if args.interval <= 0:
+        parser.error("--interval must be > 0")
+    return args
+
+
+def fmt(value, digits=1) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def status_line(store: SeriesStore, scraper: Scraper, started: float) -> str:
+    def w(name, key, seconds=10):
+        s = store.get(name)
+        return s.summary(seconds).get(key) if s else None
+
+    m, h = scraper.stats[METRICS_PATH], scraper.stats[WS_HEALTHZ_PATH]
+    return (
+        f"t={time.time() - started:5.0f}s "
+        f"conn={fmt(w('ws_connected_current', 'max', 1), 0)} (p99 10s {fmt(w('ws_connected_current', 'p99'), 0)}) "
+        f"lobbies={fmt(w('lobby_active', 'max', 1), 0)} (max 10s {fmt(w('lobby_active', 'max'), 0)}) "
+        f"connects/s={fmt(w('ws_connections_total', 'rate'))} http/s={fmt(w('http_requests_total', 'rate'))} "
+        f"rtt={fmt(w('ws_healthz_avg_latency_ms', 'p50'), 0)}ms "
+        f"scrape p99={fmt(w('scrape_metrics_ms', 'p99'))}ms "
+        f"ok={m.ok}/{h.ok} err={m.errors}/{h.errors} missed={m.missed}/{h.missed}"
+    )
+
+
+def snapshot(store: SeriesStore, scraper: Scraper, url: str, started: float) -> dict:
+    return {
+        "url": url,
+        "interval": scraper.interval,
+        "started": started,
+        "updated": time.time(),
+        "endpoints": {p: vars(s) for p, s in scraper.stats.items()},
+        "memory_bytes": store.nbytes,
+        "series": store.snapshot(),
+    }
+
+
+async def run(args) -> int:
+    standin = None
+    url = args.url
+    if args.standin:
+        try:
+            from loadlib.standin import StandIn
+            standin = await StandIn(churn=True).start()
+        except ImportError:
+            print("❌ ERROR: --standin needs websockets: pip install websockets")
+            return 1
+        url = standin.http_url
+        print(f"[scrape] stand-in server on {url}")
+
+    out = args.out or RESULTS_DIR / f"metrics-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    headers = {"x-ops-token": args.ops_token} if args.ops_token else {}
+    store = SeriesStore(capacity=args.capacity)
+    scraper = Scraper(url, store, interval=args.interval, headers=headers)
+    started = time.time()
+    print(f"[scrape] {url} every {args.interval * 1000:g} ms -> {out}")
+
+    async def report():
+        next_snapshot = time.monotonic() + args.snapshot_every
+        while True:
+            await asyncio.sleep(1.0)
+            if not args.quiet:
+                sys.stdout.write("\r" + status_line(store, scraper, started) + "   ")
+                sys.stdout.flush()
+            if args.snapshot_every and time.monotonic() >= next_snapshot:
+                write_json(out, snapshot(store, scraper, url, started))
+                next_snapshot += args.snapshot_every
+
+    reporter = asyncio.create_task(report())
+    try:
+        await scraper.run(args.seconds)
+    finally:
+        reporter.cancel()
+        write_json(out, snapshot(store, scraper, url, started))
+        if standin is not None:
+            await standin.stop()
+
+    print("\n" + status_line(store, scraper, started))
+    m = scraper.stats[METRICS_PATH]
+    if m.errors and not m.ok:
+        print(f"❌ ERROR: every /api/metrics poll failed: {m.last_error}")
+        print("   (404 means ops-only: pass --ops-token or scrape from localhost)")
+        return 1
+    print(f"[scrape] snapshot: {out} ({store.nbytes / 1024:.0f} KiB of ring buffers)")
+    return 0
+
+
+def main() -> int:
+    args = parse_args()
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(run(args))
+    try:
+        return loop.run_until_complete(task)
+    except KeyboardInterrupt:
+        # Cancelling unwinds run()'s finally, which still writes the snapshot.
+        task.cancel()
+        try:
+            return loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            return 0
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Scrape cancelled by user")
+        sys.exit(1)
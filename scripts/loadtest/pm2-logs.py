@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Streaming analyzer for the server's pm2 logs
+
+Reads .pm2/logs/spermrace-out.log and spermrace-err.log from where the
+previous run stopped, and keeps per-tag counters ([DB], [PAYMENT], [ELO],
+[ABUSE], ...) with per-minute rates, failure counts and latency percentiles
+(any "123ms" in a line), plus per-route status and latency for the
+LOG_JSON=true request lines. pm2 log rotation and copytruncate are followed.
+Memory stays flat however large the logs are; offsets and aggregates are
+kept in .cache/loadtest/pm2-logs-state.json.
+
+  python3 scripts/loadtest/pm2-logs.py                  # read what's new, print the summary
+  python3 scripts/loadtest/pm2-logs.py --follow         # live summary, refreshed every second
+  python3 scripts/loadtest/pm2-logs.py --reset --logs-dir /srv/spermrace/.pm2/logs
+  python3 scripts/loadtest/pm2-logs.py --file /tmp/server.log:err --state /tmp/pm2-state.json --json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+from loadlib import REPO_ROOT, RESULTS_DIR
+from loadlib.pm2log import Analyzer, LogSource, Record, load_state, parse, save_state
+from loadlib.series import write_json
+
+LOG_NAMES = (("spermrace-out.log", "out"), ("spermrace-err.log", "err"))
+SAVE_EVERY = 10.0       # seconds between state writes while following
+CHECK_EVERY = 4096      # records between deadline checks
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Incrementally summarise the server's pm2 logs.")
+    parser.add_argument("--logs-dir", type=Path, default=REPO_ROOT / ".pm2" / "logs",
+                        help="Directory with spermrace-out.log / spermrace-err.log (default: .pm2/logs).")
+    parser.add_argument("--file", action="append", default=[], metavar="PATH[:out|err]",
+                        help="Read this file instead (repeatable); the stream defaults to out.")
+    parser.add_argument("--state", type=Path, default=RESULTS_DIR / "pm2-logs-state.json",
+                        help="Offsets and aggregates (default: .cache/loadtest/pm2-logs-state.json).")
+    parser.add_argument("--reset", action="store_true", help="Forget the saved state and read the logs from the start.")
+    parser.add_argument("--follow", action="store_true", help="Keep reading and redraw the summary until Ctrl-C.")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between refreshes with --follow (default: 1).")
+    parser.add_argument("--top", type=int, default=15, help="Routes shown (default: 15).")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON instead of tables.")
+    parser.add_argument("--out", type=Path, help="Also write the summary JSON here.")
+    args = parser.parse_args()
+    if args.interval <= 0:
+        parser.error("--interval must be > 0")
+    return args
+
+
+def wanted_sources(args) -> list[LogSource]:
+    if not args.file:
+        return [LogSource(args.logs_dir / name, stream) for name, stream in LOG_NAMES]
+    sources = []
+    for spec in args.file:
+        path, _, stream = spec.rpartition(":") if spec.endswith((":out", ":err")) else (spec, "", "out")
+        sources.append(LogSource(Path(path).resolve(), stream))
+    return sources
+
+
+def restore(args) -> tuple[list[LogSource], Analyzer]:
+    """Wanted sources with their saved offsets, and the saved aggregates (if they were for the same files)."""
+    sources = wanted_sources(args)
+    saved = None if args.reset else load_state(args.state)
+    if saved is None:
+        return sources, Analyzer()
+    saved_sources, analyzer = saved
+    by_path = {str(s.path): s for s in saved_sources}
+    if set(by_path) != {str(s.path) for s in sources}:
+        print(f"⚠️  {args.state} was for other files; starting over (pass --state to keep both)", file=sys.stderr)
+        return sources, Analyzer()
+    return [by_path[str(s.path)] for s in sources], analyzer
+
+
+def until(records: Iterator[Record], deadline: float) -> Iterator[Record]:
+    """Records from `records` until `deadline`; the rest stay in the generator for next time."""
+    n = 0
+    for rec in records:
+        yield rec
+        n += 1
+        if n % CHECK_EVERY == 0 and time.monotonic() >= deadline:
+            return
+
+
+class Reader:
+    """Keeps one suspended parse() pipeline per source, so a catch-up can be spread over refreshes."""
+
+    def __init__(self, sources: list[LogSource], analyzer: Analyzer):
+        self.sources = sources
+        self.analyzer = analyzer
+        self._pipes: dict[int, Iterator[Record]] = {}
+
+    def step(self, deadline: float | None = None) -> bool:
+        """Feed new records until `deadline` (or the end); True once every source is at its end."""
+        done = True
+        for i, src in enumerate(self.sources):
+            pipe = self._pipes.get(i)
+            if pipe is None:
+                pipe = self._pipes[i] = parse(src.read(), src.stream)
+            if deadline is None:
+                self.analyzer.feed(pipe)
+            else:
+                self.analyzer.feed(until(pipe, deadline))
+                if time.monotonic() >= deadline:
+                    done = False
+                    continue
+            del self._pipes[i]     # exhausted; the next step starts a fresh read from the new offset
+        return done
+
+
+# Output ---------------------------------------------------------------------------------
+
+
+def fmt_ms(value) -> str:
+    return "-" if value is None else f"{value:.0f}" if value >= 100 else f"{value:.1f}"
+
+
+def summary(analyzer: Analyzer, sources: list[LogSource], now: float) -> dict:
+    tags = {}
+    for tag, s in sorted(analyzer.tags.items(), key=lambda kv: -kv[1].count):
+        lat = s.latency.summary_ms() if s.latency else {}
+        tags[tag] = {"count": s.count, "errors": s.errors, "stderr": s.stderr,
+                     "per_min_1m": s.per_minute(1, now), "per_min_5m": s.per_minute(5, now),
+                     "per_min_60m": s.per_minute(60, now), "latency_ms": lat}
+    routes = {route: {"count": r.count, "statuses": dict(r.statuses), "latency_ms": r.latency.summary_ms()}
+              for route, r in sorted(analyzer.routes.items(), key=lambda kv: -kv[1].count)}
+    return {"now": now, "lines": analyzer.lines, "first_ts": analyzer.first_ts, "last_ts": analyzer.last_ts,
+            "sources": [s.to_state() for s in sources], "tags": tags, "routes": routes}
+
+
+def render(data: dict, top: int) -> str:
+    out = []
+    span = ""
+    if data["first_ts"]:
+        span = (f" from {time.strftime('%Y-%m-%d %H:%M', time.localtime(data['first_ts']))}"
+                f" to {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data['last_ts']))}")
+    out.append(f"[pm2] {data['lines']:,} entries{span}")
+    for s in data["sources"]:
+        rotated = f", {s['rotations']} rotation(s)" if s["rotations"] else ""
+        out.append(f"  {s['stream']}: {s['path']} @ {s['offset']:,} bytes{rotated}")
+    out.append("")
+    out.append(f"  {'tag':12} {'total':>10} {'/min 1m':>8} {'5m':>8} {'60m':>8} {'errors':>8} {'err%':>6} "
+               f"{'p50 ms':>8} {'p99 ms':>8}")
+    for tag, t in data["tags"].items():
+        lat = t["latency_ms"]
+        err_pct = 100.0 * t["errors"] / t["count"] if t["count"] else 0.0
+        flag = "  ⚠️" if t["errors"] and t["per_min_5m"] and err_pct >= 5 else ""
+        out.append(f"  {tag:12} {t['count']:>10,} {t['per_min_1m']:>8.1f} {t['per_min_5m']:>8.1f} "
+                   f"{t['per_min_60m']:>8.1f} {t['errors']:>8,} {err_pct:>5.1f}% "
+                   f"{fmt_ms(lat.get('p50')):>8} {fmt_ms(lat.get('p99')):>8}{flag}")
+    if data["routes"]:
+        out.append("")
+        out.append(f"  {'route':40} {'count':>9} {'2xx':>8} {'4xx':>7} {'429':>6} {'5xx':>6} "
+                   f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for route, r in list(data["routes"].items())[:top]:
+            st, lat = r["statuses"], r["latency_ms"]
+            out.append(f"  {route[:40]:40} {r['count']:>9,} {st.get('2xx', 0):>8,} {st.get('4xx', 0):>7,} "
+                       f"{st.get('429', 0):>6,} {st.get('5xx', 0):>6,} {fmt_ms(lat.get('p50')):>8} "
+                       f"{fmt_ms(lat.get('p99')):>8} {fmt_ms(lat.get('max')):>8}")
+        hidden = len(data["routes"]) - top
+        if hidden > 0:
+            out.append(f"  ... {hidden} more route(s)")
+    return "\n".join(out)
+
+
+def clock(reader: Reader, live: bool) -> float:
+    """Rates are per wall-clock minute when following, and relative to the last line for a one-off read of old logs."""
+    return time.time() if live else (reader.analyzer.last_ts or time.time())
+
+
+def show(args, reader: Reader, live: bool) -> None:
+    data = summary(reader.analyzer, reader.sources, clock(reader, live))
+    if args.json:
+        print(json.dumps(data, separators=(",", ":")), flush=True)
+        return
+    text = render(data, args.top)
+    if live and sys.stdout.isatty():
+        sys.stdout.write("\x1b[H\x1b[2J" + text + f"\n\n  (refreshing every {args.interval:g}s, Ctrl-C to stop)\n")
+        sys.stdout.flush()
+    else:
+        print(text)
+
+
+def finish(args, reader: Reader, live: bool) -> None:
+    # Same clock as show(): trimming an old log against wall-clock time would drop every bucket it has.
+    now = clock(reader, live)
+    reader.analyzer.trim(now)
+    save_state(args.state, reader.sources, reader.analyzer)
+    if args.out:
+        write_json(args.out, summary(reader.analyzer, reader.sources, now))
+
+
+def main() -> int:
+    args = parse_args()
+    sources, analyzer = restore(args)
+    missing = [s.path for s in sources if not s.path.exists()]
+    if len(missing) == len(sources) and not args.follow:
+        print(f"❌ ERROR: no log files found: {', '.join(str(p) for p in missing)}")
+        print("   (pass --logs-dir or --file; pm2 writes them under .pm2/logs in the repo root)")
+        return 1
+    reader = Reader(sources, analyzer)
+
+    if not args.follow:
+        started = time.monotonic()
+        before = analyzer.lines
+        reader.step()
+        finish(args, reader, live=False)
+        show(args, reader, live=False)
+        if not args.json:
+            print(f"\n[pm2] read {analyzer.lines - before:,} new lines in {time.monotonic() - started:.2f}s; state: {args.state}")
+        return 0
+
+    next_save = time.monotonic() + SAVE_EVERY
+    try:
+        while True:
+            tick = time.monotonic()
+            # Leave a fifth of the interval for drawing; a long catch-up carries on next tick.
+            caught_up = reader.step(deadline=tick + args.interval * 0.8)
+            show(args, reader, live=True)
+            if time.monotonic() >= next_save:
+                finish(args, reader, live=True)
+                next_save = time.monotonic() + SAVE_EVERY
+            if caught_up:
+                time.sleep(max(0.0, tick + args.interval - time.monotonic()))
+    finally:
+        finish(args, reader, live=True)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Log analysis cancelled by user")
+        sys.exit(1)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Server memory/CPU sampler correlated with load phases
+
+Samples /proc/<pid>/status and stat of the node server at --hz (default 20)
+and smaps_rollup at --smaps-hz, while it drives the WebSocket swarm through
+--phases of players and idle gaps. /api/metrics (ws_connected_current,
+lobby_active) is scraped alongside. Every --step it records one row of
+memory next to players, lobbies and message rates. At the end it fits memory
+per player, projects where pm2's 500M max_memory_restart is hit, and flags
+memory that does not return to the idle baseline after lobbies end.
+
+  python3 scripts/loadtest/proc-sample.py --pid spermrace-server-ws --url ws://127.0.0.1:8080/ws \\
+      --phases 0:30,500:120,0:90,1000:120,0:90,1000:120,0:90
+  python3 scripts/loadtest/proc-sample.py --pid 12345 --external --seconds 600    # load from elsewhere
+  python3 scripts/loadtest/proc-sample.py --standin --phases 0:5,300:20,0:15 --clients-ramp 200
+
+--pid takes a pid, a pm2 app name or part of a command line; the server
+must run on this host. With --external nothing is started: players and
+lobbies come from /api/metrics only. /api/metrics is ops-only, so from
+another address pass --ops-token (or set OPS_TOKEN).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from loadlib import RESULTS_DIR
+from loadlib.metrics import Scraper
+from loadlib.procmem import (DRIFT_MB_PER_MIN, RETURN_SHARE, TOLERANCE_MB, ProcessGone, ProcSampler, analyse,
+                             find_pid)
+from loadlib.series import SeriesStore, write_json
+from loadlib.swarm import Stats, Swarm, SwarmConfig, default_workers
+
+DEFAULT_PHASES = "0:30,500:120,0:90,1000:120,0:90,1000:120,0:90"
+
+
+def parse_phases(spec: str) -> list[tuple[int, float]]:
+    phases = []
+    for part in spec.split(","):
+        clients, _, seconds = part.strip().partition(":")
+        try:
+            phases.append((int(clients), float(seconds)))
+        except ValueError:
+            raise ValueError(f"bad phase {part!r}: expected clients:seconds") from None
+        if phases[-1][0] < 0 or phases[-1][1] <= 0:
+            raise ValueError(f"bad phase {part!r}")
+    return phases
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sample the server's /proc memory and CPU against load phases.")
+    parser.add_argument("--pid", default="spermrace-server-ws", help="Pid, pm2 app name or command-line substring.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8080/ws", help="Server WebSocket URL (default: ws://127.0.0.1:8080/ws).")
+    parser.add_argument("--phases", default=DEFAULT_PHASES,
+                        help=f"clients:seconds,... ; 0 clients is an idle gap (default: {DEFAULT_PHASES}).")
+    parser.add_argument("--external", action="store_true", help="Start no clients; sample for --seconds.")
+    parser.add_argument("--seconds", type=float, default=600, help="Run time with --external (default: 600).")
+    parser.add_argument("--hz", type=float, default=20, help="status/stat samples per second (default: 20).")
+    parser.add_argument("--smaps-hz", type=float, default=2, help="smaps_rollup samples per second (default: 2).")
+    parser.add_argument("--step", type=float, default=1.0, help="Seconds per timeline row (default: 1).")
+    parser.add_argument("--ops-token", default=os.environ.get("OPS_TOKEN", ""), help="Sent as x-ops-token (default: $OPS_TOKEN).")
+    parser.add_argument("--no-metrics", action="store_true", help="Don't scrape /api/metrics; players come from the swarm.")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Swarm worker processes (default: CPU count).")
+    parser.add_argument("--clients-ramp", type=float, default=500, help="New connections per second (default: 500).")
+    parser.add_argument("--behavior", default="broadcast", help="Swarm behaviour mix (default: broadcast).")
+    parser.add_argument("--limit-mb", type=float, default=500, help="pm2 max_memory_restart in MB (default: 500).")
+    parser.add_argument("--tolerance-mb", type=float, default=TOLERANCE_MB,
+                        help=f"Idle residue not flagged (default: {TOLERANCE_MB:g}).")
+    parser.add_argument("--out", type=Path, help="Result file (default: .cache/loadtest/procmem-<utc>.json).")
+    parser.add_argument("--standin", action="store_true",
+                        help="Run a local stand-in server in this process and sample that (to try the tool).")
+    args = parser.parse_args()
+    try:
+        args.phase_list = [(0, args.seconds)] if args.external else parse_phases(args.phases)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.hz <= 0 or args.smaps_hz <= 0 or args.step <= 0:
+        parser.error("--hz, --smaps-hz and --step must be > 0")
+    return args
+
+
+class Sampler:
+    """Fixed-rate /proc sampling; folds the samples of each step into one timeline row."""
+
+    def __init__(self, args, proc: ProcSampler, store: SeriesStore | None):
+        self.args = args
+        self.proc = proc
+        self.store = store
+        self.rows: list[dict] = []
+        self.events: list[dict] = []
+        self.phase = (0, "idle", 0)         # index, kind, planned clients
+        self.swarm_totals = Stats()
+        self._step: list[dict] = []
+        self._smaps: dict = {}
+        self._prev: dict | None = None
+        self._prev_msgs = (0, 0)
+        self.started = time.time()
+
+    def _metric(self, name: str) -> float | None:
+        s = self.store.get(name) if self.store else None
+        return s.last if s else None
+
+    def _row(self, now: float) -> dict:
+        step, last = self._step, self._step[-1]
+        dt = (now - self._prev["t"]) if self._prev else self.args.step
+        mb = lambda kb: kb / 1024.0
+        swarm = self.swarm_totals
+        # A finished phase resets the swarm's totals to zero; count from there.
+        msgs_in = swarm.msgs_in - self._prev_msgs[0] if swarm.msgs_in >= self._prev_msgs[0] else swarm.msgs_in
+        msgs_out = swarm.msgs_out - self._prev_msgs[1] if swarm.msgs_out >= self._prev_msgs[1] else swarm.msgs_out
+        connected = self._metric("ws_connected_current")
+        row = {
+            "t": round(now - self.started, 2),
+            "phase": self.phase[0],
+            "clients": self.phase[2],
+            "players": int(connected) if connected is not None else swarm.open,
+            "swarm_open": swarm.open,
+            "lobbies": int(self._metric("lobby_active") or 0),
+            "msgs_in_per_s": msgs_in / dt if dt > 0 else 0.0,
+            "msgs_out_per_s": msgs_out / dt if dt > 0 else 0.0,
+            "rss_mb": mb(sum(s["rss_kb"] for s in step) / len(step)),
+            "rss_max_mb": mb(max(s["rss_kb"] for s in step)),
+            "anon_mb": mb(sum(s.get("anon_kb", 0) for s in step) / len(step)),
+            "file_mb": mb(last.get("file_kb", 0)),
+            "hwm_mb": mb(last.get("hwm_kb", 0)),
+            "swap_mb": mb(last.get("swap_kb", 0)),
+            "threads": last.get("threads", 0),
+            "pss_anon_mb": mb(self._smaps["pss_anon_kb"]) if "pss_anon_kb" in self._smaps else None,
+            "private_dirty_mb": mb(self._smaps["private_dirty_kb"]) if "private_dirty_kb" in self._smaps else None,
+        }
+        if self._prev:
+            row["cpu_pct"] = (last["cpu_s"] - self._prev["cpu_s"]) / dt * 100 if dt > 0 else 0.0
+            row["minflt_per_s"] = (last["minflt"] - self._prev["minflt"]) / dt if dt > 0 else 0.0
+        else:
+            row["cpu_pct"] = row["minflt_per_s"] = None
+        self._prev = {"t": now, "cpu_s": last["cpu_s"], "minflt": last["minflt"]}
+        self._prev_msgs = (swarm.msgs_in, swarm.msgs_out)
+        return row
+
+    async def run(self, stop: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.args.hz
+        smaps_every = max(1, round(self.args.hz / self.args.smaps_hz))
+        next_tick = loop.time()
+        next_row = time.time() + self.args.step
+        n = 0
+        while not stop.is_set():
+            try:
+                sample = self.proc.sample()
+                if n % smaps_every == 0:
+                    self._smaps = self.proc.sample_smaps() or self._smaps
+            except ProcessGone:
+                if not await self._reattach():
+                    print("\n❌ ERROR: the server process exited and no replacement was found")
+                    stop.set()
+                    return
+                continue
+            n += 1
+            self._step.append(sample)
+            now = time.time()
+            if now >= next_row:
+                row = self._row(now)
+                self.rows.append(row)
+                self._step = []
+                next_row += self.args.step
+                print(live_line(row, self.phase), flush=True)
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                next_tick = loop.time()     # fell behind: sample late rather than in a burst
+                delay = 0
+            try:
+                await asyncio.wait_for(stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _reattach(self) -> bool:
+        """pm2 restarted the server (max_memory_restart?): follow the new pid."""
+        old = self.proc.pid
+        self.proc.close()
+        pid = None
+        for _ in range(50):
+            pid = find_pid(self.args.pid) if not self.args.pid.isdigit() else None
+            if pid and pid != old:
+                break
+            await asyncio.sleep(0.1)
+        if not pid or pid == old:
+            return False
+        self.proc = ProcSampler(pid)
+        self._prev = None
+        self._step = []
+        last = self.rows[-1] if self.rows else {}
+        event = {"t": round(time.time() - self.started, 2), "event": "restart", "old_pid": old, "new_pid": pid,
+                 "rss_mb_before": last.get("rss_max_mb")}
+        self.events.append(event)
+        print(f"\n⚠️  server restarted: pid {old} -> {pid} (last RSS {last.get('rss_max_mb', 0):.0f} MB)")
+        return True
+
+
+def live_line(row: dict, phase: tuple) -> str:
+    pss = f" pss_anon={row['pss_anon_mb']:.1f}MB" if row["pss_anon_mb"] is not None else ""
+    cpu = f" cpu={row['cpu_pct']:.0f}%" if row["cpu_pct"] is not None else ""
+    return (f"t={row['t']:6.0f}s phase {phase[0] + 1} {phase[1]:<4} {phase[2]:>5} | players={row['players']:<6} "
+            f"lobbies={row['lobbies']:<4} in={row['msgs_in_per_s']:7.0f} msg/s | rss={row['rss_mb']:6.1f}MB "
+            f"anon={row['anon_mb']:6.1f}MB{pss}{cpu}")
+
+
+async def run_phases(args, url: str, sampler: Sampler, stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    for i, (clients, seconds) in enumerate(args.phase_list):
+        if stop.is_set():
+            return
+        sampler.phase = (i, "load" if clients else "idle", clients)
+        if not clients:
+            try:
+                await asyncio.wait_for(stop.wait(), seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        cfg = SwarmConfig(url=url, clients=clients, seconds=seconds, workers=max(1, min(args.workers, clients)),
+                          ramp=args.clients_ramp, behaviors=args.behavior, seed=i + 1)
+        swarm = Swarm(cfg)
+        swarm.start()
+        try:
+            while not swarm.done and not stop.is_set():
+                await loop.run_in_executor(None, swarm.poll, 0.25)
+                if not swarm.final:
+                    sampler.swarm_totals = swarm.totals()
+        finally:
+            swarm.stop()
+            await loop.run_in_executor(None, swarm.join)
+            sampler.swarm_totals = Stats()
+    stop.set()
+
+
+def print_report(report: dict, events: list[dict]) -> None:
+    print("\nServer memory by phase:")
+    for i, p in enumerate(report["phases"]):
+        if p["kind"] == "idle":
+            extra = " (baseline)" if p.get("baseline") else (
+                f" residue {p['residue_mb']:+.1f} MB" + (f", {p['returned_share'] * 100:.0f}% returned"
+                                                         if p.get("returned_share") is not None else ""))
+            print(f"  {p['t0']:7.0f}s idle  anon settled {p['settled_anon_mb']:.1f} MB, rss {p['settled_rss_mb']:.1f} MB{extra}")
+        else:
+            kb = p["anon_kb_per_player"]
+            drift = p["steady_drift_mb_per_min"]
+            print(f"  {p['t0']:7.0f}s load  {p['peak_players']} players, {p['peak_lobbies']} lobbies: peak rss "
+                  f"{p['peak_rss_mb']:.1f} MB, anon {p['peak_anon_mb']:.1f} MB"
+                  + (f", {kb:.1f} KB/player" if kb is not None else "")
+                  + (f", steady drift {drift:+.2f} MB/min" if drift is not None else ""))
+    per = report["anon_per_player"]
+    if per:
+        print(f"- anon memory: {per['kb_per_player']:.1f} KB per player over a {per['base_mb']:.1f} MB base (r²={per['r2']:.2f})")
+    rss = report["rss_per_player"]
+    if rss and report.get("players_at_limit") is not None:
+        print(f"- rss: {rss['kb_per_player']:.1f} KB per player; {report['limit_mb']:g} MB is reached at about "
+              f"{report['players_at_limit']:,} players")
+    print(f"- peak rss: {report['peak_rss_mb']:.1f} MB")
+    for e in events:
+        print(f"⚠️  {e['t']:.0f}s: restarted (pid {e['old_pid']} -> {e['new_pid']}) at {e['rss_mb_before'] or 0:.0f} MB")
+    if not any(p["kind"] == "load" for p in report["phases"]):
+        print("⚠️  no load seen (players and lobbies stayed 0): nothing to compare with the baseline")
+    elif not report["flags"]:
+        print("✅ Memory returned to baseline after every load phase")
+    for f in report["flags"]:
+        at = f" at {f['t']:.0f}s" if f["t"] is not None else ""
+        print(f"⚠️  {f['flag']}{at}: {f['detail']}")
+
+
+async def run(args) -> int:
+    standin = None
+    url = args.url
+    if args.standin:
+        from loadlib.standin import StandIn
+        standin = await StandIn().start()
+        url = standin.ws_url
+        pid = os.getpid()
+        print(f"[proc] stand-in server on {url}, sampling this process")
+    else:
+        pid = find_pid(args.pid)
+        if pid is None:
+            print(f"❌ ERROR: no process matches {args.pid!r} (pass a pid, a pm2 app name or part of its command line)")
+            return 1
+    try:
+        proc = ProcSampler(pid)
+    except ProcessGone as e:
+        print(f"❌ ERROR: {e}")
+        return 1
+    if not proc.has_smaps:
+        print("⚠️  smaps_rollup is not readable (older kernel or another user's process): no Pss_Anon")
+
+    parts = urlsplit(url)
+    http_base = f"{'https' if parts.scheme == 'wss' else 'http'}://{parts.netloc}"
+    store = None if args.no_metrics else SeriesStore(capacity=4096)
+    scraper = None
+    if store is not None:
+        scraper = Scraper(http_base, store, interval=min(0.5, args.step),
+                          headers={"x-ops-token": args.ops_token} if args.ops_token else {})
+
+    total = sum(s for _, s in args.phase_list)
+    out = args.out or RESULTS_DIR / f"procmem-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    print(f"[proc] pid {pid}, {args.hz:g} Hz (smaps {args.smaps_hz:g} Hz), {len(args.phase_list)} phase(s), "
+          f"{total:g}s -> {out}")
+
+    sampler = Sampler(args, proc, store)
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(sampler.run(stop))]
+    if scraper is not None:
+        tasks.append(asyncio.create_task(scraper.run()))
+    try:
+        if args.external:
+            try:
+                await asyncio.wait_for(stop.wait(), args.seconds)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await run_phases(args, url, sampler, stop)
+    except asyncio.CancelledError:
+        # Ctrl-C: still analyse and save what was sampled.
+        print("\n[proc] interrupted; analysing the samples so far")
+    finally:
+        stop.set()
+        if scraper is not None:
+            scraper.stop()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        sampler.proc.close()
+        if standin is not None:
+            await standin.stop()
+
+    if scraper is not None and not scraper.stats["/api/metrics"].ok:
+        print("⚠️  /api/metrics was not readable (ops-only: pass --ops-token); players come from the swarm "
+              "and lobbies are unknown")
+    report = analyse(sampler.rows, limit_mb=args.limit_mb, tolerance_mb=args.tolerance_mb,
+                     return_share=RETURN_SHARE, drift_mb_per_min=DRIFT_MB_PER_MIN) if sampler.rows else None
+    write_json(out, {"pid": pid, "url": url, "phases": args.phase_list, "hz": args.hz, "step": args.step,
+                     "started": sampler.started, "events": sampler.events, "report": report,
+                     "timeline": sampler.rows})
+    if report:
+        print_report(report, sampler.events)
+    print(f"- result: {out}")
+    return 1 if report and report["flags"] else 0
+
+
+def main() -> int:
+    args = parse_args()
+    if not Path("/proc/self/status").exists():
+        print("❌ ERROR: /proc is not available; run this on the (Linux) host of the server")
+        return 1
+    if not args.external:
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            print("❌ ERROR: Required packages not installed.")
+            print("\nInstall them with: pip install websockets")
+            return 1
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Sampling cancelled by user")
+        sys.exit(1)
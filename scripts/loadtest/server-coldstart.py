@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - Server cold-start profiler
+
+run      Starts the built server (packages/server/dist/server/src/index.js)
+         --runs times against a stub Postgres and a stub Solana RPC (see
+         loadlib/coldstart.py) and times, from spawn, the startup log lines
+         (module load, app setup, DB schema, cache warm-up, listen), the
+         first HTTP 200 on /api/healthz, /api/readyz answering ok, and the
+         first WebSocket accept on /ws. The medians are appended to a history
+         file and compared with the last entry made with the same settings.
+history  Shows the history, one line per build.
+
+  pnpm --filter server build
+  python3 scripts/loadtest/server-coldstart.py run --runs 10 --label "before lazy web3"
+  python3 scripts/loadtest/server-coldstart.py run --db-rtt-ms 25 --rpc-rtt-ms 60     # imitate Supabase and a remote RPC
+  python3 scripts/loadtest/server-coldstart.py history --last 20
+
+Runs after the first find the build in the page cache; run 1 is reported
+separately, and --drop-caches (root) makes every run cold. The server runs
+with NODE_ENV=production and the pm2 node_args by default, in a scratch
+directory under .cache/loadtest/coldstart. Nothing outside the standard
+library is needed; openssl makes the stub database's certificate once.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from loadlib import REPO_ROOT, RESULTS_DIR
+from loadlib.coldstart import (MARKERS, PROBES, PgStub, RpcStub, Run, StubStats, http_get, self_signed_cert, stub_env,
+                               ws_accept)
+from loadlib.series import write_json
+
+DEFAULT_ENTRY = REPO_ROOT / "packages" / "server" / "dist" / "server" / "src" / "index.js"
+WORK_DIR = RESULTS_DIR / "coldstart"
+HISTORY = RESULTS_DIR / "coldstart-history.jsonl"
+PROBE_INTERVAL = 0.005          # seconds between healthz / ws attempts while nothing listens
+READY_INTERVAL = 0.05           # between readyz attempts (the global limiter allows 120/min)
+REGRESSION_SHARE = 0.2          # a median this much slower than the last entry ...
+REGRESSION_MIN_S = 0.025        # ... and at least this much slower is a regression
+METRICS = tuple(name for name, _ in MARKERS) + PROBES
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time the server's cold start across builds.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Start the server repeatedly and time its startup.")
+    run.add_argument("--entry", type=Path, default=DEFAULT_ENTRY, help="Server entry point (default: the built dist).")
+    run.add_argument("--runs", type=int, default=5, help="Cold starts (default: 5).")
+    run.add_argument("--timeout", type=float, default=60, help="Seconds a run may take to accept sockets (default: 60).")
+    run.add_argument("--db-rtt-ms", type=float, default=0, help="Stub database delay per round trip (default: 0).")
+    run.add_argument("--rpc-rtt-ms", type=float, default=0, help="Stub Solana RPC delay per request (default: 0).")
+    run.add_argument("--development", action="store_true", help="NODE_ENV=development instead of production.")
+    run.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra server environment (repeatable).")
+    run.add_argument("--node", default="node", help="Node binary (default: node).")
+    run.add_argument("--node-arg", action="append", default=None, metavar="ARG",
+                     help="Node option (repeatable; default: --enable-source-maps, as pm2 runs it).")
+    run.add_argument("--drop-caches", action="store_true", help="Drop the page cache before every run (root).")
+    run.add_argument("--label", default="", help="Note stored with the history entry.")
+    run.add_argument("--history", type=Path, default=HISTORY, help="History file (default: .cache/loadtest/coldstart-history.jsonl).")
+    run.add_argument("--no-history", action="store_true", help="Don't append to the history.")
+    run.add_argument("--out", type=Path, help="Per-run detail (default: .cache/loadtest/coldstart-<utc>.json).")
+
+    hist = sub.add_parser("history", help="Show past results.")
+    hist.add_argument("--history", type=Path, default=HISTORY, help="History file.")
+    hist.add_argument("--last", type=int, default=15, help="Entries shown (default: 15).")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        if args.runs < 1:
+            parser.error("--runs must be >= 1")
+        for item in args.env:
+            if "=" not in item:
+                parser.error(f"--env {item!r}: expected KEY=VALUE")
+        if args.node_arg is None:
+            args.node_arg = ["--enable-source-maps"]
+    return args
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def build_identity(entry: Path) -> dict:
+    """Git commit, whether the server sources differ from it, and a fingerprint of the built files."""
+    out: dict = {}
+    try:
+        out["git"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                    text=True, timeout=10).stdout.strip() or None
+        status = subprocess.run(["git", "status", "--porcelain", "--", "packages/server", "packages/shared"],
+                                cwd=REPO_ROOT, capture_output=True, text=True, timeout=10).stdout
+        out["dirty"] = bool(status.strip())
+    except (OSError, subprocess.SubprocessError):
+        out["git"], out["dirty"] = None, None
+    dist = next((p for p in entry.parents if p.name == "dist"), entry.parent)
+    digest = hashlib.sha1()
+    files = size = 0
+    for path in sorted(dist.rglob("*.js")):
+        st = path.stat()
+        digest.update(f"{path.relative_to(dist)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        files += 1
+        size += st.st_size
+    out.update(dist=digest.hexdigest()[:12], dist_files=files, dist_bytes=size)
+    return out
+
+
+def drop_caches() -> bool:
+    try:
+        os.sync()
+        Path("/proc/sys/vm/drop_caches").write_text("3\n")
+        return True
+    except OSError:
+        return False
+
+
+async def one_run(args, index: int, pg: PgStub, rpc: RpcStub, base_env: dict) -> Run:
+    run = Run(index)
+    pg.stats, rpc.stats, rpc.methods = StubStats(), StubStats(), {}
+    port = free_port()
+    cwd = WORK_DIR / "run"
+    shutil.rmtree(cwd, ignore_errors=True)
+    cwd.mkdir(parents=True)
+    env = dict(base_env, **stub_env(pg, rpc, port, production=not args.development))
+    env.update(item.split("=", 1) for item in args.env)
+
+    started = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(args.node, *args.node_arg, str(args.entry), cwd=cwd, env=env,
+                                                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                                                start_new_session=True)
+    since = lambda: round(time.monotonic() - started, 4)
+    pending = [name for name, _ in MARKERS]
+
+    async def read_log():
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                return
+            text = line.decode(errors="replace").rstrip()
+            run.log_tail = (run.log_tail + [text])[-40:]
+            for name in list(pending):
+                pattern = dict(MARKERS)[name]
+                if pattern.search(text):
+                    run.marks[name] = since()
+                    pending.remove(name)
+
+    async def probe_http():
+        while True:
+            try:
+                status, _ = await http_get(port, "/api/healthz")
+                if status == 200:
+                    run.marks["healthz"] = since()
+                    break
+            except (OSError, asyncio.TimeoutError):
+                pass
+            await asyncio.sleep(PROBE_INTERVAL)
+        while True:
+            try:
+                status, body = await http_get(port, "/api/readyz", timeout=10)
+                if status == 200 and json.loads(body or b"{}").get("ok"):
+                    run.marks["readyz"] = since()
+                    return
+            except (OSError, ValueError, asyncio.TimeoutError):
+                pass
+            await asyncio.sleep(READY_INTERVAL)
+
+    async def probe_ws():
+        while True:
+            try:
+                if await ws_accept(port):
+                    run.marks["ws_accept"] = since()
+                    return
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                pass
+            await asyncio.sleep(PROBE_INTERVAL)
+
+    log_task = asyncio.create_task(read_log())
+    probes = asyncio.gather(probe_http(), probe_ws())
+    exited = asyncio.create_task(proc.wait())
+    try:
+        done, _ = await asyncio.wait({probes, exited}, timeout=args.timeout, return_when=asyncio.FIRST_COMPLETED)
+        if exited in done:
+            run.error = f"server exited with code {proc.returncode} during startup"
+        elif not done:
+            run.error = f"not accepting after {args.timeout:g}s"
+    finally:
+        probes.cancel()
+        if proc.returncode is None:
+            os.killpg(proc.pid, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(proc.wait(), 5)
+            except asyncio.TimeoutError:
+                os.killpg(proc.pid, signal.SIGKILL)
+                await proc.wait()
+        await asyncio.gather(probes, log_task, exited, return_exceptions=True)
+    run.exit_code = proc.returncode
+    run.db = {"connections": pg.stats.connections, "round_trips": pg.stats.round_trips, "statements": pg.stats.statements,
+              "first_s": round(pg.stats.first_at - started, 4) if pg.stats.first_at else None}
+    run.rpc = {"requests": rpc.stats.round_trips, "methods": dict(rpc.methods),
+               "first_s": round(rpc.stats.first_at - started, 4) if rpc.stats.first_at else None}
+    return run
+
+
+def summarise(runs: list[Run]) -> dict:
+    ok = [r for r in runs if not r.error]
+    out: dict = {"runs": len(runs), "failed": len(runs) - len(ok), "first": {}, "median": {}, "p90": {}, "max": {}}
+    for name in METRICS:
+        values = [v for v in ((r.phases()[name] if name in dict(MARKERS) else r.marks.get(name)) for r in ok) if v is not None]
+        if not values:
+            continue
+        first = ok[0].phases()[name] if name in dict(MARKERS) else ok[0].marks.get(name)
+        out["first"][name] = first
+        out["median"][name] = round(statistics.median(values), 4)
+        out["p90"][name] = round(sorted(values)[min(len(values) - 1, int(0.9 * len(values)))], 4)
+        out["max"][name] = round(max(values), 4)
+    if ok:
+        out["db_round_trips"] = statistics.median(r.db["round_trips"] for r in ok)
+        out["db_first_s"] = statistics.median(r.db["first_s"] for r in ok if r.db["first_s"] is not None) \
+            if any(r.db["first_s"] is not None for r in ok) else None
+    return out
+
+
+def fmt_ms(v) -> str:
+    return "-" if v is None else f"{v * 1000:.0f}"
+
+
+def print_summary(s: dict) -> None:
+    print(f"\n  {'(ms)':14} {'run 1':>8} {'median':>8} {'p90':>8} {'max':>8}")
+    for name in METRICS:
+        if name in PROBES and name == PROBES[0]:
+            print(f"  {'from spawn':14}")
+        print(f"  {name:14} {fmt_ms(s['first'].get(name)):>8} {fmt_ms(s['median'].get(name)):>8} "
+              f"{fmt_ms(s['p90'].get(name)):>8} {fmt_ms(s['max'].get(name)):>8}")
+    if s.get("db_round_trips") is not None:
+        first = f", first query {fmt_ms(s['db_first_s'])} ms after spawn" if s.get("db_first_s") is not None else ""
+        print(f"- database: {s['db_round_trips']:.0f} round trips during startup{first}")
+
+
+def read_history(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    entries = []
+    for line in path.read_text().splitlines():
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+
+def compare(entry: dict, previous: dict) -> list[str]:
+    """Metrics whose median moved by more than the thresholds since `previous`."""
+    notes = []
+    for name in METRICS:
+        new, old = entry["median"].get(name), previous["median"].get(name)
+        if new is None or old is None:
+            continue
+        delta = new - old
+        if abs(delta) >= REGRESSION_MIN_S and abs(delta) >= REGRESSION_SHARE * old:
+            mark = "⚠️ " if delta > 0 else "✅"
+            notes.append(f"{mark} {name}: {old * 1000:.0f} -> {new * 1000:.0f} ms ({delta * 1000:+.0f} ms)")
+    return notes
+
+
+async def run_command(args) -> int:
+    if not args.entry.exists():
+        print(f"❌ ERROR: {args.entry} not found; build the server first (pnpm --filter server build)")
+        return 1
+    if not shutil.which(args.node):
+        print(f"❌ ERROR: {args.node} not found")
+        return 1
+    try:
+        cert, key = self_signed_cert(WORK_DIR)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"❌ ERROR: {e}")
+        return 1
+    node_version = subprocess.run([args.node, "--version"], capture_output=True, text=True).stdout.strip()
+    identity = build_identity(args.entry)
+    base_env = {k: v for k, v in os.environ.items() if k in ("PATH", "HOME", "LANG", "TZ", "TMPDIR")}
+
+    pg = await PgStub(cert, key, args.db_rtt_ms).start()
+    rpc = await RpcStub(args.rpc_rtt_ms).start()
+    dirty = " (uncommitted changes)" if identity.get("dirty") else ""
+    print(f"[coldstart] {args.entry.relative_to(REPO_ROOT) if args.entry.is_relative_to(REPO_ROOT) else args.entry} "
+          f"@ {identity.get('git') or '?'}{dirty}, dist {identity['dist']} ({identity['dist_files']} files, "
+          f"{identity['dist_bytes'] / 1e6:.1f} MB), node {node_version}")
+    print(f"[coldstart] stub db rtt {args.db_rtt_ms:g} ms, stub rpc rtt {args.rpc_rtt_ms:g} ms, {args.runs} run(s)")
+
+    runs: list[Run] = []
+    can_drop = args.drop_caches
+    try:
+        for i in range(args.runs):
+            if can_drop and not drop_caches():
+                print("⚠️  cannot drop the page cache (needs root); runs after the first are warm")
+                can_drop = False
+            run = await one_run(args, i + 1, pg, rpc, base_env)
+            runs.append(run)
+            if run.error:
+                print(f"  run {run.index}: ❌ {run.error}")
+                for line in run.log_tail[-15:]:
+                    print(f"      {line}")
+            else:
+                m = run.marks
+                print(f"  run {run.index}: listen {fmt_ms(m.get('listen'))} ms, healthz {fmt_ms(m.get('healthz'))} ms, "
+                      f"readyz {fmt_ms(m.get('readyz'))} ms, ws {fmt_ms(m.get('ws_accept'))} ms", flush=True)
+    finally:
+        await pg.stop()
+        await rpc.stop()
+
+    summary = summarise(runs)
+    out = args.out or RESULTS_DIR / f"coldstart-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    entry = {"ts": time.time(), "label": args.label, **identity, "node": node_version, "entry": str(args.entry),
+             "production": not args.development, "db_rtt_ms": args.db_rtt_ms, "rpc_rtt_ms": args.rpc_rtt_ms,
+             "drop_caches": can_drop, **summary}
+    write_json(out, {"entry": entry, "runs": [r.to_dict() for r in runs]})
+    if not summary["median"]:
+        print("❌ ERROR: no run got as far as accepting connections")
+        print(f"- detail: {out}")
+        return 1
+    print_summary(summary)
+
+    notes = []
+    if not args.no_history:
+        same = [e for e in read_history(args.history)
+                if (e.get("db_rtt_ms"), e.get("rpc_rtt_ms"), e.get("production")) == (entry["db_rtt_ms"], entry["rpc_rtt_ms"], entry["production"])]
+        if same:
+            previous = same[-1]
+            notes = compare(entry, previous)
+            label = previous.get("label") or previous.get("git") or "?"
+            print(f"\nAgainst the last run with the same settings ({label}, "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(previous['ts']))}):")
+            for note in notes or ["no change beyond noise"]:
+                print(f"  {note}")
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, "a") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        print(f"- history: {args.history}")
+    print(f"- detail: {out}")
+    regressed = any(n.startswith("⚠️") for n in notes)
+    return 1 if summary["failed"] or regressed else 0
+
+
+def history_command(args) -> int:
+    entries = read_history(args.history)
+    if not entries:
+        print(f"[coldstart] no history yet in {args.history}")
+        return 0
+    print(f"  {'date':16} {'build':16} {'db/rpc ms':>9} {'runs':>4} " + " ".join(f"{n[:9]:>9}" for n in METRICS) + "  label")
+    for e in entries[-args.last:]:
+        build = (e.get("git") or "?") + ("*" if e.get("dirty") else "")
+        build = f"{build}/{e.get('dist', '')[:6]}"
+        print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(e['ts'])):16} {build:16} "
+              f"{e.get('db_rtt_ms', 0):>4g}/{e.get('rpc_rtt_ms', 0):<4g} {e.get('runs', 0):>4} "
+              + " ".join(f"{fmt_ms(e['median'].get(n)):>9}" for n in METRICS) + f"  {e.get('label', '')}")
+    print("\n  medians in ms; phases are durations, the last three are times from spawn; * = uncommitted changes")
+    return 0
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "history":
+        return history_command(args)
+    return asyncio.run(run_command(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Cold-start profiling cancelled by user")
+        sys.exit(1)
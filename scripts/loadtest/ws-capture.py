@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - record and replay real WebSocket sessions
+
+record  A recording proxy: point a game client at it, play, and every
+        session's client->server frames are written with their timing to a
+        compact capture file (format in loadlib/capture.py). Server frames
+        are relayed untouched; only the few that anchor the timing
+        (authenticated, gameStarting, GO, roundEnd) are noted.
+replay  Plays a capture back against a server, at 1x, 10x or max speed,
+        as many connections as --clients (sessions are reused round-robin).
+        The schedule is fixed by the capture and the flags, so two replays
+        against two builds send the same traffic.
+info    Sessions, frame counts by type and duration of a capture.
+
+  python3 scripts/loadtest/ws-capture.py record --listen 127.0.0.1:8090 --upstream ws://127.0.0.1:8080/ws --out prod-evening.wscap
+      (then run the client with VITE_WS_URL=ws://127.0.0.1:8090/ws)
+  python3 scripts/loadtest/ws-capture.py replay prod-evening.wscap --url ws://127.0.0.1:8080/ws --clients 2000 --speed 10x
+  python3 scripts/loadtest/ws-capture.py info prod-evening.wscap
+
+Captures hold no credentials: wallet authenticate payloads and entry fee
+signatures are stripped while recording, and replays log in as guests on the
+free tier (--keep-tiers leaves joinLobby tiers alone).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+from loadlib import RESULTS_DIR
+from loadlib import capture
+from loadlib.series import percentile, write_json
+
+
+def parse_speed(text: str) -> float:
+    text = text.strip().lower()
+    if text in ("max", "inf"):
+        return math.inf
+    value = float(text.rstrip("x"))
+    if value <= 0:
+        raise argparse.ArgumentTypeError("speed must be > 0")
+    return value
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Record and replay real WebSocket sessions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Run a recording proxy in front of a server.")
+    rec.add_argument("--listen", default="127.0.0.1:8090", help="host:port to accept clients on (default: 127.0.0.1:8090).")
+    rec.add_argument("--upstream", default="ws://127.0.0.1:8080/ws", help="Server WebSocket URL (default: ws://127.0.0.1:8080/ws).")
+    rec.add_argument("--out", type=Path, help="Capture file (default: .cache/loadtest/capture-<utc>.wscap).")
+    rec.add_argument("--seconds", type=float, default=0, help="Stop recording after this long (default: until Ctrl+C).")
+    rec.add_argument("--keep-names", action="store_true", help="Keep guest names (default: stored as 'Guest').")
+
+    rep = sub.add_parser("replay", help="Replay a capture against a server.")
+    rep.add_argument("capture", type=Path)
+    rep.add_argument("--url", default="ws://127.0.0.1:8080/ws", help="WebSocket URL (default: ws://127.0.0.1:8080/ws).")
+    rep.add_argument("--clients", type=int, default=0, help="Connections to replay (default: one per captured session).")
+    rep.add_argument("--speed", type=parse_speed, default=1.0, help="1x, 10x, ... or max (default: 1x).")
+    rep.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    rep.add_argument("--ramp", type=float, default=500, help="New connections per second at most (default: 500).")
+    rep.add_argument("--repeat-gap", type=float, default=0.25,
+                     help="Seconds between copies of the same session when --clients exceeds the capture (default: 0.25).")
+    rep.add_argument("--anchor-timeout", type=float, default=60, help="Give a connection up after waiting this long for a server event (default: 60).")
+    rep.add_argument("--keep-tiers", action="store_true", help="Replay joinLobby entry fee tiers as recorded.")
+    rep.add_argument("--seconds", type=float, default=0, help="Stop after this long (default: when all sessions are done).")
+    rep.add_argument("--out", type=Path, help="Result file (default: .cache/loadtest/replay-<utc>.json).")
+    rep.add_argument("--standin", action="store_true", help="Replay against a local stand-in server (ignores --url).")
+
+    info = sub.add_parser("info", help="Summarise a capture.")
+    info.add_argument("capture", type=Path)
+    info.add_argument("--frames", action="store_true", help="List every frame with its anchor and offset.")
+    return parser.parse_args()
+
+
+# Record ------------------------------------------------------------------------
+
+
+async def record(args) -> int:
+    from websockets.asyncio.client import connect
+    from websockets.asyncio.server import serve
+    from websockets.exceptions import ConnectionClosed
+
+    host, _, port = args.listen.rpartition(":")
+    out = args.out or RESULTS_DIR / f"capture-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.wscap"
+    loop = asyncio.get_running_loop()
+    writer = capture.CaptureWriter(out, {"created": int(time.time() * 1000), "upstream": args.upstream}, loop.time)
+    open_sessions = 0
+
+    async def relay(client) -> None:
+        nonlocal open_sessions
+        request = client.request
+        query = request.path.partition("?")[2]
+        url = args.upstream + (("&" if "?" in args.upstream else "?") + query if query else "")
+        origin = request.headers.get("Origin")
+        try:
+            upstream = await connect(url, origin=origin, compression=None, ping_interval=None,
+                                     max_size=64 * 1024 * 1024)
+        except Exception as e:
+            print(f"[capture] upstream connect failed: {e}")
+            await client.close(1011, "upstream unavailable")
+            return
+        session = writer.new_session({"path": request.path, "origin": origin,
+                                      "user_agent": request.headers.get("User-Agent")})
+        open_sessions += 1
+        tracker = capture.AnchorTracker()
+        print(f"[capture] session {session} opened ({open_sessions} open)")
+
+        async def client_to_server() -> None:
+            async for message in client:
+                if isinstance(message, str):
+                    stored = capture.redact(message, args.keep_names)
+                    if stored is not None:
+                        writer.text(session, stored)
+                else:
+                    writer.binary(session, message)
+                await upstream.send(message)
+
+        async def server_to_client() -> None:
+            async for message in upstream:
+                hit = tracker.feed(message, loop.time())
+                if hit is not None:
+                    writer.anchor(session, *hit)
+                await client.send(message)
+
+        tasks = [asyncio.create_task(client_to_server()), asyncio.create_task(server_to_client())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            code = upstream.close_code if upstream.close_code is not None else client.close_code
+            writer.close_session(session, code)
+            open_sessions -= 1
+            for ws, peer_code in ((client, upstream.close_code), (upstream, client.close_code)):
+                # Pass the peer's close code on (4001/4005/...), except the ones that cannot be sent.
+                try:
+                    await ws.close(peer_code if peer_code and peer_code not in (1005, 1006, 1015) else 1000)
+                except ConnectionClosed:
+                    pass
+            print(f"[capture] session {session} closed ({code}), {writer.records} records so far")
+
+    async with serve(relay, host or "127.0.0.1", int(port), compression=None, max_size=64 * 1024 * 1024):
+        print(f"[capture] recording ws://{host or '127.0.0.1'}:{port} -> {args.upstream} into {out}")
+        started = loop.time()
+        try:
+            while not args.seconds or loop.time() - started < args.seconds:
+                await asyncio.sleep(1.0)
+                writer.flush()
+        finally:
+            writer.close()
+    print(f"[capture] {writer.records} records written to {out}")
+    return 0
+
+
+# Replay ------------------------------------------------------------------------
+
+
+async def replay(args) -> int:
+    from loadlib.replay import ReplayConfig, ReplayStats, worker_main
+    from loadlib.swarm import Swarm, default_workers
+
+    try:
+        meta, sessions = capture.read_capture(args.capture)
+    except (OSError, ValueError) as e:
+        print(f"❌ ERROR: {e}")
+        return 1
+    if not sessions:
+        print(f"❌ ERROR: {args.capture} holds no sessions")
+        return 1
+    summary = capture.summarize(sessions)
+    del sessions  # workers decode their own share
+
+    standin = None
+    url = args.url
+    if args.standin:
+        from loadlib.standin import StandIn
+        standin = await StandIn().start()
+        url = standin.ws_url
+        print(f"[replay] stand-in server on {url}")
+
+    clients = args.clients or summary["sessions"]
+    cfg = ReplayConfig(url=url, capture=str(args.capture.resolve()), sessions=summary["sessions"], clients=clients,
+                       workers=min(args.workers or default_workers(), clients), speed=args.speed, ramp=args.ramp,
+                       repeat_gap=args.repeat_gap, anchor_timeout=args.anchor_timeout, keep_tiers=args.keep_tiers,
+                       seconds=args.seconds, epoch=time.time() + 2.0)
+    speed = "max" if math.isinf(cfg.speed) else f"{cfg.speed:g}x"
+    print(f"[replay] {summary['sessions']} sessions ({summary['frames']} frames, {summary['span_s']:.0f}s) "
+          f"-> {clients} connections over {cfg.workers} workers at {speed} -> {url}")
+
+    swarm = Swarm(cfg, target=worker_main)
+    loop = asyncio.get_running_loop()
+    timeline = []
+    swarm.start()
+    prev = ReplayStats()
+    try:
+        while not swarm.done:
+            await loop.run_in_executor(None, swarm.poll, 1.0)
+            if swarm.final:
+                continue
+            cur = swarm.totals(ReplayStats)
+            row = {"t": round(time.time() - cfg.epoch, 1), "open": cur.open, "sessions_done": cur.sessions_done,
+                   "msgs_out_per_s": cur.msgs_out - prev.msgs_out, "msgs_in_per_s": cur.msgs_in - prev.msgs_in,
+                   "late_sends": cur.late_sends, "anchor_timeouts": cur.anchor_timeouts}
+            timeline.append(row)
+            prev = cur
+            print(f"[replay] t={row['t']:6.1f}s open={row['open']:<6} done={row['sessions_done']:<6} "
+                  f"out={row['msgs_out_per_s']:<6} in={row['msgs_in_per_s']:<7} late={row['late_sends']} "
+                  f"anchor_timeouts={row['anchor_timeouts']}", flush=True)
+    finally:
+        swarm.stop()
+        await loop.run_in_executor(None, swarm.join)
+        if standin is not None:
+            await standin.stop()
+
+    final = ReplayStats()
+    for stats in swarm.final.values():
+        final.add(stats)
+    connect_ms = sorted(final.connect_ms)
+    out = args.out or RESULTS_DIR / f"replay-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    result = {
+        "capture": str(args.capture),
+        "capture_meta": meta,
+        "capture_summary": summary,
+        "config": {k: (None if isinstance(v, float) and math.isinf(v) else v) for k, v in vars(cfg).items()},
+        "totals": {name: getattr(final, name) for name in ReplayStats.COUNTERS if name not in ("open", "connecting")},
+        "send_lag_ms": final.lag.summary_ms(),
+        "connect_ms": {f"p{q}": percentile(connect_ms, q) for q in (50, 90, 99)} if connect_ms else {},
+        "types_in": dict(final.types.most_common()),
+        "close_codes": {str(k): v for k, v in final.close_codes.items()},
+        "timeline": timeline,
+    }
+    write_json(out, result)
+
+    lag = result["send_lag_ms"]
+    print("\nReplay summary:")
+    print(f"- connections={clients} connected={final.connects} failed={final.connect_failures} "
+          f"sessions done={final.sessions_done} anchor timeouts={final.anchor_timeouts}")
+    print(f"- frames sent={final.msgs_out} skipped={final.frames_skipped} received={final.msgs_in} "
+          f"phase-shifted={final.phase_shifted} (server phases ran ahead of the recording)")
+    if lag.get("count"):
+        print(f"- send lag behind schedule ms: p50={lag['p50']:.1f} p99={lag['p99']:.1f} p999={lag['p999']:.1f} "
+              f"max={lag['max']:.1f} (late >50 ms: {final.late_sends})")
+    if final.close_codes:
+        print(f"- close codes: {dict(final.close_codes)}")
+    print(f"- result: {out}")
+    return 0 if final.connects else 1
+
+
+# Info --------------------------------------------------------------------------
+
+
+def info(args) -> int:
+    try:
+        meta, sessions = capture.read_capture(args.capture)
+    except (OSError, ValueError) as e:
+        print(f"❌ ERROR: {e}")
+        return 1
+    summary = capture.summarize(sessions)
+    size = args.capture.stat().st_size
+    print(f"{args.capture}: {size / 1024:.1f} KiB, recorded from {meta.get('upstream')} at "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(meta.get('created', 0) / 1000))}")
+    print(f"- {summary['sessions']} sessions over {summary['span_s']:.1f}s, {summary['frames']} client frames "
+          f"({summary['frame_bytes'] / 1024:.1f} KiB of payload, {size / max(1, summary['frames']):.1f} B per frame on disk)")
+    print(f"- frame types: {json.dumps(summary['types'])}")
+    durations = sorted(s.duration for s in sessions)
+    if durations:
+        print(f"- session length s: p50={percentile(durations, 50):.1f} max={durations[-1]:.1f}")
+    if args.frames:
+        print(capture.dump_frames(sessions), end="")
+    return 0
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == "info":
+        return info(args)
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        print("❌ ERROR: Required packages not installed.")
+        print("\nInstall them with: pip install websockets")
+        return 1
+    return asyncio.run(record(args) if args.command == "record" else replay(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Capture cancelled by user")
+        sys.exit(1)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - rootless network impairment proxy for chaos and latency tests
+
+A TCP proxy between load clients (or a browser) and the server that gives
+every connection a scripted bad network: latency and jitter, bandwidth caps,
+loss-like stalls, blackouts, flaps, and synchronised cuts that set off
+reconnect storms. No root, tc/netem or spare interface is needed, unlike
+scripts/chaos/ws-flap.sh. Profiles and their phases are described in
+loadlib/impair.py; --list-profiles prints the built-in ones and --profiles
+adds your own from a JSON file.
+
+  python3 scripts/loadtest/ws-impair.py --upstream ws://127.0.0.1:8080/ws --profile 4g=3,3g=1
+      (then point clients at ws://127.0.0.1:8091/ws)
+  python3 scripts/loadtest/ws-impair.py --profile storm --clients 500 --seconds 120 --server-pid $(pgrep -f server/dist)
+
+--clients N runs ws-swarm.py clients through the proxy, reconnecting with
+the game client's backoff. Every second it prints open connections, accepts,
+how connections ended (the server's close codes 4001/4003/4004/4005 among
+them) and, with --server-pid, the server's CPU. After each cut it reports
+how long the open connection count took to recover. Writes
+.cache/loadtest/impair-<utc>.json.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from loadlib import RESULTS_DIR
+from loadlib.impair import ImpairProxy, Phase, load_profiles, parse_profile_mix
+from loadlib.series import write_json
+
+RECOVERY_SHARE = 0.9        # a storm is over once this share of the connections is back
+RECOVERY_WINDOW_S = 60.0
+
+
+def parse_host_port(text: str, default_port: int) -> tuple[str, int]:
+    if "://" in text:
+        parts = urlsplit(text)
+        return parts.hostname or "127.0.0.1", parts.port or (443 if parts.scheme in ("wss", "https") else 80)
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port) if port else default_port
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rootless network impairment proxy for WebSocket chaos tests.")
+    parser.add_argument("--listen", default="127.0.0.1:8091", help="host:port to accept clients on (default: 127.0.0.1:8091).")
+    parser.add_argument("--upstream", default="ws://127.0.0.1:8080/ws",
+                        help="Server as a ws:// URL or host:port (default: ws://127.0.0.1:8080/ws).")
+    parser.add_argument("--profile", default="4g", help="Profile mix, e.g. 4g=3,3g=1,storm=1 (default: 4g).")
+    parser.add_argument("--profiles", type=Path, help="JSON file of extra profiles, {name: spec}.")
+    parser.add_argument("--list-profiles", action="store_true", help="Print the profiles and exit.")
+    parser.add_argument("--seconds", type=float, default=0, help="Stop after this long (default: until Ctrl+C; 60 with --clients).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for profile choice and impairments.")
+    parser.add_argument("--server-pid", type=int, help="Sample this process's CPU from /proc (server on this host).")
+    parser.add_argument("--clients", type=int, default=0, help="Swarm clients to run through the proxy (default: 0).")
+    parser.add_argument("--behavior", default="broadcast", help="Swarm behaviour mix (ws-swarm.py --behavior).")
+    parser.add_argument("--workers", type=int, default=None, help="Swarm worker processes (default: CPU count).")
+    parser.add_argument("--ramp", type=float, default=200, help="Swarm connections per second (default: 200).")
+    parser.add_argument("--out", type=Path, help="Result file (default: .cache/loadtest/impair-<utc>.json).")
+    parser.add_argument("--standin", action="store_true", help="Proxy a local stand-in server (ignores --upstream).")
+    args = parser.parse_args()
+    try:
+        args.profile_map = load_profiles(args.profiles)
+        args.mix = parse_profile_mix(args.profile, args.profile_map)
+        args.listen_addr = parse_host_port(args.listen, 8091)
+        args.upstream_addr = parse_host_port(args.upstream, 8080)
+    except (OSError, ValueError, TypeError) as e:
+        parser.error(str(e))
+    if args.clients and not args.seconds:
+        args.seconds = 60
+    return args
+
+
+class CpuSampler:
+    """CPU share of one process from /proc/<pid>/stat (utime + stime)."""
+
+    def __init__(self, pid: int):
+        self.path = Path(f"/proc/{pid}/stat")
+        self.tick = os.sysconf("SC_CLK_TCK")
+        self._last: tuple[float, float] | None = None
+
+    def sample(self) -> float | None:
+        try:
+            fields = self.path.read_text().rpartition(")")[2].split()
+        except OSError:
+            return None
+        busy = (int(fields[11]) + int(fields[12])) / self.tick
+        now = time.monotonic()
+        last, self._last = self._last, (now, busy)
+        if last is None or now <= last[0]:
+            return None
+        return (busy - last[1]) / (now - last[0]) * 100
+
+
+def recoveries(timeline: list[dict], events: list[tuple[float, str, str, int]]) -> list[dict]:
+    """For every cut: open connections before it, seconds until RECOVERY_SHARE of them were back, peak accepts/s."""
+    out = []
+    for t, profile, cause, n in events:
+        if cause != "cut":
+            continue
+        before = [r for r in timeline if r["t"] <= t]
+        after = [r for r in timeline if t < r["t"] <= t + RECOVERY_WINDOW_S]
+        if not before or not after:
+            continue
+        target = before[-1]["open"] * RECOVERY_SHARE
+        back = next((r["t"] - t for r in after if r["open"] >= target), None)
+        out.append({"t": round(t, 2), "profile": profile, "cut": n, "open_before": before[-1]["open"],
+                    "recovered_s": round(back, 1) if back is not None else None,
+                    "peak_accepts_per_s": max(r["accepts_per_s"] for r in after),
+                    "peak_server_cpu": max((r["server_cpu"] for r in after if r["server_cpu"] is not None), default=None)})
+    return out
+
+
+async def run(args) -> int:
+    standin = None
+    upstream = args.upstream_addr
+    if args.standin:
+        from loadlib.standin import StandIn
+        standin = await StandIn().start()
+        parts = urlsplit(standin.ws_url)
+        upstream = (parts.hostname, parts.port)
+        print(f"[impair] stand-in server on {standin.ws_url}")
+
+    proxy = await ImpairProxy(args.listen_addr, upstream, args.mix, seed=args.seed).start()
+    host, port = proxy.listen
+    mix = ", ".join(f"{p.name}={w:g}" for p, w in args.mix)
+    print(f"[impair] ws://{host}:{port} -> {upstream[0]}:{upstream[1]} with {mix}")
+
+    loop = asyncio.get_running_loop()
+    swarm = None
+    if args.clients:
+        from loadlib.swarm import Swarm, SwarmConfig, default_workers
+        workers = min(args.workers or default_workers(), args.clients)
+        swarm = Swarm(SwarmConfig(url=f"ws://{host}:{port}/ws", clients=args.clients, seconds=args.seconds,
+                                  workers=workers, ramp=args.ramp, behaviors=args.behavior, reconnect=True))
+        swarm.start()
+        print(f"[impair] {args.clients} swarm clients over {workers} workers, reconnecting")
+
+    stop = asyncio.Event()
+    loop.add_signal_handler(signal.SIGINT, stop.set)   # Ctrl+C ends the run with a summary
+    cpu = CpuSampler(args.server_pid) if args.server_pid else None
+    if cpu is not None:
+        cpu.sample()
+    timeline: list[dict] = []
+    prev = proxy.totals()
+    prev_t = started = time.monotonic()
+    try:
+        while not stop.is_set() and (not args.seconds or time.monotonic() - started < args.seconds):
+            if swarm is not None:
+                await loop.run_in_executor(None, swarm.poll, 1.0)
+            else:
+                await asyncio.sleep(1.0)
+            now = time.monotonic()
+            cur = proxy.totals()
+            dt = max(1e-6, now - prev_t)
+            ended = cur.ended - prev.ended
+            row = {
+                "t": round(now - started, 1),
+                "open": cur.open,
+                "accepts_per_s": (cur.accepted - prev.accepted) / dt,
+                "ended": dict(ended),
+                "server_codes": dict(cur.server_codes - prev.server_codes),
+                "down_bytes_per_s": (cur.bytes_down - prev.bytes_down) / dt,
+                "up_bytes_per_s": (cur.bytes_up - prev.bytes_up) / dt,
+                "server_cpu": cpu.sample() if cpu is not None else None,
+            }
+            timeline.append(row)
+            codes = " ".join(f"{k}:{v}" for k, v in sorted(row["server_codes"].items()))
+            ends = " ".join(f"{k}={v}" for k, v in sorted(ended.items()))
+            print(f"[impair] t={row['t']:5.0f}s open={row['open']:<6} accept/s={row['accepts_per_s']:<5.0f} "
+                  f"down={row['down_bytes_per_s'] * 8 / 1e6:6.2f} Mbit/s"
+                  + (f" cpu={row['server_cpu']:5.1f}%" if row["server_cpu"] is not None else "")
+                  + (f" ended {ends}" if ends else "") + (f" codes {codes}" if codes else ""), flush=True)
+            prev, prev_t = cur, now
+    finally:
+        loop.remove_signal_handler(signal.SIGINT)
+        if swarm is not None:
+            swarm.stop()
+            await loop.run_in_executor(None, swarm.join)
+        await proxy.stop()
+        if standin is not None:
+            await standin.stop()
+
+    total = proxy.totals()
+    storms = recoveries(timeline, proxy.events)
+    result = {
+        "listen": f"{host}:{port}", "upstream": f"{upstream[0]}:{upstream[1]}", "seed": args.seed,
+        "started": time.time() - (time.monotonic() - started),
+        "profiles": {p.name: {"weight": w, "clock": p.clock, "loop": p.loop, "phases": [asdict(ph) for ph in p.phases]}
+                     for p, w in args.mix},
+        "per_profile": {}, "events": [list(e) for e in proxy.events], "storms": storms, "timeline": timeline,
+    }
+    print("\nImpairment summary:")
+    for name, s in proxy.stats.items():
+        result["per_profile"][name] = {
+            "accepted": s.accepted, "connected_s": round(s.connected_s, 1), "stalls": s.stalls,
+            "bytes_up": s.bytes_up, "bytes_down": s.bytes_down, "ended": dict(s.ended),
+            "server_codes": {str(k): v for k, v in s.server_codes.items()},
+            "client_codes": {str(k): v for k, v in s.client_codes.items()},
+        }
+        print(f"- {name}: {s.accepted} connections, {s.connected_s:.0f} connected-seconds, {s.stalls} stalls; "
+              f"ended {dict(s.ended) or '-'}; server close codes {dict(s.server_codes) or '-'}")
+    for storm in storms:
+        back = f"{storm['recovered_s']:.1f}s" if storm["recovered_s"] is not None else "not within 60s"
+        print(f"- cut at {storm['t']:.0f}s ({storm['profile']}, {storm['cut']} connections): "
+              f"{RECOVERY_SHARE:.0%} back after {back}, peak {storm['peak_accepts_per_s']:.0f} accepts/s"
+              + (f", server CPU peak {storm['peak_server_cpu']:.0f}%" if storm["peak_server_cpu"] is not None else ""))
+    if swarm is not None:
+        clients = swarm.totals()
+        result["swarm"] = {"connects": clients.connects, "reconnects": clients.reconnects,
+                           "connect_failures": clients.connect_failures,
+                           "close_codes": {str(k): v for k, v in clients.close_codes.items()}}
+        print(f"- swarm: {clients.connects} connects, {clients.reconnects} reconnects, "
+              f"{clients.connect_failures} failed; close codes seen {dict(clients.close_codes) or '-'}")
+
+    out = args.out or RESULTS_DIR / f"impair-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    write_json(out, result)
+    print(f"- result: {out}")
+    return 0 if total.accepted else 1
+
+
+def main() -> int:
+    args = parse_args()
+    if args.list_profiles:
+        defaults = asdict(Phase())
+        for name, profile in args.profile_map.items():
+            clock = f"{profile.clock} clock" + (f", loop {profile.loop:g}s" if profile.loop else "")
+            print(f"{name} ({clock})")
+            for phase in profile.phases:
+                changed = {k: v for k, v in asdict(phase).items() if k != "at" and v != defaults[k]}
+                print(f"  {phase.at:6g}s {json.dumps(changed) if changed else 'no impairment'}")
+        return 0
+    if args.clients:
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            print("❌ ERROR: Required packages not installed.")
+            print("\nInstall them with: pip install websockets")
+            return 1
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Impairment proxy stopped by user")
+        sys.exit(1)
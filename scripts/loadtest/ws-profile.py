@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - WebSocket bandwidth and broadcast-jitter profiler
+
+Joins --observers passive guest clients (no inputs) and breaks down what the
+server sends them by message type: bytes per client per second, frame sizes
+and what permessage-deflate would save, the inter-arrival jitter of
+gameStateUpdate (BROADCAST_INTERVAL) and trailDelta (twice that), and how
+gameStateUpdate / trailDelta split into a frame base and per-player entries.
+From that layout it projects egress for N players per lobby, and it flags
+message types whose per-player entries grow with match duration.
+
+Half the observers (--full-share) skip clientHello {trailDelta} and get full
+frames with trails inlined, so both encodings are profiled side by side.
+--background N adds N swarm clients (ws-swarm.py) to see jitter under load.
+
+  python3 scripts/loadtest/ws-profile.py --url ws://127.0.0.1:8080/ws --seconds 120 --project 8,16,32
+  python3 scripts/loadtest/ws-profile.py --standin --seconds 60 --background 200
+
+Writes .cache/loadtest/wsprofile-<utc>.json.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from loadlib import RESULTS_DIR
+from loadlib.series import write_json
+from loadlib.wireprof import GROWTH_BUCKET_S, NOMINAL_INTERVAL_MS, Observer, merge_observers, project
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-message-type bandwidth and broadcast jitter profiler.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8080/ws", help="WebSocket URL (default: ws://127.0.0.1:8080/ws).")
+    parser.add_argument("--observers", type=int, default=4, help="Passive observer clients (default: 4).")
+    parser.add_argument("--full-share", type=float, default=0.5,
+                        help="Share of observers that take full frames instead of trailDelta (default: 0.5).")
+    parser.add_argument("--seconds", type=float, default=60, help="Profiling time (default: 60).")
+    parser.add_argument("--background", type=int, default=0, help="Background swarm clients (default: 0).")
+    parser.add_argument("--behavior", default="broadcast", help="Background behaviour mix (ws-swarm.py --behavior).")
+    parser.add_argument("--workers", type=int, default=None, help="Background worker processes (default: CPU count).")
+    parser.add_argument("--project", default="8,16,32,64", help="Players per lobby to project egress for (default: 8,16,32,64).")
+    parser.add_argument("--lobbies", type=int, default=1, help="Concurrent lobbies in the projection (default: 1).")
+    parser.add_argument("--growth-threshold", type=float, default=0.25,
+                        help="Flag types whose per-player entries grow by more than this share over --match-seconds (default: 0.25).")
+    parser.add_argument("--match-seconds", type=float, default=60, help="Match length used for the growth flag (default: 60).")
+    parser.add_argument("--out", type=Path, help="Result file (default: .cache/loadtest/wsprofile-<utc>.json).")
+    parser.add_argument("--standin", action="store_true", help="Run against a local stand-in server (ignores --url).")
+    args = parser.parse_args()
+    try:
+        args.project_list = [int(x) for x in args.project.split(",") if x.strip()]
+    except ValueError:
+        parser.error("--project must be comma-separated integers")
+    if args.observers < 1 or not 0 <= args.full_share <= 1:
+        parser.error("--observers must be >= 1 and --full-share within 0..1")
+    return args
+
+
+def mbit(bytes_per_s: float) -> float:
+    return bytes_per_s * 8 / 1e6
+
+
+async def run(args) -> int:
+    standin = None
+    url = args.url
+    if args.standin:
+        from loadlib.standin import StandIn
+        standin = await StandIn().start()
+        url = standin.ws_url
+        print(f"[profile] stand-in server on {url}")
+
+    loop = asyncio.get_running_loop()
+    swarm = None
+    if args.background:
+        from loadlib.swarm import Swarm, SwarmConfig, default_workers
+        workers = min(args.workers or default_workers(), args.background)
+        swarm = Swarm(SwarmConfig(url=url, clients=args.background, seconds=args.seconds + 60, workers=workers,
+                                  behaviors=args.behavior))
+        swarm.start()
+        print(f"[profile] {args.background} background clients over {workers} workers")
+
+    n_full = round(args.observers * args.full_share)
+    observers = [Observer(i, url, full=i < n_full) for i in range(args.observers)]
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(o.run(stop)) for o in observers]
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < args.seconds:
+            if swarm is not None:
+                await loop.run_in_executor(None, swarm.poll, 5.0)
+            else:
+                await asyncio.sleep(5.0)
+            frames = sum(t.count for o in observers for t in o.types.values())
+            print(f"[profile] {time.monotonic() - started:4.0f}s {frames} frames", flush=True)
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if swarm is not None:
+            swarm.stop()
+            await loop.run_in_executor(None, swarm.join)
+        if standin is not None:
+            await standin.stop()
+
+    merged, seconds = merge_observers(observers)
+    result = {"url": url, "started": time.time() - (time.monotonic() - started), "seconds": args.seconds,
+              "observers": {k: sum(1 for o in observers if o.kind == k) for k in ("slim", "full")},
+              "connect_failures": sum(o.connect_failed for o in observers),
+              "background": args.background, "kinds": {}}
+    for kind, by_type in merged.items():
+        secs = seconds.get(kind, 0.0)
+        if secs <= 0:
+            continue
+        section = result["kinds"][kind] = {"observer_seconds": round(secs, 1), "types": {}, "projection": {},
+                                           "growth_flags": []}
+        print(f"\n{kind} clients ({'trailDelta' if kind == 'slim' else 'trails inlined'}), "
+              f"{secs:.0f} observer-seconds:")
+        print(f"  {'type':18} {'msg/s':>7} {'B/s':>9} {'mean B':>8} {'p50':>7} {'p99':>7} {'max':>7} {'deflated':>8}")
+        for name, t in sorted(by_type.items(), key=lambda kv: -kv[1].bytes):
+            row = {
+                "count": t.count,
+                "msgs_per_s": t.count / secs,
+                "bytes_per_s": t.bytes / secs,
+                "mean_bytes": t.bytes / t.count,
+                "p50_bytes": t.size.value_at(50),
+                "p99_bytes": t.size.value_at(99),
+                "max_bytes": t.size.max,
+                "deflate_ratio": t.deflated / t.bytes if t.bytes else None,
+            }
+            print(f"  {name:18} {row['msgs_per_s']:7.2f} {row['bytes_per_s']:9.0f} {row['mean_bytes']:8.0f} "
+                  f"{row['p50_bytes']:7} {row['p99_bytes']:7} {row['max_bytes']:7} {row['deflate_ratio'] or 0:7.0%}")
+            if name in NOMINAL_INTERVAL_MS:
+                row["jitter"] = {
+                    "nominal_ms": NOMINAL_INTERVAL_MS[name],
+                    "mean_ms": t.interval_ms.mean,
+                    "stdev_ms": t.interval_ms.stdev,
+                    "p50_ms": t.interval.value_at(50) / 1000,
+                    "p99_ms": t.interval.value_at(99) / 1000,
+                    "max_ms": t.interval.max / 1000,
+                    "late": t.late,
+                    "bursts": t.bursts,
+                    "server_mean_ms": t.server_interval_ms.mean,
+                    "server_stdev_ms": t.server_interval_ms.stdev,
+                }
+                row["layout"] = {"base_bytes": t.base_bytes.mean, "bytes_per_entry": t.entry_bytes.mean,
+                                 "entries_per_frame": t.entries.mean}
+                first, slope = t.growth_slope()
+                row["growth"] = {"bucket_s": GROWTH_BUCKET_S, "first_bytes_per_entry": first,
+                                 "slope_bytes_per_s": slope,
+                                 "buckets": {str(int(b * GROWTH_BUCKET_S)): r.mean for b, r in sorted(t.growth.items())}}
+                if first and first == first and slope * args.match_seconds > args.growth_threshold * first:
+                    section["growth_flags"].append(name)
+            section["types"][name] = row
+
+        for name, row in section["types"].items():
+            if "jitter" not in row:
+                continue
+            j, lay = row["jitter"], row["layout"]
+            intervals = max(1, by_type[name].interval_ms.n)
+            print(f"  {name}: every {j['mean_ms']:.1f} ms (nominal {j['nominal_ms']:.1f}) stdev {j['stdev_ms']:.1f} "
+                  f"p99 {j['p99_ms']:.1f} max {j['max_ms']:.1f}; late {j['late'] / intervals:.1%} "
+                  f"bursts {j['bursts'] / intervals:.1%}; server spacing {j['server_mean_ms']:.1f} "
+                  f"± {j['server_stdev_ms']:.1f} ms")
+            print(f"  {name}: {lay['base_bytes']:.0f} B base + {lay['bytes_per_entry']:.0f} B x "
+                  f"{lay['entries_per_frame']:.1f} entries")
+        for name in section["growth_flags"]:
+            g = section["types"][name]["growth"]
+            buckets = " ".join(f"{t}s:{v:.0f}" for t, v in g["buckets"].items())
+            print(f"  ⚠️  {name} grows with match time: {g['slope_bytes_per_s']:+.1f} B/entry per second "
+                  f"(bytes per entry by match second: {buckets})")
+
+        for players in args.project_list:
+            p = project(by_type, secs, players)
+            section["projection"][str(players)] = p
+            print(f"  projected at {players:3} players/lobby: {p['client_bytes_per_s'] / 1024:7.1f} KiB/s per client, "
+                  f"{mbit(p['lobby_bytes_per_s']):7.2f} Mbit/s per lobby, "
+                  f"{mbit(p['lobby_bytes_per_s'] * args.lobbies):8.2f} Mbit/s for {args.lobbies} lobbies")
+
+    out = args.out or RESULTS_DIR / f"wsprofile-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    write_json(out, result)
+    print(f"\n- result: {out}")
+    return 0 if result["kinds"] else 1
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        print("❌ ERROR: Required packages not installed.")
+        print("\nInstall them with: pip install websockets")
+        return 1
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Profiling cancelled by user")
+        sys.exit(1)
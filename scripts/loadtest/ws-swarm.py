@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+SpermRace.io - WebSocket swarm load generator
+
+Opens --clients guest connections spread over --workers processes (one event
+loop each; default one per core). Every client logs in as a guest, joins a
+free practice lobby and then plays according to its behaviour:
+
+  idle              joins and listens only
+  broadcast         ws-broadcast.js inputs: random target every 40-80 ms (default)
+  aggressive-boost  60 inputs/s, always accelerating, boosting half the time
+  bot               steers from its own position at 10 Hz, occasional boost
+
+Mix them with weights (--behavior bot=3,idle=1) or plug in your own
+Behavior subclass (--behavior my_behaviors.py:Camper).
+
+  python3 scripts/loadtest/ws-swarm.py --url ws://127.0.0.1:8080/ws --clients 10000 --seconds 120
+  python3 scripts/loadtest/ws-swarm.py --standin --clients 500 --seconds 30 --behavior bot
+
+Prints connection, message and byte throughput every second and writes the
+timeline to .cache/loadtest/swarm-<utc>.json. Above ~28k clients from one
+address the local ephemeral ports run out; spread them with --bind
+127.0.0.2,127.0.0.3,... (loopback) or several NIC addresses.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from loadlib import RESULTS_DIR
+from loadlib.behaviors import BEHAVIORS, parse_mix
+from loadlib.series import percentile, write_json
+from loadlib.swarm import Stats, Swarm, SwarmConfig, default_workers
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Python asyncio WebSocket swarm load generator.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8080/ws", help="WebSocket URL (default: ws://127.0.0.1:8080/ws).")
+    parser.add_argument("--clients", type=int, default=1000, help="Virtual clients (default: 1000).")
+    parser.add_argument("--seconds", type=float, default=60, help="Run time, including the ramp (default: 60).")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Worker processes (default: CPU count).")
+    parser.add_argument("--ramp", type=float, default=500, help="New connections per second across all workers (default: 500).")
+    parser.add_argument("--behavior", default="broadcast",
+                        help=f"Behaviour mix, e.g. bot=3,idle=1 ({', '.join(BEHAVIORS)} or module:Class).")
+    parser.add_argument("--tier", type=int, default=0, help="joinLobby entryFeeTier (guests: 0).")
+    parser.add_argument("--mode", default="practice", help="joinLobby mode (default: practice).")
+    parser.add_argument("--deflate", action="store_true", help="Offer permessage-deflate (server needs WS_PERMESSAGE_DEFLATE=1).")
+    parser.add_argument("--bind", default="", help="Comma-separated local source addresses, used round-robin.")
+    parser.add_argument("--reconnect", action="store_true",
+                        help="Reconnect after an unclean close with the game client's backoff (1 s doubling to 30 s).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for behaviour choice and inputs.")
+    parser.add_argument("--out", type=Path, help="Result file (default: .cache/loadtest/swarm-<utc>.json).")
+    parser.add_argument("--standin", action="store_true", help="Run against a local stand-in server (ignores --url).")
+    args = parser.parse_args()
+    try:
+        parse_mix(args.behavior)
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+    if args.clients < 1 or args.workers < 1:
+        parser.error("--clients and --workers must be >= 1")
+    return args
+
+
+def rate_line(t: float, cur: Stats, prev: Stats, dt: float) -> dict:
+    d = lambda name: (getattr(cur, name) - getattr(prev, name)) / dt
+    return {
+        "t": round(t, 1),
+        "open": cur.open,
+        "connecting": cur.connecting,
+        "connects_per_s": d("connects"),
+        "failures_per_s": d("connect_failures"),
+        "reconnects_per_s": d("reconnects"),
+        "msgs_in_per_s": d("msgs_in"),
+        "bytes_in_per_s": d("bytes_in"),
+        "msgs_out_per_s": d("msgs_out"),
+        "bytes_out_per_s": d("bytes_out"),
+        "inputs_dropped_per_s": d("inputs_dropped"),
+        "closed_by_server": cur.closed_by_server,
+        "server_errors": cur.server_errors,
+    }
+
+
+def show(row: dict) -> str:
+    return (f"t={row['t']:5.0f}s open={row['open']:<6} connecting={row['connecting']:<5} "
+            f"conn/s={row['connects_per_s']:<6.0f} fail/s={row['failures_per_s']:<4.0f} reconn/s={row['reconnects_per_s']:<5.0f} "
+            f"in={row['msgs_in_per_s']:8.0f} msg/s {row['bytes_in_per_s'] / 1e6:6.2f} MB/s "
+            f"out={row['msgs_out_per_s']:7.0f} msg/s {row['bytes_out_per_s'] / 1e6:5.2f} MB/s "
+            f"dropped/s={row['inputs_dropped_per_s']:.0f} closed={row['closed_by_server']} srvErr={row['server_errors']}")
+
+
+async def run(args) -> int:
+    standin = None
+    url = args.url
+    if args.standin:
+        from loadlib.standin import StandIn
+        standin = await StandIn().start()
+        url = standin.ws_url
+        print(f"[swarm] stand-in server on {url}")
+
+    cfg = SwarmConfig(url=url, clients=args.clients, seconds=args.seconds, workers=min(args.workers, args.clients),
+                      ramp=args.ramp, behaviors=args.behavior, tier=args.tier, mode=args.mode, deflate=args.deflate,
+                      bind=[b.strip() for b in args.bind.split(",") if b.strip()], seed=args.seed,
+                      reconnect=args.reconnect)
+    out = args.out or RESULTS_DIR / f"swarm-{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}.json"
+    print(f"[swarm] {cfg.clients} clients over {cfg.workers} workers -> {url} "
+          f"(behavior {cfg.behaviors}, ramp {cfg.ramp:g}/s, {cfg.seconds:g}s)")
+
+    swarm = Swarm(cfg)
+    loop = asyncio.get_running_loop()
+    timeline: list[dict] = []
+    started = time.monotonic()
+    swarm.start()
+    prev, prev_t = Stats(), started
+    try:
+        while not swarm.done:
+            await loop.run_in_executor(None, swarm.poll, 1.0)
+            now = time.monotonic()
+            if now - prev_t >= 1.0 and not swarm.final:  # no rows once workers are closing
+                cur = swarm.totals()
+                row = rate_line(now - started, cur, prev, now - prev_t)
+                timeline.append(row)
+                print(show(row), flush=True)
+                prev, prev_t = cur, now
+    finally:
+        swarm.stop()
+        await loop.run_in_executor(None, swarm.join)
+        if standin is not None:
+            await standin.stop()
+
+    final = Stats()
+    for stats in swarm.final.values():
+        final.add(stats)
+    connect_ms = sorted(final.connect_ms)
+    steady = [r for r in timeline if r["open"] >= 0.95 * max(1, final.connects)] or timeline
+    result = {
+        "config": {k: v for k, v in vars(cfg).items()},
+        "started": time.time() - (time.monotonic() - started),
+        "totals": {name: getattr(final, name) for name in Stats.COUNTERS if name not in ("open", "connecting")},
+        "peak_open": max((r["open"] for r in timeline), default=0),
+        "connect_ms": {f"p{q}": percentile(connect_ms, q) for q in (50, 90, 99)} if connect_ms else {},
+        "steady_state": {
+            key: sum(r[key] for r in steady) / len(steady)
+            for key in ("msgs_in_per_s", "bytes_in_per_s", "msgs_out_per_s", "bytes_out_per_s")
+        } if steady else {},
+        "types": dict(final.types.most_common()),
+        "close_codes": {str(k): v for k, v in final.close_codes.items()},
+        "connect_failures": dict(final.failures),
+        "timeline": timeline,
+    }
+    write_json(out, result)
+
+    print("\nWS swarm summary:")
+    print(f"- clients={cfg.clients} connected={final.connects} failed={final.connect_failures} "
+          f"peak_open={result['peak_open']} closed_by_server={final.closed_by_server} reconnects={final.reconnects}")
+    if connect_ms:
+        c = result["connect_ms"]
+        print(f"- connect ms p50={c['p50']:.1f} p90={c['p90']:.1f} p99={c['p99']:.1f}")
+    if steady:
+        s = result["steady_state"]
+        print(f"- steady state: in {s['msgs_in_per_s']:.0f} msg/s {s['bytes_in_per_s'] / 1e6:.2f} MB/s, "
+              f"out {s['msgs_out_per_s']:.0f} msg/s {s['bytes_out_per_s'] / 1e6:.2f} MB/s")
+    print(f"- message types: {', '.join(f'{k}={v}' for k, v in final.types.most_common(8))}")
+    if final.close_codes:
+        print(f"- close codes: {dict(final.close_codes)}")
+    if final.failures:
+        print(f"- connect failures: {dict(final.failures)}")
+    print(f"- result: {out}")
+    return 0 if final.connects else 1
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        print("❌ ERROR: Required packages not installed.")
+        print("\nInstall them with: pip install websockets")
+        return 1
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Swarm cancelled by user")
+        sys.exit(1)
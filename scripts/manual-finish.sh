@@ -24,7 +24,7 @@ sudo npm install -g pm2
 echo "[4/7] Extracting project..."
 sudo mkdir -p /opt/spermrace
 cd /opt/spermrace
-sudo tar -xzf /tmp/spermrace-deploy.tar.gz
+sudo tar -xf /tmp/spermrace-deploy.tar.gz
 
 echo "[5/7] Building project..."
 pnpm install
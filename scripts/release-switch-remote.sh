@@ -0,0 +1,283 @@
+#!/usr/bin/env bash
+# ============================================================================
+# SpermRace.io - Versioned Releases with Zero-Downtime Switch (remote side)
+# Driven by scripts/deploy-release.py.
+#
+#   release-switch-remote.sh activate <bundle.tar.gz>   unpack + switch to it
+#   release-switch-remote.sh rollback [release-id]      switch to an older one
+#   release-switch-remote.sh list                       releases, * = current
+#
+# Layout under $APP_DIR:
+#   releases/<id>/{server,client}   unpacked prebuilt bundles
+#   shared/.env                     server env, linked into every release
+#   shared/data                     server state (SQLite, audit log), linked into
+#                                   every release and at packages/server/data
+#   current -> releases/<id>        what nginx serves ($WEB_ROOT links through it)
+#
+# Two pm2 slots alternate: A = $PM2_APP_NAME on 8080, B = $PM2_APP_NAME-b on
+# 8081. The new release starts on the idle slot and has to pass /api/readyz,
+# /api/ws-healthz and a WebSocket upgrade. Only then are the nginx upstream
+# file and the `current` symlink swapped (rename(2), then nginx reload).
+# The old slot keeps serving open sockets for $DRAIN_SECONDS before it stops.
+#
+# Re-running deploy-from-root.sh afterwards reverts to the in-place layout.
+# ============================================================================
+
+set -euo pipefail
+
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+CYAN='\033[0;36m'
+NC='\033[0m'
+
+info() { echo -e "${CYAN}[INFO]${NC} $*"; }
+ok() { echo -e "${GREEN}[OK]${NC} $*"; }
+warn() { echo -e "${YELLOW}[WARN]${NC} $*"; }
+die() { echo -e "${RED}[FATAL]${NC} $*"; exit 1; }
+
+APP_DIR="${APP_DIR:-/opt/spermrace}"
+WEB_ROOT="${WEB_ROOT:-/var/www/spermrace}"
+NGINX_CONF="${NGINX_CONF:-/etc/nginx/sites-available/spermrace}"
+UPSTREAM_CONF="${UPSTREAM_CONF:-/etc/nginx/spermrace-upstream.conf}"
+PM2_APP_NAME="${PM2_APP_NAME:-spermrace-server-ws}"
+KEEP_RELEASES="${KEEP_RELEASES:-5}"
+DRAIN_SECONDS="${DRAIN_SECONDS:-30}"
+READY_TIMEOUT="${READY_TIMEOUT:-90}"
+
+RELEASES="$APP_DIR/releases"
+SHARED="$APP_DIR/shared"
+CURRENT="$APP_DIR/current"
+
+if [[ $EUID -eq 0 ]]; then NEED_SUDO=""; else NEED_SUDO="sudo"; fi
+
+# The lock fd (9, see the bottom) must not leak into a pm2 daemon spawned from here.
+pm2() { command pm2 "$@" 9>&-; }
+
+slot_name() { if [[ "$1" == "a" ]]; then echo "$PM2_APP_NAME"; else echo "$PM2_APP_NAME-b"; fi; }
+slot_port() { if [[ "$1" == "a" ]]; then echo 8080; else echo 8081; fi; }
+
+active_slot() {
+  if [[ -f "$UPSTREAM_CONF" ]] && grep -q '127.0.0.1:8081' "$UPSTREAM_CONF"; then echo b; else echo a; fi
+}
+
+current_release() {
+  if [[ -L "$CURRENT" ]]; then basename "$(readlink "$CURRENT")"; fi
+}
+
+# Atomically point symlink $2 at $1.
+swap_link() {
+  local target="$1" link="$2" tmp
+  tmp="$link.tmp.$$"
+  $NEED_SUDO ln -sfn "$target" "$tmp"
+  $NEED_SUDO mv -T "$tmp" "$link"
+}
+
+# ====== ONE-TIME MIGRATION FROM THE IN-PLACE LAYOUT ======
+migrate() {
+  $NEED_SUDO mkdir -p "$RELEASES" "$SHARED"
+  $NEED_SUDO chown "$(id -un)" "$RELEASES" "$SHARED"
+  if [[ ! -f "$SHARED/.env" ]]; then
+    [[ -f "$APP_DIR/packages/server/.env" ]] || die "No server .env found - run deploy-from-root.sh once first"
+    cp "$APP_DIR/packages/server/.env" "$SHARED/.env"
+    chmod 600 "$SHARED/.env"
+    ok "Server .env moved to $SHARED/.env"
+  fi
+  migrate_data
+  if [[ ! -f "$UPSTREAM_CONF" ]]; then
+    grep -qE '^\s*server 127\.0\.0\.1:8080 ' "$NGINX_CONF" \
+      || die "$NGINX_CONF has no 'server 127.0.0.1:8080' upstream line to replace"
+    echo "server 127.0.0.1:8080 max_fails=3 fail_timeout=30s;" | $NEED_SUDO tee "$UPSTREAM_CONF" >/dev/null
+    $NEED_SUDO sed -i -E "s|^(\s*)server 127\.0\.0\.1:8080 .*;|\1include $UPSTREAM_CONF;|" "$NGINX_CONF"
+    $NEED_SUDO nginx -t || die "Nginx config test failed after switching to $UPSTREAM_CONF"
+    ok "Nginx upstream now read from $UPSTREAM_CONF"
+  fi
+}
+
+# The server keeps its state in ./data relative to its cwd (releases/<id>/server),
+# so it has to live outside the releases. The newest real data dir wins: the
+# current release's (deployed before shared/data existed) or the in-place one.
+# packages/server/data stays as a link so backup-data.py and audit-verify.py
+# keep finding it. mv keeps the inodes, so a running server's open DB survives.
+migrate_data() {
+  local legacy="$APP_DIR/packages/server/data" from=""
+  if [[ ! -e "$SHARED/data" ]]; then
+    if [[ -d "$CURRENT/server/data" && ! -L "$CURRENT/server/data" ]]; then
+      from="$CURRENT/server/data"
+    elif [[ -d "$legacy" && ! -L "$legacy" ]]; then
+      from="$legacy"
+    fi
+    if [[ -n "$from" ]]; then
+      mv -T "$from" "$SHARED/data"
+      ln -sn "$SHARED/data" "$from"
+      ok "Server data moved from $from to $SHARED/data"
+    else
+      mkdir -p "$SHARED/data"
+    fi
+  fi
+  if [[ -d "$APP_DIR/packages/server" && ! -e "$legacy" && ! -L "$legacy" ]]; then
+    ln -sn "$SHARED/data" "$legacy"
+  fi
+}
+
+# ====== START + GATE ======
+start_slot() {
+  local slot="$1" release="$2" name port
+  name="$(slot_name "$slot")"
+  port="$(slot_port "$slot")"
+  pm2 delete "$name" &>/dev/null || true
+  (cd "$RELEASES/$release/server" && PORT="$port" NODE_ENV=production pm2 start dist/server/src/index.js \
+    --name "$name" --max-memory-restart 600M --time >/dev/null)
+  ok "Started $release as $name on :$port"
+}
+
+gate() {
+  local port="$1" deadline code
+  deadline=$((SECONDS + READY_TIMEOUT))
+  until curl -fsS -m 5 "http://127.0.0.1:$port/api/readyz" >/dev/null 2>&1 \
+     && curl -fsS -m 5 "http://127.0.0.1:$port/api/ws-healthz" >/dev/null 2>&1; do
+    (( SECONDS < deadline )) || return 1
+    sleep 1
+  done
+  code="$(curl -s -o /dev/null -m 3 -w '%{http_code}' \
+    -H 'Connection: Upgrade' -H 'Upgrade: websocket' -H 'Sec-WebSocket-Version: 13' \
+    -H 'Sec-WebSocket-Key: c3Blcm1yYWNlLWdhdGUtMQ==' "http://127.0.0.1:$port/ws" || true)"
+  [[ "$code" == "101" ]] || { warn "WebSocket upgrade on :$port returned $code"; return 1; }
+  # Warm the hot read paths (JIT, DB pool, caches) before real traffic arrives.
+  for path in /api/stats /api/leaderboard/wins /api/leaderboard/skill-rating; do
+    for _ in 1 2 3; do curl -s -o /dev/null -m 5 "http://127.0.0.1:$port$path" || true; done
+  done
+  return 0
+}
+
+# ====== SWITCH ======
+switch_to() {
+  local release="$1" from_slot to_slot to_port old_name
+  from_slot="$(active_slot)"
+  if [[ "$from_slot" == "a" ]]; then to_slot=b; else to_slot=a; fi
+  to_port="$(slot_port "$to_slot")"
+
+  info "🚦 Starting $release on side port $to_port..."
+  start_slot "$to_slot" "$release"
+  if ! gate "$to_port"; then
+    pm2 logs "$(slot_name "$to_slot")" --lines 40 --nostream 2>/dev/null || true
+    pm2 delete "$(slot_name "$to_slot")" &>/dev/null || true
+    die "$release did not pass the readiness gate on :$to_port within ${READY_TIMEOUT}s; nothing switched"
+  fi
+  ok "Readiness gate passed on :$to_port"
+
+  info "🔀 Switching traffic..."
+  echo "server 127.0.0.1:$to_port max_fails=3 fail_timeout=30s;" | $NEED_SUDO tee "$UPSTREAM_CONF.tmp" >/dev/null
+  $NEED_SUDO mv -T "$UPSTREAM_CONF.tmp" "$UPSTREAM_CONF"
+  if ! $NEED_SUDO nginx -t 2>/dev/null; then
+    echo "server 127.0.0.1:$(slot_port "$from_slot") max_fails=3 fail_timeout=30s;" | $NEED_SUDO tee "$UPSTREAM_CONF" >/dev/null
+    pm2 delete "$(slot_name "$to_slot")" &>/dev/null || true
+    die "Nginx config test failed; upstream restored"
+  fi
+  swap_link "$RELEASES/$release" "$CURRENT"
+  if [[ ! -L "$WEB_ROOT" ]]; then
+    # Timestamped, so a second attempt after a failed switch doesn't trip over the first backup.
+    if [[ -e "$WEB_ROOT" ]]; then
+      $NEED_SUDO mv -T "$WEB_ROOT" "$WEB_ROOT.pre-releases.$(date -u +%Y%m%d%H%M%S)"
+    fi
+    swap_link "$CURRENT/client" "$WEB_ROOT"
+  fi
+  $NEED_SUDO systemctl reload nginx
+  ok "Now serving $release via :$to_port"
+
+  old_name="$(slot_name "$from_slot")"
+  if pm2 describe "$old_name" &>/dev/null; then
+    info "⏳ Draining $old_name for ${DRAIN_SECONDS}s..."
+    sleep "$DRAIN_SECONDS"
+    pm2 delete "$old_name" >/dev/null
+    ok "Stopped $old_name"
+  fi
+  pm2 save >/dev/null
+}
+
+prune() {
+  local keep="$KEEP_RELEASES" cur n=0
+  (( keep >= 2 )) || keep=2  # always leave something to roll back to
+  cur="$(current_release)"
+  for dir in $(ls -1 "$RELEASES" | sort -r); do
+    n=$((n + 1))
+    if (( n > keep )) && [[ "$dir" != "$cur" ]]; then
+      rm -rf "${RELEASES:?}/$dir"
+      info "Pruned release $dir"
+    fi
+  done
+}
+
+cmd_activate() {
+  local bundle="$1" id stage cur
+  [[ -f "$bundle" ]] || die "Bundle not found at $bundle"
+  migrate
+
+  info "📥 Unpacking release..."
+  id="$(date -u +%Y%m%d%H%M%S)-$(sha256sum "$bundle" | cut -c1-8)"
+  stage="$RELEASES/.$id.partial"
+  rm -rf "$stage"
+  mkdir -p "$stage"
+  tar -xf "$bundle" -C "$stage" || die "Failed to extract bundle"
+  [[ -d "$stage/server/dist" && -d "$stage/client" ]] || die "Bundle is missing server/dist or client/"
+  ln -sfn "$SHARED/.env" "$stage/server/.env"
+  rm -rf "$stage/server/data"
+  ln -sn "$SHARED/data" "$stage/server/data"
+  # Keep the previous release's own hashed assets reachable for pages loaded
+  # before the switch (hard links; only one release back, so they don't pile up).
+  (cd "$stage/client" && find assets -type f 2>/dev/null > .release-assets || true)
+  cur="$(current_release)"
+  if [[ -n "$cur" && -f "$RELEASES/$cur/client/.release-assets" ]]; then
+    while IFS= read -r f; do
+      [[ -e "$stage/client/$f" ]] && continue
+      mkdir -p "$(dirname "$stage/client/$f")"
+      ln "$RELEASES/$cur/client/$f" "$stage/client/$f" 2>/dev/null || true
+    done < "$RELEASES/$cur/client/.release-assets"
+  fi
+  chmod -R a+rX "$stage/client"
+  mv -T "$stage" "$RELEASES/$id"
+  rm -f "$bundle"
+  ok "Release $id unpacked"
+
+  switch_to "$id"
+  prune
+  ok "🎉 Release $id is live"
+}
+
+cmd_rollback() {
+  local target="${1:-}" cur
+  cur="$(current_release)"
+  [[ -n "$cur" ]] || die "No current release; nothing to roll back"
+  if [[ -z "$target" ]]; then
+    target="$(ls -1 "$RELEASES" | grep -v '^\.' | sort | grep -B1 -x "$cur" | head -n1)"
+    [[ -n "$target" && "$target" != "$cur" ]] || die "No release older than $cur"
+  fi
+  [[ -d "$RELEASES/$target/server/dist" ]] || die "Unknown release $target"
+  [[ "$target" != "$cur" ]] || die "$target is already current"
+  info "⏪ Rolling back $cur -> $target"
+  switch_to "$target"
+  ok "🎉 Rolled back to $target"
+}
+
+cmd_list() {
+  local cur
+  cur="$(current_release)"
+  [[ -d "$RELEASES" ]] || exit 0
+  for dir in $(ls -1 "$RELEASES" | grep -v '^\.' | sort -r); do
+    if [[ "$dir" == "$cur" ]]; then echo "* $dir"; else echo "  $dir"; fi
+  done
+}
+
+cmd="${1:-}"
+shift || true
+case "$cmd" in
+  list) cmd_list ;;
+  activate|rollback)
+    command -v pm2 &>/dev/null || die "pm2 not installed - run deploy-from-root.sh once first"
+    $NEED_SUDO mkdir -p "$APP_DIR"
+    exec 9>"/tmp/spermrace-release.lock"
+    flock -n 9 || die "Another release switch is running"
+    if [[ "$cmd" == "activate" ]]; then cmd_activate "${1:-/tmp/spermrace-prebuilt.tar.gz}"; else cmd_rollback "${1:-}"; fi
+    ;;
+  *) die "usage: $0 activate <bundle> | rollback [release-id] | list" ;;
+esac
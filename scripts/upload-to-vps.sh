@@ -91,7 +91,7 @@ echo ""
 echo -e "${YELLOW}# Extract the project${NC}"
 echo -e "${CYAN}mkdir -p ~/spermrace-deploy${NC}"
 echo -e "${CYAN}cd ~/spermrace-deploy${NC}"
-echo -e "${CYAN}tar -xzf ${REMOTE_PATH}${NC}"
+echo -e "${CYAN}tar -xf ${REMOTE_PATH}${NC}"
 echo ""
 echo -e "${YELLOW}# Run the deployment script${NC}"
 echo -e "${CYAN}chmod +x scripts/vps-deploy-turkey.sh${NC}"
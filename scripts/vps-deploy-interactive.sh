@@ -135,7 +135,7 @@ sudo chown "$USER":"$USER" "$APP_DIR"
 if [[ "$CODE_SOURCE" == "tarball" ]]; then
   cd "$APP_DIR"
   wget -O spermrace-deploy.tar.gz "$TARBALL_URL" || die "Failed to download tarball"
-  tar -xzf spermrace-deploy.tar.gz
+  tar -xf spermrace-deploy.tar.gz
   rm spermrace-deploy.tar.gz
   ok "Tarball extracted"
 elif [[ "$CODE_SOURCE" == "git" ]]; then
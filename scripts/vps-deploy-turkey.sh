@@ -147,7 +147,7 @@ sudo chown "$USER":"$USER" "$APP_DIR"
 cd "$APP_DIR"
 
 cp "$TARBALL_LOCATION" ./spermrace-deploy.tar.gz || die "Failed to copy tarball"
-tar -xzf spermrace-deploy.tar.gz || die "Failed to extract tarball"
+tar -xf spermrace-deploy.tar.gz || die "Failed to extract tarball"
 rm spermrace-deploy.tar.gz
 ok "Project extracted"
 
@@ -374,7 +374,7 @@ echo ""
 echo "   # 2. Extract and rebuild on VPS:"
 echo "   cd $APP_DIR"
 echo "   cp /tmp/spermrace-deploy.tar.gz ."
-echo "   tar -xzf spermrace-deploy.tar.gz && rm spermrace-deploy.tar.gz"
+echo "   tar -xf spermrace-deploy.tar.gz && rm spermrace-deploy.tar.gz"
 echo "   pnpm install && pnpm build"
 echo "   sudo cp -r packages/client/dist/* /var/www/spermrace/"
 echo "   pm2 restart $PM2_APP_NAME"